@@ -20,7 +20,11 @@ from flask import Flask, jsonify, request, session
 from flask_cors import CORS
 
 # Import Firebase utilities
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.autocomplete import MAX_SUGGESTIONS, get_autocomplete_index
+from app.utils.firebase_utils import get_firebase, parse_fields
+from app.utils.product_catalog import get_product_catalog
+from app.utils.query_planner import ListingQuery
+from app.utils.sales_rollups import record_order
 
 # Import all controllers with error handling
 controllers_status = {}
@@ -154,7 +158,7 @@ def create_app():
             return response
 
     # Initialize Firebase
-    firebase = FirebaseUtils()
+    firebase = get_firebase()
     
     # Initialize all controllers
     controllers = {}
@@ -162,7 +166,7 @@ def create_app():
     # Initialize AI Controller
     if controllers_status['ai']:
         try:
-            controllers['ai'] = AIAssistantController()
+            controllers['ai'] = AIAssistantController(firebase=firebase)
             logger.info("✅ AI Assistant Controller initialized")
         except Exception as e:
             logger.warning(f"❌ AI Controller initialization failed: {e}")
@@ -170,7 +174,7 @@ def create_app():
     # Initialize Analytics Controller
     if controllers_status['analytics']:
         try:
-            controllers['analytics'] = AnalyticsController()
+            controllers['analytics'] = AnalyticsController(firebase=firebase)
             logger.info("✅ Analytics Controller initialized")
         except Exception as e:
             logger.warning(f"❌ Analytics Controller initialization failed: {e}")
@@ -178,7 +182,7 @@ def create_app():
     # Initialize Pricing Controller
     if controllers_status['pricing']:
         try:
-            controllers['pricing'] = PricingController()
+            controllers['pricing'] = PricingController(firebase=firebase)
             logger.info("✅ Pricing Controller initialized")
         except Exception as e:
             logger.warning(f"❌ Pricing Controller initialization failed: {e}")
@@ -186,7 +190,7 @@ def create_app():
     # Initialize Auth Controller
     if controllers_status['auth']:
         try:
-            controllers['auth'] = AuthController()
+            controllers['auth'] = AuthController(firebase=firebase)
             logger.info("✅ Auth Controller initialized")
         except Exception as e:
             logger.warning(f"❌ Auth Controller initialization failed: {e}")
@@ -196,7 +200,7 @@ def create_app():
     # Initialize Product Controller
     if controllers_status['product']:
         try:
-            controllers['product'] = ProductController()
+            controllers['product'] = ProductController(firebase=firebase)
             logger.info("✅ Product Controller initialized")
         except Exception as e:
             logger.warning(f"❌ Product Controller initialization failed: {e}")
@@ -204,7 +208,7 @@ def create_app():
     # Initialize Inventory Controller
     if controllers_status['inventory']:
         try:
-            controllers['inventory'] = InventoryController()
+            controllers['inventory'] = InventoryController(firebase=firebase)
             logger.info("✅ Inventory Controller initialized")
         except Exception as e:
             logger.warning(f"❌ Inventory Controller initialization failed: {e}")
@@ -212,7 +216,7 @@ def create_app():
     # Initialize Feedback Controller
     if controllers_status['feedback']:
         try:
-            controllers['feedback'] = FeedbackController()
+            controllers['feedback'] = FeedbackController(firebase=firebase)
             logger.info("✅ Feedback Controller initialized")
         except Exception as e:
             logger.warning(f"❌ Feedback Controller initialization failed: {e}")
@@ -449,6 +453,7 @@ def create_app():
                 {"endpoint": "/api/v1/products/<id>", "method": "PUT", "description": "Update product"},
                 {"endpoint": "/api/v1/products/<id>", "method": "DELETE", "description": "Delete product"},
                 {"endpoint": "/api/v1/products/search", "method": "GET", "description": "Advanced product search"},
+                {"endpoint": "/api/v1/products/suggest", "method": "GET", "description": "Autocomplete suggestions"},
                 {"endpoint": "/api/v1/products/categories", "method": "GET", "description": "Get product categories"},
                 {"endpoint": "/api/v1/products/bulk", "method": "POST", "description": "Bulk product operations"}
             ],
@@ -532,8 +537,7 @@ def create_app():
             
             for collection in collections:
                 try:
-                    docs = firebase.get_documents(collection) or []
-                    collection_stats[collection] = len(docs)
+                    collection_stats[collection] = firebase.count_documents(collection)
                 except:
                     collection_stats[collection] = 0
             
@@ -543,6 +547,8 @@ def create_app():
                 "firebase_project": os.getenv('FIREBASE_PROJECT_ID'),
                 "collections": collection_stats,
                 "total_documents": sum(collection_stats.values()),
+                "cache": firebase.get_cache_stats(),
+                "product_catalog": get_product_catalog("products", firebase).stats(),
                 "timestamp": datetime.now().isoformat()
             })
             
@@ -566,10 +572,10 @@ def create_app():
                 status = {}
                 for collection in collections_to_init:
                     try:
-                        existing_docs = firebase.get_documents(collection) or []
+                        document_count = firebase.count_documents(collection)
                         status[collection] = {
-                            "exists": len(existing_docs) > 0,
-                            "document_count": len(existing_docs)
+                            "exists": document_count > 0,
+                            "document_count": document_count
                         }
                     except Exception as e:
                         status[collection] = {
@@ -804,30 +810,27 @@ def create_app():
             max_price = request.args.get('max_price', type=float)
             sort_by = request.args.get('sort_by', 'name')
             limit = request.args.get('limit', 50, type=int)
-            
-            # Always use fallback implementation for now
-            products = firebase.get_documents("products") or []
-            
-            # Apply filters
-            filtered_products = products
-            if category:
-                filtered_products = [p for p in filtered_products if p.get("category", "").lower() == category.lower()]
-            if min_price is not None:
-                filtered_products = [p for p in filtered_products if p.get("price", 0) >= min_price]
-            if max_price is not None:
-                filtered_products = [p for p in filtered_products if p.get("price", 0) <= max_price]
-            
-            # Sort products
-            if sort_by == 'price':
-                filtered_products.sort(key=lambda x: x.get("price", 0))
-            elif sort_by == 'name':
-                filtered_products.sort(key=lambda x: x.get("name", ""))
-            
-            # Limit results
-            filtered_products = filtered_products[:limit]
+            page_token = request.args.get('page_token')
+            include_total = request.args.get('include_total', 'false').lower() == 'true'
+            include_facets = request.args.get('facets', 'false').lower() == 'true'
+            fields = parse_fields(request.args.get('fields'))
+            
+            # Filter and sort against the in-memory columnar catalog
+            catalog = get_product_catalog("products", firebase)
+            page = catalog.query(
+                category=category,
+                min_price=min_price,
+                max_price=max_price,
+                sort_by=sort_by,
+                limit=limit,
+                page_token=page_token,
+                include_total=include_total,
+                fields=fields
+            )
+            filtered_products = page["documents"]
             
             # If no products, add sample data
-            if not filtered_products:
+            if not filtered_products and not page_token:
                 sample_products = [
                     {
                         "id": "sample_001",
@@ -853,18 +856,26 @@ def create_app():
                     }
                 }), 200
             
-            return jsonify({
+            response = {
                 "success": True,
                 "data": filtered_products,
                 "count": len(filtered_products),
+                "pagination": page["pagination"],
                 "filters_applied": {
                     "category": category,
                     "min_price": min_price,
                     "max_price": max_price,
                     "sort_by": sort_by
                 }
-            }), 200
+            }
+            if include_facets:
+                response["facets"] = catalog.facets(
+                    category=category, min_price=min_price, max_price=max_price
+                )
+            return jsonify(response), 200
                 
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception as e:
             logger.error(f"Get products error: {str(e)}")
             return jsonify({"success": False, "error": str(e)}), 500
@@ -909,6 +920,27 @@ def create_app():
             logger.error(f"Create product error: {str(e)}")
             return jsonify({"success": False, "error": str(e)}), 500
 
+    @app.route("/api/v1/products/suggest", methods=["GET"])
+    def suggest_products_advanced():
+        """Autocomplete suggestions for product names, brands and categories"""
+        try:
+            prefix = request.args.get('q', '')
+            limit = min(max(request.args.get('limit', 8, type=int), 1), MAX_SUGGESTIONS)
+            suggestions = get_autocomplete_index("products", firebase).suggest(
+                prefix, limit=limit, kind=request.args.get('type')
+            )
+
+            return jsonify({
+                "success": True,
+                "data": suggestions,
+                "count": len(suggestions),
+                "query": prefix
+            }), 200
+
+        except Exception as e:
+            logger.error(f"Suggest products error: {str(e)}")
+            return jsonify({"success": False, "error": str(e)}), 500
+
     @app.route("/api/v1/products/<product_id>", methods=["GET"])
     def get_product(product_id):
         """Get a single product by ID"""
@@ -938,33 +970,56 @@ def create_app():
         try:
             status = request.args.get('status')
             customer_id = request.args.get('customer_id')
+            min_total = request.args.get('min_total', type=float)
+            max_total = request.args.get('max_total', type=float)
             limit = request.args.get('limit', 50, type=int)
             
-            orders = firebase.get_documents("orders") or []
-            
-            # Apply filters
-            filtered_orders = orders
+            filters = []
             if status:
-                filtered_orders = [o for o in filtered_orders if o.get("status") == status]
+                filters.append(("status", "==", status))
             if customer_id:
-                filtered_orders = [o for o in filtered_orders if o.get("customer_id") == customer_id]
-            
-            # Sort by creation date (newest first)
-            filtered_orders.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-            
-            # Limit results
-            filtered_orders = filtered_orders[:limit]
-            
-            return jsonify({
+                filters.append(("customer_id", "==", customer_id))
+            if min_total is not None:
+                filters.append(("total", ">=", min_total))
+            if max_total is not None:
+                filters.append(("total", "<=", max_total))
+            
+            # Newest first, one page at a time
+            query = ListingQuery(
+                "orders",
+                filters=filters,
+                sort_by="created_at",
+                descending=True,
+                limit=limit,
+                fields=parse_fields(request.args.get('fields'))
+            )
+            page = query.execute(
+                firebase,
+                page_token=request.args.get('page_token'),
+                include_total=(
+                    request.args.get('include_total', 'false').lower() == 'true'
+                ),
+            )
+            filtered_orders = page["documents"]
+            
+            response = {
                 "success": True,
                 "orders": filtered_orders,
                 "count": len(filtered_orders),
+                "pagination": page["pagination"],
                 "filters": {
                     "status": status,
-                    "customer_id": customer_id
+                    "customer_id": customer_id,
+                    "min_total": min_total,
+                    "max_total": max_total
                 }
-            }), 200
+            }
+            if request.args.get('explain', 'false').lower() == 'true':
+                response["query_plan"] = query.explain(firebase)
+            return jsonify(response), 200
             
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception as e:
             logger.error(f"Get orders error: {str(e)}")
             return jsonify({"success": False, "error": str(e)}), 500
@@ -997,9 +1052,16 @@ def create_app():
                 "created_at": datetime.now().isoformat(),
                 "updated_at": datetime.now().isoformat()
             }
+            if data.get("store_id"):
+                order_data["store_id"] = data["store_id"]
             
             order_id = firebase.create_document("orders", order_data)
             
+            # Keep the daily sales rollups current; the order stands even
+            # if they fail (the backfill job recomputes them)
+            if not record_order(firebase, order_data):
+                logger.warning(f"Sales rollups not updated for order {order_id}")
+
             return jsonify({
                 "success": True,
                 "order_id": order_id,
@@ -1015,10 +1077,25 @@ def create_app():
     def get_customers_advanced():
         """Get all customers"""
         try:
-            customers = firebase.get_documents("customers") or []
+            page_token = request.args.get('page_token')
+            query = ListingQuery(
+                "customers",
+                sort_by=request.args.get('sort_by'),
+                descending=request.args.get('order', 'asc').lower() == 'desc',
+                limit=request.args.get('limit', 50, type=int),
+                fields=parse_fields(request.args.get('fields'))
+            )
+            page = query.execute(
+                firebase,
+                page_token=page_token,
+                include_total=(
+                    request.args.get('include_total', 'false').lower() == 'true'
+                ),
+            )
+            customers = page["documents"]
             
             # If no customers exist, return sample data
-            if not customers:
+            if not customers and not page_token:
                 sample_customers = [
                     {
                         "id": "cust_001",
@@ -1037,12 +1114,18 @@ def create_app():
                     "message": "Sample customers (database empty)"
                 }), 200
             
-            return jsonify({
+            response = {
                 "success": True,
                 "customers": customers,
-                "count": len(customers)
-            }), 200
+                "count": len(customers),
+                "pagination": page["pagination"]
+            }
+            if request.args.get('explain', 'false').lower() == 'true':
+                response["query_plan"] = query.explain(firebase)
+            return jsonify(response), 200
             
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception as e:
             logger.error(f"Get customers error: {str(e)}")
             return jsonify({"success": False, "error": str(e)}), 500
@@ -1163,10 +1246,13 @@ def create_app():
     def get_sales_analytics():
         """Get sales analytics"""
         try:
-            period = request.args.get('period', 'month')  # day, week, month, year
+            # day, week, month, year or <n>d
+            period = request.args.get('period', 'month')
             
             if "analytics" in controllers:
-                result = controllers["analytics"].get_sales_analytics(period)
+                result = controllers["analytics"].get_sales_analytics(
+                    period, request.args.get('store_id')
+                )
                 return jsonify(result), 200
             else:
                 # Fallback implementation
@@ -1198,15 +1284,38 @@ def create_app():
     def get_feedback():
         """Get all feedback"""
         try:
+            rating = request.args.get('rating', type=int)
+            category = request.args.get('category')
+            limit = request.args.get('limit', 50, type=int)
+            page_token = request.args.get('page_token')
+
             if "feedback" in controllers:
-                result = controllers["feedback"].get_all_feedback()
+                result = controllers["feedback"].get_feedback_page(
+                    rating_filter=rating,
+                    category_filter=category,
+                    page_size=limit,
+                    page_token=page_token
+                )
                 return jsonify(result), 200
             else:
                 # Fallback implementation
-                feedback = firebase.get_documents("feedback") or []
+                filters = {}
+                if rating:
+                    filters["rating"] = rating
+                if category:
+                    filters["category"] = category
+                page = firebase.get_documents_page(
+                    "feedback",
+                    page_size=limit,
+                    order_by="timestamp",
+                    descending=True,
+                    filters=filters,
+                    page_token=page_token
+                )
+                feedback = page["documents"]
                 
                 # If no feedback exists, return sample data
-                if not feedback:
+                if not feedback and not page_token:
                     sample_feedback = [
                         {
                             "id": "fb_001",
@@ -1228,9 +1337,12 @@ def create_app():
                 return jsonify({
                     "success": True,
                     "feedback": feedback,
-                    "count": len(feedback)
+                    "count": len(feedback),
+                    "pagination": page["pagination"]
                 }), 200
                 
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         except Exception as e:
             logger.error(f"Get feedback error: {str(e)}")
             return jsonify({"success": False, "error": str(e)}), 500
@@ -1400,18 +1512,14 @@ def create_app():
         try:
             time_range = request.args.get("time_range", "week")
             
-            # Get real data from Firebase
+            # Get real totals from Firebase aggregation queries
             try:
-                products = firebase.get_collection_data("products") or []
-                customers = firebase.get_collection_data("customers") or []
-                orders = firebase.get_collection_data("orders") or []
-            except:
-                products, customers, orders = [], [], []
-            
-            # Calculate real analytics
-            total_revenue = sum(order.get('total', 0) for order in orders)
-            total_orders = len(orders)
-            total_customers = len(customers)
+                order_totals = firebase.aggregate("orders", sum_fields=["total"])
+                total_revenue = order_totals["sum"]["total"]
+                total_orders = order_totals["count"]
+                total_customers = firebase.count_documents("customers")
+            except Exception:
+                total_revenue, total_orders, total_customers = 0, 0, 0
             
             # Mock conversion rate calculation
             conversion_rate = (total_orders / max(total_customers, 1)) * 100 if total_customers > 0 else 0
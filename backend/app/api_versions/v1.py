@@ -10,7 +10,8 @@ from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify, request
 
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.async_firebase_utils import gather_sync, get_async_firebase
+from app.utils.firebase_utils import get_firebase
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,7 +20,8 @@ logger = logging.getLogger(__name__)
 api_v1 = Blueprint("api_v1", __name__, url_prefix="/api/v1")
 
 # Initialize Firebase
-firebase = FirebaseUtils()
+firebase = get_firebase()
+async_firebase = get_async_firebase(firebase)
 
 
 # Version info
@@ -211,15 +213,17 @@ def submit_feedback():
 def get_analytics():
     """Get analytics dashboard - V1"""
     try:
-        # V1 analytics - basic metrics
-        products = firebase.get_documents("products")
-        feedback = firebase.get_documents("feedback")
+        # V1 analytics - basic metrics, counted concurrently
+        total_products, total_feedback = gather_sync(
+            async_firebase.count_documents("products"),
+            async_firebase.count_documents("feedback"),
+        )
 
         return jsonify(
             {
                 "metrics": {
-                    "total_products": len(products),
-                    "total_feedback": len(feedback),
+                    "total_products": total_products,
+                    "total_feedback": total_feedback,
                     "average_rating": 4.5,  # V1 simplified calculation
                     "active_users": 100,
                 },
@@ -10,7 +10,11 @@ from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify, request
 
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.async_firebase_utils import gather_sync, get_async_firebase
+from app.utils.copurchase import DEFAULT_TOP_N, NEIGHBOURS_COLLECTION
+from app.utils.firebase_utils import get_firebase, parse_fields
+from app.utils.product_catalog import get_product_catalog
+from app.utils.search_index import get_collection_search_index
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,7 +23,8 @@ logger = logging.getLogger(__name__)
 api_v2 = Blueprint("api_v2", __name__, url_prefix="/api/v2")
 
 # Initialize Firebase
-firebase = FirebaseUtils()
+firebase = get_firebase()
+async_firebase = get_async_firebase(firebase)
 
 
 # Version info
@@ -84,50 +89,61 @@ def get_products():
     try:
         # V2 enhanced query parameters
         category = request.args.get("category")
+        brand = request.args.get("brand")
         min_price = request.args.get("min_price", type=float)
         max_price = request.args.get("max_price", type=float)
         in_stock_only = request.args.get("in_stock", type=bool, default=False)
         sort_by = request.args.get("sort_by", "name")
         limit = request.args.get("limit", type=int, default=100)
-
-        products = firebase.get_documents("products")
-
-        # V2 filtering
-        if category:
-            products = [
-                p for p in products if p.get("category", "").lower() == category.lower()
-            ]
-        if min_price is not None:
-            products = [p for p in products if p.get("price", 0) >= min_price]
-        if max_price is not None:
-            products = [p for p in products if p.get("price", 0) <= max_price]
-        if in_stock_only:
-            products = [p for p in products if p.get("in_stock", True)]
-
-        # V2 sorting
-        if sort_by == "price":
-            products.sort(key=lambda x: x.get("price", 0))
-        elif sort_by == "name":
-            products.sort(key=lambda x: x.get("name", ""))
-
-        # V2 pagination
-        products = products[:limit]
-
-        return jsonify(
-            {
-                "products": products,
-                "count": len(products),
-                "version": "2.0.0",
-                "filters_applied": {
-                    "category": category,
-                    "min_price": min_price,
-                    "max_price": max_price,
-                    "in_stock_only": in_stock_only,
-                    "sort_by": sort_by,
-                    "limit": limit,
-                },
-            }
+        page_token = request.args.get("page_token")
+        include_total = request.args.get("include_total", "false").lower() == "true"
+        include_facets = request.args.get("facets", "false").lower() == "true"
+        fields = parse_fields(request.args.get("fields"))
+
+        # V2 filtering, sorting and cursor pagination on the columnar catalog
+        catalog = get_product_catalog("products", firebase)
+        page = catalog.query(
+            category=category,
+            brand=brand,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock_only=in_stock_only,
+            sort_by=sort_by,
+            limit=limit,
+            page_token=page_token,
+            include_total=include_total,
+            fields=fields,
         )
+        products = page["documents"]
+
+        response = {
+            "products": products,
+            "count": len(products),
+            "pagination": page["pagination"],
+            "version": "2.0.0",
+            "filters_applied": {
+                "category": category,
+                "brand": brand,
+                "min_price": min_price,
+                "max_price": max_price,
+                "in_stock_only": in_stock_only,
+                "sort_by": sort_by,
+                "limit": limit,
+            },
+        }
+        if include_facets:
+            # Counts per category, brand, price/rating bucket and stock
+            # status, so clients don't need the full product list for filters
+            response["facets"] = catalog.facets(
+                category=category,
+                brand=brand,
+                min_price=min_price,
+                max_price=max_price,
+                in_stock_only=in_stock_only,
+            )
+        return jsonify(response)
+    except ValueError as e:
+        return jsonify({"error": str(e), "version": "2.0.0"}), 400
     except Exception as e:
         logger.error(f"V2 - Error getting products: {str(e)}")
         return (
@@ -222,51 +238,55 @@ def search_products():
         if not query:
             return jsonify({"error": "Search query required", "version": "2.0.0"}), 400
 
-        products = firebase.get_documents("products")
-
-        # V2 advanced search
-        results = []
-        for product in products:
-            score = 0
-            query_lower = query.lower()
-
-            # Search in name
-            if query_lower in product.get("name", "").lower():
-                score += 10
-
-            # Search in description
-            if query_lower in product.get("description", "").lower():
-                score += 5
-
-            # Search in category
-            if query_lower in product.get("category", "").lower():
-                score += 3
-
-            # Search in tags
-            for tag in product.get("tags", []):
-                if query_lower in tag.lower():
-                    score += 2
+        limit = request.args.get("limit", type=int, default=50)
+        include_facets = request.args.get("facets", "false").lower() == "true"
 
-            if score > 0:
-                product["search_score"] = score
-                results.append(product)
+        # V2 advanced search: BM25 ranking over the product index
+        index = get_collection_search_index("products", firebase)
+        results = index.search_documents(query, limit=limit, score_field="search_score")
 
-        # Sort by relevance
-        results.sort(key=lambda x: x["search_score"], reverse=True)
-
-        return jsonify(
-            {
-                "results": results,
-                "count": len(results),
-                "query": query,
-                "version": "2.0.0",
-            }
-        )
+        response = {
+            "results": results,
+            "count": len(results),
+            "query": query,
+            "version": "2.0.0",
+        }
+        if include_facets:
+            response["facets"] = get_product_catalog("products", firebase).facets(
+                ids=index.matching_ids(query)
+            )
+        return jsonify(response)
     except Exception as e:
         logger.error(f"V2 - Search error: {str(e)}")
         return jsonify({"error": "Search failed", "version": "2.0.0"}), 500
 
 
+def _similar_products(product, limit):
+    """
+    Cold-start recommendations from the product catalog: same-category
+    products within 20% of the price first (score 8), then the rest of the
+    category (score 5)
+    """
+    category = product.get("category")
+    if not category:
+        return []
+    price = product.get("price", 0)
+    catalog = get_product_catalog("products", firebase)
+
+    recommendations = {}
+    for score, bounds in ((8, (price * 0.8, price * 1.2)), (5, (None, None))):
+        page = catalog.query(
+            category=category,
+            min_price=bounds[0],
+            max_price=bounds[1],
+            limit=limit + len(recommendations) + 1,
+        )
+        for p in page["documents"]:
+            if p["id"] != product.get("id") and p["id"] not in recommendations:
+                recommendations[p["id"]] = {**p, "recommendation_score": score}
+    return list(recommendations.values())[:limit]
+
+
 # Recommendations endpoint (New in V2)
 @api_v2.route("/recommendations/<product_id>", methods=["GET"])
 def get_recommendations(product_id):
@@ -276,35 +296,31 @@ def get_recommendations(product_id):
         if not product:
             return jsonify({"error": "Product not found", "version": "2.0.0"}), 404
 
-        # V2 simple recommendation algorithm
-        all_products = firebase.get_documents("products")
-        recommendations = []
-
-        for p in all_products:
-            if p.get("id") != product_id:
-                score = 0
-
-                # Same category
-                if p.get("category") == product.get("category"):
-                    score += 5
+        limit = min(max(request.args.get("limit", 5, type=int), 1), DEFAULT_TOP_N)
 
-                # Similar price range
-                price_diff = abs(p.get("price", 0) - product.get("price", 0))
-                if price_diff <= product.get("price", 0) * 0.2:  # Within 20%
-                    score += 3
-
-                if score > 0:
-                    p["recommendation_score"] = score
-                    recommendations.append(p)
-
-        # Sort and limit
-        recommendations.sort(key=lambda x: x["recommendation_score"], reverse=True)
-        recommendations = recommendations[:5]
+        # Products bought together, precomputed by the co-purchase model
+        stored = firebase.get_document(NEIGHBOURS_COLLECTION, product_id) or {}
+        neighbours = stored.get("neighbours", [])[:limit]
+        products = firebase.get_documents_by_ids(
+            "products", [n.get("id") for n in neighbours]
+        )
+        recommendations = [
+            {**products[n["id"]], "recommendation_score": n.get("score")}
+            for n in neighbours
+            if n.get("id") in products
+        ]
+        source = "co_purchase"
+
+        # Cold start: no order history yet, fall back to similar products
+        if not recommendations:
+            recommendations = _similar_products(product, limit)
+            source = "similar_products"
 
         return jsonify(
             {
                 "recommendations": recommendations,
                 "base_product": product,
+                "source": source,
                 "version": "2.0.0",
             }
         )
@@ -321,8 +337,10 @@ def get_recommendations(product_id):
 def get_enhanced_analytics():
     """Get enhanced analytics dashboard - V2"""
     try:
-        products = firebase.get_documents("products")
-        feedback = firebase.get_documents("feedback")
+        products, feedback = gather_sync(
+            async_firebase.get_documents("products"),
+            async_firebase.get_documents("feedback"),
+        )
 
         # V2 enhanced analytics calculations
         total_views = sum(p.get("views", 0) for p in products)
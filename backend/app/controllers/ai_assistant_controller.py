@@ -8,15 +8,17 @@ import speech_recognition as sr
 
 from app.controllers.ai_engine import AIEngine
 from app.utils.email_utils import EmailUtils
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import get_firebase
+from app.utils.search_index import get_collection_search_index
+from app.utils.substitute_index import get_substitute_index
 
 logger = logging.getLogger(__name__)
 
 
 class AIAssistantController:
-    def __init__(self):
+    def __init__(self, firebase=None):
         self.ai_engine = AIEngine()
-        self.firebase = FirebaseUtils()
+        self.firebase = firebase or get_firebase()
         self.email_utils = EmailUtils()
         self.chat_collection = "chat_history"
         self.products_collection = "products"
@@ -158,14 +160,11 @@ class AIAssistantController:
             if not original_product:
                 return {"substitutes": [], "message": "Original product not found"}
 
-            # Get all products in the same category
-            category_products = self.firebase.get_documents(
-                self.products_collection, {"category": original_product.get("category")}
-            )
-
-            # Use AI to find best substitutes
+            # Rank the category's products against the precomputed index
             substitutes = self.ai_engine.find_product_substitutes(
-                original_product, category_products, preferences
+                original_product,
+                preferences=preferences,
+                index=get_substitute_index(self.products_collection, self.firebase),
             )
 
             # Add substitute reasoning
@@ -251,14 +250,16 @@ class AIAssistantController:
             item_scores = []
             sustainability_factors = []
 
+            # Get product sustainability data for the whole cart in one read
+            products = self.firebase.get_documents_by_ids(
+                self.products_collection,
+                [item.get("product_id") for item in cart_items],
+            )
+
             for item in cart_items:
                 product_id = item.get("product_id")
                 quantity = item.get("quantity", 1)
-
-                # Get product sustainability data
-                product = self.firebase.get_document(
-                    self.products_collection, product_id
-                )
+                product = products.get(product_id)
 
                 if product:
                     # Calculate item sustainability score
@@ -342,17 +343,24 @@ class AIAssistantController:
             # Extract search terms (enhanced with Gemini if available)
             search_terms = self._extract_search_terms_with_ai(message)
 
-            # Get all products from Firebase
-            all_products = self.firebase.get_documents(self.products_collection)
+            # Search the product index using AI engine
+            products = self.ai_engine.search_products(
+                search_terms,
+                index=get_collection_search_index(
+                    self.products_collection, self.firebase
+                ),
+            )
 
-            # Search products using AI engine
-            products = self.ai_engine.search_products(search_terms, all_products)
+            # Misspelled terms were matched to catalog terms (fuzzy fallback)
+            corrected_query = products[0].get("corrected_query") if products else None
 
             # Generate AI-powered response
             if len(products) > 0:
                 response_text = (
                     f"I found {len(products)} products that match your search"
                 )
+                if corrected_query:
+                    response_text += f' for "{corrected_query}"'
                 if self.gemini_model:
                     # Use Gemini to generate a more natural response
                     ai_response = self._generate_search_response(message, products[:3])
@@ -368,6 +376,7 @@ class AIAssistantController:
                 "products": products[:5],
                 "actions": ["show_products"],
                 "search_terms": search_terms,
+                "corrected_query": corrected_query,
                 "total_found": len(products),
             }
         except Exception as e:
@@ -4,7 +4,7 @@ import os
 import re
 import warnings
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import google.generativeai as genai
@@ -12,10 +12,17 @@ import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from app.utils.recommender import RecommendationScorer
+from app.utils.search_index import SearchIndex, tokenize
+from app.utils.substitute_index import SubstituteIndex
+
 warnings.filterwarnings("ignore")
 
 logger = logging.getLogger(__name__)
 
+# Searches finding fewer products than this also try a typo-corrected query
+CORRECTION_MIN_RESULTS = 3
+
 
 class AIEngine:
     def __init__(self):
@@ -75,61 +82,38 @@ class AIEngine:
             return [avg] * days_ahead
 
     def find_product_substitutes(
-        self, original_product: Dict, all_products: List[Dict], preferences: Dict = None
+        self,
+        original_product: Dict,
+        all_products: Optional[List[Dict]] = None,
+        preferences: Dict = None,
+        index: Optional[SubstituteIndex] = None,
+        limit: int = 10,
     ) -> List[Dict]:
         """
         Find product substitutes using AI similarity matching
 
+        Scores every same-category product at once from TF-IDF text
+        similarity plus price, rating and brand features.
+
         Args:
             original_product (Dict): Original product details
-            all_products (List[Dict]): All available products
+            all_products (List[Dict], optional): Candidate products when no
+                index is given (indexed on the fly)
             preferences (Dict): User preferences
+            index (SubstituteIndex, optional): Prebuilt product index, e.g.
+                from get_substitute_index()
+            limit (int): Maximum number of substitutes
 
         Returns:
             List[Dict]: Ranked substitute products
         """
         try:
-            if not all_products:
-                return []
-
-            # Filter products in the same category
-            category_products = [
-                p
-                for p in all_products
-                if p.get("category") == original_product.get("category")
-                and p.get("id") != original_product.get("id")
-            ]
-
-            if not category_products:
-                return []
-
-            # Calculate similarity scores
-            scored_substitutes = []
-
-            for product in category_products:
-                similarity_score = self._calculate_product_similarity(
-                    original_product, product
-                )
-
-                # Apply user preferences
-                preference_score = self._apply_preference_scoring(
-                    product, preferences or {}
-                )
+            if index is None:
+                if not all_products:
+                    return []
+                index = SubstituteIndex.build(all_products)
 
-                # Combined score
-                final_score = (similarity_score * 0.7) + (preference_score * 0.3)
-
-                product_copy = product.copy()
-                product_copy["similarity_score"] = similarity_score
-                product_copy["preference_score"] = preference_score
-                product_copy["final_score"] = final_score
-
-                scored_substitutes.append(product_copy)
-
-            # Sort by final score
-            scored_substitutes.sort(key=lambda x: x["final_score"], reverse=True)
-
-            return scored_substitutes[:10]  # Return top 10 substitutes
+            return index.find_substitutes(original_product, limit, preferences)
 
         except Exception as e:
             logger.error(f"Error finding substitutes: {str(e)}")
@@ -333,73 +317,74 @@ class AIEngine:
                 "I'm here to help with your shopping needs. How can I assist you today?"
             )
 
-    def search_products(self, query: str, products: List[Dict]) -> List[Dict]:
+    def search_products(
+        self,
+        query: str,
+        products: Optional[List[Dict]] = None,
+        index: Optional[SearchIndex] = None,
+        limit: int = 20,
+    ) -> List[Dict]:
         """
         Perform AI-powered product search
 
+        Ranks products with BM25 over an inverted index of name,
+        description, category and tags. Only when the query finds fewer
+        than CORRECTION_MIN_RESULTS products are terms the index doesn't
+        know corrected to the closest indexed terms (trigram candidates
+        re-ranked by edit distance); if the corrected query finds more, its
+        results are returned instead, carrying it in corrected_query.
+
         Args:
             query (str): Search query
-            products (List[Dict]): List of all products
+            products (List[Dict], optional): Products to search when no
+                index is given (indexed on the fly)
+            index (SearchIndex, optional): Prebuilt product index, e.g. from
+                get_collection_search_index()
+            limit (int): Maximum number of results
 
         Returns:
-            List[Dict]: Ranked search results
+            List[Dict]: Ranked search results with relevance_score
         """
         try:
-            if not products:
-                return []
-
-            # Simple keyword-based search (can be enhanced with AI/ML models)
-            query_lower = query.lower()
-            scored_products = []
-
-            for product in products:
-                score = 0
-                name = product.get("name", "").lower()
-                description = product.get("description", "").lower()
-                category = product.get("category", "").lower()
-                tags = product.get("tags", [])
-
-                # Calculate relevance score
-                if query_lower in name:
-                    score += 10
-                if query_lower in description:
-                    score += 5
-                if query_lower in category:
-                    score += 3
-
-                # Check tags
-                for tag in tags:
-                    if query_lower in tag.lower():
-                        score += 2
-
-                # Fuzzy matching for partial words
-                words = query_lower.split()
-                for word in words:
-                    if word in name or word in description:
-                        score += 1
-
-                if score > 0:
-                    product_copy = product.copy()
-                    product_copy["relevance_score"] = score
-                    scored_products.append(product_copy)
-
-            # Sort by relevance score
-            scored_products.sort(key=lambda x: x["relevance_score"], reverse=True)
-
-            return scored_products[:20]  # Return top 20 results
+            if index is None:
+                if not products:
+                    return []
+                index = SearchIndex.build(products)
+
+            results = index.search_documents(query, limit=limit)
+            if len(results) >= min(limit, CORRECTION_MIN_RESULTS):
+                return results
+
+            # Typo fallback for queries that (nearly) miss
+            corrected = index.correct_query(query)
+            if corrected and corrected != " ".join(tokenize(query)):
+                corrected_results = index.search_documents(corrected, limit=limit)
+                if len(corrected_results) > len(results):
+                    for result in corrected_results:
+                        result["corrected_query"] = corrected
+                    return corrected_results
+
+            return results
         except Exception as e:
             logger.error(f"Error in product search: {str(e)}")
-            return products[:10]  # Fallback to first 10 products
+            return (products or [])[:10]  # Fallback to first 10 products
 
     def generate_recommendations(
-        self, user_preferences: Dict, products: List[Dict]
+        self,
+        user_preferences: Dict,
+        products: List[Dict],
+        weights: Optional[Dict[str, float]] = None,
     ) -> List[Dict]:
         """
         Generate AI-powered product recommendations
 
+        Scores all products in one vectorized pass (see
+        RecommendationScorer); weights default to DEFAULT_WEIGHTS.
+
         Args:
             user_preferences (Dict): User preferences and history
             products (List[Dict]): List of all products
+            weights (Dict[str, float], optional): Scoring weight overrides
 
         Returns:
             List[Dict]: Recommended products
@@ -408,59 +393,7 @@ class AIEngine:
             if not products:
                 return []
 
-            # Extract user preferences
-            preferred_categories = user_preferences.get("categories", [])
-            price_range = user_preferences.get("price_range", {})
-            previous_purchases = user_preferences.get("purchase_history", [])
-            favorite_brands = user_preferences.get("brands", [])
-
-            scored_products = []
-
-            for product in products:
-                score = 0
-
-                # Category preference
-                if product.get("category") in preferred_categories:
-                    score += 15
-
-                # Price range preference
-                price = product.get("price", 0)
-                min_price = price_range.get("min", 0)
-                max_price = price_range.get("max", float("inf"))
-                if min_price <= price <= max_price:
-                    score += 10
-
-                # Brand preference
-                if product.get("brand") in favorite_brands:
-                    score += 12
-
-                # Avoid recommending previously purchased items
-                if product.get("id") not in previous_purchases:
-                    score += 5
-
-                # High-rated products
-                rating = product.get("rating", 0)
-                if rating >= 4.0:
-                    score += 8
-                elif rating >= 3.5:
-                    score += 5
-
-                # Popular products (based on review count)
-                review_count = product.get("review_count", 0)
-                if review_count > 100:
-                    score += 6
-                elif review_count > 50:
-                    score += 3
-
-                if score > 0:
-                    product_copy = product.copy()
-                    product_copy["recommendation_score"] = score
-                    scored_products.append(product_copy)
-
-            # Sort by recommendation score
-            scored_products.sort(key=lambda x: x["recommendation_score"], reverse=True)
-
-            return scored_products[:15]  # Return top 15 recommendations
+            return RecommendationScorer(products, weights).recommend(user_preferences)
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
             return products[:10]  # Fallback to first 10 products
@@ -683,94 +616,6 @@ class AIEngine:
         except:
             return 0
 
-    def _calculate_product_similarity(self, product1: Dict, product2: Dict) -> float:
-        """Calculate similarity between two products"""
-        try:
-            similarity_score = 0
-
-            # Price similarity (closer prices = higher similarity)
-            price1 = product1.get("price", 0)
-            price2 = product2.get("price", 0)
-            if price1 > 0 and price2 > 0:
-                price_diff = abs(price1 - price2) / max(price1, price2)
-                price_similarity = 1 - min(price_diff, 1)
-                similarity_score += price_similarity * 0.3
-
-            # Brand similarity
-            if product1.get("brand") == product2.get("brand"):
-                similarity_score += 0.2
-
-            # Rating similarity
-            rating1 = product1.get("rating", 0)
-            rating2 = product2.get("rating", 0)
-            if rating1 > 0 and rating2 > 0:
-                rating_diff = abs(rating1 - rating2) / 5.0
-                rating_similarity = 1 - rating_diff
-                similarity_score += rating_similarity * 0.2
-
-            # Text similarity (name and description)
-            text_similarity = self._calculate_text_similarity(
-                product1.get("name", "") + " " + product1.get("description", ""),
-                product2.get("name", "") + " " + product2.get("description", ""),
-            )
-            similarity_score += text_similarity * 0.3
-
-            return min(similarity_score, 1.0)
-
-        except Exception as e:
-            logger.error(f"Error calculating similarity: {str(e)}")
-            return 0.0
-
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """Calculate text similarity using TF-IDF"""
-        try:
-            if not text1 or not text2:
-                return 0
-
-            # Simple word overlap calculation
-            words1 = set(text1.lower().split())
-            words2 = set(text2.lower().split())
-
-            intersection = words1.intersection(words2)
-            union = words1.union(words2)
-
-            return len(intersection) / len(union) if union else 0
-
-        except Exception as e:
-            logger.error(f"Error calculating text similarity: {str(e)}")
-            return 0
-
-    def _apply_preference_scoring(self, product: Dict, preferences: Dict) -> float:
-        """Apply user preference scoring to product"""
-        try:
-            score = 0.5  # Base score
-
-            # Price preference
-            if "max_price" in preferences:
-                max_price = preferences["max_price"]
-                product_price = product.get("price", 0)
-                if product_price <= max_price:
-                    score += 0.2
-                else:
-                    score -= 0.1
-
-            # Brand preference
-            preferred_brands = preferences.get("preferred_brands", [])
-            if product.get("brand") in preferred_brands:
-                score += 0.2
-
-            # Rating preference
-            min_rating = preferences.get("min_rating", 0)
-            product_rating = product.get("rating", 0)
-            if product_rating >= min_rating:
-                score += 0.1
-
-            return min(max(score, 0), 1)
-
-        except Exception as e:
-            logger.error(f"Error applying preferences: {str(e)}")
-            return 0.5
-
     def _is_coupon_applicable(
         self,
         coupon: Dict,
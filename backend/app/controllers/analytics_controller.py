@@ -7,28 +7,92 @@ import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from app.utils.firebase_utils import FirebaseUtils
+import numpy as np
+
+from app.utils.async_firebase_utils import gather_sync, get_async_firebase
+from app.utils.firebase_utils import get_firebase
+from app.utils.order_extract import (
+    bucket_range,
+    bucket_starts,
+    get_order_extract,
+    resolve_period,
+)
+from app.utils.product_activity import ProductActivity
+from app.utils.product_catalog import get_product_catalog
+from app.utils.sales_rollups import SCOPE_ALL, SCOPE_PRODUCT, daily_window, top_keys
+from app.utils.section_runner import Section, SectionRunner
 
 logger = logging.getLogger(__name__)
 
+# time_range names accepted alongside "<n>d"
+RANGE_DAYS = {"day": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
+
+# Longest trend window served from the daily rollups
+MAX_RANGE_DAYS = 366
+
+# Stock at or below this is reported in product performance
+LOW_STOCK_THRESHOLD = 10
+
+# Runs the independent sections of the dashboard, shared by all controllers
+dashboard_sections = SectionRunner.from_env("DASHBOARD_SECTION")
+
+
+def _growth(current: float, previous: float) -> Optional[float]:
+    """Percent change from previous to current (None without a previous value)"""
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 1)
+
+
+def _range_days(time_range: str, default: int = 7) -> int:
+    """Days covered by a time_range, e.g. 7d or month"""
+    time_range = (time_range or "").strip().lower()
+    if time_range in RANGE_DAYS:
+        return RANGE_DAYS[time_range]
+    if time_range.endswith("d") and time_range[:-1].isdigit():
+        return max(1, min(int(time_range[:-1]), MAX_RANGE_DAYS))
+    return default
+
 
 class AnalyticsController:
-    def __init__(self):
+    def __init__(self, firebase=None):
         """Initialize Analytics Controller"""
-        self.firebase = FirebaseUtils()
+        self.firebase = firebase or get_firebase()
+        self.async_firebase = get_async_firebase(self.firebase)
+        self.order_extract = get_order_extract("orders", self.firebase)
+        self.product_catalog = get_product_catalog("products", self.firebase)
+        self.section_runner = dashboard_sections
 
-    def get_dashboard_stats(self) -> Dict[str, Any]:
-        """Get dashboard statistics"""
+    def get_dashboard_stats(self, period: str = "month") -> Dict[str, Any]:
+        """Get dashboard statistics for a period, with growth over the previous one"""
         try:
-            # Mock data for now - replace with real queries
+            window = resolve_period(period)
+            end = datetime.now()
+            start = end - timedelta(days=window.days)
+            orders, _ = self.order_extract.window(
+                start - timedelta(days=window.days), end
+            )
+            current_mask = (orders["created_at"] > start).to_numpy()
+            current, previous = orders[current_mask], orders[~current_mask]
+
+            total_customers, total_products = gather_sync(
+                self.async_firebase.count_documents("customers"),
+                self.async_firebase.count_documents("products"),
+            )
+            total_sales = float(current["total"].sum())
+
             stats = {
-                "total_sales": 12456.78,
-                "total_orders": 145,
-                "total_customers": 89,
-                "total_products": 23,
-                "revenue_growth": 15.2,
-                "order_growth": 8.7,
-                "customer_growth": 12.1,
+                "period": window.name,
+                "total_sales": round(total_sales, 2),
+                "total_orders": len(current),
+                "total_customers": total_customers,
+                "total_products": total_products,
+                "active_customers": int(current["customer_id"].nunique()),
+                "revenue_growth": _growth(total_sales, float(previous["total"].sum())),
+                "order_growth": _growth(len(current), len(previous)),
+                "customer_growth": _growth(
+                    current["customer_id"].nunique(), previous["customer_id"].nunique()
+                ),
                 "generated_at": datetime.now().isoformat(),
             }
 
@@ -39,22 +103,58 @@ class AnalyticsController:
             logger.error(f"Error getting dashboard stats: {str(e)}")
             return {"success": False, "error": str(e)}
 
-    def get_sales_analytics(self, period: str = "30d") -> Dict[str, Any]:
-        """Get sales analytics for specified period"""
+    def get_sales_analytics(
+        self, period: str = "30d", store_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get sales analytics for a period, bucketed by day, week, month or year"""
         try:
-            # Mock sales data
+            window = resolve_period(period)
+            end = datetime.now()
+            start = end - timedelta(days=window.series_days)
+            orders, lines = self.order_extract.window(start, end, store_id)
+
+            series = (
+                orders.groupby(bucket_starts(orders["created_at"], window.bucket))
+                .agg(revenue=("total", "sum"), orders=("id", "size"))
+                .reindex(bucket_range(start, end, window.bucket), fill_value=0)
+            )
+            top = (
+                lines.groupby("product_id")
+                .agg(revenue=("revenue", "sum"), units_sold=("quantity", "sum"))
+                .nlargest(5, "revenue")
+            )
+            products = self.product_catalog.get_many(top.index)
+
+            total_revenue = float(orders["total"].sum())
             sales_data = {
-                "period": period,
-                "total_revenue": 12456.78,
-                "total_orders": 145,
-                "average_order_value": 85.91,
-                "daily_sales": [
-                    {"date": "2025-07-01", "revenue": 456.78, "orders": 6},
-                    {"date": "2025-07-02", "revenue": 523.45, "orders": 8},
+                "period": window.name,
+                "bucket": window.bucket,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "store_id": store_id,
+                "total_revenue": round(total_revenue, 2),
+                "total_orders": len(orders),
+                "average_order_value": (
+                    round(total_revenue / len(orders), 2) if len(orders) else 0
+                ),
+                "sales_over_time": [
+                    {
+                        "date": bucket.strftime("%Y-%m-%d"),
+                        "revenue": round(float(revenue), 2),
+                        "orders": int(count),
+                    }
+                    for bucket, revenue, count in zip(
+                        series.index, series["revenue"], series["orders"]
+                    )
                 ],
                 "top_products": [
-                    {"name": "Premium Coffee", "revenue": 2345.67, "units_sold": 45},
-                    {"name": "Organic Tea", "revenue": 1876.32, "units_sold": 32},
+                    {
+                        "id": product_id,
+                        "name": products.get(product_id, {}).get("name", product_id),
+                        "revenue": round(float(row.revenue), 2),
+                        "units_sold": float(row.units_sold),
+                    }
+                    for product_id, row in top.iterrows()
                 ],
             }
 
@@ -65,19 +165,71 @@ class AnalyticsController:
             logger.error(f"Error getting sales analytics: {str(e)}")
             return {"success": False, "error": str(e)}
 
-    def get_customer_analytics(self) -> Dict[str, Any]:
-        """Get customer analytics"""
+    def get_customer_analytics(self, period: str = "month") -> Dict[str, Any]:
+        """Get customer analytics for the last period"""
         try:
+            window = resolve_period(period)
+            end = datetime.now()
+            start = end - timedelta(days=window.days)
+            orders, _ = self.order_extract.window(
+                start - timedelta(days=window.days), end
+            )
+            orders = orders[orders["customer_id"].notna()]
+            current_mask = (orders["created_at"] > start).to_numpy()
+            previous_customers = set(orders.loc[~current_mask, "customer_id"])
+
+            spend = (
+                orders[current_mask]
+                .groupby("customer_id")
+                .agg(spend=("total", "sum"), orders=("id", "size"))
+            )
+            first_orders = self.order_extract.first_order_times(spend.index)
+            is_new = first_orders > np.datetime64(start, "ns")
+            returning = spend[~is_new]
+            premium_floor = returning["spend"].quantile(0.8) if len(returning) else 0
+            segments = np.where(
+                is_new,
+                "New",
+                np.where(spend["spend"] >= premium_floor, "Premium", "Regular"),
+            )
+            active = len(spend)
+
+            total_customers = self.firebase.count_documents("customers")
             customer_data = {
-                "total_customers": 89,
-                "new_customers_this_month": 12,
-                "repeat_customers": 67,
-                "customer_retention_rate": 75.3,
-                "average_lifetime_value": 456.78,
+                "period": window.name,
+                "total_customers": total_customers,
+                "active_customers": active,
+                "new_customers": int(is_new.sum()),
+                "repeat_customers": int(
+                    (~is_new | (spend["orders"] > 1).to_numpy()).sum()
+                ),
+                "customer_retention_rate": (
+                    round(
+                        len(previous_customers & set(spend.index))
+                        / len(previous_customers)
+                        * 100,
+                        1,
+                    )
+                    if previous_customers
+                    else None
+                ),
+                "average_customer_value": (
+                    round(float(spend["spend"].mean()), 2) if active else 0
+                ),
+                "average_orders_per_customer": (
+                    round(float(spend["orders"].mean()), 2) if active else 0
+                ),
                 "customer_segments": [
-                    {"segment": "Premium", "count": 23, "percentage": 25.8},
-                    {"segment": "Regular", "count": 45, "percentage": 50.6},
-                    {"segment": "New", "count": 21, "percentage": 23.6},
+                    {
+                        "segment": segment,
+                        "count": int((segments == segment).sum()),
+                        "percentage": (
+                            round((segments == segment).sum() / active * 100, 1)
+                            if active
+                            else 0
+                        ),
+                    }
+                    for segment in ("Premium", "Regular", "New")
                 ],
             }
 
@@ -88,30 +240,94 @@ class AnalyticsController:
             logger.error(f"Error getting customer analytics: {str(e)}")
             return {"success": False, "error": str(e)}
 
-    def get_product_performance(self) -> Dict[str, Any]:
-        """Get product performance analytics"""
+    def get_product_performance(
+        self, period: str = "30d", limit: int = 5
+    ) -> Dict[str, Any]:
+        """Get product performance analytics for the last period"""
         try:
+            window = resolve_period(period)
+            end = datetime.now()
+            start = end - timedelta(days=window.days)
+            _, lines = self.order_extract.window(start, end)
+            lines = lines[lines["product_id"].notna()]
+
+            by_product = lines.groupby("product_id").agg(
+                revenue=("revenue", "sum"),
+                units_sold=("quantity", "sum"),
+                orders=("order_id", "nunique"),
+            )
+            products = self.product_catalog.get_many(by_product.index)
+            by_product["category"] = [
+                products.get(product_id, {}).get("category") or "Uncategorized"
+                for product_id in by_product.index
+            ]
+            by_category = (
+                by_product.groupby("category")
+                .agg(
+                    revenue=("revenue", "sum"),
+                    units_sold=("units_sold", "sum"),
+                    products=("orders", "size"),
+                )
+                .sort_values("revenue", ascending=False)
+            )
+
+            def performer(product_id: str, row: Any) -> Dict[str, Any]:
+                product = products.get(product_id, {})
+                price, cost = product.get("price"), product.get("cost")
+                margin = None
+                if (
+                    isinstance(price, (int, float))
+                    and isinstance(cost, (int, float))
+                    and price > 0
+                ):
+                    margin = round((price - cost) / price * 100, 1)
+                return {
+                    "id": product_id,
+                    "name": product.get("name", product_id),
+                    "category": row.category,
+                    "revenue": round(float(row.revenue), 2),
+                    "units_sold": float(row.units_sold),
+                    "orders": int(row.orders),
+                    "profit_margin": margin,
+                }
+
+            low_stock = self.product_catalog.query(
+                sort_by="stock_quantity", limit=limit, fields=["name", "stock_quantity"]
+            )["documents"]
+
             product_data = {
-                "total_products": 23,
+                "period": window.name,
+                "total_products": len(self.product_catalog),
+                "products_sold": len(by_product),
                 "best_performers": [
+                    performer(product_id, row)
+                    for product_id, row in by_product.nlargest(
+                        limit, "revenue"
+                    ).iterrows()
+                ],
+                "worst_performers": [
+                    performer(product_id, row)
+                    for product_id, row in by_product.nsmallest(
+                        limit, "revenue"
+                    ).iterrows()
+                ],
+                "category_performance": [
                     {
-                        "id": "prod_001",
-                        "name": "Premium Coffee Beans",
-                        "revenue": 2345.67,
-                        "units_sold": 45,
-                        "profit_margin": 35.2,
-                    },
-                    {
-                        "id": "prod_002",
-                        "name": "Organic Tea Set",
-                        "revenue": 1876.32,
-                        "units_sold": 32,
-                        "profit_margin": 42.1,
-                    },
+                        "category": category,
+                        "revenue": round(float(row.revenue), 2),
+                        "units_sold": float(row.units_sold),
+                        "products": int(row.products),
+                    }
+                    for category, row in by_category.iterrows()
                 ],
                 "low_stock_alerts": [
-                    {"id": "prod_005", "name": "Specialty Honey", "stock": 5},
-                    {"id": "prod_012", "name": "Artisan Bread", "stock": 3},
+                    {
+                        "id": product["id"],
+                        "name": product.get("name"),
+                        "stock": product["stock_quantity"],
+                    }
+                    for product in low_stock
+                    if product["stock_quantity"] <= LOW_STOCK_THRESHOLD
                 ],
             }
 
@@ -148,17 +364,41 @@ class AnalyticsController:
     def get_dashboard_analytics(
         self, store_id: Optional[str] = None, date_range: str = "7d"
     ) -> Dict[str, Any]:
-        """Get dashboard analytics data with ML insights"""
+        """
+        Get dashboard analytics data with ML insights
+
+        The base stats and the ML analysis are computed concurrently, each
+        within the dashboard section budget. A section that fails or runs
+        late is left empty and named in degraded_sections, so the rest of
+        the dashboard is still served on time.
+        """
         try:
-            # Get base dashboard stats
-            base_stats = self.get_dashboard_stats()
-            
-            # Get ML-powered analysis
-            ml_analysis = self.get_ml_product_analysis(store_id)
+            sections = self.section_runner.run(
+                [
+                    Section(
+                        "overview",
+                        lambda: self._section_data(self.get_dashboard_stats()),
+                        default={},
+                    ),
+                    Section(
+                        "ml_analysis",
+                        lambda: self._section_data(
+                            self.get_ml_product_analysis(store_id)
+                        ),
+                        default={},
+                    ),
+                    Section(
+                        "ml_insights",
+                        self._ml_insights,
+                        depends_on=["ml_analysis"],
+                        default={},
+                    ),
+                ]
+            )
 
             # Enhanced analytics with date range filtering and ML insights
             dashboard_data = {
-                "overview": base_stats.get("data", {}),
+                "overview": sections.values["overview"],
                 "date_range": date_range,
                 "store_id": store_id,
                 "sales_trend": [
@@ -191,40 +431,16 @@ class AnalyticsController:
                     "inventory_turnover": 2.8,
                 },
                 # Add ML-powered insights to dashboard
-                "ml_insights": {
-                    "summary": ml_analysis.get("data", {}).get("performance_metrics", {}),
-                    "top_alerts": ml_analysis.get("data", {}).get("inventory_alerts", [])[:3],  # Top 3 alerts
-                    "trending_products": [
-                        {
-                            "product_id": pid,
-                            "trend": data.get("trend", "stable"),
-                            "confidence": data.get("confidence", 0.5)
-                        }
-                        for pid, data in ml_analysis.get("data", {}).get("demand_forecasting", {}).items()
-                        if data.get("trend") == "increasing"
-                    ][:5],  # Top 5 trending products
-                    "sentiment_overview": {
-                        "positive_products": len([
-                            p for p in ml_analysis.get("data", {}).get("sentiment_analysis", {}).values()
-                            if p.get("overall_sentiment") == "positive"
-                        ]),
-                        "negative_products": len([
-                            p for p in ml_analysis.get("data", {}).get("sentiment_analysis", {}).values()
-                            if p.get("overall_sentiment") == "negative"
-                        ]),
-                        "neutral_products": len([
-                            p for p in ml_analysis.get("data", {}).get("sentiment_analysis", {}).values()
-                            if p.get("overall_sentiment") == "neutral"
-                        ])
-                    },
-                    "pricing_opportunities": len([
-                        p for p in ml_analysis.get("data", {}).get("pricing_recommendations", {}).values()
-                        if abs(p.get("price_change_percent", 0)) > 5
-                    ])
-                },
-                "generated_at": datetime.now().isoformat()
+                "ml_insights": sections.values["ml_insights"],
+                "degraded_sections": sections.degraded_sections,
+                "section_timings_ms": sections.timings_ms,
+                "generated_at": datetime.now().isoformat(),
             }
 
+            if sections.degraded:
+                logger.warning(
+                    f"Dashboard served with degraded sections: {sections.degraded}"
+                )
             logger.info(
                 f"Dashboard analytics with ML insights retrieved for store: {store_id}, range: {date_range}"
             )
@@ -242,6 +458,47 @@ class AnalyticsController:
                 "generated_at": datetime.now().isoformat()
             }
 
+    @staticmethod
+    def _section_data(result: Dict[str, Any]) -> Dict[str, Any]:
+        """The data of a controller result, raising if it failed"""
+        if not result.get("success"):
+            raise RuntimeError(result.get("error", "section failed"))
+        return result.get("data", {})
+
+    @staticmethod
+    def _ml_insights(ml_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Dashboard summary of an ML product analysis"""
+        sentiments = [
+            p.get("overall_sentiment")
+            for p in ml_data.get("sentiment_analysis", {}).values()
+        ]
+        return {
+            "summary": ml_data.get("performance_metrics", {}),
+            "top_alerts": ml_data.get("inventory_alerts", [])[:3],  # Top 3 alerts
+            # Top 5 trending products
+            "trending_products": [
+                {
+                    "product_id": pid,
+                    "trend": data.get("trend", "stable"),
+                    "confidence": data.get("confidence", 0.5),
+                }
+                for pid, data in ml_data.get("demand_forecasting", {}).items()
+                if data.get("trend") == "increasing"
+            ][:5],
+            "sentiment_overview": {
+                "positive_products": sentiments.count("positive"),
+                "negative_products": sentiments.count("negative"),
+                "neutral_products": sentiments.count("neutral"),
+            },
+            "pricing_opportunities": len(
+                [
+                    p
+                    for p in ml_data.get("pricing_recommendations", {}).values()
+                    if abs(p.get("price_change_percent", 0)) > 5
+                ]
+            ),
+        }
+
     def get_customer_insights(
         self, store_id: Optional[str] = None, segment: str = "all"
     ) -> Dict[str, Any]:
@@ -525,33 +782,64 @@ class AnalyticsController:
     def get_general_analytics(self, time_range: str = "7d") -> Dict[str, Any]:
         """Get general analytics data for the specified time range"""
         try:
-            # Get real data from Firebase
-            orders = self.firebase.get_documents("orders") or []
-            customers = self.firebase.get_documents("customers") or []
-            products = self.firebase.get_documents("products") or []
-
-            # Calculate overview metrics
-            total_revenue = sum(order.get("total", 0) for order in orders)
-            total_orders = len(orders)
-            total_customers = len(customers)
+            # Get real totals from Firebase aggregation queries, run concurrently
+            order_totals, total_customers = gather_sync(
+                self.async_firebase.aggregate("orders", sum_fields=["total"]),
+                self.async_firebase.count_documents("customers"),
+            )
+            total_revenue = order_totals["sum"]["total"]
+            total_orders = order_totals["count"]
 
             # Calculate conversion rate (orders/customers * 100)
             conversion_rate = (total_orders / total_customers * 100) if total_customers > 0 else 0
 
-            # Generate sample sales trend data
-            sales_trend = []
-            for i in range(7):
-                date = (datetime.now() - timedelta(days=6-i)).strftime("%Y-%m-%d")
-                revenue = 2000 + (i * 100) + (i % 3 * 200)  # Sample data pattern
-                orders = 25 + (i * 2) + (i % 3 * 5)  # Sample orders data
-                sales_trend.append({"date": date, "revenue": revenue, "orders": orders})
-
-            # Get top products (sample data if no real data)
-            top_products = [
-                {"name": "Coffee Beans", "sales": 45, "revenue": 899.55},
-                {"name": "Organic Tea", "sales": 32, "revenue": 415.68},
-                {"name": "Artisan Chocolate", "sales": 28, "revenue": 251.72},
+            # Daily trend and top products from the sales rollups: one
+            # document per day (and per product sold that day), not every order
+            days = _range_days(time_range)
+            window = daily_window(self.firebase, SCOPE_ALL, days=days)
+            sales_trend = [
+                {"date": day, "revenue": round(revenue, 2), "orders": orders}
+                for day, revenue, orders in zip(
+                    window["dates"], window["revenue"], window["orders"]
+                )
             ]
+            if not any(window["orders"]):
+                # Sample data until orders (or a backfill) fill the rollups
+                sales_trend = []
+                for i in range(7):
+                    date = (datetime.now() - timedelta(days=6 - i)).strftime("%Y-%m-%d")
+                    revenue = 2000 + (i * 100) + (i % 3 * 200)  # Sample data pattern
+                    orders = 25 + (i * 2) + (i % 3 * 5)  # Sample orders data
+                    sales_trend.append(
+                        {"date": date, "revenue": revenue, "orders": orders}
+                    )
+
+            top = top_keys(
+                self.firebase,
+                SCOPE_PRODUCT,
+                start=datetime.now().date() - timedelta(days=days - 1),
+            )
+            if top:
+                products = self.firebase.get_documents_by_ids(
+                    "products", [entry["key"] for entry in top]
+                )
+                top_products = [
+                    {
+                        "name": products.get(entry["key"], {}).get(
+                            "name", entry["key"]
+                        ),
+                        "sales": entry["units"],
+                        "revenue": round(entry["revenue"], 2),
+                    }
+                    for entry in top
+                ]
+            else:
+                # Get top products (sample data if no real data)
+                top_products = [
+                    {"name": "Coffee Beans", "sales": 45, "revenue": 899.55},
+                    {"name": "Organic Tea", "sales": 32, "revenue": 415.68},
+                    {"name": "Artisan Chocolate", "sales": 28, "revenue": 251.72},
+                ]
 
             # Generate category distribution data
             category_distribution = [
@@ -593,8 +881,41 @@ class AnalyticsController:
             logger.error(f"Error getting general analytics: {str(e)}")
             raise
 
+    def _product_activity(self) -> ProductActivity:
+        """
+        Orders and feedback grouped by product
+
+        Both collections are streamed concurrently in one pass, so each
+        product in the analysis is a lookup. A failed stream is raised
+        rather than analysed as zero demand and no feedback.
+        """
+        activity = ProductActivity()
+
+        async def index_orders():
+            async for order in self.async_firebase.iter_documents("orders"):
+                activity.add_order(order)
+
+        async def index_feedback():
+            async for fb in self.async_firebase.iter_documents("feedback"):
+                activity.add_feedback(fb)
+
+        try:
+            gather_sync(index_orders(), index_feedback())
+        except Exception as e:
+            logger.warning(f"Streaming orders and feedback for ML analysis failed: {e}")
+            raise
+        activity.finish()
+        return activity
+
     def get_ml_product_analysis(self, store_id: Optional[str] = None) -> Dict[str, Any]:
-        """Get ML-powered product analysis including forecasting and sentiment"""
+        """
+        Get ML-powered product analysis including forecasting and sentiment
+
+        Raises:
+            Exception: If orders or feedback couldn't be read (the dashboard
+                reports the section as degraded)
+        """
+        activity = self._product_activity()
         try:
             import sys
             import os
@@ -604,13 +925,7 @@ class AnalyticsController:
             if ml_path not in sys.path:
                 sys.path.append(ml_path)
             
-            # Get real product data from database
-            try:
-                products = self.firebase.get_documents("products") or []
-                feedback = self.firebase.get_documents("feedback") or []
-                orders = self.firebase.get_documents("orders") or []
-            except:
-                products, feedback, orders = [], [], []
+            products_analyzed = 0
             
             ml_analysis = {
                 "product_insights": [],
@@ -622,7 +937,8 @@ class AnalyticsController:
             }
             
             # Process each product with ML analysis
-            for product in products:
+            for product in self.firebase.iter_documents("products"):
+                products_analyzed += 1
                 product_id = product.get('id', 'unknown')
                 product_name = product.get('name', 'Unknown Product')
                 current_stock = product.get('stock_quantity', 0)
@@ -630,13 +946,8 @@ class AnalyticsController:
                 
                 # 1. Demand Forecasting using simple ML logic
                 try:
-                    # Calculate historical demand from orders
-                    product_orders = [
-                        order for order in orders 
-                        if any(item.get('product_id') == product_id for item in order.get('items', []))
-                    ]
-                    
-                    recent_demand = len(product_orders)
+                    # Historical demand: orders containing the product
+                    recent_demand = activity.order_count(product_id)
                     
                     # Simple forecasting logic
                     if recent_demand > 10:
@@ -657,7 +968,9 @@ class AnalyticsController:
                         "predicted_demand": predicted_demand,
                         "trend": trend,
                         "confidence": confidence,
-                        "reorder_recommended": predicted_demand > current_stock
+                        "reorder_recommended": predicted_demand > current_stock,
+                        "units_ordered": activity.quantity(product_id),
+                        "last_ordered_at": activity.last_ordered(product_id)
                     }
                     
                 except Exception as forecast_error:
@@ -665,10 +978,7 @@ class AnalyticsController:
                 
                 # 2. Sentiment Analysis from feedback
                 try:
-                    product_feedback = [
-                        fb for fb in feedback 
-                        if fb.get('product_id') == product_id and fb.get('comment')
-                    ]
+                    product_feedback = activity.feedback_comments(product_id)
                     
                     if product_feedback:
                         # Simple sentiment scoring
@@ -676,8 +986,8 @@ class AnalyticsController:
                         negative_words = ['bad', 'terrible', 'awful', 'hate', 'poor', 'worst']
                         
                         sentiment_scores = []
-                        for fb in product_feedback:
-                            comment = fb.get('comment', '').lower()
+                        for comment in product_feedback:
+                            comment = comment.lower()
                             positive_count = sum(1 for word in positive_words if word in comment)
                             negative_count = sum(1 for word in negative_words if word in comment)
                             
@@ -790,7 +1100,7 @@ class AnalyticsController:
             
             # Calculate overall performance metrics
             ml_analysis["performance_metrics"] = {
-                "total_products_analyzed": len(products),
+                "total_products_analyzed": products_analyzed,
                 "high_demand_products": len([p for p in ml_analysis["demand_forecasting"].values() if p.get("trend") == "increasing"]),
                 "positive_sentiment_products": len([p for p in ml_analysis["sentiment_analysis"].values() if p.get("overall_sentiment") == "positive"]),
                 "critical_inventory_alerts": len([a for a in ml_analysis["inventory_alerts"] if a.get("alert_level") == "critical"]),
@@ -801,7 +1111,9 @@ class AnalyticsController:
                 "analysis_timestamp": datetime.now().isoformat()
             }
             
-            logger.info(f"ML product analysis completed for {len(products)} products")
+            logger.info(
+                f"ML product analysis completed for {products_analyzed} products"
+            )
             return {"success": True, "data": ml_analysis}
             
         except Exception as e:
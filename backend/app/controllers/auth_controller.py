@@ -6,14 +6,14 @@ import bcrypt
 import jwt
 
 from app.models.user_model import User
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import get_firebase
 
 logger = logging.getLogger(__name__)
 
 
 class AuthController:
-    def __init__(self):
-        self.firebase = FirebaseUtils()
+    def __init__(self, firebase=None):
+        self.firebase = firebase or get_firebase()
         self.collection_name = "users"
         self.secret_key = os.getenv("JWT_SECRET_KEY", "jwt-secret-key-change-in-production")
 
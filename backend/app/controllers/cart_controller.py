@@ -6,7 +6,7 @@ Shopping cart management and operations
 import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import get_firebase
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +14,8 @@ logger = logging.getLogger(__name__)
 class CartController:
     """Controller for managing shopping cart operations"""
 
-    def __init__(self):
-        self.firebase = FirebaseUtils()
+    def __init__(self, firebase=None):
+        self.firebase = firebase or get_firebase()
         self.collection_name = "carts"
 
     def get_cart(self, user_id: str) -> Dict[str, Any]:
@@ -3,16 +3,17 @@ from datetime import datetime
 
 from app.controllers.ai_engine import AIEngine
 from app.utils.email_utils import EmailUtils
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import get_firebase
 from app.utils.pdf_utils import PDFUtils
+from app.utils.query_planner import ListingQuery
 
 logger = logging.getLogger(__name__)
 
 
 class FeedbackController:
-    def __init__(self):
+    def __init__(self, firebase=None):
         self.ai_engine = AIEngine()
-        self.firebase = FirebaseUtils()
+        self.firebase = firebase or get_firebase()
         self.pdf_utils = PDFUtils()
         self.email_utils = EmailUtils()
         self.collection_name = "feedback"
@@ -242,78 +243,15 @@ class FeedbackController:
             list: List of feedback entries
         """
         try:
-            # Get all feedback
-            feedback = self.firebase.get_documents(self.collection_name) or []
-
-            # Apply filters
-            if rating_filter:
-                feedback = [f for f in feedback if f.get("rating") == rating_filter]
-
-            if category_filter:
-                feedback = [f for f in feedback if f.get("category") == category_filter]
-
-            # Sort by timestamp (newest first)
-            feedback.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-
-            # Apply limit
-            feedback = feedback[:limit]
+            # Newest first; filters, sort and limit run in the query
+            feedback = (
+                self._feedback_query(rating_filter, category_filter, limit)
+                .execute(self.firebase)["documents"]
+            )
 
             # Add sample data if empty
             if not feedback:
-                feedback = [
-                    {
-                        "id": "sample_001",
-                        "user_id": "user_001",
-                        "customer_name": "John Smith",
-                        "product_id": "prod_001",
-                        "product_name": "Premium Coffee Beans",
-                        "rating": 5,
-                        "comment": "Great product! Really satisfied with the quality and flavor.",
-                        "sentiment": "positive",
-                        "timestamp": datetime.now().isoformat(),
-                        "category": "product",
-                        "status": "pending",
-                    },
-                    {
-                        "id": "sample_002", 
-                        "user_id": "user_002",
-                        "customer_name": "Sarah Johnson",
-                        "product_id": "prod_002",
-                        "product_name": "Organic Tea Set",
-                        "rating": 4,
-                        "comment": "Good service, fast delivery. Could improve packaging though.",
-                        "sentiment": "positive",
-                        "timestamp": datetime.now().isoformat(),
-                        "category": "service",
-                        "status": "responded",
-                    },
-                    {
-                        "id": "sample_003",
-                        "user_id": "user_003", 
-                        "customer_name": "Mike Davis",
-                        "product_id": "prod_003",
-                        "product_name": "Artisan Chocolate",
-                        "rating": 3,
-                        "comment": "Average product. Expected more for the price point.",
-                        "sentiment": "neutral",
-                        "timestamp": datetime.now().isoformat(),
-                        "category": "product",
-                        "status": "pending",
-                    },
-                    {
-                        "id": "sample_004",
-                        "user_id": "user_004",
-                        "customer_name": "Lisa Wilson",
-                        "product_id": "prod_004", 
-                        "product_name": "Wellness Supplements",
-                        "rating": 2,
-                        "comment": "Product didn't meet expectations. Issues with delivery timing.",
-                        "sentiment": "negative",
-                        "timestamp": datetime.now().isoformat(),
-                        "category": "delivery",
-                        "status": "pending",
-                    },
-                ]
+                feedback = self._sample_feedback()
 
             return feedback
         except Exception as e:
@@ -329,6 +267,135 @@ class FeedbackController:
                 }
             ]
 
+    def explain_feedback_query(
+        self, rating_filter=None, category_filter=None, limit=50
+    ):
+        """
+        Query plan of get_all_feedback() for the same arguments
+
+        Returns:
+            dict: What runs in the database and what runs in process
+        """
+        return self._feedback_query(rating_filter, category_filter, limit).explain(
+            self.firebase
+        )
+
+    def _feedback_query(self, rating_filter=None, category_filter=None, limit=50):
+        filters = {}
+        if rating_filter:
+            filters["rating"] = rating_filter
+        if category_filter:
+            filters["category"] = category_filter
+        return ListingQuery(
+            self.collection_name,
+            filters=filters,
+            sort_by="timestamp",
+            descending=True,
+            limit=limit,
+        )
+
+    def get_feedback_page(
+        self, rating_filter=None, category_filter=None, page_size=50, page_token=None
+    ):
+        """
+        Get one page of feedback, newest first
+
+        Args:
+            rating_filter (int, optional): Filter by rating
+            category_filter (str, optional): Filter by category
+            page_size (int): Number of entries per page
+            page_token (str, optional): next_page_token from the previous page
+
+        Returns:
+            dict: Feedback entries and pagination info
+
+        Raises:
+            ValueError: If page_token is invalid
+        """
+        filters = {}
+        if rating_filter:
+            filters["rating"] = rating_filter
+        if category_filter:
+            filters["category"] = category_filter
+
+        page = self.firebase.get_documents_page(
+            self.collection_name,
+            page_size=page_size,
+            order_by="timestamp",
+            descending=True,
+            filters=filters,
+            page_token=page_token,
+        )
+        feedback = page["documents"]
+
+        # Add sample data if the collection is empty
+        if not feedback and not page_token and not filters:
+            feedback = self._sample_feedback()
+
+        return {
+            "success": True,
+            "feedback": feedback,
+            "count": len(feedback),
+            "pagination": page["pagination"],
+        }
+
+    def _sample_feedback(self):
+        """Sample feedback entries shown while the collection is empty"""
+        return [
+            {
+                "id": "sample_001",
+                "user_id": "user_001",
+                "customer_name": "John Smith",
+                "product_id": "prod_001",
+                "product_name": "Premium Coffee Beans",
+                "rating": 5,
+                "comment": "Great product! Really satisfied with the quality and flavor.",
+                "sentiment": "positive",
+                "timestamp": datetime.now().isoformat(),
+                "category": "product",
+                "status": "pending",
+            },
+            {
+                "id": "sample_002",
+                "user_id": "user_002",
+                "customer_name": "Sarah Johnson",
+                "product_id": "prod_002",
+                "product_name": "Organic Tea Set",
+                "rating": 4,
+                "comment": "Good service, fast delivery. Could improve packaging though.",
+                "sentiment": "positive",
+                "timestamp": datetime.now().isoformat(),
+                "category": "service",
+                "status": "responded",
+            },
+            {
+                "id": "sample_003",
+                "user_id": "user_003",
+                "customer_name": "Mike Davis",
+                "product_id": "prod_003",
+                "product_name": "Artisan Chocolate",
+                "rating": 3,
+                "comment": "Average product. Expected more for the price point.",
+                "sentiment": "neutral",
+                "timestamp": datetime.now().isoformat(),
+                "category": "product",
+                "status": "pending",
+            },
+            {
+                "id": "sample_004",
+                "user_id": "user_004",
+                "customer_name": "Lisa Wilson",
+                "product_id": "prod_004",
+                "product_name": "Wellness Supplements",
+                "rating": 2,
+                "comment": "Product didn't meet expectations. Issues with delivery timing.",
+                "sentiment": "negative",
+                "timestamp": datetime.now().isoformat(),
+                "category": "delivery",
+                "status": "pending",
+            },
+        ]
+
     def get_sentiment_analysis(self):
         """
         Get overall sentiment analysis of all feedback
@@ -1,19 +1,27 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import numpy as np
 import pandas as pd
 
 from app.controllers.ai_engine import AIEngine
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.async_firebase_utils import gather_sync, get_async_firebase
+from app.utils.firebase_utils import get_firebase
+from app.utils.query_planner import ListingQuery
+from app.utils.sales_rollups import SCOPE_PRODUCT, daily_series
 
 logger = logging.getLogger(__name__)
 
 
+def _is_low_stock(item):
+    return item.get("quantity", 0) < item.get("minimum_stock", 10)
+
+
 class InventoryController:
-    def __init__(self):
+    def __init__(self, firebase=None):
         self.ai_engine = AIEngine()
-        self.firebase = FirebaseUtils()
+        self.firebase = firebase or get_firebase()
+        self.async_firebase = get_async_firebase(self.firebase)
         self.inventory_collection = "inventory"
         self.sales_collection = "sales"
 
@@ -141,20 +149,23 @@ class InventoryController:
             logger.error(f"Error generating optimization recommendations: {str(e)}")
             raise
 
-    def get_stock_alerts(self, store_id):
+    def get_stock_alerts(self, store_id, inventory_data=None):
         """
         Get stock alerts for low stock and overstock situations
 
         Args:
             store_id (str): Store ID
+            inventory_data (list, optional): The store's inventory items, if
+                already loaded
 
         Returns:
             dict: Stock alerts
         """
         try:
-            inventory_data = self.firebase.get_documents(
-                self.inventory_collection, {"store_id": store_id}
-            )
+            if inventory_data is None:
+                inventory_data = self.firebase.get_documents(
+                    self.inventory_collection, {"store_id": store_id}
+                )
 
             alerts = {
                 "critical_low": [],
@@ -233,13 +244,19 @@ class InventoryController:
                 "regional_trends": {},
             }
 
-            for store in stores:
-                store_id = store.get("id")
-
-                # Get inventory data for this store
-                inventory = self.firebase.get_documents(
-                    self.inventory_collection, {"store_id": store_id}
+            # Inventory reads for the stores are independent, so run them
+            # concurrently instead of one round trip after another
+            inventories = gather_sync(
+                *(
+                    self.async_firebase.get_documents(
+                        self.inventory_collection, {"store_id": store.get("id")}
+                    )
+                    for store in stores
                 )
+            )
+
+            for store, inventory in zip(stores, inventories):
+                store_id = store.get("id")
 
                 # Calculate store performance metrics
                 total_value = sum(
@@ -254,7 +271,7 @@ class InventoryController:
                         "store_name": store.get("name"),
                         "inventory_value": total_value,
                         "turnover_rate": turnover_rate,
-                        "stock_health": self._assess_stock_health(store_id),
+                        "stock_health": self._assess_stock_health(store_id, inventory),
                     }
                 )
 
@@ -267,41 +284,10 @@ class InventoryController:
             raise
 
     def _get_historical_sales(self, product_id, days=90):
-        """Get historical sales data for a product"""
+        """Get daily units sold for a product, from the daily sales rollups"""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-
-            sales = self.firebase.query_documents(
-                self.sales_collection, "product_id", "==", product_id
-            )
-
-            # Filter by date range and aggregate by day
-            daily_sales = {}
-            for sale in sales:
-                sale_date = sale.get("date", "")
-                if sale_date:
-                    try:
-                        sale_datetime = datetime.fromisoformat(
-                            sale_date.replace("Z", "+00:00")
-                        )
-                        if start_date <= sale_datetime <= end_date:
-                            day_key = sale_datetime.strftime("%Y-%m-%d")
-                            daily_sales[day_key] = daily_sales.get(
-                                day_key, 0
-                            ) + sale.get("quantity", 0)
-                    except:
-                        continue
-
-            # Convert to list of daily quantities
-            sales_data = []
-            current_date = start_date
-            while current_date <= end_date:
-                day_key = current_date.strftime("%Y-%m-%d")
-                sales_data.append(daily_sales.get(day_key, 0))
-                current_date += timedelta(days=1)
-
-            return sales_data
+            # One rollup per day, through today
+            return daily_series(self.firebase, SCOPE_PRODUCT, product_id, days=days + 1)
         except Exception as e:
             logger.error(f"Error getting historical sales: {str(e)}")
             return []
@@ -370,10 +356,10 @@ class InventoryController:
         except:
             return 0.0
 
-    def _assess_stock_health(self, store_id):
+    def _assess_stock_health(self, store_id, inventory=None):
         """Assess overall stock health for a store"""
         try:
-            alerts = self.get_stock_alerts(store_id)
+            alerts = self.get_stock_alerts(store_id, inventory)
 
             total_issues = (
                 len(alerts["out_of_stock"]) * 3  # Weight out of stock heavily
@@ -419,16 +405,12 @@ class InventoryController:
             list: List of inventory items
         """
         try:
-            # Get all inventory items
-            items = self.firebase.get_documents(self.inventory_collection) or []
-
-            # Apply category filter
-            if category_filter:
-                items = [item for item in items if item.get("category") == category_filter]
-
-            # Apply low stock filter
-            if low_stock_only:
-                items = [item for item in items if item.get("quantity", 0) < item.get("minimum_stock", 10)]
+            # Category is filtered by the query; low stock compares two
+            # fields, so it is checked while streaming
+            items = (
+                self._inventory_query(category_filter, low_stock_only)
+                .execute(self.firebase)["documents"]
+            )
 
             # If no items exist, return sample data
             if not items:
@@ -478,7 +460,7 @@ class InventoryController:
                 if category_filter:
                     items = [item for item in items if item.get("category") == category_filter]
                 if low_stock_only:
-                    items = [item for item in items if item.get("quantity", 0) < item.get("minimum_stock", 10)]
+                    items = [item for item in items if _is_low_stock(item)]
 
             return items
         except Exception as e:
@@ -491,6 +473,26 @@ class InventoryController:
                 "status": "active"
             }]
 
+    def explain_inventory_query(self, category_filter=None, low_stock_only=False):
+        """
+        Query plan of get_all_inventory() for the same arguments
+
+        Returns:
+            dict: What runs in the database and what runs in process
+        """
+        query = self._inventory_query(category_filter, low_stock_only)
+        return query.explain(self.firebase)
+
+    def _inventory_query(self, category_filter=None, low_stock_only=False):
+        return ListingQuery(
+            self.inventory_collection,
+            filters={"category": category_filter} if category_filter else None,
+            limit=None,
+            predicate=_is_low_stock if low_stock_only else None,
+            predicate_fields=["quantity", "minimum_stock"],
+            predicate_description="quantity < minimum_stock (default 10)",
+        )
+
     def add_inventory_item(self, item_data):
         """
         Add new inventory item
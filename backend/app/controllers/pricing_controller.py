@@ -7,15 +7,15 @@ import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import get_firebase
 
 logger = logging.getLogger(__name__)
 
 
 class PricingController:
-    def __init__(self):
+    def __init__(self, firebase=None):
         """Initialize Pricing Controller"""
-        self.firebase = FirebaseUtils()
+        self.firebase = firebase or get_firebase()
 
     def get_product_pricing(self, product_id: str) -> Dict[str, Any]:
         """Get pricing information for a product"""
@@ -128,6 +128,7 @@ class PricingController:
         try:
             updated_products = []
             errors = []
+            operations = []
 
             for update in updates:
                 product_id = update.get("product_id")
@@ -137,15 +138,26 @@ class PricingController:
                     errors.append(f"Invalid update data: {update}")
                     continue
 
-                try:
-                    # Update product price
-                    self.firebase.update_document(
-                        "products", product_id, {"price": new_price}
-                    )
-                    updated_products.append(product_id)
+                operations.append(
+                    {
+                        "type": "update",
+                        "collection": "products",
+                        "document_id": product_id,
+                        "data": {"price": new_price},
+                    }
+                )
 
-                except Exception as e:
-                    errors.append(f"Failed to update {product_id}: {str(e)}")
+            # Chunked, parallel batches instead of one round trip per product
+            if operations:
+                write_result = self.firebase.bulk_write(operations)
+                for op_result in write_result["results"]:
+                    if op_result["success"]:
+                        updated_products.append(op_result["document_id"])
+                    else:
+                        errors.append(
+                            f"Failed to update {op_result['document_id']}: "
+                            f"{op_result['error']}"
+                        )
 
             result = {
                 "updated_count": len(updated_products),
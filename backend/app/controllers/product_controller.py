@@ -1,16 +1,27 @@
 import logging
 
 from app.controllers.ai_engine import AIEngine
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.autocomplete import get_autocomplete_index
+from app.utils.firebase_utils import get_firebase
+from app.utils.product_catalog import get_product_catalog
+from app.utils.recommender import RECOMMENDATIONS_COLLECTION, get_recommendation_scorer
+from app.utils.search_index import get_collection_search_index
 
 logger = logging.getLogger(__name__)
 
 
 class ProductController:
-    def __init__(self):
+    def __init__(self, firebase=None):
         self.ai_engine = AIEngine()
-        self.firebase = FirebaseUtils()
+        self.firebase = firebase or get_firebase()
         self.collection_name = "products"
+        self.search_index = get_collection_search_index(
+            self.collection_name, self.firebase
+        )
+        self.autocomplete = get_autocomplete_index(self.collection_name, self.firebase)
+        self.recommender = get_recommendation_scorer(
+            self.collection_name, self.firebase
+        )
 
     def get_products(self, filters=None):
         """
@@ -57,41 +68,109 @@ class ProductController:
             list: List of matching products
         """
         try:
-            # Get all products first
-            all_products = self.firebase.get_documents(self.collection_name)
-
-            # Use AI engine to perform intelligent search
-            search_results = self.ai_engine.search_products(query, all_products)
+            # Rank against the inverted index instead of scanning every product
+            search_results = self.ai_engine.search_products(
+                query, index=self.search_index
+            )
 
             return search_results
         except Exception as e:
             logger.error(f"Error searching products: {str(e)}")
             raise
 
-    def get_recommendations(self, user_preferences):
+    def get_search_facets(self, query, results=None):
+        """
+        Facet counts for the products a search query matches
+
+        Args:
+            query (str): Search query
+            results (list, optional): The query's search results; when they
+                came from a typo-corrected query, facets count that query's
+                matches so they agree with the results
+
+        Returns:
+            dict: Counts per category, brand, price bucket, rating band
+                and stock status
+        """
+        try:
+            if results and results[0].get("corrected_query"):
+                query = results[0]["corrected_query"]
+            catalog = get_product_catalog(self.collection_name, self.firebase)
+            return catalog.facets(ids=self.search_index.matching_ids(query))
+        except Exception as e:
+            logger.error(f"Error computing search facets: {str(e)}")
+            raise
+
+    def suggest_products(self, prefix, limit=8, kind=None):
+        """
+        Autocomplete suggestions for a search box
+
+        Args:
+            prefix (str): Text typed so far
+            limit (int): Maximum number of suggestions
+            kind (str, optional): Only "product", "brand" or "category"
+
+        Returns:
+            list: Suggestions with text, type and popularity score
+        """
+        try:
+            return self.autocomplete.suggest(prefix, limit=limit, kind=kind)
+        except Exception as e:
+            logger.error(f"Error getting suggestions: {str(e)}")
+            raise
+
+    def get_recommendations(self, user_preferences, user_id=None):
         """
         Get AI-powered product recommendations
 
         Args:
             user_preferences (dict): User preferences and history
+            user_id (str, optional): Serve the user's precomputed nightly
+                list when there is one and no preferences are given
 
         Returns:
             list: List of recommended products
         """
         try:
-            # Get all products
-            all_products = self.firebase.get_documents(self.collection_name)
-
-            # Use AI engine to generate recommendations
-            recommendations = self.ai_engine.generate_recommendations(
-                user_preferences, all_products
-            )
+            if user_id and not user_preferences:
+                precomputed = self.get_precomputed_recommendations(user_id)
+                if precomputed is not None:
+                    return precomputed
 
-            return recommendations
+            # Score against the shared scorer, kept current by product writes
+            return self.recommender.recommend(user_preferences or {})
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
             raise
 
+    def get_precomputed_recommendations(self, user_id):
+        """
+        Get a user's recommendations from the nightly batch
+
+        Args:
+            user_id (str): User ID
+
+        Returns:
+            list: Recommended products with recommendation_score, or None
+                if no list has been precomputed for the user
+        """
+        stored = self.firebase.get_document(RECOMMENDATIONS_COLLECTION, user_id)
+        if not stored:
+            return None
+
+        entries = stored.get("products", [])
+        products = self.firebase.get_documents_by_ids(
+            self.collection_name, [entry.get("id") for entry in entries]
+        )
+        recommendations = []
+        for entry in entries:
+            product = products.get(entry.get("id"))
+            if product:  # Skip products deleted since the batch ran
+                recommendations.append(
+                    {**product, "recommendation_score": entry.get("score")}
+                )
+        return recommendations
+
     def create_product(self, product_data):
         """
         Create a new product
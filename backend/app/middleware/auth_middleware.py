@@ -11,7 +11,7 @@ from functools import wraps
 
 import jwt
 from flask import jsonify, request, current_app
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import get_firebase
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +19,9 @@ logger = logging.getLogger(__name__)
 class AuthMiddleware:
     """Authentication middleware for JWT token validation"""
 
-    def __init__(self, app=None):
+    def __init__(self, app=None, firebase=None):
         self.app = app
-        self.firebase = FirebaseUtils()
+        self.firebase = firebase or get_firebase()
         self.jwt_secret = os.getenv(
             "JWT_SECRET_KEY", "jwt-secret-key-change-in-production"
         )
@@ -1,11 +1,30 @@
+import os
+
 from flask import Blueprint, jsonify, request
 
 from app.controllers.analytics_controller import AnalyticsController
+from app.utils.result_cache import ResultCache
 
 analytics_bp = Blueprint("analytics", __name__)
 analytics_controller = AnalyticsController()
 
 
+def _degraded_ttl(payload):
+    """Short TTL for payloads with degraded sections, so they aren't served for long"""
+    if isinstance(payload, dict) and payload.get("degraded_sections"):
+        return float(os.getenv("ANALYTICS_CACHE_DEGRADED_TTL", "5"))
+    return None
+
+
+# Dashboards poll these endpoints; serve the last payload and refresh it
+# in the background once stale (ANALYTICS_CACHE_* settings)
+analytics_cache = ResultCache.from_env("ANALYTICS_CACHE", ttl_for=_degraded_ttl)
+
+
+def _force_refresh() -> bool:
+    return request.args.get("refresh", "false").lower() == "true"
+
+
 @analytics_bp.route("/dashboard", methods=["GET"])
 def get_dashboard_data():
     """Get dashboard analytics data"""
@@ -13,8 +32,10 @@ def get_dashboard_data():
         store_id = request.args.get("store_id")
         date_range = request.args.get("date_range", "7d")
 
-        dashboard_data = analytics_controller.get_dashboard_analytics(
-            store_id, date_range
+        dashboard_data, freshness = analytics_cache.get(
+            ("dashboard", store_id, date_range),
+            lambda: analytics_controller.get_dashboard_analytics(store_id, date_range),
+            force=_force_refresh(),
         )
 
         return (
@@ -22,6 +43,7 @@ def get_dashboard_data():
                 {
                     "success": True,
                     "data": dashboard_data,
+                    "cache": freshness,
                     "message": "Dashboard data retrieved successfully",
                 }
             ),
@@ -180,10 +202,19 @@ def get_analytics():
         time_range = request.args.get("time_range", "7d")
 
         # Get analytics data from controller
-        analytics_data = analytics_controller.get_general_analytics(time_range)
+        analytics_data, freshness = analytics_cache.get(
+            ("analytics", time_range),
+            lambda: analytics_controller.get_general_analytics(time_range),
+            force=_force_refresh(),
+        )
 
         return jsonify(
-            {"success": True, "data": analytics_data, "message": "Analytics retrieved successfully"}
+            {
+                "success": True,
+                "data": analytics_data,
+                "cache": freshness,
+                "message": "Analytics retrieved successfully",
+            }
         ), 200
 
     except Exception as e:
@@ -246,11 +277,16 @@ def get_ml_product_analysis():
     try:
         store_id = request.args.get("store_id")
         
-        ml_analysis = analytics_controller.get_ml_product_analysis(store_id)
+        ml_analysis, freshness = analytics_cache.get(
+            ("ml-analysis", store_id),
+            lambda: analytics_controller.get_ml_product_analysis(store_id),
+            force=_force_refresh(),
+        )
         
         return jsonify({
             "success": True,
             "data": ml_analysis["data"],
+            "cache": freshness,
             "message": "ML product analysis completed successfully"
         }), 200
         
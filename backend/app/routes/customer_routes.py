@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 
+from app.utils.firebase_utils import parse_fields
+from app.utils.query_planner import ListingQuery
+
 customer_bp = Blueprint('customer', __name__)
 
 @customer_bp.route('/', methods=['GET', 'POST', 'OPTIONS'])
@@ -12,17 +15,30 @@ def handle_customers():
         return response
 
     try:
-        from app.utils.firebase_utils import FirebaseUtils
-        firebase = FirebaseUtils()
+        from app.utils.firebase_utils import get_firebase
+        firebase = get_firebase()
 
         if request.method == 'GET':
-            # Get all customers
-            customers = firebase.get_documents("customers") or []
-            return jsonify({
+            # Every customer unless a limit is given; sorting and paging run
+            # in the query
+            query = ListingQuery(
+                "customers",
+                sort_by=request.args.get('sort_by'),
+                descending=request.args.get('order', 'asc').lower() == 'desc',
+                limit=request.args.get('limit', type=int),
+                fields=parse_fields(request.args.get('fields'))
+            )
+            page = query.execute(firebase, page_token=request.args.get('page_token'))
+            customers = page["documents"]
+            response = {
                 "success": True,
                 "customers": customers,
-                "count": len(customers)
-            }), 200
+                "count": len(customers),
+                "pagination": page["pagination"]
+            }
+            if request.args.get('explain', 'false').lower() == 'true':
+                response["query_plan"] = query.explain(firebase)
+            return jsonify(response), 200
 
         elif request.method == 'POST':
             # Create new customer
@@ -60,8 +76,8 @@ def handle_customer(customer_id):
         return response
 
     try:
-        from app.utils.firebase_utils import FirebaseUtils
-        firebase = FirebaseUtils()
+        from app.utils.firebase_utils import get_firebase
+        firebase = get_firebase()
 
         if request.method == 'GET':
             # Get customer details
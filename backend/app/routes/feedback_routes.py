@@ -178,17 +178,17 @@ def get_all_feedback():
             limit=limit,
         )
 
-        return (
-            jsonify(
-                {
-                    "success": True,
-                    "feedback": feedback,
-                    "count": len(feedback),
-                    "message": "Feedback retrieved successfully",
-                }
-            ),
-            200,
-        )
+        response = {
+            "success": True,
+            "feedback": feedback,
+            "count": len(feedback),
+            "message": "Feedback retrieved successfully",
+        }
+        if request.args.get("explain", "false").lower() == "true":
+            response["query_plan"] = feedback_controller.explain_feedback_query(
+                rating_filter, category_filter, limit
+            )
+        return jsonify(response), 200
 
     except Exception as e:
         return (
@@ -145,17 +145,17 @@ def get_inventory():
             category_filter=category, low_stock_only=low_stock
         )
 
-        return (
-            jsonify(
-                {
-                    "success": True,
-                    "items": items,
-                    "count": len(items),
-                    "message": "Inventory retrieved successfully",
-                }
-            ),
-            200,
-        )
+        response = {
+            "success": True,
+            "items": items,
+            "count": len(items),
+            "message": "Inventory retrieved successfully",
+        }
+        if request.args.get("explain", "false").lower() == "true":
+            response["query_plan"] = inventory_controller.explain_inventory_query(
+                category, low_stock
+            )
+        return jsonify(response), 200
     except Exception as e:
         return (
             jsonify(
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 
 from app.controllers.product_controller import ProductController
+from app.utils.autocomplete import MAX_SUGGESTIONS
 
 product_bp = Blueprint("products", __name__)
 product_controller = ProductController()
@@ -66,6 +67,48 @@ def get_products():
         }), 500
 
 
+@product_bp.route("/suggest", methods=["GET"])
+def suggest_products():
+    """Autocomplete suggestions for product names, brands and categories"""
+    try:
+        prefix = request.args.get("q", "")
+        limit = min(max(request.args.get("limit", 8, type=int), 1), MAX_SUGGESTIONS)
+        kind = request.args.get("type")
+
+        suggestions = product_controller.suggest_products(prefix, limit, kind)
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "data": suggestions,
+                    "count": len(suggestions),
+                    "query": prefix,
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": str(e),
+                    "message": "Failed to get suggestions",
+                }
+            ),
+            500,
+        )
+
+
+@product_bp.route("/suggest/stats", methods=["GET"])
+def suggest_stats():
+    """Size and memory footprint of the autocomplete index"""
+    return (
+        jsonify({"success": True, "data": product_controller.autocomplete.stats()}),
+        200,
+    )
+
+
 @product_bp.route("/<product_id>", methods=["GET"])
 def get_product(product_id):
     """Get a specific product by ID"""
@@ -111,16 +154,14 @@ def search_products():
             )
 
         results = product_controller.search_products(query)
-        return (
-            jsonify(
-                {
-                    "success": True,
-                    "data": results,
-                    "message": "Search completed successfully",
-                }
-            ),
-            200,
-        )
+        response = {
+            "success": True,
+            "data": results,
+            "message": "Search completed successfully",
+        }
+        if data.get("facets"):
+            response["facets"] = product_controller.get_search_facets(query, results)
+        return jsonify(response), 200
     except Exception as e:
         return (
             jsonify({"success": False, "error": str(e), "message": "Search failed"}),
@@ -135,7 +176,9 @@ def get_recommendations():
         data = request.get_json()
         user_preferences = data.get("preferences", {})
 
-        recommendations = product_controller.get_recommendations(user_preferences)
+        recommendations = product_controller.get_recommendations(
+            user_preferences, user_id=data.get("user_id")
+        )
         return (
             jsonify(
                 {
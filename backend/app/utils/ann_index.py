@@ -0,0 +1,259 @@
+"""
+Approximate nearest-neighbour search for RetailGenie
+Random-hyperplane LSH over feature vectors, so similarity lookups probe a
+few hash buckets instead of scoring every item
+"""
+
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import joblib
+import numpy as np
+
+# Hash tables and sign bits per table: more tables raise recall, more
+# bits make buckets smaller
+DEFAULT_TABLES = 8
+DEFAULT_BITS = 12
+
+
+class LSHIndex:
+    """
+    Cosine-similarity ANN index with random-hyperplane LSH
+
+    Every table hashes a vector to n_bits sign bits against random
+    hyperplanes, so similar vectors usually share a bucket in at least one
+    table. A query gathers the rows in its buckets (and, with multi-probe,
+    the buckets one bit away), then ranks only those candidates by exact
+    cosine. Rows can be added and removed at any time; removed rows are
+    reused. Vectors may carry a partition key (e.g. category) that queries
+    are restricted to.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        n_tables: int = DEFAULT_TABLES,
+        n_bits: int = DEFAULT_BITS,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.seed = seed
+        self._planes = (
+            np.random.default_rng(seed)
+            .standard_normal((n_tables * n_bits, dim))
+            .astype(np.float32)
+        )
+        self._bit_values = (1 << np.arange(n_bits)).astype(np.int64)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._codes = np.zeros((0, self.n_tables), dtype=np.int64)
+        self._ids: List[Optional[str]] = []
+        self._partitions: List[Hashable] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        # One {(partition, code): rows} dict per table
+        self._buckets: List[Dict[Tuple[Hashable, int], Set[int]]] = [
+            {} for _ in range(self.n_tables)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    def _hash(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self._planes.T > 0).reshape(
+            len(vectors), self.n_tables, self.n_bits
+        )
+        return bits @ self._bit_values
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(-1, vectors.shape[-1])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def add(self, item_id: str, vector: np.ndarray, partition: Hashable = None) -> None:
+        """Insert or replace one vector"""
+        self.add_batch([item_id], np.asarray(vector)[None, :], [partition])
+
+    def add_batch(
+        self,
+        item_ids: List[str],
+        vectors: np.ndarray,
+        partitions: Optional[List[Hashable]] = None,
+    ) -> None:
+        """Insert or replace many vectors, hashing them in one pass"""
+        if not len(item_ids):
+            return
+        vectors = self._normalize(vectors)
+        codes = self._hash(vectors)
+        partitions = partitions if partitions is not None else [None] * len(item_ids)
+
+        with self._lock:
+            needed = len(item_ids) - len(self._free)
+            if needed > 0:
+                start = len(self._ids)
+                capacity = max(len(self._vectors) * 2, start + needed)
+                if capacity > len(self._vectors):
+                    self._vectors = np.resize(self._vectors, (capacity, self.dim))
+                    self._codes = np.resize(self._codes, (capacity, self.n_tables))
+                self._ids.extend([None] * needed)
+                self._partitions.extend([None] * needed)
+                self._free.extend(range(start + needed - 1, start - 1, -1))
+
+            for item_id, vector, code, partition in zip(
+                item_ids, vectors, codes, partitions
+            ):
+                self.remove(item_id)
+                row = self._free.pop()
+                self._vectors[row] = vector
+                self._codes[row] = code
+                self._ids[row] = item_id
+                self._partitions[row] = partition
+                self._rows[item_id] = row
+                for table, bucket_code in enumerate(code):
+                    self._buckets[table].setdefault(
+                        (partition, int(bucket_code)), set()
+                    ).add(row)
+
+    def remove(self, item_id: str) -> bool:
+        """Delete a vector; returns False if it isn't indexed"""
+        with self._lock:
+            row = self._rows.pop(item_id, None)
+            if row is None:
+                return False
+            partition = self._partitions[row]
+            for table, code in enumerate(self._codes[row]):
+                key = (partition, int(code))
+                bucket = self._buckets[table].get(key)
+                if bucket is not None:
+                    bucket.discard(row)
+                    if not bucket:
+                        del self._buckets[table][key]
+            self._ids[row] = None
+            self._partitions[row] = None
+            self._free.append(row)
+            return True
+
+    def candidates(
+        self, vector: np.ndarray, partition: Hashable = None, multi_probe: bool = True
+    ) -> np.ndarray:
+        """Rows sharing a bucket with the vector (or one bit away when multi_probe)"""
+        codes = self._hash(self._normalize(vector))[0]
+        flips = [0] + ([int(bit) for bit in self._bit_values] if multi_probe else [])
+        rows: Set[int] = set()
+        with self._lock:
+            for table, code in enumerate(codes):
+                buckets = self._buckets[table]
+                for flip in flips:
+                    bucket = buckets.get((partition, int(code) ^ flip))
+                    if bucket:
+                        rows.update(bucket)
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def query(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        partition: Hashable = None,
+        exclude: Iterable[str] = (),
+        multi_probe: bool = True,
+    ) -> List[Tuple[str, float]]:
+        """
+        Approximate k nearest neighbours by cosine similarity
+
+        Args:
+            vector (np.ndarray): Query vector
+            k (int): Number of neighbours
+            partition (Hashable, optional): Partition to search (items
+                added without one are in the None partition)
+            exclude (Iterable[str]): IDs to leave out (e.g. the query item)
+            multi_probe (bool): Also probe buckets one bit away (higher
+                recall, more candidates)
+
+        Returns:
+            List[Tuple[str, float]]: (id, cosine) pairs, best first
+        """
+        query = self._normalize(vector)[0]
+        with self._lock:
+            rows = self.candidates(query, partition, multi_probe)
+            excluded = {self._rows[i] for i in exclude if i in self._rows}
+            if excluded:
+                rows = rows[~np.isin(rows, list(excluded))]
+            if not len(rows) or k <= 0:
+                return []
+            scores = self._vectors[rows] @ query
+            if len(rows) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                rows, scores = rows[top], scores[top]
+            order = np.argsort(-scores, kind="stable")
+            return [(self._ids[rows[i]], float(scores[i])) for i in order]
+
+    def exact_query(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        partition: Hashable = None,
+        exclude: Iterable[str] = (),
+    ) -> List[Tuple[str, float]]:
+        """Brute-force k nearest neighbours, the baseline for recall"""
+        query = self._normalize(vector)[0]
+        with self._lock:
+            excluded = set(exclude)
+            rows = np.array(
+                [
+                    row
+                    for item_id, row in self._rows.items()
+                    if item_id not in excluded and self._partitions[row] == partition
+                ],
+                dtype=np.int64,
+            )
+            if not len(rows) or k <= 0:
+                return []
+            scores = self._vectors[rows] @ query
+            top = np.argsort(-scores, kind="stable")[:k]
+            return [(self._ids[rows[i]], float(scores[i])) for i in top]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = [len(rows) for table in self._buckets for rows in table.values()]
+            return {
+                "items": len(self._rows),
+                "tables": self.n_tables,
+                "bits": self.n_bits,
+                "buckets": len(sizes),
+                "mean_bucket_size": round(float(np.mean(sizes)), 2) if sizes else 0,
+                "max_bucket_size": max(sizes, default=0),
+            }
+
+    def save(self, path: str) -> None:
+        """Write the index to disk (buckets are rebuilt on load)"""
+        with self._lock:
+            rows = list(self._rows.values())
+            joblib.dump(
+                {
+                    "dim": self.dim,
+                    "n_tables": self.n_tables,
+                    "n_bits": self.n_bits,
+                    "seed": self.seed,
+                    "ids": [self._ids[row] for row in rows],
+                    "partitions": [self._partitions[row] for row in rows],
+                    "vectors": self._vectors[rows],
+                },
+                path,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "LSHIndex":
+        state = joblib.load(path)
+        index = cls(state["dim"], state["n_tables"], state["n_bits"], state["seed"])
+        index.add_batch(state["ids"], state["vectors"], state["partitions"])
+        return index
@@ -0,0 +1,631 @@
+"""
+Asyncio data-access layer for RetailGenie
+Async counterpart of FirebaseUtils built on the Firestore AsyncClient, so
+independent reads can be fanned out with asyncio.gather
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterable, List, Optional, Tuple
+
+import firebase_admin
+from firebase_admin import firestore
+
+from app.utils import firebase_utils
+from app.utils.document_cache import DocumentCache
+from app.utils.firebase_utils import (
+    GET_ALL_CHUNK_SIZE,
+    MAX_AGGREGATIONS_PER_QUERY,
+    Filters,
+    FirebaseUtils,
+    _normalize_fields,
+    get_firebase,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFirebaseUtils:
+    """
+    Async mirror of the FirebaseUtils read/write API
+
+    Wraps a FirebaseUtils instance and shares its configuration, read cache
+    and count cache, so writes made through either side invalidate both.
+    In mock mode every call is served by the wrapped instance's in-memory
+    store, which makes the async API usable in tests without Firestore.
+
+    gRPC aio channels are bound to the event loop that created them, so one
+    AsyncClient is created per running loop.
+    """
+
+    def __init__(self, firebase: Optional[FirebaseUtils] = None):
+        """
+        Initialize the async data-access layer
+
+        Args:
+            firebase (FirebaseUtils, optional): Instance to mirror. Defaults
+                to the shared instance from get_firebase().
+        """
+        self.firebase = firebase or get_firebase()
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._client_lock = threading.Lock()
+
+    @property
+    def is_mock(self) -> bool:
+        """True when the wrapped FirebaseUtils is using the mock database"""
+        return self.firebase.pool_size == 0
+
+    @property
+    def db(self):
+        """AsyncClient for the running event loop, or None in mock mode"""
+        if self.is_mock:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._clients.get(loop)
+            if client is None:
+                app = firebase_admin.get_app()
+                client = firestore.AsyncClient(
+                    project=app.project_id,
+                    credentials=app.credential.get_credential(),
+                )
+                self._clients[loop] = client
+        return client
+
+    async def create_document(
+        self,
+        collection_name: str,
+        data: Dict[str, Any],
+        document_id: Optional[str] = None,
+    ) -> str:
+        """
+        Create a new document
+
+        Args:
+            collection_name (str): Name of the collection
+            data (Dict[str, Any]): Document data
+            document_id (str, optional): Custom document ID
+
+        Returns:
+            str: Document ID
+        """
+        if self.is_mock:
+            return self.firebase.create_document(collection_name, data, document_id)
+
+        try:
+            collection = self.db.collection(collection_name)
+            doc_ref = (
+                collection.document(document_id)
+                if document_id
+                else collection.document()
+            )
+            await doc_ref.set(data)
+            self.firebase._notify(collection_name, "create", doc_ref.id, data)
+            return doc_ref.id
+        except Exception as e:
+            logger.error(f"Error creating document: {str(e)}")
+            raise
+        finally:
+            self.firebase._invalidate(collection_name)
+
+    async def get_document(
+        self, collection_name: str, document_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a document by ID
+
+        Args:
+            collection_name (str): Name of the collection
+            document_id (str): Document ID
+
+        Returns:
+            Optional[Dict[str, Any]]: Document data or None if not found
+        """
+        if self.is_mock:
+            return self.firebase.get_document(collection_name, document_id)
+
+        try:
+            cache_key = ("doc", document_id)
+            cached, generation = self.firebase._cache_get(collection_name, cache_key)
+            if cached is not DocumentCache.MISS:
+                return cached
+
+            doc = await self.db.collection(collection_name).document(document_id).get()
+            data = _snapshot_to_dict(doc) if doc.exists else None
+
+            self.firebase._cache_set(collection_name, cache_key, data, generation)
+            return data
+        except Exception as e:
+            logger.error(f"Error getting document: {str(e)}")
+            raise
+
+    async def get_documents_by_ids(
+        self, collection_name: str, document_ids: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get many documents by ID; chunks of the batched read run concurrently
+
+        Args:
+            collection_name (str): Name of the collection
+            document_ids (Iterable[str]): Document IDs
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Found documents keyed by ID, in request
+                order; IDs that don't exist are omitted
+        """
+        if self.is_mock:
+            return self.firebase.get_documents_by_ids(collection_name, document_ids)
+
+        ids = list(dict.fromkeys(doc_id for doc_id in document_ids if doc_id))
+        if not ids:
+            return {}
+
+        try:
+            found: Dict[str, Dict[str, Any]] = {}
+            pending = []
+            generation = 0
+            for doc_id in ids:
+                cached, generation = self.firebase._cache_get(
+                    collection_name, ("doc", doc_id)
+                )
+                if cached is DocumentCache.MISS:
+                    pending.append(doc_id)
+                elif cached is not None:
+                    found[doc_id] = cached
+
+            if pending:
+                db = self.db
+                collection = db.collection(collection_name)
+
+                async def read_chunk(chunk: List[str]) -> List[Dict[str, Any]]:
+                    refs = [collection.document(doc_id) for doc_id in chunk]
+                    return [
+                        _snapshot_to_dict(snapshot)
+                        async for snapshot in db.get_all(refs)
+                        if snapshot.exists
+                    ]
+
+                chunks = await asyncio.gather(
+                    *(
+                        read_chunk(pending[start : start + GET_ALL_CHUNK_SIZE])
+                        for start in range(0, len(pending), GET_ALL_CHUNK_SIZE)
+                    )
+                )
+                for chunk in chunks:
+                    found.update((data["id"], data) for data in chunk)
+
+                for doc_id in pending:
+                    self.firebase._cache_set(
+                        collection_name, ("doc", doc_id), found.get(doc_id), generation
+                    )
+
+            return {doc_id: found[doc_id] for doc_id in ids if doc_id in found}
+        except Exception as e:
+            logger.error(f"Error getting documents by IDs: {str(e)}")
+            raise
+
+    async def get_documents(
+        self,
+        collection_name: str,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        order_by: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get documents from a collection with optional equality filters
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (Dict[str, Any], optional): Filters to apply
+            limit (int, optional): Maximum number of documents to return
+            order_by (str, optional): Field to order by
+            fields (List[str], optional): Field paths to return (plus "id")
+
+        Returns:
+            List[Dict[str, Any]]: List of documents
+        """
+        if self.is_mock:
+            return self.firebase.get_documents(
+                collection_name, filters, limit, order_by, fields
+            )
+
+        try:
+            fields = _normalize_fields(fields)
+            cache_key = (
+                "query",
+                repr(sorted((filters or {}).items())),
+                limit,
+                order_by,
+                tuple(fields) if fields is not None else None,
+            )
+            cached, generation = self.firebase._cache_get(collection_name, cache_key)
+            if cached is not DocumentCache.MISS:
+                return cached
+
+            query = self.db.collection(collection_name)
+            for field, value in (filters or {}).items():
+                query = query.where(field, "==", value)
+            if order_by:
+                query = query.order_by(order_by)
+            if limit:
+                query = query.limit(limit)
+            if fields is not None:
+                query = query.select(fields)
+
+            result = [_snapshot_to_dict(doc) async for doc in query.stream()]
+
+            self.firebase._cache_set(collection_name, cache_key, result, generation)
+            return result
+        except Exception as e:
+            logger.error(f"Error getting documents: {str(e)}")
+            raise
+
+    async def query_documents(
+        self,
+        collection_name: str,
+        field: str,
+        operator: str,
+        value: Any,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Query documents with a single condition
+
+        Args:
+            collection_name (str): Name of the collection
+            field (str): Field to query
+            operator (str): Query operator ('==', '>', '<', '>=', '<=', '!=',
+                'in', 'array-contains')
+            value (Any): Value to compare
+            limit (int, optional): Maximum number of documents to return
+            fields (List[str], optional): Field paths to return (plus "id")
+
+        Returns:
+            List[Dict[str, Any]]: List of matching documents
+        """
+        if self.is_mock:
+            return self.firebase.query_documents(
+                collection_name, field, operator, value, limit, fields
+            )
+
+        try:
+            fields = _normalize_fields(fields)
+            query = self.db.collection(collection_name).where(field, operator, value)
+            if limit:
+                query = query.limit(limit)
+            if fields is not None:
+                query = query.select(fields)
+            return [_snapshot_to_dict(doc) async for doc in query.stream()]
+        except Exception as e:
+            logger.error(f"Error querying documents: {str(e)}")
+            raise
+
+    async def iter_documents(
+        self,
+        collection_name: str,
+        filters: Filters = None,
+        page_size: int = 500,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream documents lazily, one cursor-paginated page at a time
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+            page_size (int): Documents fetched per round trip
+            order_by (str, optional): Field to order by (document ID if omitted)
+            descending (bool): Reverse the ordering
+
+        Yields:
+            Dict[str, Any]: Documents in order
+        """
+        if self.is_mock:
+            for doc in self.firebase.iter_documents(
+                collection_name, filters, page_size, order_by, descending
+            ):
+                yield doc
+            return
+
+        query = self.db.collection(collection_name)
+        for field, operator, value in self.firebase._normalize_filters(filters):
+            query = query.where(field, operator, value)
+
+        direction = (
+            firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+        )
+        if order_by:
+            query = query.order_by(order_by, direction=direction)
+        query = query.order_by("__name__", direction=direction)
+
+        page_size = max(1, page_size)
+        cursor = None
+        while True:
+            page_query = query
+            if cursor is not None:
+                page_query = page_query.start_after(cursor)
+            batch = [
+                _snapshot_to_dict(doc)
+                async for doc in page_query.limit(page_size).stream()
+            ]
+            for doc in batch:
+                yield doc
+
+            if len(batch) < page_size:
+                return
+            last = batch[-1]
+            cursor = [last.get(order_by), last["id"]] if order_by else [last["id"]]
+
+    async def update_document(
+        self, collection_name: str, document_id: str, data: Dict[str, Any]
+    ) -> bool:
+        """
+        Update a document
+
+        Args:
+            collection_name (str): Name of the collection
+            document_id (str): Document ID
+            data (Dict[str, Any]): Data to update
+
+        Returns:
+            bool: Success status
+        """
+        if self.is_mock:
+            return self.firebase.update_document(collection_name, document_id, data)
+
+        try:
+            await self.db.collection(collection_name).document(document_id).update(data)
+            self.firebase._notify(collection_name, "update", document_id, data)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating document: {str(e)}")
+            return False
+        finally:
+            self.firebase._invalidate(collection_name)
+
+    async def delete_document(self, collection_name: str, document_id: str) -> bool:
+        """
+        Delete a document
+
+        Args:
+            collection_name (str): Name of the collection
+            document_id (str): Document ID
+
+        Returns:
+            bool: Success status
+        """
+        if self.is_mock:
+            return self.firebase.delete_document(collection_name, document_id)
+
+        try:
+            await self.db.collection(collection_name).document(document_id).delete()
+            self.firebase._notify(collection_name, "delete", document_id, None)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting document: {str(e)}")
+            return False
+        finally:
+            self.firebase._invalidate(collection_name)
+
+    async def aggregate(
+        self,
+        collection_name: str,
+        filters: Filters = None,
+        sum_fields: Optional[List[str]] = None,
+        avg_fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Count documents and sum/average fields with server-side aggregation
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+            sum_fields (List[str], optional): Numeric fields to sum
+            avg_fields (List[str], optional): Numeric fields to average
+
+        Returns:
+            Dict with "count", "sum" ({field: total}) and "avg"
+            ({field: mean or None}), as FirebaseUtils.aggregate
+        """
+        if self.is_mock:
+            return self.firebase.aggregate(
+                collection_name, filters, sum_fields, avg_fields
+            )
+
+        filter_tuples = self.firebase._normalize_filters(filters)
+        sum_fields = list(sum_fields or [])
+        avg_fields = list(avg_fields or [])
+
+        count_cache = self.firebase._count_cache
+        cache_key = (
+            "aggregate",
+            repr(filter_tuples),
+            tuple(sum_fields),
+            tuple(avg_fields),
+        )
+        generation = count_cache.generation(collection_name)
+        cached = count_cache.get(collection_name, cache_key)
+        if cached is not DocumentCache.MISS:
+            return cached
+
+        try:
+            query = self.db.collection(collection_name)
+            for field, operator, value in filter_tuples:
+                query = query.where(field, operator, value)
+
+            aggregations = [("count", "count", None)]
+            aggregations += [(f"sum_{i}", "sum", f) for i, f in enumerate(sum_fields)]
+            aggregations += [(f"avg_{i}", "avg", f) for i, f in enumerate(avg_fields)]
+
+            async def run(
+                group: List[Tuple[str, str, Optional[str]]]
+            ) -> Dict[str, Any]:
+                aggregation_query = query
+                for alias, kind, field in group:
+                    if kind == "count":
+                        aggregation_query = aggregation_query.count(alias=alias)
+                    else:
+                        aggregation_query = getattr(aggregation_query, kind)(
+                            field, alias=alias
+                        )
+                return {
+                    aggregation.alias: aggregation.value
+                    for result in await aggregation_query.get()
+                    for aggregation in result
+                }
+
+            values: Dict[str, Any] = {}
+            for group_values in await asyncio.gather(
+                *(
+                    run(aggregations[start : start + MAX_AGGREGATIONS_PER_QUERY])
+                    for start in range(0, len(aggregations), MAX_AGGREGATIONS_PER_QUERY)
+                )
+            ):
+                values.update(group_values)
+        except Exception as e:
+            logger.error(f"Error aggregating documents: {e}")
+            raise
+
+        result = {
+            "count": int(values.get("count", 0)),
+            "sum": {f: values.get(f"sum_{i}", 0) for i, f in enumerate(sum_fields)},
+            "avg": {f: values.get(f"avg_{i}") for i, f in enumerate(avg_fields)},
+        }
+        count_cache.set(collection_name, cache_key, result, generation)
+        return result
+
+    async def count_documents(
+        self, collection_name: str, filters: Filters = None
+    ) -> int:
+        """
+        Count documents matching the filters with a COUNT aggregation
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+
+        Returns:
+            int: Number of matching documents
+        """
+        return (await self.aggregate(collection_name, filters))["count"]
+
+
+def _snapshot_to_dict(snapshot) -> Dict[str, Any]:
+    data = snapshot.to_dict() or {}
+    data["id"] = snapshot.id
+    return data
+
+
+class _LoopThread:
+    """Event loop running forever in a daemon thread, for run_sync()"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="firestore-async-loop", daemon=True
+        )
+        self.thread.start()
+
+
+_shared_instance: Optional[AsyncFirebaseUtils] = None
+_loop_thread: Optional[_LoopThread] = None
+_shared_lock = threading.Lock()
+
+
+def run_sync(
+    coroutine: Coroutine[Any, Any, Any], timeout: Optional[float] = None
+) -> Any:
+    """
+    Run a coroutine from synchronous code, such as a Flask view
+
+    The coroutine runs on a long-lived background event loop, so the
+    AsyncClient and its channel are reused across requests.
+
+    Args:
+        coroutine: Coroutine to run
+        timeout (float, optional): Seconds to wait for the result
+
+    Returns:
+        The coroutine's result; its exceptions are re-raised
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coroutine.close()
+        raise RuntimeError(
+            "run_sync() cannot be used inside an event loop; await instead"
+        )
+
+    global _loop_thread
+    if _loop_thread is None:
+        with _shared_lock:
+            if _loop_thread is None:
+                _loop_thread = _LoopThread()
+
+    future = asyncio.run_coroutine_threadsafe(coroutine, _loop_thread.loop)
+    return future.result(timeout)
+
+
+def gather_sync(
+    *coroutines: Coroutine[Any, Any, Any], timeout: Optional[float] = None
+) -> List[Any]:
+    """
+    Run independent coroutines concurrently from synchronous code
+
+    Example:
+        products, feedback = gather_sync(
+            afb.get_documents("products"), afb.get_documents("feedback")
+        )
+
+    Returns:
+        List[Any]: Results in the order the coroutines were given
+    """
+
+    async def gather() -> List[Any]:
+        return list(await asyncio.gather(*coroutines))
+
+    return run_sync(gather(), timeout)
+
+
+def get_async_firebase(firebase: Optional[FirebaseUtils] = None) -> AsyncFirebaseUtils:
+    """
+    Get the process-wide AsyncFirebaseUtils instance
+
+    Args:
+        firebase (FirebaseUtils, optional): Instance to mirror. The shared
+            async instance is returned when this is omitted or is the shared
+            FirebaseUtils; any other instance gets its own wrapper.
+
+    Returns:
+        AsyncFirebaseUtils: Async counterpart of the FirebaseUtils instance
+    """
+    global _shared_instance
+    if firebase is not None and firebase is not firebase_utils._shared_instance:
+        return AsyncFirebaseUtils(firebase)
+    if _shared_instance is None:
+        with _shared_lock:
+            if _shared_instance is None:
+                _shared_instance = AsyncFirebaseUtils(get_firebase())
+    return _shared_instance
+
+
+def _reset_shared_instance() -> None:
+    """Drop the shared instance and loop thread in forked children"""
+    global _shared_instance, _loop_thread, _shared_lock
+    _shared_instance = None
+    _loop_thread = None
+    _shared_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_shared_instance)
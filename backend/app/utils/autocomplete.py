@@ -0,0 +1,429 @@
+"""
+Prefix autocomplete for RetailGenie
+Sorted array of normalized prefixes over product names, brands and
+categories, weighted by product popularity
+"""
+
+import bisect
+import heapq
+import itertools
+import re
+import sys
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.utils.search_index import CollectionSync
+
+# Product field -> suggestion type
+SUGGESTION_FIELDS = {"name": "product", "brand": "brand", "category": "category"}
+
+# Upper bound on suggestions returned per lookup
+MAX_SUGGESTIONS = 50
+
+# Prefixes this short match large ranges, so their rankings are memoized
+# and kept current by writes
+SHORT_PREFIX_LENGTH = 2
+
+# Up to this many new prefix entries are inserted one by one; more (a
+# bulk load) are appended and the array is sorted once
+INSORT_MAX = 64
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+# Items sampled per structure when estimating memory use in stats()
+MEMORY_SAMPLE = 256
+
+# (suggestion type, normalized text) identifies a suggestion
+SuggestionKey = Tuple[str, str]
+
+
+def normalize(text: Any) -> str:
+    """Case- and accent-insensitive form used for matching"""
+    text = str(text)
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM_RE.sub(" ", text.lower()).strip()
+
+
+def _rank_key(item: Tuple[SuggestionKey, float]) -> Tuple[float, int, str]:
+    """Most popular first, then shorter (closer) matches"""
+    (_, text), weight = item
+    return (-weight, len(text), text)
+
+
+def _deep_sizeof(obj: Any, seen: Set[int]) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(
+            _deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def _estimate_sizeof(container: Any, sample: int = MEMORY_SAMPLE) -> int:
+    """Approximate deep size of a list or dict from a sample of its items"""
+    count = len(container)
+    if not count:
+        return sys.getsizeof(container)
+    step = max(count // sample, 1)
+    if isinstance(container, dict):
+        items = list(itertools.islice(container.items(), 0, None, step))[:sample]
+    else:
+        items = container[::step][:sample]
+    # Strings shared between items are counted once per item, so this
+    # errs on the high side
+    item_bytes = sum(_deep_sizeof(item, set()) for item in items) / len(items)
+    return sys.getsizeof(container) + int(item_bytes * count)
+
+
+class AutocompleteIndex:
+    """
+    Prefix index for search-box suggestions
+
+    Every suggestion (a product name, brand or category) is stored once
+    with its display text and weight, and is reachable from a sorted array
+    of (normalized suffix, type, text) entries, one per word start, so
+    "cof" and "bea" both find "Organic Coffee Beans". A lookup is a binary
+    search for the prefix range followed by a top-k by weight. New entries
+    are buffered and merged into the array before the next lookup, so a
+    bulk load sorts once instead of inserting entry by entry.
+
+    A product contributes 1 + its popularity field (views by default) to
+    the weight of each of its suggestions, so brands and categories rank
+    by the combined popularity of their products.
+    """
+
+    def __init__(self, popularity_field: str = "views"):
+        self.popularity_field = popularity_field
+        self._entries: List[Tuple[str, str, str]] = []
+        # Entries added since the array was last merged (see finish())
+        self._new_entries: List[Tuple[str, str, str]] = []
+        # key -> [display text, weight, {doc_id: weight}]
+        self._suggestions: Dict[SuggestionKey, list] = {}
+        self._kind_counts: Dict[str, int] = {}
+        # doc_id -> indexed field values, for updates and removal
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._short_cache: Dict[
+            Tuple[str, Optional[str]], List[Tuple[SuggestionKey, float]]
+        ] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """Index a product's name, brand and category, replacing any previous version"""
+        with self._lock:
+            fields = {
+                field: document.get(field)
+                for field in (*SUGGESTION_FIELDS, self.popularity_field)
+                if document.get(field) is not None
+            }
+            self._apply(doc_id, fields)
+
+    def update(self, doc_id: str, changes: Dict[str, Any]) -> bool:
+        """
+        Apply a partial product update
+
+        Returns:
+            bool: False if the product isn't indexed
+        """
+        with self._lock:
+            current = self._documents.get(doc_id)
+            if current is None:
+                return False
+            relevant = (*SUGGESTION_FIELDS, self.popularity_field)
+            if not any(field in changes for field in relevant):
+                return True
+            merged = dict(current)
+            merged.update({k: v for k, v in changes.items() if k in relevant})
+            self.add(doc_id, merged)
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a product's suggestions; returns False if it wasn't indexed"""
+        with self._lock:
+            if doc_id not in self._documents:
+                return False
+            self._apply(doc_id, None)
+            return True
+
+    def _apply(self, doc_id: str, fields: Optional[Dict[str, Any]]) -> None:
+        """Replace a product's contribution to its suggestions (None removes it)"""
+        old = self._contributions(self._documents.pop(doc_id, None))
+        new = self._contributions(fields)
+        if fields is not None:
+            self._documents[doc_id] = fields
+
+        for key in old.keys() | new.keys():
+            suggestion = self._suggestions.get(key)
+            if key in new:
+                text, weight = new[key]
+                if suggestion is None:
+                    suggestion = [text, 0.0, {}]
+                    self._suggestions[key] = suggestion
+                    self._kind_counts[key[0]] = self._kind_counts.get(key[0], 0) + 1
+                    self._new_entries.extend(
+                        (suffix, key[0], key[1]) for suffix in self._suffixes(key[1])
+                    )
+                previous = suggestion[2].get(doc_id)
+                if previous == weight:
+                    continue
+                suggestion[1] += weight - (previous or 0.0)
+                suggestion[2][doc_id] = weight
+            elif suggestion is not None and doc_id in suggestion[2]:
+                suggestion[1] -= suggestion[2].pop(doc_id)
+                if not suggestion[2]:
+                    del self._suggestions[key]
+                    self._kind_counts[key[0]] -= 1
+                    self._drop_entries(key)
+                    self._update_short(key, None)
+                    continue
+            else:
+                continue
+            self._update_short(key, suggestion[1])
+
+    def _contributions(
+        self, fields: Optional[Dict[str, Any]]
+    ) -> Dict[SuggestionKey, Tuple[str, float]]:
+        """key -> (display text, weight) for each suggestion of a product"""
+        if fields is None:
+            return {}
+        weight = self._weight(fields)
+        contributions = {}
+        for field, kind in SUGGESTION_FIELDS.items():
+            text = fields.get(field)
+            normalized = normalize(text) if isinstance(text, str) else ""
+            if normalized:
+                contributions[(kind, normalized)] = (text.strip(), weight)
+        return contributions
+
+    def _drop_entries(self, key: SuggestionKey) -> None:
+        self.finish()
+        for suffix in self._suffixes(key[1]):
+            entry = (suffix, key[0], key[1])
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def _update_short(self, key: SuggestionKey, weight: Optional[float]) -> None:
+        """
+        Apply a suggestion's new weight (None if it's gone) to the memoized
+        short-prefix rankings that contain or could contain it
+
+        A ranking is only dropped (recomputed on its next lookup) when it was
+        full and the change could let a suggestion outside it in.
+        """
+        if not self._short_cache:
+            return
+        prefixes = {
+            suffix[:length]
+            for suffix in self._suffixes(key[1])
+            for length in range(1, SHORT_PREFIX_LENGTH + 1)
+        }
+        for prefix in prefixes:
+            for cache_key in ((prefix, None), (prefix, key[0])):
+                ranked = self._short_cache.get(cache_key)
+                if ranked is not None and not self._rerank(ranked, key, weight):
+                    del self._short_cache[cache_key]
+
+    @staticmethod
+    def _rerank(
+        ranked: List[Tuple[SuggestionKey, float]],
+        key: SuggestionKey,
+        weight: Optional[float],
+    ) -> bool:
+        """Update a ranking in place; False if it can't be kept exact"""
+        full = len(ranked) >= MAX_SUGGESTIONS
+        position = next(
+            (i for i, (ranked_key, _) in enumerate(ranked) if ranked_key == key), None
+        )
+        if position is None:
+            if weight is None:
+                return True
+            ranked.append((key, weight))
+        elif weight is None:
+            del ranked[position]
+            return not full
+        else:
+            ranked[position] = (key, weight)
+        ranked.sort(key=_rank_key)
+        if len(ranked) > MAX_SUGGESTIONS:
+            del ranked[MAX_SUGGESTIONS:]
+            return True
+        # A full ranking whose last place went down may be passed by an outsider
+        return not (full and position is not None and ranked[-1][0] == key)
+
+    def finish(self) -> None:
+        """Merge entries added since the last lookup into the sorted array"""
+        with self._lock:
+            if not self._new_entries:
+                return
+            if len(self._new_entries) <= INSORT_MAX:
+                for entry in self._new_entries:
+                    bisect.insort(self._entries, entry)
+            else:
+                self._entries.extend(self._new_entries)
+                self._entries.sort()
+            self._new_entries = []
+
+    def suggest(
+        self, prefix: str, limit: int = 8, kind: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Suggestions whose text has a word starting with the prefix
+
+        Args:
+            prefix (str): What the user has typed so far
+            limit (int): Maximum number of suggestions
+            kind (str, optional): Only "product", "brand" or "category"
+
+        Returns:
+            List[Dict[str, Any]]: {text, type, score[, product_id]}, most
+                popular first
+        """
+        normalized = normalize(prefix)
+        if not normalized or limit <= 0:
+            return []
+
+        with self._lock:
+            self.finish()
+            ranked = self._rank(normalized, kind)
+            results = []
+            for key, weight in ranked[:limit]:
+                text, _, doc_weights = self._suggestions[key]
+                result = {"text": text, "type": key[0], "score": round(weight, 2)}
+                if key[0] == "product" and len(doc_weights) == 1:
+                    result["product_id"] = next(iter(doc_weights))
+                results.append(result)
+            return results
+
+    def _rank(
+        self, normalized: str, kind: Optional[str]
+    ) -> List[Tuple[SuggestionKey, float]]:
+        short = len(normalized) <= SHORT_PREFIX_LENGTH
+        if short and (normalized, kind) in self._short_cache:
+            return self._short_cache[(normalized, kind)]
+
+        start = bisect.bisect_left(self._entries, (normalized,))
+        end = bisect.bisect_left(self._entries, (normalized + "\uffff",))
+        keys = {
+            (entry_kind, text)
+            for _, entry_kind, text in self._entries[start:end]
+            if kind is None or entry_kind == kind
+        }
+        ranked = heapq.nsmallest(
+            MAX_SUGGESTIONS,
+            ((key, self._suggestions[key][1]) for key in keys),
+            key=_rank_key,
+        )
+        if short:
+            self._short_cache[(normalized, kind)] = ranked
+        return ranked
+
+    def _weight(self, fields: Dict[str, Any]) -> float:
+        popularity = fields.get(self.popularity_field, 0)
+        if isinstance(popularity, bool) or not isinstance(popularity, (int, float)):
+            popularity = 0
+        return 1.0 + max(popularity, 0)
+
+    @staticmethod
+    def _suffixes(normalized: str) -> List[str]:
+        words = normalized.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def stats(self) -> Dict[str, Any]:
+        """Sizes and memory footprint of the index (estimated from a sample)"""
+        with self._lock:
+            memory = sum(
+                _estimate_sizeof(structure)
+                for structure in (self._entries, self._suggestions, self._documents)
+            )
+            return {
+                "documents": len(self._documents),
+                "suggestions": len(self._suggestions),
+                "suggestions_by_type": {
+                    kind: count for kind, count in self._kind_counts.items() if count
+                },
+                "prefix_entries": len(self._entries) + len(self._new_entries),
+                "memory_bytes": memory,
+            }
+
+
+class CollectionAutocompleteIndex(CollectionSync, AutocompleteIndex):
+    """AutocompleteIndex kept in sync with a Firestore collection"""
+
+    def __init__(
+        self,
+        firebase,
+        collection_name: str,
+        refresh_seconds: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self._init_sync(firebase, collection_name, refresh_seconds)
+
+    def _empty_copy(self) -> AutocompleteIndex:
+        return AutocompleteIndex(self.popularity_field)
+
+    def _finish_copy(self, fresh: AutocompleteIndex) -> None:
+        fresh.finish()
+
+    def _adopt(self, fresh: AutocompleteIndex) -> None:
+        self._entries = fresh._entries
+        self._new_entries = fresh._new_entries
+        self._suggestions = fresh._suggestions
+        self._kind_counts = fresh._kind_counts
+        self._documents = fresh._documents
+        self._short_cache = {}
+
+    def suggest(
+        self, prefix: str, limit: int = 8, kind: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        self.ensure_loaded()
+        return super().suggest(prefix, limit, kind)
+
+    def stats(self) -> Dict[str, Any]:
+        result = super().stats()
+        result["loaded"] = self._loaded_at is not None
+        return result
+
+
+_indexes: Dict[Tuple[int, str], CollectionAutocompleteIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_autocomplete_index(
+    collection_name: str = "products", firebase=None
+) -> CollectionAutocompleteIndex:
+    """
+    Get the process-wide autocomplete index for a collection
+
+    Args:
+        collection_name (str): Collection to index
+        firebase (FirebaseUtils, optional): Data source; defaults to
+            get_firebase(). Each instance gets its own index.
+
+    Returns:
+        CollectionAutocompleteIndex: Shared index, built lazily on first lookup
+    """
+    if firebase is None:
+        # Imported here so AutocompleteIndex itself has no Firebase dependency
+        from app.utils.firebase_utils import get_firebase
+
+        firebase = get_firebase()
+
+    key = (id(firebase), collection_name)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.firebase is not firebase:
+            index = CollectionAutocompleteIndex(firebase, collection_name)
+            _indexes[key] = index
+        return index
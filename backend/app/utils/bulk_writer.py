@@ -0,0 +1,187 @@
+"""
+Chunked, parallel Firestore bulk writer
+Splits write operations into batches under Firestore's 500-write limit,
+commits them concurrently, retries transient failures with backoff and
+reports a result for every operation
+"""
+
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+try:
+    from google.api_core import exceptions as google_exceptions
+
+    TRANSIENT_ERRORS = (
+        google_exceptions.Aborted,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.TooManyRequests,
+        ConnectionError,
+        TimeoutError,
+    )
+except ImportError:  # pragma: no cover - google-cloud is installed with firebase-admin
+    TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_SIZE = 500
+
+OPERATION_TYPES = ("create", "set", "update", "delete")
+
+
+class BulkWriter:
+    """
+    Commit many write operations as parallel Firestore batches
+
+    Operations use the same dicts as FirebaseUtils.batch_write:
+    {"type": "create" | "set" | "update" | "delete", "collection": ...,
+    "document_id": ..., "data": ...}. A create without a document_id gets
+    an auto-generated ID.
+
+    Batches are atomic, so if a batch fails with a non-transient error
+    (for example an update of a missing document) its operations are
+    retried one by one to find out exactly which ones failed.
+    """
+
+    def __init__(
+        self,
+        db,
+        chunk_size: int = MAX_BATCH_SIZE,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+    ):
+        self.db = db
+        self.chunk_size = max(1, min(chunk_size, MAX_BATCH_SIZE))
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+
+    def write(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Commit all operations
+
+        Args:
+            operations (List[Dict[str, Any]]): Write operations
+
+        Returns:
+            List[Dict[str, Any]]: One result per operation, in input order,
+                with index, type, collection, document_id, success and error
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        prepared = []
+
+        for index, operation in enumerate(operations):
+            error = self._validate(operation)
+            if error:
+                results[index] = self._result(index, operation, None, False, error)
+            else:
+                prepared.append((index, operation, self._document_ref(operation)))
+
+        chunks = [
+            prepared[start : start + self.chunk_size]
+            for start in range(0, len(prepared), self.chunk_size)
+        ]
+
+        if len(chunks) <= 1 or self.max_workers == 1:
+            chunk_results = [self._write_chunk(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(chunks))
+            ) as executor:
+                chunk_results = list(executor.map(self._write_chunk, chunks))
+
+        for chunk_result in chunk_results:
+            for result in chunk_result:
+                results[result["index"]] = result
+
+        return results
+
+    def _validate(self, operation: Dict[str, Any]) -> Optional[str]:
+        op_type = operation.get("type")
+        if op_type not in OPERATION_TYPES:
+            return f"Unsupported operation type: {op_type}"
+        if not operation.get("collection"):
+            return "Missing collection"
+        if op_type != "create" and not operation.get("document_id"):
+            return f"Missing document_id for {op_type}"
+        return None
+
+    def _document_ref(self, operation: Dict[str, Any]):
+        collection = self.db.collection(operation["collection"])
+        document_id = operation.get("document_id")
+        return (
+            collection.document(document_id) if document_id else collection.document()
+        )
+
+    def _write_chunk(self, chunk: List) -> List[Dict[str, Any]]:
+        error = self._commit_with_retries(chunk)
+        if error is None:
+            return [
+                self._result(index, operation, doc_ref.id, True, None)
+                for index, operation, doc_ref in chunk
+            ]
+
+        if len(chunk) == 1 or isinstance(error, TRANSIENT_ERRORS):
+            return [
+                self._result(index, operation, doc_ref.id, False, str(error))
+                for index, operation, doc_ref in chunk
+            ]
+
+        # Isolate the failing operations of a rejected batch
+        logger.warning(
+            f"Batch of {len(chunk)} writes failed ({error}); retrying individually"
+        )
+        results = []
+        for entry in chunk:
+            results.extend(self._write_chunk([entry]))
+        return results
+
+    def _commit_with_retries(self, chunk: List) -> Optional[Exception]:
+        """Commit a chunk as one batch; returns the final error, if any"""
+        for attempt in range(self.max_retries + 1):
+            batch = self.db.batch()
+            for _, operation, doc_ref in chunk:
+                op_type = operation["type"]
+                data = operation.get("data", {})
+                if op_type in ("create", "set"):
+                    batch.set(doc_ref, data)
+                elif op_type == "update":
+                    batch.update(doc_ref, data)
+                else:
+                    batch.delete(doc_ref)
+
+            try:
+                batch.commit()
+                return None
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    return e
+                delay = self.backoff_seconds * (2**attempt)
+                time.sleep(delay + random.uniform(0, delay))
+            except Exception as e:
+                return e
+        return None
+
+    @staticmethod
+    def _result(
+        index: int,
+        operation: Dict[str, Any],
+        document_id: Optional[str],
+        success: bool,
+        error: Optional[str],
+    ) -> Dict[str, Any]:
+        return {
+            "index": index,
+            "type": operation.get("type"),
+            "collection": operation.get("collection"),
+            "document_id": document_id or operation.get("document_id"),
+            "success": success,
+            "error": error,
+        }
@@ -0,0 +1,322 @@
+"""
+Item-to-item co-purchase recommendations for RetailGenie
+Sparse item co-occurrence counts from order baskets, cosine-normalized,
+with the top neighbours of every product kept in fixed-width arrays
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# Neighbours kept per product
+DEFAULT_TOP_N = 20
+
+# Pairs bought together fewer times than this are ignored
+DEFAULT_MIN_COUNT = 1
+
+# Neighbour lists served to the API (one document per product)
+NEIGHBOURS_COLLECTION = "product_neighbours"
+
+# Worker-local model state, so scheduled refreshes only read new orders
+# (COPURCHASE_MODEL_PATH; kept out of the source tree by default)
+DEFAULT_MODEL_PATH = os.path.join(
+    tempfile.gettempdir(), "retailgenie", "copurchase_model.pkl"
+)
+
+
+def basket_items(order: Dict[str, Any]) -> List[str]:
+    """Distinct product IDs in an order's items"""
+    items = []
+    for item in order.get("items") or []:
+        if isinstance(item, dict):
+            item = item.get("product_id") or item.get("id")
+        if item:
+            items.append(str(item))
+    return list(dict.fromkeys(items))
+
+
+class CoPurchaseModel:
+    """
+    Item-item model from products bought in the same order
+
+    The model keeps C = B^T B, where B is the binary order x product
+    matrix, so C[i, j] counts orders containing both products and C[i, i]
+    the orders containing product i. Similarity is the cosine
+    C[i, j] / sqrt(C[i, i] * C[j, j]).
+
+    Each product's top_n neighbours and scores live in two
+    (products x top_n) arrays padded with -1, so a lookup is a row read.
+    New orders are folded in with partial_fit(), which adds their
+    co-occurrences to C and recomputes the neighbour rows of the products
+    whose scores changed.
+    """
+
+    def __init__(self, top_n: int = DEFAULT_TOP_N, min_count: int = DEFAULT_MIN_COUNT):
+        self.top_n = top_n
+        self.min_count = min_count
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._counts = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self.neighbours = np.full((0, self.top_n), -1, dtype=np.int32)
+        self.scores = np.zeros((0, self.top_n), dtype=np.float32)
+        self.orders_seen = 0
+        # Newest order created_at folded in, and the IDs of orders with
+        # exactly that timestamp, so refreshes resume without duplicates
+        self.watermark: Optional[str] = None
+        self.watermark_ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def fit(self, orders: Iterable[Dict[str, Any]]) -> "CoPurchaseModel":
+        """Build the model from scratch"""
+        with self._lock:
+            self._reset()
+            self.partial_fit(orders)
+        return self
+
+    def partial_fit(self, orders: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Add new orders to the model
+
+        Args:
+            orders (Iterable[Dict[str, Any]]): Orders with items
+
+        Returns:
+            List[str]: Products whose neighbour lists were recomputed
+        """
+        with self._lock:
+            rows, cols = [], []
+            baskets = 0
+            for order in orders:
+                items = basket_items(order)
+                if not items:
+                    continue
+                for product_id in items:
+                    rows.append(baskets)
+                    cols.append(self._item(product_id))
+                baskets += 1
+            if not baskets:
+                return []
+
+            size = len(self._ids)
+            basket_matrix = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.int64), (rows, cols)),
+                shape=(baskets, size),
+            )
+            if self._counts.shape[0] < size:
+                self._counts.resize((size, size))
+                self._grow(size)
+            self._counts = (self._counts + basket_matrix.T @ basket_matrix).tocsr()
+            self.orders_seen += baskets
+
+            # A product's scores change if it was bought or if it co-occurs
+            # with a product that was (whose count normalizes the cosine)
+            touched = np.unique(cols)
+            affected = np.union1d(touched, self._counts[touched].indices)
+            self._recompute(affected)
+            return [self._ids[row] for row in affected]
+
+    def _item(self, product_id: str) -> int:
+        row = self._index.get(product_id)
+        if row is None:
+            row = len(self._ids)
+            self._index[product_id] = row
+            self._ids.append(product_id)
+        return row
+
+    def _grow(self, size: int) -> None:
+        extra = size - len(self.neighbours)
+        self.neighbours = np.vstack(
+            [self.neighbours, np.full((extra, self.top_n), -1, dtype=np.int32)]
+        )
+        self.scores = np.vstack(
+            [self.scores, np.zeros((extra, self.top_n), dtype=np.float32)]
+        )
+
+    def _recompute(self, rows: np.ndarray) -> None:
+        """Recompute the neighbour rows of the given products"""
+        frequency = self._counts.diagonal().astype(float)
+        block = self._counts[rows].tocsr()
+        for position, row in enumerate(rows):
+            start, end = block.indptr[position], block.indptr[position + 1]
+            columns = block.indices[start:end]
+            counts = block.data[start:end]
+            keep = (columns != row) & (counts >= self.min_count)
+            columns, counts = columns[keep], counts[keep]
+
+            self.neighbours[row] = -1
+            self.scores[row] = 0
+            if not len(columns):
+                continue
+            cosine = counts / np.sqrt(frequency[row] * frequency[columns])
+            k = min(self.top_n, len(columns))
+            top = (
+                np.argpartition(-cosine, k - 1)[:k]
+                if len(columns) > k
+                else np.arange(k)
+            )
+            # Best first; ties go to the more frequently bought product
+            top = top[np.lexsort((-frequency[columns[top]], -cosine[top]))]
+            self.neighbours[row, :k] = columns[top]
+            self.scores[row, :k] = cosine[top]
+
+    def similar(self, product_id: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Products most often bought with a product
+
+        Returns:
+            List[Tuple[str, float]]: (product_id, cosine score), best first
+        """
+        with self._lock:
+            row = self._index.get(product_id)
+            if row is None:
+                return []
+            neighbours = self.neighbours[row, :limit]
+            scores = self.scores[row, :limit]
+            return [
+                (self._ids[n], round(float(s), 4))
+                for n, s in zip(neighbours, scores)
+                if n >= 0
+            ]
+
+    def neighbour_lists(
+        self, product_ids: Optional[Iterable[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Neighbour lists as {product_id: [{id, score}]} for storage"""
+        ids = self._ids if product_ids is None else product_ids
+        return {
+            product_id: [
+                {"id": neighbour, "score": score}
+                for neighbour, score in self.similar(product_id, self.top_n)
+            ]
+            for product_id in ids
+        }
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            joblib.dump(
+                {
+                    "top_n": self.top_n,
+                    "min_count": self.min_count,
+                    "ids": self._ids,
+                    "counts": self._counts,
+                    "neighbours": self.neighbours,
+                    "scores": self.scores,
+                    "orders_seen": self.orders_seen,
+                    "watermark": self.watermark,
+                    "watermark_ids": self.watermark_ids,
+                },
+                path,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "CoPurchaseModel":
+        state = joblib.load(path)
+        model = cls(state["top_n"], state["min_count"])
+        model._ids = state["ids"]
+        model._index = {product_id: row for row, product_id in enumerate(model._ids)}
+        model._counts = state["counts"]
+        model.neighbours = state["neighbours"]
+        model.scores = state["scores"]
+        model.orders_seen = state["orders_seen"]
+        model.watermark = state.get("watermark")
+        model.watermark_ids = state.get("watermark_ids", [])
+        return model
+
+
+def refresh_copurchase_model(
+    firebase,
+    model_path: Optional[str] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """
+    Bring the co-purchase model up to date and publish neighbour lists
+
+    Orders created after the last refresh (by created_at) are folded into
+    the saved model, and only the neighbour lists they changed are written
+    to the product_neighbours collection. Without a saved model, or with
+    full=True, the model is rebuilt from every order.
+
+    Args:
+        firebase (FirebaseUtils): Data source
+        model_path (str, optional): Saved model state (COPURCHASE_MODEL_PATH)
+        full (bool): Rebuild from scratch
+
+    Returns:
+        Dict with the mode, orders read, lists written and duration
+    """
+    started = time.perf_counter()
+    model_path = model_path or os.getenv("COPURCHASE_MODEL_PATH", DEFAULT_MODEL_PATH)
+
+    model = None
+    if not full and os.path.exists(model_path):
+        try:
+            model = CoPurchaseModel.load(model_path)
+        except Exception as e:
+            logger.warning(f"Rebuilding co-purchase model, saved state unusable: {e}")
+    if model is None:
+        model = CoPurchaseModel(
+            top_n=int(os.getenv("COPURCHASE_TOP_N", DEFAULT_TOP_N)),
+            min_count=int(os.getenv("COPURCHASE_MIN_COUNT", DEFAULT_MIN_COUNT)),
+        )
+    mode = "incremental" if len(model) else "full"
+
+    # Resume at the watermark; orders sharing its timestamp were already seen
+    seen = set(model.watermark_ids)
+    filters = [("created_at", ">=", model.watermark)] if model.watermark else None
+    orders = []
+    for order in firebase.iter_documents(
+        "orders", filters=filters, order_by="created_at", fields=["items", "created_at"]
+    ):
+        if order["id"] in seen:
+            continue
+        orders.append(order)
+        if order["created_at"] != model.watermark:
+            model.watermark, seen = order["created_at"], set()
+        seen.add(order["id"])
+    model.watermark_ids = sorted(seen)
+
+    lists = model.neighbour_lists(model.partial_fit(orders))
+    failed = 0
+    if lists:
+        failed = firebase.bulk_write(
+            [
+                {
+                    "type": "set",
+                    "collection": NEIGHBOURS_COLLECTION,
+                    "document_id": product_id,
+                    "data": {
+                        "neighbours": neighbours,
+                        "orders_seen": model.orders_seen,
+                    },
+                }
+                for product_id, neighbours in lists.items()
+            ]
+        ).get("failed", 0)
+    model.save(model_path)
+
+    summary = {
+        "mode": mode,
+        "orders": len(orders),
+        "products": len(model),
+        "lists_written": len(lists),
+        "failed": failed,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(f"Co-purchase model refreshed: {summary}")
+    return summary
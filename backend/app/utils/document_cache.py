@@ -0,0 +1,191 @@
+"""
+Read-through document cache for FirebaseUtils
+Bounded LRU cache with per-collection TTLs and write invalidation
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+_MISS = object()
+
+
+def _copy(value: Any) -> Any:
+    """Shallow-copy cached documents so callers can't mutate the cache"""
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return [dict(item) if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def _parse_ttls(raw: str) -> Dict[str, float]:
+    """Parse "products=300,orders=30" into a collection -> TTL map"""
+    ttls = {}
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        name, ttl = part.split("=", 1)
+        try:
+            ttls[name.strip()] = float(ttl)
+        except ValueError:
+            continue
+    return ttls
+
+
+class DocumentCache:
+    """
+    LRU cache for Firestore reads, keyed by collection and query
+
+    Entries expire after the collection's TTL (or the default TTL) and are
+    evicted least-recently-used once max_entries is reached. Writes made
+    through FirebaseUtils invalidate the affected collection.
+    """
+
+    MISS = _MISS
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float = 60.0,
+        collection_ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.default_ttl = default_ttl
+        self.collection_ttls = dict(collection_ttls or {})
+
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._keys_by_collection: Dict[str, Set[Tuple]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["DocumentCache"]:
+        """Build a cache from FIRESTORE_CACHE_* settings, or None if disabled"""
+        if os.getenv("FIRESTORE_CACHE_ENABLED", "false").lower() not in (
+            "1",
+            "true",
+            "yes",
+        ):
+            return None
+        return cls(
+            max_entries=int(os.getenv("FIRESTORE_CACHE_MAX_ENTRIES", "1024")),
+            default_ttl=float(os.getenv("FIRESTORE_CACHE_TTL", "60")),
+            collection_ttls=_parse_ttls(os.getenv("FIRESTORE_CACHE_TTLS", "")),
+        )
+
+    def ttl_for(self, collection_name: str) -> float:
+        return self.collection_ttls.get(collection_name, self.default_ttl)
+
+    def generation(self, collection_name: str) -> int:
+        """Counter bumped on every invalidation of the collection"""
+        with self._lock:
+            return self._generations.get(collection_name, 0)
+
+    def get(self, collection_name: str, key: Hashable) -> Any:
+        """
+        Look up a cached value
+
+        Returns:
+            The cached value (copied), or DocumentCache.MISS if absent/expired
+        """
+        full_key = (collection_name, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                self.misses += 1
+                return _MISS
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(full_key)
+                self.misses += 1
+                return _MISS
+
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return _copy(value)
+
+    def set(
+        self,
+        collection_name: str,
+        key: Hashable,
+        value: Any,
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        Store a value
+
+        Args:
+            collection_name (str): Collection the value was read from
+            key (Hashable): Document or query key
+            value (Any): Document(s) to cache
+            generation (int, optional): generation() observed before the read;
+                the value is dropped if the collection was written since
+        """
+        ttl = self.ttl_for(collection_name)
+        if ttl <= 0:
+            return
+
+        full_key = (collection_name, key)
+        with self._lock:
+            if (
+                generation is not None
+                and self._generations.get(collection_name, 0) != generation
+            ):
+                return
+            self._entries[full_key] = (time.monotonic() + ttl, _copy(value))
+            self._entries.move_to_end(full_key)
+            self._keys_by_collection.setdefault(collection_name, set()).add(full_key)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, collection_name: str) -> None:
+        """Drop every cached document and query result of a collection"""
+        with self._lock:
+            for full_key in list(self._keys_by_collection.get(collection_name, ())):
+                self._remove(full_key)
+            self._generations[collection_name] = (
+                self._generations.get(collection_name, 0) + 1
+            )
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_collection.clear()
+
+    def _remove(self, full_key: Tuple) -> None:
+        self._entries.pop(full_key, None)
+        keys = self._keys_by_collection.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._keys_by_collection[full_key[0]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "collections": {
+                    name: len(keys) for name, keys in self._keys_by_collection.items()
+                },
+            }
@@ -1,21 +1,134 @@
+import base64
+import hashlib
+import itertools
+import json
 import logging
 import os
+import threading
+import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import firebase_admin
 from dotenv import load_dotenv
 from firebase_admin import credentials, firestore
 
+from app.utils.bulk_writer import MAX_BATCH_SIZE, BulkWriter
+from app.utils.document_cache import DocumentCache
+from app.utils.mock_store import InMemoryDocumentStore
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Document references per BatchGetDocuments call in get_documents_by_ids
+GET_ALL_CHUNK_SIZE = 100
+
+# Firestore accepts at most this many aggregations per aggregation query
+MAX_AGGREGATIONS_PER_QUERY = 5
+
+# Filters are either {field: value} equality filters or (field, op, value) tuples
+Filters = Union[Dict[str, Any], List[Tuple[str, str, Any]], None]
+
+
+def parse_fields(raw: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated ``fields`` request parameter
+
+    Returns:
+        Optional[List[str]]: Field paths to select, or None for whole
+            documents when the parameter is missing or blank
+    """
+    if not raw or not raw.strip():
+        return None
+    return [field.strip() for field in raw.split(",") if field.strip()]
+
+
+def _normalize_fields(fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """Dedupe a projection; "id" is dropped since it's always returned"""
+    if fields is None:
+        return None
+    return list(dict.fromkeys(f for f in fields if f and f != "id"))
+
+
+def _project(data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Trim a document to the selected (possibly dotted) field paths plus id"""
+    if fields is None:
+        return data
+    projected: Dict[str, Any] = {}
+    for path in fields:
+        parts = path.split(".")
+        value: Any = data
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    if "id" in data:
+        projected["id"] = data["id"]
+    return projected
+
+
+def _cursor_value_to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _cursor_value_from_json(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def _encode_page_token(fingerprint: str, cursor: Tuple[Any, str]) -> str:
+    payload = json.dumps(
+        {"q": fingerprint, "v": _cursor_value_to_json(cursor[0]), "id": cursor[1]},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_page_token(token: str, fingerprint: str) -> Tuple[Any, str]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        cursor = (_cursor_value_from_json(payload["v"]), str(payload["id"]))
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid page token")
+    if payload.get("q") != fingerprint:
+        raise ValueError("Page token does not match this query")
+    return cursor
+
 
 class FirebaseUtils:
-    def __init__(self):
-        """Initialize Firebase connection"""
+    def __init__(self, cache: Optional[DocumentCache] = None):
+        """
+        Initialize Firebase connection
+
+        Args:
+            cache (DocumentCache, optional): Read-through cache for
+                get_document/get_documents. Defaults to the
+                FIRESTORE_CACHE_* environment settings (disabled unless
+                FIRESTORE_CACHE_ENABLED is set).
+        """
+        self.cache = cache if cache is not None else DocumentCache.from_env()
+        # Totals are expensive to compute, so they're always cached briefly
+        self._count_cache = DocumentCache(
+            max_entries=256,
+            default_ttl=float(os.getenv("FIRESTORE_COUNT_CACHE_TTL", "60")),
+        )
+        self._clients: List[Any] = []
+        self._client_cycle = None
+        self._client_lock = threading.Lock()
+        self._thread_state = threading.local()
+        self._write_listeners: Dict[str, List[Callable]] = {}
+
         try:
             # Check if Firebase is already initialized
             if not firebase_admin._apps:
@@ -70,17 +183,76 @@ class FirebaseUtils:
                     firebase_admin.initialize_app()
                     logger.info("Firebase initialized with default credentials")
 
-            # Get Firestore client
-            self.db = firestore.client()
-            logger.info("Firestore client created successfully")
+            # Get Firestore client(s)
+            pool_size = max(1, int(os.getenv("FIRESTORE_CHANNEL_POOL_SIZE", "1")))
+            self._set_clients(self._create_clients(pool_size))
+            logger.info(
+                f"Firestore client created successfully (channel pool: {pool_size})"
+            )
 
         except Exception as e:
             logger.error(f"Failed to initialize Firebase: {str(e)}")
             # Create a mock database for development/testing
             self.db = None
-            self._mock_data = {}
+            self._mock_store = InMemoryDocumentStore()
             logger.warning("Using mock database - Firebase not available")
 
+    @staticmethod
+    def _create_clients(pool_size: int) -> List[Any]:
+        """
+        Create the Firestore clients backing this instance
+
+        firestore.client() is cached per app and shares one gRPC channel,
+        so any extra pool members are separate Client objects built from
+        the same app credentials, each with its own channel.
+        """
+        clients = [firestore.client()]
+        if pool_size > 1:
+            app = firebase_admin.get_app()
+            google_credentials = app.credential.get_credential()
+            for _ in range(pool_size - 1):
+                clients.append(
+                    firestore.Client(
+                        project=app.project_id, credentials=google_credentials
+                    )
+                )
+        return clients
+
+    def _set_clients(self, clients: List[Any]) -> None:
+        with self._client_lock:
+            self._clients = list(clients)
+            self._client_cycle = itertools.cycle(self._clients) if clients else None
+            self._thread_state = threading.local()
+
+    @property
+    def db(self):
+        """
+        Firestore client for the calling thread
+
+        Threads are assigned a client from the pool round-robin on first use
+        and keep it, so a request's reads and batched writes share a channel.
+        Returns None in mock mode.
+        """
+        if not self._clients:
+            return None
+        client = getattr(self._thread_state, "client", None)
+        if client is None:
+            with self._client_lock:
+                if self._client_cycle is None:
+                    return None
+                client = next(self._client_cycle)
+            self._thread_state.client = client
+        return client
+
+    @db.setter
+    def db(self, client) -> None:
+        self._set_clients([client] if client is not None else [])
+
+    @property
+    def pool_size(self) -> int:
+        """Number of Firestore clients (gRPC channels) in the pool"""
+        return len(self._clients)
+
     def create_document(
         self,
         collection_name: str,
@@ -104,30 +276,25 @@ class FirebaseUtils:
                 if document_id:
                     doc_ref = self.db.collection(collection_name).document(document_id)
                     doc_ref.set(data)
-                    return document_id
+                    doc_id = document_id
                 else:
                     doc_ref = self.db.collection(collection_name).add(data)
                     if isinstance(doc_ref, tuple):
-                        return doc_ref[1].id
-                    return doc_ref.id
+                        doc_ref = doc_ref[1]
+                    doc_id = doc_ref.id
             else:
                 # Use mock database
-                import uuid
-
                 doc_id = document_id or str(uuid.uuid4())
+                self._mock_store.set(collection_name, doc_id, data)
 
-                if collection_name not in self._mock_data:
-                    self._mock_data[collection_name] = {}
-
-                data_with_id = data.copy()
-                data_with_id["id"] = doc_id
-                self._mock_data[collection_name][doc_id] = data_with_id
-
-                return doc_id
+            self._notify(collection_name, "create", doc_id, data)
+            return doc_id
 
         except Exception as e:
             logger.error(f"Error creating document: {str(e)}")
             raise
+        finally:
+            self._invalidate(collection_name)
 
     def get_document(
         self, collection_name: str, document_id: str
@@ -143,32 +310,96 @@ class FirebaseUtils:
             Optional[Dict[str, Any]]: Document data or None if not found
         """
         try:
+            cache_key = ("doc", document_id)
+            cached, generation = self._cache_get(collection_name, cache_key)
+            if cached is not DocumentCache.MISS:
+                return cached
+
             if self.db:
                 # Use Firestore
                 doc_ref = self.db.collection(collection_name).document(document_id)
                 doc = doc_ref.get()
 
+                data = None
                 if doc.exists:
                     data = doc.to_dict()
                     data["id"] = doc.id
-                    return data
-                return None
             else:
                 # Use mock database
-                if collection_name in self._mock_data:
-                    return self._mock_data[collection_name].get(document_id)
-                return None
+                data = self._mock_store.get(collection_name, document_id)
+
+            self._cache_set(collection_name, cache_key, data, generation)
+            return data
 
         except Exception as e:
             logger.error(f"Error getting document: {str(e)}")
             raise
 
+    def get_documents_by_ids(
+        self, collection_name: str, document_ids: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get many documents by ID using batched reads
+
+        Args:
+            collection_name (str): Name of the collection
+            document_ids (Iterable[str]): Document IDs (duplicates and empty
+                IDs are ignored)
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Found documents keyed by ID, in request
+                order; IDs that don't exist are omitted
+        """
+        ids = list(dict.fromkeys(doc_id for doc_id in document_ids if doc_id))
+        if not ids:
+            return {}
+
+        try:
+            found: Dict[str, Dict[str, Any]] = {}
+            pending = []
+            generation = 0
+            for doc_id in ids:
+                cached, generation = self._cache_get(collection_name, ("doc", doc_id))
+                if cached is DocumentCache.MISS:
+                    pending.append(doc_id)
+                elif cached is not None:
+                    found[doc_id] = cached
+
+            if pending:
+                db = self.db
+                if db:
+                    # Use Firestore batched reads, one round trip per chunk
+                    collection = db.collection(collection_name)
+                    for start in range(0, len(pending), GET_ALL_CHUNK_SIZE):
+                        chunk = pending[start : start + GET_ALL_CHUNK_SIZE]
+                        refs = [collection.document(doc_id) for doc_id in chunk]
+                        for snapshot in db.get_all(refs):
+                            if snapshot.exists:
+                                data = snapshot.to_dict()
+                                data["id"] = snapshot.id
+                                found[snapshot.id] = data
+                else:
+                    # Use mock database
+                    found.update(self._mock_store.get_many(collection_name, pending))
+
+                for doc_id in pending:
+                    self._cache_set(
+                        collection_name, ("doc", doc_id), found.get(doc_id), generation
+                    )
+
+            return {doc_id: found[doc_id] for doc_id in ids if doc_id in found}
+
+        except Exception as e:
+            logger.error(f"Error getting documents by IDs: {str(e)}")
+            raise
+
     def get_documents(
         self,
         collection_name: str,
         filters: Optional[Dict[str, Any]] = None,
         limit: Optional[int] = None,
         order_by: Optional[str] = None,
+        fields: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Get documents from a collection with optional filters
@@ -178,11 +409,25 @@ class FirebaseUtils:
             filters (Dict[str, Any], optional): Filters to apply
             limit (int, optional): Maximum number of documents to return
             order_by (str, optional): Field to order by
+            fields (List[str], optional): Field paths to return (plus "id");
+                whole documents if omitted
 
         Returns:
             List[Dict[str, Any]]: List of documents
         """
         try:
+            fields = _normalize_fields(fields)
+            cache_key = (
+                "query",
+                repr(sorted((filters or {}).items())),
+                limit,
+                order_by,
+                tuple(fields) if fields is not None else None,
+            )
+            cached, generation = self._cache_get(collection_name, cache_key)
+            if cached is not DocumentCache.MISS:
+                return cached
+
             if self.db:
                 # Use Firestore
                 query = self.db.collection(collection_name)
@@ -200,44 +445,31 @@ class FirebaseUtils:
                 if limit:
                     query = query.limit(limit)
 
+                # Only transfer the selected fields
+                if fields is not None:
+                    query = query.select(fields)
+
                 docs = query.stream()
                 result = []
 
                 for doc in docs:
-                    data = doc.to_dict()
+                    data = doc.to_dict() or {}
                     data["id"] = doc.id
                     result.append(data)
-
-                return result
             else:
                 # Use mock database
-                if collection_name not in self._mock_data:
-                    return []
-
-                documents = list(self._mock_data[collection_name].values())
-
-                # Apply filters
-                if filters:
-                    filtered_docs = []
-                    for doc in documents:
-                        match = True
-                        for field, value in filters.items():
-                            if doc.get(field) != value:
-                                match = False
-                                break
-                        if match:
-                            filtered_docs.append(doc)
-                    documents = filtered_docs
-
-                # Apply ordering (simple implementation)
-                if order_by:
-                    documents.sort(key=lambda x: x.get(order_by, ""))
-
-                # Apply limit
-                if limit:
-                    documents = documents[:limit]
-
-                return documents
+                result = [
+                    _project(doc, fields)
+                    for doc in self._mock_store.query(
+                        collection_name,
+                        filters=self._normalize_filters(filters),
+                        order_by=order_by,
+                        limit=limit or None,
+                    )
+                ]
+
+            self._cache_set(collection_name, cache_key, result, generation)
+            return result
 
         except Exception as e:
             logger.error(f"Error getting documents: {str(e)}")
@@ -262,20 +494,20 @@ class FirebaseUtils:
                 # Use Firestore
                 doc_ref = self.db.collection(collection_name).document(document_id)
                 doc_ref.update(data)
-                return True
+                updated = True
             else:
                 # Use mock database
-                if (
-                    collection_name in self._mock_data
-                    and document_id in self._mock_data[collection_name]
-                ):
-                    self._mock_data[collection_name][document_id].update(data)
-                    return True
-                return False
+                updated = self._mock_store.update(collection_name, document_id, data)
+
+            if updated:
+                self._notify(collection_name, "update", document_id, data)
+            return updated
 
         except Exception as e:
             logger.error(f"Error updating document: {str(e)}")
             return False
+        finally:
+            self._invalidate(collection_name)
 
     def delete_document(self, collection_name: str, document_id: str) -> bool:
         """
@@ -293,20 +525,77 @@ class FirebaseUtils:
                 # Use Firestore
                 doc_ref = self.db.collection(collection_name).document(document_id)
                 doc_ref.delete()
-                return True
+                deleted = True
             else:
                 # Use mock database
-                if (
-                    collection_name in self._mock_data
-                    and document_id in self._mock_data[collection_name]
-                ):
-                    del self._mock_data[collection_name][document_id]
-                    return True
-                return False
+                deleted = self._mock_store.delete(collection_name, document_id)
+
+            if deleted:
+                self._notify(collection_name, "delete", document_id, None)
+            return deleted
 
         except Exception as e:
             logger.error(f"Error deleting document: {str(e)}")
             return False
+        finally:
+            self._invalidate(collection_name)
+
+    def increment_documents(
+        self,
+        collection_name: str,
+        increments: Dict[str, Dict[str, float]],
+        data: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> bool:
+        """
+        Atomically add to numeric fields of several documents
+
+        Missing documents are created. In Firestore the increments are
+        server-side (concurrent writers never lose updates) and are
+        committed in batches of at most 500 documents.
+
+        Args:
+            collection_name (str): Name of the collection
+            increments (Dict[str, Dict[str, float]]): Document ID ->
+                {field: amount}
+            data (Dict[str, Dict[str, Any]], optional): Document ID -> fields
+                to set alongside the increments
+
+        Returns:
+            bool: Success status
+        """
+        data = data or {}
+        try:
+            if self.db:
+                # Use Firestore
+                collection = self.db.collection(collection_name)
+                doc_ids = list(increments)
+                for start in range(0, len(doc_ids), MAX_BATCH_SIZE):
+                    batch = self.db.batch()
+                    for doc_id in doc_ids[start : start + MAX_BATCH_SIZE]:
+                        fields = dict(data.get(doc_id, {}))
+                        for field, amount in increments[doc_id].items():
+                            fields[field] = firestore.Increment(amount)
+                        batch.set(collection.document(doc_id), fields, merge=True)
+                    batch.commit()
+                written = {doc_id: None for doc_id in doc_ids}
+            else:
+                # Use mock database
+                written = {
+                    doc_id: self._mock_store.increment(
+                        collection_name, doc_id, amounts, data.get(doc_id)
+                    )
+                    for doc_id, amounts in increments.items()
+                }
+
+            for doc_id, doc in written.items():
+                self._notify(collection_name, "update", doc_id, doc)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error incrementing documents: {str(e)}")
+            return False
+        finally:
+            self._invalidate(collection_name)
 
     def query_documents(
         self,
@@ -315,6 +604,7 @@ class FirebaseUtils:
         operator: str,
         value: Any,
         limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Query documents with specific conditions
@@ -325,11 +615,14 @@ class FirebaseUtils:
             operator (str): Query operator ('==', '>', '<', '>=', '<=', '!=', 'in', 'array-contains')
             value (Any): Value to compare
             limit (int, optional): Maximum number of documents to return
+            fields (List[str], optional): Field paths to return (plus "id");
+                whole documents if omitted
 
         Returns:
             List[Dict[str, Any]]: List of matching documents
         """
         try:
+            fields = _normalize_fields(fields)
             if self.db:
                 # Use Firestore
                 query = self.db.collection(collection_name).where(
@@ -339,51 +632,28 @@ class FirebaseUtils:
                 if limit:
                     query = query.limit(limit)
 
+                if fields is not None:
+                    query = query.select(fields)
+
                 docs = query.stream()
                 result = []
 
                 for doc in docs:
-                    data = doc.to_dict()
+                    data = doc.to_dict() or {}
                     data["id"] = doc.id
                     result.append(data)
 
                 return result
             else:
-                # Use mock database (simplified implementation)
-                if collection_name not in self._mock_data:
-                    return []
-
-                documents = list(self._mock_data[collection_name].values())
-                result = []
-
-                for doc in documents:
-                    field_value = doc.get(field)
-
-                    if operator == "==" and field_value == value:
-                        result.append(doc)
-                    elif operator == ">" and field_value and field_value > value:
-                        result.append(doc)
-                    elif operator == "<" and field_value and field_value < value:
-                        result.append(doc)
-                    elif operator == ">=" and field_value and field_value >= value:
-                        result.append(doc)
-                    elif operator == "<=" and field_value and field_value <= value:
-                        result.append(doc)
-                    elif operator == "!=" and field_value != value:
-                        result.append(doc)
-                    elif operator == "in" and field_value in value:
-                        result.append(doc)
-                    elif (
-                        operator == "array-contains"
-                        and isinstance(field_value, list)
-                        and value in field_value
-                    ):
-                        result.append(doc)
-
-                if limit:
-                    result = result[:limit]
-
-                return result
+                # Use mock database
+                return [
+                    _project(doc, fields)
+                    for doc in self._mock_store.query(
+                        collection_name,
+                        filters=[(field, operator, value)],
+                        limit=limit or None,
+                    )
+                ]
 
         except Exception as e:
             logger.error(f"Error querying documents: {str(e)}")
@@ -404,10 +674,15 @@ class FirebaseUtils:
         Returns:
             bool: Success status
         """
+        if len(operations) > MAX_BATCH_SIZE:
+            # Too big for one atomic batch: commit in chunks instead
+            return self.bulk_write(operations)["success"]
+
         try:
             if self.db:
                 # Use Firestore batch
                 batch = self.db.batch()
+                written = []
 
                 for operation in operations:
                     op_type = operation.get("type")
@@ -423,8 +698,18 @@ class FirebaseUtils:
                         batch.update(doc_ref, data)
                     elif op_type == "delete":
                         batch.delete(doc_ref)
+                    else:
+                        continue
+                    written.append((collection, op_type, doc_ref.id, data))
 
                 batch.commit()
+                for collection, op_type, doc_id, data in written:
+                    self._notify(
+                        collection,
+                        op_type,
+                        doc_id,
+                        None if op_type == "delete" else data,
+                    )
                 return True
             else:
                 # Use mock database
@@ -446,6 +731,115 @@ class FirebaseUtils:
         except Exception as e:
             logger.error(f"Error in batch write: {str(e)}")
             return False
+        finally:
+            for collection in {operation.get("collection") for operation in operations}:
+                self._invalidate(collection)
+
+    def bulk_write(
+        self,
+        operations: List[Dict[str, Any]],
+        chunk_size: int = MAX_BATCH_SIZE,
+        max_workers: int = 4,
+        max_retries: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Perform any number of write operations as chunked, parallel batches
+
+        Unlike batch_write the operations are not applied atomically: each
+        chunk of at most 500 writes is its own batch, chunks are committed
+        concurrently and transient failures are retried with backoff.
+
+        Args:
+            operations (List[Dict[str, Any]]): Operations as for batch_write;
+                'type' may also be 'set', and 'create' without a
+                'document_id' gets an auto-generated ID
+            chunk_size (int): Writes per batch (capped at 500)
+            max_workers (int): Batches committed concurrently
+            max_retries (int): Retries per batch for transient errors
+
+        Returns:
+            Dict containing success, succeeded/failed counts and a result per
+            operation (index, type, collection, document_id, success, error)
+        """
+        try:
+            if self.db:
+                writer = BulkWriter(
+                    self.db,
+                    chunk_size=chunk_size,
+                    max_workers=max_workers,
+                    max_retries=max_retries,
+                )
+                results = writer.write(operations)
+            else:
+                results = [
+                    self._mock_write(index, operation)
+                    for index, operation in enumerate(operations)
+                ]
+        finally:
+            for collection in {operation.get("collection") for operation in operations}:
+                self._invalidate(collection)
+
+        if self.db:
+            # Mock writes notify as they're applied in _mock_write
+            for operation, result in zip(operations, results):
+                if result["success"]:
+                    self._notify(
+                        result["collection"],
+                        result["type"],
+                        result["document_id"],
+                        (
+                            None
+                            if result["type"] == "delete"
+                            else operation.get("data", {})
+                        ),
+                    )
+
+        failed = sum(1 for result in results if not result["success"])
+        if failed:
+            logger.warning(f"Bulk write: {failed} of {len(results)} operations failed")
+
+        return {
+            "success": failed == 0,
+            "total": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "results": results,
+        }
+
+    def _mock_write(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply one bulk_write operation to the mock store"""
+        op_type = operation.get("type")
+        collection = operation.get("collection")
+        doc_id = operation.get("document_id")
+        data = operation.get("data", {})
+
+        error = None
+        if not collection:
+            error = "Missing collection"
+        elif op_type in ("create", "set"):
+            doc_id = doc_id or str(uuid.uuid4())
+            self._mock_store.set(collection, doc_id, data)
+        elif op_type == "update":
+            if not self._mock_store.update(collection, doc_id, data):
+                error = f"No document to update: {collection}/{doc_id}"
+        elif op_type == "delete":
+            self._mock_store.delete(collection, doc_id)
+        else:
+            error = f"Unsupported operation type: {op_type}"
+
+        if error is None:
+            self._notify(
+                collection, op_type, doc_id, None if op_type == "delete" else data
+            )
+
+        return {
+            "index": index,
+            "type": op_type,
+            "collection": collection,
+            "document_id": doc_id,
+            "success": error is None,
+            "error": error,
+        }
 
     def get_documents_paginated(
         self,
@@ -454,6 +848,7 @@ class FirebaseUtils:
         per_page: int = 20,
         order_by: Optional[str] = None,
         filters: Optional[Dict[str, Any]] = None,
+        fields: Optional[List[str]] = None,
     ) -> Dict[str, Any]:
         """
         Get documents with pagination support
@@ -464,11 +859,14 @@ class FirebaseUtils:
             per_page (int): Number of documents per page
             order_by (str, optional): Field to order by
             filters (Dict[str, Any], optional): Filters to apply
+            fields (List[str], optional): Field paths to return (plus "id");
+                whole documents if omitted
 
         Returns:
             Dict containing documents, pagination info, and metadata
         """
         try:
+            fields = _normalize_fields(fields)
             if self.db:
                 query = self.db.collection(collection_name)
 
@@ -482,17 +880,19 @@ class FirebaseUtils:
                     query = query.order_by(order_by)
 
                 # Get total count (for pagination metadata)
-                total_docs = len(list(query.stream()))
+                total_docs = self.count_documents(collection_name, filters)
 
                 # Apply pagination
                 offset = (page - 1) * per_page
                 query = query.offset(offset).limit(per_page)
+                if fields is not None:
+                    query = query.select(fields)
 
                 # Execute query
                 docs = query.stream()
                 documents = []
                 for doc in docs:
-                    doc_dict = doc.to_dict()
+                    doc_dict = doc.to_dict() or {}
                     doc_dict["id"] = doc.id
                     documents.append(doc_dict)
 
@@ -511,18 +911,25 @@ class FirebaseUtils:
                 }
             else:
                 # Mock implementation
-                mock_data = self._mock_data.get(collection_name, [])
+                mock_filters = self._normalize_filters(filters)
+                total_docs = self.count_documents(collection_name, filters)
                 offset = (page - 1) * per_page
-                paginated_data = mock_data[offset : offset + per_page]
+                paginated_data = self._mock_store.query(
+                    collection_name,
+                    filters=mock_filters,
+                    order_by=order_by,
+                    limit=per_page,
+                    offset=offset,
+                )
 
                 return {
-                    "documents": paginated_data,
+                    "documents": [_project(doc, fields) for doc in paginated_data],
                     "pagination": {
                         "page": page,
                         "per_page": per_page,
-                        "total_documents": len(mock_data),
-                        "total_pages": (len(mock_data) + per_page - 1) // per_page,
-                        "has_next": offset + per_page < len(mock_data),
+                        "total_documents": total_docs,
+                        "total_pages": (total_docs + per_page - 1) // per_page,
+                        "has_next": offset + per_page < total_docs,
                         "has_prev": page > 1,
                     },
                 }
@@ -540,6 +947,375 @@ class FirebaseUtils:
                 },
             }
 
+    def get_documents_page(
+        self,
+        collection_name: str,
+        page_size: int = 20,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        filters: Filters = None,
+        page_token: Optional[str] = None,
+        include_total: bool = False,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        fields: Optional[List[str]] = None,
+        predicate_fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get one page of documents using cursor (keyset) pagination
+
+        Pages are ordered by order_by and then document ID, and each page
+        resumes with start_after() from the previous page's last document,
+        so deep pages don't pay for skipped documents.
+
+        Args:
+            collection_name (str): Name of the collection
+            page_size (int): Number of documents per page
+            order_by (str, optional): Field to order by (document ID if omitted);
+                documents without the field are not returned, as in Firestore
+            descending (bool): Order newest/highest first
+            filters (Filters, optional): Equality dict or (field, op, value) tuples,
+                applied by Firestore
+            page_token (str, optional): next_page_token from the previous page
+            include_total (bool): Also return the (cached) total matching count
+            predicate (Callable, optional): Extra in-process filter for conditions
+                Firestore can't express; pages are filled by scanning ahead
+            fields (List[str], optional): Field paths to return (plus "id");
+                whole documents if omitted
+            predicate_fields (List[str], optional): Fields the predicate reads
+                when fields is set; fetched but not returned
+
+        Returns:
+            Dict containing documents and pagination info with next_page_token
+
+        Raises:
+            ValueError: If page_token is malformed or belongs to another query
+        """
+        page_size = max(1, page_size)
+        filter_tuples = self._normalize_filters(filters)
+        fields = _normalize_fields(fields)
+        # Cursors need the order-by value, and the predicate its inputs
+        read_fields = (
+            _normalize_fields(fields + [order_by or ""] + list(predicate_fields or []))
+            if fields is not None
+            else None
+        )
+        fingerprint = hashlib.sha1(
+            repr((collection_name, filter_tuples, order_by, descending)).encode()
+        ).hexdigest()[:16]
+        cursor = _decode_page_token(page_token, fingerprint) if page_token else None
+
+        def cursor_of(doc: Dict[str, Any]) -> Tuple[Any, str]:
+            return (doc.get(order_by) if order_by else doc["id"], doc["id"])
+
+        # Without a predicate one extra document tells us whether there's a
+        # next page; with one, scan ahead in larger batches
+        batch_size = page_size + 1 if predicate is None else max(page_size * 2, 50)
+
+        try:
+            documents: List[Dict[str, Any]] = []
+            scan_cursor = cursor
+            more = True
+            while more and len(documents) < page_size:
+                batch = self._fetch_after(
+                    collection_name,
+                    filter_tuples,
+                    order_by,
+                    descending,
+                    scan_cursor,
+                    batch_size,
+                    read_fields,
+                )
+                more = len(batch) == batch_size
+                for position, doc in enumerate(batch, start=1):
+                    if predicate is not None and not predicate(doc):
+                        continue
+                    documents.append(doc)
+                    if len(documents) == page_size:
+                        more = more or position < len(batch)
+                        break
+                if batch:
+                    scan_cursor = cursor_of(batch[-1])
+
+            next_page_token = (
+                _encode_page_token(fingerprint, cursor_of(documents[-1]))
+                if more and documents
+                else None
+            )
+
+            pagination: Dict[str, Any] = {
+                "page_size": page_size,
+                "has_next": next_page_token is not None,
+                "next_page_token": next_page_token,
+            }
+            if include_total and predicate is None:
+                pagination["total_documents"] = self.count_documents(
+                    collection_name, filter_tuples
+                )
+
+            if read_fields != fields:
+                documents = [_project(doc, fields) for doc in documents]
+
+            return {"documents": documents, "pagination": pagination}
+
+        except Exception as e:
+            logger.error(f"Error getting page of documents: {e}")
+            raise
+
+    def iter_documents(
+        self,
+        collection_name: str,
+        filters: Filters = None,
+        page_size: int = 500,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream documents lazily, one cursor-paginated page at a time
+
+        At most page_size documents are held in memory, and documents may be
+        updated while iterating since each page resumes from a cursor rather
+        than an offset.
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+            page_size (int): Documents fetched per round trip
+            order_by (str, optional): Field to order by (document ID if omitted)
+            descending (bool): Reverse the ordering
+            fields (List[str], optional): Field paths to return (plus "id");
+                whole documents if omitted
+
+        Yields:
+            Dict[str, Any]: Documents in order
+        """
+        filter_tuples = self._normalize_filters(filters)
+        page_size = max(1, page_size)
+        fields = _normalize_fields(fields)
+        read_fields = (
+            _normalize_fields(fields + [order_by or ""]) if fields is not None else None
+        )
+        cursor = None
+
+        while True:
+            batch = self._fetch_after(
+                collection_name,
+                filter_tuples,
+                order_by,
+                descending,
+                cursor,
+                page_size,
+                read_fields,
+            )
+            if read_fields != fields:
+                yield from (_project(doc, fields) for doc in batch)
+            else:
+                yield from batch
+
+            if len(batch) < page_size:
+                return
+            last = batch[-1]
+            cursor = (last.get(order_by) if order_by else last["id"], last["id"])
+
+    def _fetch_after(
+        self,
+        collection_name: str,
+        filter_tuples: List[Tuple[str, str, Any]],
+        order_by: Optional[str],
+        descending: bool,
+        cursor: Optional[Tuple[Any, str]],
+        limit: int,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Read up to limit documents positioned after a (value, id) cursor"""
+        if self.db:
+            query = self.db.collection(collection_name)
+            for field, operator, value in filter_tuples:
+                query = query.where(field, operator, value)
+
+            direction = (
+                firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            )
+            if order_by:
+                query = query.order_by(order_by, direction=direction)
+            query = query.order_by("__name__", direction=direction)
+
+            if cursor is not None:
+                query = query.start_after(
+                    [cursor[0], cursor[1]] if order_by else [cursor[1]]
+                )
+
+            if fields is not None:
+                query = query.select(fields)
+
+            result = []
+            for doc in query.limit(limit).stream():
+                data = doc.to_dict() or {}
+                data["id"] = doc.id
+                result.append(data)
+            return result
+
+        # Mock documents carry their ID in "id", which gives document ID order
+        documents = self._mock_store.query(
+            collection_name,
+            filters=filter_tuples,
+            order_by=order_by or "id",
+            descending=descending,
+            limit=limit,
+            start_after=cursor,
+        )
+        return [_project(doc, fields) for doc in documents]
+
+    def aggregate(
+        self,
+        collection_name: str,
+        filters: Filters = None,
+        sum_fields: Optional[List[str]] = None,
+        avg_fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Count documents and sum/average fields with server-side aggregation
+
+        Uses Firestore aggregation queries, so only the results are
+        transferred. Results are cached until the next write through this
+        instance or FIRESTORE_COUNT_CACHE_TTL.
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+            sum_fields (List[str], optional): Numeric fields to sum
+            avg_fields (List[str], optional): Numeric fields to average
+
+        Returns:
+            Dict with "count", "sum" ({field: total}) and "avg"
+            ({field: mean or None}); non-numeric values are ignored
+        """
+        filter_tuples = self._normalize_filters(filters)
+        sum_fields = list(sum_fields or [])
+        avg_fields = list(avg_fields or [])
+
+        cache_key = (
+            "aggregate",
+            repr(filter_tuples),
+            tuple(sum_fields),
+            tuple(avg_fields),
+        )
+        generation = self._count_cache.generation(collection_name)
+        cached = self._count_cache.get(collection_name, cache_key)
+        if cached is not DocumentCache.MISS:
+            return cached
+
+        try:
+            if self.db:
+                result = self._firestore_aggregate(
+                    collection_name, filter_tuples, sum_fields, avg_fields
+                )
+            else:
+                result = self._mock_store.aggregate(
+                    collection_name, filter_tuples, sum_fields, avg_fields
+                )
+        except Exception as e:
+            logger.error(f"Error aggregating documents: {e}")
+            raise
+
+        self._count_cache.set(collection_name, cache_key, result, generation)
+        return result
+
+    def _firestore_aggregate(
+        self,
+        collection_name: str,
+        filter_tuples: List[Tuple[str, str, Any]],
+        sum_fields: List[str],
+        avg_fields: List[str],
+    ) -> Dict[str, Any]:
+        query = self.db.collection(collection_name)
+        for field, operator, value in filter_tuples:
+            query = query.where(field, operator, value)
+
+        aggregations = [("count", "count", None)]
+        aggregations += [
+            (f"sum_{i}", "sum", field) for i, field in enumerate(sum_fields)
+        ]
+        aggregations += [
+            (f"avg_{i}", "avg", field) for i, field in enumerate(avg_fields)
+        ]
+
+        values: Dict[str, Any] = {}
+        for start in range(0, len(aggregations), MAX_AGGREGATIONS_PER_QUERY):
+            aggregation_query = query
+            for alias, kind, field in aggregations[
+                start : start + MAX_AGGREGATIONS_PER_QUERY
+            ]:
+                if kind == "count":
+                    aggregation_query = aggregation_query.count(alias=alias)
+                else:
+                    aggregation_query = getattr(aggregation_query, kind)(
+                        field, alias=alias
+                    )
+
+            for result in aggregation_query.get():
+                for aggregation in result:
+                    values[aggregation.alias] = aggregation.value
+
+        return {
+            "count": int(values.get("count", 0)),
+            "sum": {
+                field: values.get(f"sum_{i}", 0) for i, field in enumerate(sum_fields)
+            },
+            "avg": {
+                field: values.get(f"avg_{i}") for i, field in enumerate(avg_fields)
+            },
+        }
+
+    def count_documents(self, collection_name: str, filters: Filters = None) -> int:
+        """
+        Count documents matching the filters with a COUNT aggregation
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+
+        Returns:
+            int: Number of matching documents
+        """
+        return self.aggregate(collection_name, filters)["count"]
+
+    def sum_field(
+        self, collection_name: str, field: str, filters: Filters = None
+    ) -> float:
+        """
+        Sum a numeric field over matching documents with a SUM aggregation
+
+        Args:
+            collection_name (str): Name of the collection
+            field (str): Field to sum
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+
+        Returns:
+            float: Total of the numeric values (0 if there are none)
+        """
+        return self.aggregate(collection_name, filters, sum_fields=[field])["sum"][
+            field
+        ]
+
+    def avg_field(
+        self, collection_name: str, field: str, filters: Filters = None
+    ) -> Optional[float]:
+        """
+        Average a numeric field over matching documents with an AVG aggregation
+
+        Args:
+            collection_name (str): Name of the collection
+            field (str): Field to average
+            filters (Filters, optional): Equality dict or (field, op, value) tuples
+
+        Returns:
+            Optional[float]: Mean of the numeric values, or None if there are none
+        """
+        return self.aggregate(collection_name, filters, avg_fields=[field])["avg"][
+            field
+        ]
+
     def search_documents(
         self,
         collection_name: str,
@@ -579,13 +1355,16 @@ class FirebaseUtils:
 
                 return documents
             else:
-                # Mock implementation
-                mock_data = self._mock_data.get(collection_name, [])
-                return [
-                    doc
-                    for doc in mock_data
-                    if search_value.lower() in str(doc.get(search_field, "")).lower()
-                ][:limit]
+                # Mock implementation (same prefix range as the Firestore query)
+                return self._mock_store.query(
+                    collection_name,
+                    filters=[
+                        (search_field, ">=", search_value),
+                        (search_field, "<=", search_value + "\uf8ff"),
+                    ],
+                    order_by=search_field,
+                    limit=limit,
+                )
 
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
@@ -602,21 +1381,11 @@ class FirebaseUtils:
             Dict containing collection statistics
         """
         try:
-            if self.db:
-                docs = list(self.db.collection(collection_name).stream())
-
-                return {
-                    "total_documents": len(docs),
-                    "collection_name": collection_name,
-                    "last_updated": datetime.now().isoformat(),
-                }
-            else:
-                mock_data = self._mock_data.get(collection_name, [])
-                return {
-                    "total_documents": len(mock_data),
-                    "collection_name": collection_name,
-                    "last_updated": datetime.now().isoformat(),
-                }
+            return {
+                "total_documents": self.count_documents(collection_name),
+                "collection_name": collection_name,
+                "last_updated": datetime.now().isoformat(),
+            }
         except Exception as e:
             logger.error(f"Error getting collection stats: {e}")
             return {
@@ -639,39 +1408,25 @@ class FirebaseUtils:
             Dict containing batch operation results
         """
         try:
-            if self.db:
-                batch = self.db.batch()
-                doc_ids = []
-
-                for doc_data in documents:
-                    doc_ref = self.db.collection(collection_name).document()
-                    batch.set(doc_ref, doc_data)
-                    doc_ids.append(doc_ref.id)
-
-                batch.commit()
-
-                return {
-                    "success": True,
-                    "created_count": len(doc_ids),
-                    "document_ids": doc_ids,
-                }
-            else:
-                # Mock implementation
-                if collection_name not in self._mock_data:
-                    self._mock_data[collection_name] = []
-
-                doc_ids = []
-                for doc_data in documents:
-                    doc_id = f"mock-{len(self._mock_data[collection_name])}"
-                    doc_data["id"] = doc_id
-                    self._mock_data[collection_name].append(doc_data)
-                    doc_ids.append(doc_id)
-
-                return {
-                    "success": True,
-                    "created_count": len(doc_ids),
-                    "document_ids": doc_ids,
-                }
+            result = self.bulk_write(
+                [
+                    {"type": "create", "collection": collection_name, "data": doc_data}
+                    for doc_data in documents
+                ]
+            )
+            doc_ids = [r["document_id"] for r in result["results"] if r["success"]]
+
+            response = {
+                "success": result["success"],
+                "created_count": len(doc_ids),
+                "document_ids": doc_ids,
+            }
+            if result["failed"]:
+                response["failed_count"] = result["failed"]
+                response["errors"] = [
+                    r["error"] for r in result["results"] if not r["success"]
+                ]
+            return response
         except Exception as e:
             logger.error(f"Error in batch create: {e}")
             return {"success": False, "error": str(e), "created_count": 0}
@@ -694,6 +1449,85 @@ class FirebaseUtils:
             logger.error(f"Connection test failed: {e}")
             return False
 
+    def add_write_listener(
+        self,
+        collection_name: str,
+        listener: Callable[[str, str, Optional[Dict[str, Any]]], None],
+    ) -> None:
+        """
+        Register a callback for writes made through this instance
+
+        The listener is called as listener(op_type, document_id, data) after
+        each successful write to the collection, once the collection's
+        cached reads have been dropped. op_type is "create", "set",
+        "update" (data holds only the changed fields) or "delete" (data is
+        None). Writes made by other processes are not reported.
+
+        Args:
+            collection_name (str): Collection to watch
+            listener (Callable): Callback; exceptions it raises are logged
+        """
+        with self._client_lock:
+            self._write_listeners.setdefault(collection_name, []).append(listener)
+
+    def _notify(
+        self,
+        collection_name: str,
+        op_type: str,
+        document_id: str,
+        data: Optional[Dict[str, Any]],
+    ) -> None:
+        listeners = self._write_listeners.get(collection_name, ())
+        if listeners:
+            # Listeners may read the document back; they must not be served
+            # the cached copy from before this write
+            self._invalidate(collection_name)
+        for listener in listeners:
+            try:
+                listener(op_type, document_id, data)
+            except Exception as e:
+                logger.warning(f"Write listener for {collection_name} failed: {e}")
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get read-through cache counters
+
+        Returns:
+            Dict containing hits, misses, hit rate, evictions and sizes
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return self.cache.stats()
+
+    def _cache_get(self, collection_name: str, key: Tuple) -> Tuple[Any, int]:
+        """Return (cached value or MISS, collection generation before the read)"""
+        if self.cache is None:
+            return DocumentCache.MISS, 0
+        generation = self.cache.generation(collection_name)
+        return self.cache.get(collection_name, key), generation
+
+    def _cache_set(
+        self, collection_name: str, key: Tuple, value: Any, generation: int
+    ) -> None:
+        if self.cache is not None:
+            self.cache.set(collection_name, key, value, generation)
+
+    def _invalidate(self, collection_name: Optional[str]) -> None:
+        if not collection_name:
+            return
+        self._count_cache.invalidate(collection_name)
+        if self.cache is not None:
+            self.cache.invalidate(collection_name)
+
+    @staticmethod
+    def _normalize_filters(filters: Filters) -> List[Tuple[str, str, Any]]:
+        """Turn a field -> value dict or a list of filter tuples into tuples"""
+        if not filters:
+            return []
+        if isinstance(filters, dict):
+            return [(field, "==", value) for field, value in filters.items()]
+        return [tuple(item) for item in filters]
+
     @property
     def project_id(self) -> Optional[str]:
         """Get the Firebase project ID"""
@@ -704,3 +1538,36 @@ class FirebaseUtils:
             return None
         except Exception:
             return None
+
+
+_shared_instance: Optional[FirebaseUtils] = None
+_shared_lock = threading.Lock()
+
+
+def get_firebase() -> FirebaseUtils:
+    """
+    Get the process-wide FirebaseUtils instance
+
+    Controllers, blueprints and middleware share this instance so Firebase
+    is initialized once per process and the Firestore channel pool is reused.
+
+    Returns:
+        FirebaseUtils: Shared instance, created on first use
+    """
+    global _shared_instance
+    if _shared_instance is None:
+        with _shared_lock:
+            if _shared_instance is None:
+                _shared_instance = FirebaseUtils()
+    return _shared_instance
+
+
+def _reset_shared_instance() -> None:
+    """Drop the shared instance in forked children (gRPC channels don't survive fork)"""
+    global _shared_instance, _shared_lock
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_shared_instance)
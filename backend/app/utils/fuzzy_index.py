@@ -0,0 +1,151 @@
+"""
+Typo-tolerant term lookup for RetailGenie
+Character trigram index over a vocabulary, with candidates re-ranked by
+edit distance, so misspelled search terms map to indexed ones
+"""
+
+import heapq
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+# Vocabulary terms re-ranked by edit distance per lookup; bounds the cost
+# of a lookup regardless of vocabulary size
+MAX_CANDIDATES = 50
+
+
+def trigrams(term: str) -> Set[str]:
+    """Character trigrams of a term, padded so its ends count double"""
+    padded = f"$${term}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(term: str) -> int:
+    """Typos tolerated in a term: none below 4 characters, 2 from 8"""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    Levenshtein distance counting adjacent transpositions as one edit
+
+    Args:
+        a (str): First string
+        b (str): Second string
+        limit (int, optional): Stop early once the distance must exceed
+            this; limit + 1 is returned then
+
+    Returns:
+        int: Number of edits
+    """
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """
+    Trigram postings over a set of terms
+
+    A lookup gathers the terms sharing trigrams with the query term, keeps
+    the MAX_CANDIDATES with the highest trigram overlap (Dice coefficient),
+    and re-ranks only those by edit distance.
+    """
+
+    def __init__(self, max_candidates: int = MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self._postings: Dict[str, Set[str]] = {}
+        self._terms: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def add(self, term: str) -> None:
+        with self._lock:
+            if term in self._terms:
+                return
+            self._terms.add(term)
+            for gram in trigrams(term):
+                self._postings.setdefault(gram, set()).add(term)
+
+    def remove(self, term: str) -> None:
+        with self._lock:
+            if term not in self._terms:
+                return
+            self._terms.discard(term)
+            for gram in trigrams(term):
+                terms = self._postings.get(gram)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self._postings[gram]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._terms.clear()
+
+    def lookup(
+        self, term: str, max_distance: Optional[int] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        Indexed terms within an edit distance of a term
+
+        Args:
+            term (str): Possibly misspelled term
+            max_distance (int, optional): Edits allowed (max_edits(term)
+                by default)
+
+        Returns:
+            List[Tuple[str, int]]: (term, distance) pairs, closest first
+        """
+        if max_distance is None:
+            max_distance = max_edits(term)
+        if max_distance <= 0:
+            return [(term, 0)] if term in self._terms else []
+
+        grams = trigrams(term)
+        with self._lock:
+            shared: Dict[str, int] = {}
+            for gram in grams:
+                for candidate in self._postings.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+
+        def dice(item: Tuple[str, int]) -> float:
+            return 2 * item[1] / (len(grams) + len(item[0]) + 1)
+
+        candidates = heapq.nlargest(
+            self.max_candidates,
+            (
+                item
+                for item in shared.items()
+                if abs(len(item[0]) - len(term)) <= max_distance
+            ),
+            key=lambda item: (dice(item), item[0]),
+        )
+        matches = []
+        for candidate, _ in candidates:
+            distance = edit_distance(term, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((candidate, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
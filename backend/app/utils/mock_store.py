@@ -0,0 +1,528 @@
+"""
+In-memory document store for FirebaseUtils mock mode
+Indexed collections that answer the Firestore queries the app issues
+without scanning every document
+"""
+
+import bisect
+import threading
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Filter tuples are (field, operator, value), the same shape as Query.where()
+Filter = Tuple[str, str, Any]
+
+RANGE_OPERATORS = {">", ">=", "<", "<="}
+SUPPORTED_OPERATORS = RANGE_OPERATORS | {
+    "==",
+    "!=",
+    "in",
+    "not-in",
+    "array-contains",
+    "array-contains-any",
+}
+
+_EMPTY: frozenset = frozenset()
+_MISSING = object()
+
+
+class _Top:
+    """Sorts after every document ID, for bisecting past all entries of a key"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_TOP = _Top()
+
+
+def sort_key(value: Any) -> Tuple:
+    """
+    Build an ordering key that sorts values the way Firestore does:
+    by type first (null < bool < number < string < timestamp < other),
+    then by value inside the type.
+    """
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, int(value))
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    if isinstance(value, datetime):
+        return (4, value.timestamp())
+    return (5, repr(value))
+
+
+def _hash_key(value: Any) -> Tuple:
+    """
+    Key a value is filed under in a hash index: its type rank with the
+    value, so True and 1 are told apart while 1 and 1.0 still match
+    """
+    return (sort_key(value)[0], value)
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class _IndexedCollection:
+    """Documents of one collection plus the secondary indexes built over them"""
+
+    def __init__(self):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.seq: Dict[str, int] = {}
+        self._next_seq = 0
+
+        # field -> _hash_key(value) -> doc ids, for == / != / in / not-in.
+        # Documents without the field aren't filed, as in Firestore
+        self.hash_indexes: Dict[str, Dict[Any, Set[str]]] = {}
+        # field -> sorted [(sort_key, doc_id)], for ranges and order_by.
+        # Ties break on document ID, like Firestore's implicit __name__ order
+        self.sorted_indexes: Dict[str, List[Tuple]] = {}
+        # field -> _hash_key(array element) -> doc ids, for array-contains(-any)
+        self.array_indexes: Dict[str, Dict[Any, Set[str]]] = {}
+
+    # ----- writes -----
+
+    def put(self, doc_id: str, doc: Dict[str, Any]) -> None:
+        old = self.docs.get(doc_id)
+        if old is None:
+            self.seq[doc_id] = self._next_seq
+            self._next_seq += 1
+        self.docs[doc_id] = doc
+        self._reindex(doc_id, old, doc)
+
+    def remove(self, doc_id: str) -> bool:
+        old = self.docs.pop(doc_id, None)
+        if old is None:
+            return False
+        self._reindex(doc_id, old, None)
+        del self.seq[doc_id]
+        return True
+
+    def _reindex(self, doc_id: str, old: Optional[Dict], new: Optional[Dict]) -> None:
+        for field, index in self.hash_indexes.items():
+            old_value = old.get(field, _MISSING) if old is not None else _MISSING
+            new_value = new.get(field, _MISSING) if new is not None else _MISSING
+            if old_value is _MISSING and new_value is _MISSING:
+                continue
+            if old_value is not _MISSING and new_value is not _MISSING:
+                if _hash_key(old_value) == _hash_key(new_value):
+                    continue
+            self._hash_discard(index, old_value, doc_id)
+            self._hash_add(index, new_value, doc_id)
+
+        for field, index in self.sorted_indexes.items():
+            old_value = old.get(field, _MISSING) if old is not None else _MISSING
+            new_value = new.get(field, _MISSING) if new is not None else _MISSING
+            old_entry = (
+                (sort_key(old_value), doc_id) if old_value is not _MISSING else None
+            )
+            new_entry = (
+                (sort_key(new_value), doc_id) if new_value is not _MISSING else None
+            )
+            if old_entry == new_entry:
+                continue
+            if old_entry is not None:
+                position = bisect.bisect_left(index, old_entry)
+                if position < len(index) and index[position] == old_entry:
+                    del index[position]
+            if new_entry is not None:
+                bisect.insort(index, new_entry)
+
+        for field, index in self.array_indexes.items():
+            old_items = self._array_items(old.get(field)) if old is not None else {}
+            new_items = self._array_items(new.get(field)) if new is not None else {}
+            for key in old_items.keys() - new_items.keys():
+                self._hash_discard(index, old_items[key], doc_id)
+            for key in new_items.keys() - old_items.keys():
+                self._hash_add(index, new_items[key], doc_id)
+
+    @staticmethod
+    def _hash_add(index: Dict[Any, Set[str]], value: Any, doc_id: str) -> None:
+        if value is not _MISSING and _is_hashable(value):
+            index.setdefault(_hash_key(value), set()).add(doc_id)
+
+    @staticmethod
+    def _hash_discard(index: Dict[Any, Set[str]], value: Any, doc_id: str) -> None:
+        if value is _MISSING or not _is_hashable(value):
+            return
+        key = _hash_key(value)
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(doc_id)
+            if not bucket:
+                del index[key]
+
+    @staticmethod
+    def _array_items(value: Any) -> Dict[Tuple, Any]:
+        """Distinct hashable elements of an array, by _hash_key"""
+        if not isinstance(value, list):
+            return {}
+        return {_hash_key(item): item for item in value if _is_hashable(item)}
+
+    # ----- lazily built indexes -----
+
+    def hash_index(self, field: str) -> Dict[Any, Set[str]]:
+        index = self.hash_indexes.get(field)
+        if index is None:
+            index = {}
+            for doc_id, doc in self.docs.items():
+                self._hash_add(index, doc.get(field, _MISSING), doc_id)
+            self.hash_indexes[field] = index
+        return index
+
+    def sorted_index(self, field: str) -> List[Tuple]:
+        index = self.sorted_indexes.get(field)
+        if index is None:
+            index = sorted(
+                (sort_key(doc[field]), doc_id)
+                for doc_id, doc in self.docs.items()
+                if field in doc
+            )
+            self.sorted_indexes[field] = index
+        return index
+
+    def array_index(self, field: str) -> Dict[Any, Set[str]]:
+        index = self.array_indexes.get(field)
+        if index is None:
+            index = {}
+            for doc_id, doc in self.docs.items():
+                for item in self._array_items(doc.get(field)).values():
+                    self._hash_add(index, item, doc_id)
+            self.array_indexes[field] = index
+        return index
+
+    # ----- lookups -----
+
+    def equal_ids(self, field: str, value: Any) -> Set[str]:
+        if not _is_hashable(value):
+            return {
+                doc_id
+                for doc_id, doc in self.docs.items()
+                if field in doc and doc[field] == value
+            }
+        return self.hash_index(field).get(_hash_key(value), _EMPTY)
+
+    def contains_ids(self, field: str, value: Any) -> Set[str]:
+        if not _is_hashable(value):
+            return {
+                doc_id
+                for doc_id, doc in self.docs.items()
+                if isinstance(doc.get(field), list) and value in doc[field]
+            }
+        return self.array_index(field).get(_hash_key(value), _EMPTY)
+
+    @staticmethod
+    def range_bounds(index: List[Tuple], ops: List[Tuple[str, Any]]) -> Tuple[int, int]:
+        """Positions [lo, hi) in a sorted index matching every range op"""
+        lo, hi = 0, len(index)
+        for operator, value in ops:
+            key = sort_key(value)
+            type_start = bisect.bisect_left(index, ((key[0],),))
+            type_end = bisect.bisect_left(index, ((key[0] + 1,),))
+            if operator == ">":
+                op_lo, op_hi = bisect.bisect_right(index, (key, _TOP)), type_end
+            elif operator == ">=":
+                op_lo, op_hi = bisect.bisect_left(index, (key,)), type_end
+            elif operator == "<":
+                op_lo, op_hi = type_start, bisect.bisect_left(index, (key,))
+            else:  # "<="
+                op_lo, op_hi = type_start, bisect.bisect_right(index, (key, _TOP))
+            lo, hi = max(lo, op_lo), min(hi, op_hi)
+        return lo, max(lo, hi)
+
+    def select(
+        self,
+        filters: Optional[List[Filter]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        start_after: Optional[Tuple[Any, str]] = None,
+    ) -> List[str]:
+        """
+        Resolve filters, ordering and paging to a list of document IDs
+
+        start_after is an (order_by value, document ID) cursor; results
+        resume after that position in the (order_by, document ID) ordering.
+        """
+        if start_after is not None and not order_by:
+            raise ValueError("start_after requires order_by")
+
+        include: Optional[Set[str]] = None
+        exclude: Set[str] = set()
+        ranges: Dict[str, List[Tuple[str, Any]]] = {}
+
+        for field, operator, value in filters or []:
+            if operator not in SUPPORTED_OPERATORS:
+                raise ValueError(f"Unsupported query operator: {operator}")
+
+            if operator in RANGE_OPERATORS:
+                ranges.setdefault(field, []).append((operator, value))
+                continue
+            if operator == "!=":
+                exclude |= self.equal_ids(field, value)
+                continue
+            if operator == "not-in":
+                for item in value:
+                    exclude |= self.equal_ids(field, item)
+                continue
+
+            if operator == "==":
+                matched = self.equal_ids(field, value)
+            elif operator == "in":
+                matched = set().union(*(self.equal_ids(field, v) for v in value))
+            elif operator == "array-contains":
+                matched = self.contains_ids(field, value)
+            else:  # "array-contains-any"
+                matched = set().union(*(self.contains_ids(field, v) for v in value))
+
+            include = matched if include is None else include & matched
+            if not include:
+                return []
+
+        # A range on the order_by field is walked in index order directly
+        walk: Optional[Tuple[List[Tuple], int, int]] = None
+        for field, ops in ranges.items():
+            index = self.sorted_index(field)
+            lo, hi = self.range_bounds(index, ops)
+            if field == order_by and len(ranges) == 1:
+                walk = (index, lo, hi)
+                continue
+            matched = {entry[1] for entry in index[lo:hi]}
+            include = matched if include is None else include & matched
+            if not include:
+                return []
+
+        def accepted(doc_id: str) -> bool:
+            return (include is None or doc_id in include) and doc_id not in exclude
+
+        cursor = (
+            (sort_key(start_after[0]), start_after[1])
+            if start_after is not None
+            else None
+        )
+
+        ordered: Iterator[str]
+        if order_by and (walk is not None or include is None):
+            index, lo, hi = walk or (self.sorted_index(order_by), 0, None)
+            hi = len(index) if hi is None else hi
+            if cursor is not None and descending:
+                hi = min(hi, bisect.bisect_left(index, cursor))
+            elif cursor is not None:
+                lo = max(lo, bisect.bisect_right(index, cursor))
+            positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+            ordered = (index[p][1] for p in positions if accepted(index[p][1]))
+        elif order_by:
+            entries = sorted(
+                (
+                    (sort_key(self.docs[doc_id][order_by]), doc_id)
+                    for doc_id in include
+                    if order_by in self.docs[doc_id] and doc_id not in exclude
+                ),
+                reverse=descending,
+            )
+            if cursor is not None:
+                entries = [
+                    entry
+                    for entry in entries
+                    if (entry < cursor if descending else entry > cursor)
+                ]
+            ordered = (entry[1] for entry in entries)
+        elif include is None:
+            ordered = (doc_id for doc_id in self.docs if doc_id not in exclude)
+        else:
+            ordered = iter(sorted(include - exclude, key=self.seq.__getitem__))
+
+        stop = offset + limit if limit is not None else None
+        return list(islice(ordered, offset, stop))
+
+
+class InMemoryDocumentStore:
+    """
+    Thread-safe, indexed stand-in for Firestore used when Firebase is unavailable
+
+    Hash indexes serve ==, !=, in and not-in filters, sorted indexes serve
+    range filters and order_by, and inverted indexes serve array-contains
+    and array-contains-any. Indexes are built the first time a field is
+    queried and kept up to date on every write afterwards.
+    """
+
+    def __init__(self):
+        self._collections: Dict[str, _IndexedCollection] = {}
+        self._lock = threading.RLock()
+
+    def _collection(self, name: str) -> _IndexedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = _IndexedCollection()
+        return collection
+
+    def collection_names(self) -> List[str]:
+        with self._lock:
+            return list(self._collections)
+
+    def set(self, collection_name: str, doc_id: str, data: Dict[str, Any]) -> None:
+        """Create or overwrite a document"""
+        doc = dict(data)
+        doc["id"] = doc_id
+        with self._lock:
+            self._collection(collection_name).put(doc_id, doc)
+
+    def update(self, collection_name: str, doc_id: str, data: Dict[str, Any]) -> bool:
+        """Merge fields into an existing document"""
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None or doc_id not in collection.docs:
+                return False
+            doc = dict(collection.docs[doc_id])
+            doc.update(data)
+            collection.put(doc_id, doc)
+            return True
+
+    def increment(
+        self,
+        collection_name: str,
+        doc_id: str,
+        increments: Dict[str, float],
+        data: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Add to numeric fields, creating the document if needed"""
+        with self._lock:
+            collection = self._collection(collection_name)
+            doc = dict(collection.docs.get(doc_id) or {"id": doc_id})
+            doc.update(data or {})
+            for field, amount in increments.items():
+                doc[field] = doc.get(field, 0) + amount
+            collection.put(doc_id, doc)
+            return dict(doc)
+
+    def delete(self, collection_name: str, doc_id: str) -> bool:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                return False
+            return collection.remove(doc_id)
+
+    def get(self, collection_name: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                return None
+            doc = collection.docs.get(doc_id)
+            return dict(doc) if doc is not None else None
+
+    def get_many(
+        self, collection_name: str, doc_ids: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch several documents under one lock; missing IDs are omitted"""
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                return {}
+            found = {}
+            for doc_id in doc_ids:
+                doc = collection.docs.get(doc_id)
+                if doc is not None:
+                    found[doc_id] = dict(doc)
+            return found
+
+    def query(
+        self,
+        collection_name: str,
+        filters: Optional[List[Filter]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        start_after: Optional[Tuple[Any, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a query against the indexes
+
+        Args:
+            collection_name (str): Name of the collection
+            filters (List[Filter], optional): (field, operator, value) tuples
+            order_by (str, optional): Field to order by
+            descending (bool): Reverse the ordering
+            limit (int, optional): Maximum number of documents to return
+            offset (int): Number of matching documents to skip
+            start_after (Tuple[Any, str], optional): (order_by value,
+                document ID) cursor to resume after
+
+        Returns:
+            List[Dict[str, Any]]: Copies of the matching documents
+        """
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                return []
+            doc_ids = collection.select(
+                filters, order_by, descending, offset, limit, start_after
+            )
+            return [dict(collection.docs[doc_id]) for doc_id in doc_ids]
+
+    def aggregate(
+        self,
+        collection_name: str,
+        filters: Optional[List[Filter]] = None,
+        sum_fields: Iterable[str] = (),
+        avg_fields: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Count matching documents and sum/average numeric fields
+
+        Like Firestore, non-numeric values are ignored and the average of
+        a field with no numeric values is None.
+        """
+        sum_fields, avg_fields = list(sum_fields), list(avg_fields)
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                doc_ids: List[str] = []
+            elif filters:
+                doc_ids = collection.select(filters)
+            else:
+                doc_ids = list(collection.docs)
+
+            totals: Dict[str, Tuple[float, int]] = {}
+            for field in dict.fromkeys(sum_fields + avg_fields):
+                total, numeric = 0, 0
+                for doc_id in doc_ids:
+                    value = collection.docs[doc_id].get(field)
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        total += value
+                        numeric += 1
+                totals[field] = (total, numeric)
+
+        return {
+            "count": len(doc_ids),
+            "sum": {field: totals[field][0] for field in sum_fields},
+            "avg": {
+                field: totals[field][0] / totals[field][1] if totals[field][1] else None
+                for field in avg_fields
+            },
+        }
+
+    def count(
+        self, collection_name: str, filters: Optional[List[Filter]] = None
+    ) -> int:
+        """Count documents matching the filters"""
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                return 0
+            if not filters:
+                return len(collection.docs)
+            return len(collection.select(filters))
@@ -0,0 +1,466 @@
+"""
+Columnar order extract for RetailGenie analytics
+Orders and their line items as NumPy columns kept in created_at order, so
+an analytics call slices its time window with a binary search and hands
+only that slice to pandas, instead of re-reading every order document
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.utils.firebase_utils import get_firebase
+from app.utils.search_index import CollectionSync
+
+NAT = np.datetime64("NaT", "ns")
+
+# Time buckets: bucket -> pandas period frequency
+BUCKET_FREQUENCIES = {"day": "D", "week": "W", "month": "M", "year": "Y"}
+
+# Named periods: (bucket, days compared period-over-period, buckets in a
+# series)
+PERIODS = {
+    "day": ("day", 1, 30),
+    "week": ("week", 7, 12),
+    "month": ("month", 30, 12),
+    "year": ("year", 365, 5),
+}
+
+# Longest window a "<n>d" period may cover
+MAX_PERIOD_DAYS = 5 * 366
+
+_INITIAL_CAPACITY = 1024
+
+
+class Period:
+    """An analytics period: its bucket size and the windows it covers"""
+
+    def __init__(self, name: str, bucket: str, days: int, series_days: int):
+        self.name = name
+        self.bucket = bucket
+        self.days = days
+        self.series_days = series_days
+
+    @property
+    def frequency(self) -> str:
+        return BUCKET_FREQUENCIES[self.bucket]
+
+
+def resolve_period(period: str) -> Period:
+    """
+    Parse a period name ("day", "week", "month", "year") or "<n>d"
+
+    A named period compares the last day/week/month/year against the one
+    before, and its series covers several buckets of that size. "<n>d"
+    covers n days, bucketed by day, week or month depending on n.
+
+    Raises:
+        ValueError: If the period isn't recognised
+    """
+    name = (period or "").strip().lower()
+    if name in PERIODS:
+        bucket, days, buckets = PERIODS[name]
+        return Period(name, bucket, days, days * buckets)
+    if name.endswith("d") and name[:-1].isdigit() and int(name[:-1]) > 0:
+        days = min(int(name[:-1]), MAX_PERIOD_DAYS)
+        bucket = "day" if days <= 92 else "week" if days <= 366 else "month"
+        return Period(name, bucket, days, days)
+    raise ValueError(
+        f"Unsupported period: {period} (use day, week, month, year or <n>d)"
+    )
+
+
+def bucket_starts(times: pd.Series, bucket: str) -> pd.Series:
+    """Start of the bucket each timestamp falls in"""
+    return times.dt.to_period(BUCKET_FREQUENCIES[bucket]).dt.start_time
+
+
+def bucket_range(start: datetime, end: datetime, bucket: str) -> pd.DatetimeIndex:
+    """Starts of every bucket from start to end, inclusive"""
+    return pd.period_range(start, end, freq=BUCKET_FREQUENCIES[bucket]).start_time
+
+
+def _timestamp(value: Any) -> np.datetime64:
+    """created_at as datetime64[ns] (wall-clock time, offset dropped)"""
+    if isinstance(value, str) and value:
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return NAT
+    if isinstance(value, datetime):
+        return np.datetime64(value.replace(tzinfo=None), "ns")
+    return NAT
+
+
+def _number(value: Any, default: float = 0.0) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    return float(value)
+
+
+def _key(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+class OrderExtract:
+    """
+    Column-oriented snapshot of an order collection
+
+    Each order is a row of customer, store, status, total and created_at
+    arrays; its line items are a contiguous run of product, quantity and
+    price arrays, addressed by the row's line_start:line_end. Rows with a
+    created_at are also listed in created_at order, so a time window is two
+    binary searches. Orders usually arrive in time order and are appended
+    to that list; anything else re-sorts it on the next read. Deleted rows
+    are tombstoned and compacted once they make up half the arrays.
+
+    Each customer's first order time is kept as orders are added, for
+    new-versus-returning splits without a scan of their history.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset(_INITIAL_CAPACITY)
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._dead = 0
+        self._rows: Dict[str, int] = {}
+        self._documents: List[Optional[Dict[str, Any]]] = []
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._ids = np.full(capacity, None, dtype=object)
+        self._customers = np.full(capacity, None, dtype=object)
+        self._stores = np.full(capacity, None, dtype=object)
+        self._statuses = np.full(capacity, None, dtype=object)
+        self._totals = np.zeros(capacity)
+        self._created = np.full(capacity, NAT)
+        self._line_start = np.zeros(capacity, dtype=np.int64)
+        self._line_end = np.zeros(capacity, dtype=np.int64)
+
+        self._line_size = 0
+        self._products = np.full(capacity, None, dtype=object)
+        self._quantities = np.zeros(capacity)
+        self._prices = np.zeros(capacity)
+
+        # Rows with a created_at and their created_at, in time order once sorted
+        self._time_size = 0
+        self._time_rows = np.zeros(capacity, dtype=np.int64)
+        self._time_values = np.full(capacity, NAT)
+        self._time_sorted = True
+
+        self._first_orders: Dict[str, np.datetime64] = {}
+        self._first_orders_stale = False
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def _grow(array: np.ndarray, needed: int, fill: Any) -> np.ndarray:
+        if needed <= len(array):
+            return array
+        grown = np.full(max(needed, len(array) * 2), fill, dtype=array.dtype)
+        grown[: len(array)] = array
+        return grown
+
+    def _append_row(self) -> int:
+        needed = self._size + 1
+        self._alive = self._grow(self._alive, needed, False)
+        self._ids = self._grow(self._ids, needed, None)
+        self._customers = self._grow(self._customers, needed, None)
+        self._stores = self._grow(self._stores, needed, None)
+        self._statuses = self._grow(self._statuses, needed, None)
+        self._totals = self._grow(self._totals, needed, 0.0)
+        self._created = self._grow(self._created, needed, NAT)
+        self._line_start = self._grow(self._line_start, needed, 0)
+        self._line_end = self._grow(self._line_end, needed, 0)
+        self._documents.append(None)
+        self._size = needed
+        return needed - 1
+
+    def _set_fields(self, row: int, document: Dict[str, Any]) -> None:
+        """Columns that can change without moving the row"""
+        self._stores[row] = _key(document.get("store_id"))
+        self._statuses[row] = document.get("status")
+        self._totals[row] = _number(
+            document.get("total"),
+            sum(
+                _number(item.get("price")) * _number(item.get("quantity"), 1.0)
+                for item in document.get("items") or []
+                if isinstance(item, dict)
+            ),
+        )
+
+    def add(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """Store an order, replacing any previous version"""
+        with self._lock:
+            if self._drop(doc_id) and self._dead * 2 > self._size > _INITIAL_CAPACITY:
+                self._compact()
+            row = self._append_row()
+            stored = dict(document)
+            stored["id"] = doc_id
+            self._documents[row] = stored
+            self._rows[doc_id] = row
+            self._alive[row] = True
+            self._ids[row] = doc_id
+            customer = _key(stored.get("customer_id"))
+            self._customers[row] = customer
+            self._set_fields(row, stored)
+
+            items = [
+                item for item in stored.get("items") or [] if isinstance(item, dict)
+            ]
+            start, end = self._line_size, self._line_size + len(items)
+            self._products = self._grow(self._products, end, None)
+            self._quantities = self._grow(self._quantities, end, 0.0)
+            self._prices = self._grow(self._prices, end, 0.0)
+            for line, item in enumerate(items, start):
+                self._products[line] = _key(item.get("product_id"))
+                self._quantities[line] = _number(item.get("quantity"), 1.0)
+                self._prices[line] = _number(item.get("price"))
+            self._line_start[row], self._line_end[row] = start, end
+            self._line_size = end
+
+            created = _timestamp(stored.get("created_at"))
+            self._created[row] = created
+            if not np.isnat(created):
+                position = self._time_size
+                self._time_rows = self._grow(self._time_rows, position + 1, 0)
+                self._time_values = self._grow(self._time_values, position + 1, NAT)
+                if position and created < self._time_values[position - 1]:
+                    self._time_sorted = False
+                self._time_rows[position] = row
+                self._time_values[position] = created
+                self._time_size += 1
+                if customer is not None:
+                    first = self._first_orders.get(customer)
+                    if first is None or created < first:
+                        self._first_orders[customer] = created
+
+    def update(self, doc_id: str, changes: Dict[str, Any]) -> bool:
+        """Merge changed fields into a stored order"""
+        with self._lock:
+            row = self._rows.get(doc_id)
+            if row is None:
+                return False
+            stored = {**self._documents[row], **changes}
+            if {"items", "created_at", "customer_id"} & set(changes):
+                self.add(doc_id, stored)
+            else:
+                # Status and total changes are patched in place
+                self._documents[row] = stored
+                self._set_fields(row, stored)
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            removed = self._drop(doc_id)
+            if removed and self._dead * 2 > self._size > _INITIAL_CAPACITY:
+                self._compact()
+            return removed
+
+    def _drop(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        customer = self._customers[row]
+        if (
+            customer is not None
+            and self._first_orders.get(customer) == self._created[row]
+        ):
+            self._first_orders_stale = True
+        self._alive[row] = False
+        self._documents[row] = None
+        self._dead += 1
+        return True
+
+    def _compact(self) -> None:
+        documents = [doc for doc in self._documents if doc is not None]
+        self._reset(max(_INITIAL_CAPACITY, len(documents) * 2))
+        for document in documents:
+            self.add(document["id"], document)
+
+    def _sort_time_index(self) -> None:
+        if self._time_sorted:
+            return
+        size = self._time_size
+        order = np.argsort(self._time_values[:size], kind="stable")
+        self._time_rows[:size] = self._time_rows[:size][order]
+        self._time_values[:size] = self._time_values[:size][order]
+        self._time_sorted = True
+
+    def window(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        store_id: Optional[str] = None,
+        include_cancelled: bool = False,
+    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Orders created in [start, end] and their line items, as DataFrames
+
+        Args:
+            start (datetime, optional): Earliest created_at (inclusive)
+            end (datetime, optional): Latest created_at (inclusive)
+            store_id (str, optional): Only this store's orders
+            include_cancelled (bool): Keep orders with status "cancelled"
+
+        Returns:
+            Tuple of (orders, lines): orders has id, customer_id, store_id,
+            status, total and created_at columns; lines has order_id,
+            customer_id, product_id, quantity, price, revenue and
+            created_at. Orders without a created_at are never included.
+        """
+        with self._lock:
+            self._sort_time_index()
+            values = self._time_values[: self._time_size]
+            low = (
+                np.searchsorted(values, np.datetime64(start, "ns"), side="left")
+                if start is not None
+                else 0
+            )
+            high = (
+                np.searchsorted(values, np.datetime64(end, "ns"), side="right")
+                if end is not None
+                else len(values)
+            )
+            rows = self._time_rows[low:high]
+            rows = rows[self._alive[rows]]
+            if store_id is not None:
+                rows = rows[self._stores[rows] == store_id]
+            if not include_cancelled:
+                rows = rows[self._statuses[rows] != "cancelled"]
+
+            ids = self._ids[rows]
+            customers = self._customers[rows]
+            created = self._created[rows]
+            orders = pd.DataFrame(
+                {
+                    "id": ids,
+                    "customer_id": customers,
+                    "store_id": self._stores[rows],
+                    "status": self._statuses[rows],
+                    "total": self._totals[rows],
+                    "created_at": created,
+                }
+            )
+
+            # Gather every row's run of lines
+            starts = self._line_start[rows]
+            counts = self._line_end[rows] - starts
+            run_offsets = np.cumsum(counts) - counts
+            lines_index = np.arange(counts.sum()) - np.repeat(
+                run_offsets - starts, counts
+            )
+            quantities = self._quantities[lines_index]
+            prices = self._prices[lines_index]
+            lines = pd.DataFrame(
+                {
+                    "order_id": np.repeat(ids, counts),
+                    "customer_id": np.repeat(customers, counts),
+                    "product_id": self._products[lines_index],
+                    "quantity": quantities,
+                    "price": prices,
+                    "revenue": quantities * prices,
+                    "created_at": np.repeat(created, counts),
+                }
+            )
+        return orders, lines
+
+    def first_order_times(self, customer_ids: Iterable[str]) -> np.ndarray:
+        """Each customer's first order created_at (NaT if unknown)"""
+        with self._lock:
+            if self._first_orders_stale:
+                live = self._alive[: self._size] & ~np.isnat(
+                    self._created[: self._size]
+                )
+                firsts = (
+                    pd.Series(self._created[: self._size][live])
+                    .groupby(self._customers[: self._size][live])
+                    .min()
+                )
+                self._first_orders = {
+                    customer: first.to_datetime64()
+                    for customer, first in firsts.items()
+                }
+                self._first_orders_stale = False
+            return np.array(
+                [self._first_orders.get(customer, NAT) for customer in customer_ids],
+                dtype="datetime64[ns]",
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "orders": len(self._rows),
+                "lines": self._line_size,
+                "rows": self._size,
+                "capacity": len(self._alive),
+                "customers": len(self._first_orders),
+            }
+
+    @classmethod
+    def build(cls, documents: List[Dict[str, Any]]) -> "OrderExtract":
+        """Load orders that carry their ID in "id" """
+        extract = cls()
+        for position, document in enumerate(documents):
+            extract.add(str(document.get("id", position)), document)
+        return extract
+
+
+class CollectionOrderExtract(CollectionSync, OrderExtract):
+    """OrderExtract kept in sync with a Firestore collection"""
+
+    def __init__(
+        self, firebase, collection_name: str, refresh_seconds: Optional[float] = None
+    ):
+        super().__init__()
+        self._init_sync(firebase, collection_name, refresh_seconds)
+
+    def _empty_copy(self) -> OrderExtract:
+        return OrderExtract()
+
+    def _adopt(self, fresh: OrderExtract) -> None:
+        self.__dict__.update(
+            {key: value for key, value in fresh.__dict__.items() if key != "_lock"}
+        )
+
+    def window(self, *args: Any, **kwargs: Any) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        self.ensure_loaded()
+        return super().window(*args, **kwargs)
+
+    def first_order_times(self, customer_ids: Iterable[str]) -> np.ndarray:
+        self.ensure_loaded()
+        return super().first_order_times(customer_ids)
+
+
+_extracts: Dict[Tuple[int, str], CollectionOrderExtract] = {}
+_extracts_lock = threading.Lock()
+
+
+def get_order_extract(
+    collection_name: str = "orders", firebase=None
+) -> CollectionOrderExtract:
+    """
+    Get the process-wide columnar extract of an order collection
+
+    Args:
+        collection_name (str): Order collection
+        firebase (FirebaseUtils, optional): Data source; defaults to
+            get_firebase(). Each instance gets its own extract.
+
+    Returns:
+        CollectionOrderExtract: Shared extract, loaded lazily on first read
+    """
+    if firebase is None:
+        firebase = get_firebase()
+
+    key = (id(firebase), collection_name)
+    with _extracts_lock:
+        extract = _extracts.get(key)
+        if extract is None or extract.firebase is not firebase:
+            extract = CollectionOrderExtract(firebase, collection_name)
+            _extracts[key] = extract
+        return extract
@@ -0,0 +1,134 @@
+"""
+Per-product order and feedback activity for RetailGenie
+One pass over orders and feedback groups them by product_id into flat
+arrays, so per-product analysis is a lookup instead of a scan of every
+order for every product
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class ProductActivity:
+    """
+    Orders and feedback grouped by product
+
+    add_order() and add_feedback() fold documents in one at a time, then
+    finish() packs the result: order counts, units ordered and last order
+    timestamps are arrays indexed by a product's row, and feedback
+    comments sit in one list ordered by product, where
+    offsets[row]:offsets[row + 1] is a product's slice.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._order_counts: List[int] = []
+        self._quantities: List[float] = []
+        self._last_ordered: List[Optional[str]] = []
+        self._pending_feedback: List[Tuple[int, str]] = []
+
+        self.order_counts = np.zeros(0, dtype=np.int64)
+        self.quantities = np.zeros(0)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.comments: List[str] = []
+        self.orders_seen = 0
+        self.feedback_seen = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _row(self, product_id: str) -> int:
+        row = self._rows.get(product_id)
+        if row is None:
+            row = len(self._rows)
+            self._rows[product_id] = row
+            self._order_counts.append(0)
+            self._quantities.append(0.0)
+            self._last_ordered.append(None)
+        return row
+
+    def add_order(self, order: Dict[str, Any]) -> None:
+        """Count an order once for each distinct product in its items"""
+        self.orders_seen += 1
+        created_at = order.get("created_at")
+        seen = set()
+        for item in order.get("items") or []:
+            if not isinstance(item, dict) or not item.get("product_id"):
+                continue
+            row = self._row(str(item["product_id"]))
+            quantity = item.get("quantity", 1)
+            if isinstance(quantity, (int, float)) and not isinstance(quantity, bool):
+                self._quantities[row] += quantity
+            if row in seen:
+                continue
+            seen.add(row)
+            self._order_counts[row] += 1
+            if isinstance(created_at, str) and (
+                self._last_ordered[row] is None or created_at > self._last_ordered[row]
+            ):
+                self._last_ordered[row] = created_at
+
+    def add_feedback(self, feedback: Dict[str, Any]) -> None:
+        """Keep a feedback comment under its product"""
+        self.feedback_seen += 1
+        product_id = feedback.get("product_id")
+        comment = feedback.get("comment")
+        if product_id and comment:
+            self._pending_feedback.append((self._row(str(product_id)), comment))
+
+    def finish(self) -> "ProductActivity":
+        """Pack counts into arrays and feedback into per-product slices"""
+        size = len(self._rows)
+        self.order_counts = np.array(self._order_counts, dtype=np.int64)
+        self.quantities = np.array(self._quantities, dtype=float)
+
+        rows = np.array([row for row, _ in self._pending_feedback], dtype=np.int64)
+        order = np.argsort(rows, kind="stable")
+        self.comments = [self._pending_feedback[i][1] for i in order]
+        self.offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=self.offsets[1:])
+        self._pending_feedback = []
+        return self
+
+    def order_count(self, product_id: str) -> int:
+        """Orders containing the product"""
+        row = self._rows.get(product_id)
+        return int(self.order_counts[row]) if row is not None else 0
+
+    def quantity(self, product_id: str) -> float:
+        """Units of the product ordered"""
+        row = self._rows.get(product_id)
+        return float(self.quantities[row]) if row is not None else 0.0
+
+    def last_ordered(self, product_id: str) -> Optional[str]:
+        """created_at of the product's newest order"""
+        row = self._rows.get(product_id)
+        return self._last_ordered[row] if row is not None else None
+
+    def feedback_comments(self, product_id: str) -> List[str]:
+        """Feedback comments left on the product"""
+        row = self._rows.get(product_id)
+        if row is None:
+            return []
+        return self.comments[self.offsets[row] : self.offsets[row + 1]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self._rows),
+            "orders": self.orders_seen,
+            "feedback": self.feedback_seen,
+            "comments": len(self.comments),
+        }
+
+    @classmethod
+    def build(
+        cls, orders: Iterable[Dict[str, Any]], feedback: Iterable[Dict[str, Any]] = ()
+    ) -> "ProductActivity":
+        """Index orders and feedback in one pass each"""
+        activity = cls()
+        for order in orders:
+            activity.add_order(order)
+        for entry in feedback:
+            activity.add_feedback(entry)
+        return activity.finish()
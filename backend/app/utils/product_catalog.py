@@ -0,0 +1,666 @@
+"""
+Columnar product catalog for RetailGenie
+NumPy columns for the fields product listings filter and sort on, so a
+listing is a few boolean masks and a partial sort instead of a scan over
+product dicts, plus per-value bitmaps for facet counts
+"""
+
+import bisect
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.firebase_utils import (
+    _decode_page_token,
+    _encode_page_token,
+    _normalize_fields,
+    _project,
+    get_firebase,
+)
+from app.utils.search_index import CollectionSync
+
+# Numeric columns: column name -> product field
+NUMERIC_COLUMNS = {
+    "price": "price",
+    "rating": "rating",
+    "stock": "stock_quantity",
+    "review_count": "review_count",
+}
+
+# Fields listings can be sorted by; anything else sorts by document ID
+SORT_FIELDS = ("name", *NUMERIC_COLUMNS.values())
+
+# Facet buckets: upper price bounds (the last bucket is open-ended) and
+# whole-star rating bands
+PRICE_BUCKETS = (10, 25, 50, 100, 250, 500)
+RATING_BUCKETS = 5
+
+FACETS = ("category", "brand", "price", "rating", "in_stock")
+
+_INITIAL_CAPACITY = 64
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _price_bucket(price: float) -> int:
+    return int(np.searchsorted(PRICE_BUCKETS, price, side="right"))
+
+
+def _price_label(bucket: int) -> str:
+    if bucket == len(PRICE_BUCKETS):
+        return f"{PRICE_BUCKETS[-1]}+"
+    low = PRICE_BUCKETS[bucket - 1] if bucket else 0
+    return f"{low}-{PRICE_BUCKETS[bucket]}"
+
+
+def _by_count(item: Tuple[Any, int]) -> Tuple[int, Any]:
+    return -item[1], item[0]
+
+
+def _words(capacity: int) -> int:
+    return (capacity + 63) // 64
+
+
+def _pack(mask: np.ndarray, words: int) -> np.ndarray:
+    """Boolean row mask as a bitmap of uint64 words (bit row % 64 of word row // 64)"""
+    padded = np.zeros(words * 64, dtype=bool)
+    padded[: len(mask)] = mask
+    return np.packbits(padded, bitorder="little").view("<u8").astype(np.uint64)
+
+
+class _Bitmaps:
+    """Posting bitmaps of one facet: a row bitmap per value"""
+
+    def __init__(self, words: int):
+        self.words = words
+        self.bitmaps: Dict[Any, np.ndarray] = {}
+
+    def set(self, row: int, value: Any) -> None:
+        bitmap = self.bitmaps.get(value)
+        if bitmap is None:
+            bitmap = self.bitmaps[value] = np.zeros(self.words, dtype=np.uint64)
+        bitmap[row >> 6] |= np.uint64(1 << (row & 63))
+
+    def clear(self, row: int, value: Any) -> None:
+        bitmap = self.bitmaps.get(value)
+        if bitmap is not None:
+            bitmap[row >> 6] &= ~np.uint64(1 << (row & 63))
+            if not bitmap.any():
+                del self.bitmaps[value]
+
+    def resize(self, words: int) -> None:
+        for value, bitmap in self.bitmaps.items():
+            grown = np.zeros(words, dtype=np.uint64)
+            grown[: len(bitmap)] = bitmap[:words]
+            self.bitmaps[value] = grown
+        self.words = words
+
+    def get(self, value: Any) -> np.ndarray:
+        """Bitmap of a value (empty for an unknown one)"""
+        bitmap = self.bitmaps.get(value)
+        return bitmap if bitmap is not None else np.zeros(self.words, dtype=np.uint64)
+
+    def counts(self, selection: np.ndarray) -> Dict[Any, int]:
+        """Rows of each value within a selection bitmap (zero counts omitted)"""
+        counts = {}
+        for value, bitmap in self.bitmaps.items():
+            count = int(np.bitwise_count(bitmap & selection).sum())
+            if count:
+                counts[value] = count
+        return counts
+
+
+class _Dictionary:
+    """Dictionary encoding of a string column (case-insensitive)"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        # Spelling each code was first seen with, for facet labels
+        self.labels: List[str] = []
+
+    def encode(self, value: Any) -> int:
+        if not isinstance(value, str):
+            return -1
+        code = self.codes.setdefault(value.lower(), len(self.codes))
+        if code == len(self.labels):
+            self.labels.append(value)
+        return code
+
+    def mask(self, column: np.ndarray, value: str) -> np.ndarray:
+        """Rows whose value matches (no rows for an unknown value)"""
+        code = self.codes.get(value.lower())
+        if code is None:
+            return np.zeros(len(column), dtype=bool)
+        return column == code
+
+
+class ProductCatalog:
+    """
+    Column-oriented snapshot of a product collection
+
+    Each product is a row: price, rating, stock and review count are
+    float arrays (with a presence mask, since products missing a sort
+    field aren't listed when sorting by it, as in Firestore), category and
+    brand are dictionary-encoded int arrays and in_stock is a bool array.
+    Writes patch a row in place; deleted rows are tombstoned and compacted
+    once they make up half the arrays.
+
+    A listing is built from boolean masks, and its page is chosen with
+    argpartition over a cached sort rank, so only the returned rows are
+    fully sorted. Writes move their row within each cached rank rather
+    than dropping it. Pages use keyset cursors, like get_documents_page().
+
+    For facets, every value of category, brand, price bucket, rating band
+    and in_stock has a bitmap of its rows, kept current on writes. Facet
+    counts are popcounts of those bitmaps ANDed with the bitmap of the
+    rows matching the filters, so no product is re-read.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._categories = _Dictionary()
+        self._brands = _Dictionary()
+        self._reset(_INITIAL_CAPACITY)
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._rows: Dict[str, int] = {}
+        self._documents: List[Optional[Dict[str, Any]]] = []
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._ids = np.full(capacity, "", dtype=object)
+        self._names = np.full(capacity, "", dtype=object)
+        self._has_name = np.zeros(capacity, dtype=bool)
+        self._numbers = {column: np.zeros(capacity) for column in NUMERIC_COLUMNS}
+        self._present = {
+            column: np.zeros(capacity, dtype=bool) for column in NUMERIC_COLUMNS
+        }
+        self._category = np.full(capacity, -1, dtype=np.int32)
+        self._brand = np.full(capacity, -1, dtype=np.int32)
+        self._in_stock = np.zeros(capacity, dtype=bool)
+        # sort field -> rows in (field, id) order, and each row's position in it
+        self._orders: Dict[Optional[str], np.ndarray] = {}
+        self._ranks: Dict[Optional[str], np.ndarray] = {}
+        self._facets = {facet: _Bitmaps(_words(capacity)) for facet in FACETS}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """Store a product, replacing any previous version"""
+        with self._lock:
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._append_row()
+                self._rows[doc_id] = row
+            else:
+                self._unset_facets(row)
+            stored = dict(document)
+            stored["id"] = doc_id
+            self._documents[row] = stored
+
+            self._alive[row] = True
+            self._ids[row] = doc_id
+            name = stored.get("name")
+            self._has_name[row] = isinstance(name, str)
+            self._names[row] = name if isinstance(name, str) else ""
+            for column, field in NUMERIC_COLUMNS.items():
+                value = stored.get(field)
+                self._present[column][row] = _is_number(value)
+                self._numbers[column][row] = value if _is_number(value) else 0.0
+            self._category[row] = self._categories.encode(stored.get("category"))
+            self._brand[row] = self._brands.encode(stored.get("brand"))
+            self._in_stock[row] = bool(stored.get("in_stock", True))
+            self._rerank_row(row)
+            for facet, value in self._facet_values(row).items():
+                self._facets[facet].set(row, value)
+
+    def _facet_values(self, row: int) -> Dict[str, Any]:
+        """Facet values of a stored row (facets it has no value for are left out)"""
+        values: Dict[str, Any] = {"in_stock": bool(self._in_stock[row])}
+        if self._category[row] >= 0:
+            values["category"] = int(self._category[row])
+        if self._brand[row] >= 0:
+            values["brand"] = int(self._brand[row])
+        if self._present["price"][row]:
+            values["price"] = _price_bucket(self._numbers["price"][row])
+        if self._present["rating"][row]:
+            rating = self._numbers["rating"][row]
+            values["rating"] = min(max(int(rating), 0), RATING_BUCKETS - 1)
+        return values
+
+    def _unset_facets(self, row: int) -> None:
+        for facet, value in self._facet_values(row).items():
+            self._facets[facet].clear(row, value)
+
+    def update(self, doc_id: str, changes: Dict[str, Any]) -> bool:
+        """
+        Apply a partial product update
+
+        Returns:
+            bool: False if the product isn't in the catalog
+        """
+        with self._lock:
+            row = self._rows.get(doc_id)
+            if row is None:
+                return False
+            merged = dict(self._documents[row])
+            merged.update(changes)
+            self.add(doc_id, merged)
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a product; returns False if it wasn't in the catalog"""
+        with self._lock:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                return False
+            self._unset_facets(row)
+            self._documents[row] = None
+            self._alive[row] = False
+            self._ids[row] = ""
+            self._names[row] = ""
+            self._rerank_row(row)
+            if self._size - len(self._rows) > max(self._size // 2, _INITIAL_CAPACITY):
+                self._compact()
+            return True
+
+    def _append_row(self) -> int:
+        capacity = len(self._alive)
+        if self._size == capacity:
+            self._resize(capacity * 2)
+        self._documents.append(None)
+        self._size += 1
+        return self._size - 1
+
+    def _resize(self, capacity: int) -> None:
+        def grow(array: np.ndarray, fill: Any) -> np.ndarray:
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[: len(array)] = array[:capacity]
+            return grown
+
+        self._alive = grow(self._alive, False)
+        self._ids = grow(self._ids, "")
+        self._names = grow(self._names, "")
+        self._has_name = grow(self._has_name, False)
+        self._numbers = {c: grow(a, 0.0) for c, a in self._numbers.items()}
+        self._present = {c: grow(a, False) for c, a in self._present.items()}
+        self._category = grow(self._category, -1)
+        self._brand = grow(self._brand, -1)
+        self._in_stock = grow(self._in_stock, False)
+        for bitmaps in self._facets.values():
+            bitmaps.resize(_words(capacity))
+
+    def _compact(self) -> None:
+        documents = [doc for doc in self._documents if doc is not None]
+        self._reset(max(_INITIAL_CAPACITY, len(documents) * 2))
+        for document in documents:
+            self.add(document["id"], document)
+
+    def _rank(self, sort_by: Optional[str]) -> np.ndarray:
+        """Position of every row in (sort field, id) order, kept current on writes"""
+        rank = self._ranks.get(sort_by)
+        if rank is None:
+            size = self._size
+            id_order = np.argsort(self._ids[:size], kind="stable")
+            if sort_by is None:
+                order = id_order
+            elif sort_by == "name":
+                # Stable sort by name of the ID-ordered rows breaks ties by ID
+                order = id_order[
+                    np.argsort(self._names[:size][id_order], kind="stable")
+                ]
+            else:
+                values = self._numbers[self._column(sort_by)][:size]
+                order = id_order[np.argsort(values[id_order], kind="stable")]
+            rank = np.empty(size, dtype=np.int64)
+            rank[order] = np.arange(size)
+            self._orders[sort_by] = order
+            self._ranks[sort_by] = rank
+        return rank
+
+    def _rerank_row(self, row: int) -> None:
+        """
+        Move a written (or new) row to its place in every cached sort order
+
+        A binary search finds the new position, and only the ranks of the
+        rows between the old and new positions change, so a write doesn't
+        force the next listing to re-sort the catalog.
+        """
+        ids = self._ids
+        for sort_by, order in self._orders.items():
+            values, _ = self._sort_values(sort_by)
+            rank = self._ranks[sort_by]
+
+            def key(other: int) -> Tuple[Any, str]:
+                return values[other], ids[other]
+
+            if row < len(rank):
+                position = int(rank[row])
+                current = key(row)
+                if (position == 0 or key(order[position - 1]) <= current) and (
+                    position == len(order) - 1 or current <= key(order[position + 1])
+                ):
+                    continue  # Sort key unchanged, or still in order
+                order = np.delete(order, position)
+            else:
+                position = len(order)
+                rank = np.append(rank, 0)
+            target = bisect.bisect_left(order, key(row), key=key)
+            order = np.insert(order, target, row)
+            low, high = min(position, target), max(position, target) + 1
+            rank[order[low:high]] = np.arange(low, high)
+            self._orders[sort_by] = order
+            self._ranks[sort_by] = rank
+
+    @staticmethod
+    def _column(field: str) -> str:
+        return next(c for c, f in NUMERIC_COLUMNS.items() if f == field)
+
+    def _sort_values(
+        self, sort_by: Optional[str]
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Sort key values and the mask of rows that have them"""
+        size = self._size
+        if sort_by is None:
+            return self._ids[:size], None
+        if sort_by == "name":
+            return self._names[:size], self._has_name[:size]
+        column = self._column(sort_by)
+        return self._numbers[column][:size], self._present[column][:size]
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock_only: bool = False,
+        sort_by: Optional[str] = None,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+        include_total: bool = False,
+        fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get one page of filtered, sorted products
+
+        Args:
+            category (str, optional): Category (case-insensitive)
+            brand (str, optional): Brand (case-insensitive)
+            min_price (float, optional): Lowest price (missing prices count as 0)
+            max_price (float, optional): Highest price
+            in_stock_only (bool): Skip products with a falsy in_stock
+            sort_by (str, optional): One of SORT_FIELDS (document ID otherwise);
+                products without the field are not listed
+            limit (int): Page size
+            page_token (str, optional): next_page_token from the previous page
+            include_total (bool): Also return the number of matching products
+            fields (List[str], optional): Field paths to return (plus "id")
+
+        Returns:
+            Dict containing documents and pagination info with next_page_token,
+            in the same shape as FirebaseUtils.get_documents_page()
+
+        Raises:
+            ValueError: If page_token is malformed or belongs to another query
+        """
+        limit = max(1, limit)
+        sort_by = sort_by if sort_by in SORT_FIELDS else None
+        fingerprint = hashlib.sha1(
+            repr(
+                (
+                    "catalog",
+                    category,
+                    brand,
+                    min_price,
+                    max_price,
+                    in_stock_only,
+                    sort_by,
+                )
+            ).encode()
+        ).hexdigest()[:16]
+        cursor = _decode_page_token(page_token, fingerprint) if page_token else None
+
+        with self._lock:
+            size = self._size
+            values, present = self._sort_values(sort_by)
+            mask = self._alive[:size].copy()
+            if present is not None:
+                mask &= present
+            if category:
+                mask &= self._categories.mask(self._category[:size], category)
+            if brand:
+                mask &= self._brands.mask(self._brand[:size], brand)
+            prices = self._numbers["price"][:size]
+            if min_price is not None:
+                mask &= prices >= min_price
+            if max_price is not None:
+                mask &= prices <= max_price
+            if in_stock_only:
+                mask &= self._in_stock[:size]
+            total = int(mask.sum()) if include_total else None
+
+            rows = np.flatnonzero(mask)
+            if cursor is not None and len(rows):
+                value, cursor_id = cursor
+                keys = values[rows]
+                try:
+                    after = (keys > value) | (
+                        (keys == value) & (self._ids[rows] > cursor_id)
+                    )
+                except TypeError:
+                    raise ValueError("Invalid page token")
+                rows = rows[np.asarray(after, dtype=bool)]
+
+            # Top limit + 1 rows by rank; the extra one tells us there's a next page
+            ranks = self._rank(sort_by)[rows]
+            if len(rows) > limit + 1:
+                top = np.argpartition(ranks, limit)[: limit + 1]
+                rows, ranks = rows[top], ranks[top]
+            rows = rows[np.argsort(ranks)]
+            more = len(rows) > limit
+            rows = rows[:limit]
+
+            documents = [dict(self._documents[row]) for row in rows]
+            next_page_token = None
+            if more and documents:
+                last = rows[-1]
+                cursor_value = values[last]
+                if isinstance(cursor_value, np.generic):
+                    cursor_value = cursor_value.item()
+                next_page_token = _encode_page_token(
+                    fingerprint, (cursor_value, self._ids[last])
+                )
+
+        pagination: Dict[str, Any] = {
+            "page_size": limit,
+            "has_next": next_page_token is not None,
+            "next_page_token": next_page_token,
+        }
+        if total is not None:
+            pagination["total_documents"] = total
+
+        fields = _normalize_fields(fields)
+        if fields is not None:
+            documents = [_project(doc, fields) for doc in documents]
+        return {"documents": documents, "pagination": pagination}
+
+    def facets(
+        self,
+        ids: Optional[Iterable[str]] = None,
+        category: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock_only: bool = False,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Count matching products per category, brand, price, rating and stock
+
+        Each facet is counted with every filter except its own, so a
+        selected category still shows the counts of the other categories.
+
+        Args:
+            ids (Iterable[str], optional): Restrict to these products (e.g.
+                the matches of a search query)
+            category (str, optional): Category filter (case-insensitive)
+            brand (str, optional): Brand filter (case-insensitive)
+            min_price (float, optional): Lowest price (missing prices count as 0)
+            max_price (float, optional): Highest price
+            in_stock_only (bool): Skip products with a falsy in_stock
+
+        Returns:
+            Dict[str, Dict[str, int]]: {facet: {value: count}}, values in
+                descending count order (price and rating in bucket order)
+        """
+        with self._lock:
+            size = self._size
+            stock = self._facets["in_stock"]
+            words = stock.words
+            # Every stored product has an in_stock value
+            selection = stock.get(True) | stock.get(False)
+            if ids is not None:
+                rows = [self._rows[i] for i in ids if i in self._rows]
+                members = np.zeros(size, dtype=bool)
+                members[rows] = True
+                selection &= _pack(members, words)
+
+            filters: Dict[str, np.ndarray] = {}
+            if category:
+                code = self._categories.codes.get(category.lower())
+                filters["category"] = self._facets["category"].get(code)
+            if brand:
+                code = self._brands.codes.get(brand.lower())
+                filters["brand"] = self._facets["brand"].get(code)
+            if min_price is not None or max_price is not None:
+                prices = self._numbers["price"][:size]
+                in_range = np.ones(size, dtype=bool)
+                if min_price is not None:
+                    in_range &= prices >= min_price
+                if max_price is not None:
+                    in_range &= prices <= max_price
+                filters["price"] = _pack(in_range, words)
+            if in_stock_only:
+                filters["in_stock"] = self._facets["in_stock"].get(True)
+
+            counts = {}
+            for facet in FACETS:
+                facet_selection = selection.copy()
+                for other, bitmap in filters.items():
+                    if other != facet:
+                        facet_selection &= bitmap
+                counts[facet] = self._facets[facet].counts(facet_selection)
+
+        return {
+            "category": {
+                self._categories.labels[code]: count
+                for code, count in sorted(counts["category"].items(), key=_by_count)
+            },
+            "brand": {
+                self._brands.labels[code]: count
+                for code, count in sorted(counts["brand"].items(), key=_by_count)
+            },
+            "price": {
+                _price_label(bucket): count
+                for bucket, count in sorted(counts["price"].items())
+            },
+            "rating": {
+                f"{band}-{band + 1}": count
+                for band, count in sorted(counts["rating"].items())
+            },
+            "in_stock": {
+                "true": counts["in_stock"].get(True, 0),
+                "false": counts["in_stock"].get(False, 0),
+            },
+        }
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored products by ID; unknown IDs are omitted"""
+        with self._lock:
+            return {
+                doc_id: self._documents[self._rows[doc_id]]
+                for doc_id in doc_ids
+                if doc_id in self._rows
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._rows),
+                "rows": self._size,
+                "capacity": len(self._alive),
+                "categories": len(self._categories.codes),
+                "brands": len(self._brands.codes),
+            }
+
+    @classmethod
+    def build(cls, documents: List[Dict[str, Any]]) -> "ProductCatalog":
+        """Load products that carry their ID in "id" """
+        catalog = cls()
+        for position, document in enumerate(documents):
+            catalog.add(str(document.get("id", position)), document)
+        return catalog
+
+
+class CollectionProductCatalog(CollectionSync, ProductCatalog):
+    """ProductCatalog kept in sync with a Firestore collection"""
+
+    def __init__(
+        self, firebase, collection_name: str, refresh_seconds: Optional[float] = None
+    ):
+        super().__init__()
+        self._init_sync(firebase, collection_name, refresh_seconds)
+
+    def _empty_copy(self) -> ProductCatalog:
+        return ProductCatalog()
+
+    def _adopt(self, fresh: ProductCatalog) -> None:
+        self.__dict__.update(
+            {key: value for key, value in fresh.__dict__.items() if key != "_lock"}
+        )
+
+    def query(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        self.ensure_loaded()
+        return super().query(*args, **kwargs)
+
+    def facets(self, *args: Any, **kwargs: Any) -> Dict[str, Dict[str, int]]:
+        self.ensure_loaded()
+        return super().facets(*args, **kwargs)
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        self.ensure_loaded()
+        return super().get_many(doc_ids)
+
+
+_catalogs: Dict[Tuple[int, str], CollectionProductCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_product_catalog(
+    collection_name: str = "products", firebase=None
+) -> CollectionProductCatalog:
+    """
+    Get the process-wide columnar catalog for a product collection
+
+    Args:
+        collection_name (str): Product collection
+        firebase (FirebaseUtils, optional): Data source; defaults to
+            get_firebase(). Each instance gets its own catalog.
+
+    Returns:
+        CollectionProductCatalog: Shared catalog, loaded lazily on first query
+    """
+    if firebase is None:
+        firebase = get_firebase()
+
+    key = (id(firebase), collection_name)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None or catalog.firebase is not firebase:
+            catalog = CollectionProductCatalog(firebase, collection_name)
+            _catalogs[key] = catalog
+        return catalog
@@ -0,0 +1,377 @@
+"""
+Listing query planner for RetailGenie
+Endpoints describe a listing's filters, sort and limit; the planner pushes
+what the backend can evaluate into the query, and finishes the rest in
+process with a bounded heap instead of sorting whole collections
+"""
+
+import hashlib
+import heapq
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.firebase_utils import (
+    Filters,
+    FirebaseUtils,
+    _decode_page_token,
+    _encode_page_token,
+    _normalize_fields,
+    _project,
+)
+from app.utils.mock_store import RANGE_OPERATORS, sort_key
+
+Filter = Tuple[str, str, Any]
+
+# Operators Firestore only allows on one field per query
+INEQUALITY_OPERATORS = RANGE_OPERATORS | {"!=", "not-in"}
+
+# Firestore allows at most one filter from each of these groups per query
+EXCLUSIVE_OPERATOR_GROUPS = (
+    {"in", "array-contains-any", "not-in"},
+    {"!=", "not-in"},
+    {"array-contains"},
+)
+
+STRATEGY_QUERY = "query"
+STRATEGY_STREAM_FILTER = "query + in-process filter"
+STRATEGY_HEAP = "stream + heap top-k"
+
+
+def matches_filter(document: Dict[str, Any], condition: Filter) -> bool:
+    """
+    Evaluate a (field, operator, value) filter the way Firestore does
+
+    Documents without the field never match, and range comparisons only
+    match values of the same type.
+    """
+    field, operator, value = condition
+    if field not in document:
+        return False
+    actual = document[field]
+    key = sort_key(actual)
+
+    if operator == "==":
+        return key == sort_key(value)
+    if operator == "!=":
+        return actual is not None and key != sort_key(value)
+    if operator in RANGE_OPERATORS:
+        bound = sort_key(value)
+        if key[0] != bound[0]:
+            return False
+        if operator == "<":
+            return key < bound
+        if operator == "<=":
+            return key <= bound
+        if operator == ">":
+            return key > bound
+        return key >= bound
+    if operator == "in":
+        return key in {sort_key(v) for v in value}
+    if operator == "not-in":
+        return actual is not None and key not in {sort_key(v) for v in value}
+    if operator in ("array-contains", "array-contains-any"):
+        if not isinstance(actual, list):
+            return False
+        wanted = [value] if operator == "array-contains" else value
+        items = {sort_key(item) for item in actual}
+        return any(sort_key(v) in items for v in wanted)
+    raise ValueError(f"Unsupported query operator: {operator}")
+
+
+class QueryPlan:
+    """How a ListingQuery is split between the backend and the process"""
+
+    def __init__(
+        self,
+        backend: str,
+        pushed_filters: List[Filter],
+        residual_filters: List[Filter],
+        sort_pushed: bool,
+        strategy: str,
+    ):
+        self.backend = backend
+        self.pushed_filters = pushed_filters
+        self.residual_filters = residual_filters
+        self.sort_pushed = sort_pushed
+        self.strategy = strategy
+
+
+class ListingQuery:
+    """
+    Declarative listing: filters, sort order and limit
+
+    Against Firestore, equality and membership filters are always pushed
+    into the query. Inequality filters are pushed for one field only (the
+    sort field if it has any), as Firestore requires; the others are
+    evaluated in process. If the pushed inequality is on another field,
+    Firestore can't also sort, so the matches are streamed and the top
+    limit is kept with a heap. In mock mode the indexed store evaluates
+    every filter and the sort itself.
+
+    A predicate covers conditions no backend can express (e.g. comparing
+    two fields); it is always evaluated in process while streaming.
+
+    As with get_documents_page(), documents without the sort field are
+    not listed.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        filters: Filters = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = 50,
+        fields: Optional[List[str]] = None,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        predicate_fields: Optional[List[str]] = None,
+        predicate_description: Optional[str] = None,
+    ):
+        self.collection_name = collection_name
+        self.filters = FirebaseUtils._normalize_filters(filters)
+        self.sort_by = sort_by
+        self.descending = descending
+        self.limit = max(1, limit) if limit is not None else None
+        self.fields = _normalize_fields(fields)
+        self.predicate = predicate
+        self.predicate_fields = list(predicate_fields or [])
+        self.predicate_description = predicate_description or (
+            "predicate" if predicate is not None else None
+        )
+
+    def plan(self, firebase: FirebaseUtils) -> QueryPlan:
+        """Decide which parts of the query the backend evaluates"""
+        if not firebase.db:
+            return QueryPlan(
+                "mock",
+                list(self.filters),
+                [],
+                True,
+                STRATEGY_STREAM_FILTER if self.predicate else STRATEGY_QUERY,
+            )
+
+        inequality_fields = [
+            f for f, op, _ in self.filters if op in INEQUALITY_OPERATORS
+        ]
+        if self.sort_by in inequality_fields:
+            range_field = self.sort_by
+        else:
+            range_field = inequality_fields[0] if inequality_fields else None
+
+        pushed: List[Filter] = []
+        residual: List[Filter] = []
+        used_groups = set()
+        for condition in self.filters:
+            field, operator, _ = condition
+            groups = {
+                position
+                for position, group in enumerate(EXCLUSIVE_OPERATOR_GROUPS)
+                if operator in group
+            }
+            if (operator in INEQUALITY_OPERATORS and field != range_field) or (
+                groups & used_groups
+            ):
+                residual.append(condition)
+            else:
+                pushed.append(condition)
+                used_groups |= groups
+
+        sort_pushed = self.sort_by is None or range_field in (None, self.sort_by)
+        if not sort_pushed:
+            strategy = STRATEGY_HEAP
+        elif residual or self.predicate:
+            strategy = STRATEGY_STREAM_FILTER
+        else:
+            strategy = STRATEGY_QUERY
+        return QueryPlan("firestore", pushed, residual, sort_pushed, strategy)
+
+    def explain(self, firebase: FirebaseUtils) -> Dict[str, Any]:
+        """
+        Describe the plan: what was pushed down and what runs in process
+
+        Returns:
+            Dict with the backend, strategy, and the pushed_down and
+            in_process parts (filters, sort and limit)
+        """
+        plan = self.plan(firebase)
+        sort = (
+            {"field": self.sort_by, "descending": self.descending}
+            if self.sort_by
+            else None
+        )
+        streamed = plan.strategy != STRATEGY_QUERY
+        return {
+            "collection": self.collection_name,
+            "backend": plan.backend,
+            "strategy": plan.strategy,
+            "pushed_down": {
+                "filters": [list(condition) for condition in plan.pushed_filters],
+                "sort": sort if plan.sort_pushed else None,
+                "limit": self.limit if not streamed else None,
+            },
+            "in_process": {
+                "filters": [list(condition) for condition in plan.residual_filters],
+                "predicate": self.predicate_description,
+                "sort": sort if not plan.sort_pushed else None,
+                "limit": self.limit if streamed else None,
+            },
+        }
+
+    def _residual_check(
+        self, plan: QueryPlan
+    ) -> Optional[Callable[[Dict[str, Any]], bool]]:
+        conditions = plan.residual_filters
+        predicate = self.predicate
+        if not conditions and predicate is None:
+            return None
+
+        def check(document: Dict[str, Any]) -> bool:
+            if not all(matches_filter(document, condition) for condition in conditions):
+                return False
+            return predicate is None or predicate(document)
+
+        return check
+
+    def execute(
+        self,
+        firebase: FirebaseUtils,
+        page_token: Optional[str] = None,
+        include_total: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Run the query
+
+        Args:
+            firebase (FirebaseUtils): Data source
+            page_token (str, optional): next_page_token from the previous page
+            include_total (bool): Also return the number of matching
+                documents (not available when a predicate or residual
+                filter runs while streaming)
+
+        Returns:
+            Dict containing documents and pagination info, in the same shape
+            as FirebaseUtils.get_documents_page()
+
+        Raises:
+            ValueError: If page_token is malformed or belongs to another query
+        """
+        plan = self.plan(firebase)
+        check = self._residual_check(plan)
+        check_fields = [f for f, _, _ in plan.residual_filters] + self.predicate_fields
+
+        if plan.sort_pushed and self.limit is not None:
+            return firebase.get_documents_page(
+                self.collection_name,
+                page_size=self.limit,
+                order_by=self.sort_by,
+                descending=self.descending,
+                filters=plan.pushed_filters,
+                page_token=page_token,
+                include_total=include_total,
+                predicate=check,
+                fields=self.fields,
+                predicate_fields=check_fields,
+            )
+        return self._execute_streaming(
+            firebase, plan, check, check_fields, page_token, include_total
+        )
+
+    def _execute_streaming(
+        self,
+        firebase: FirebaseUtils,
+        plan: QueryPlan,
+        check: Optional[Callable[[Dict[str, Any]], bool]],
+        check_fields: List[str],
+        page_token: Optional[str],
+        include_total: bool,
+    ) -> Dict[str, Any]:
+        """Stream the pushed-down query, keeping the top limit with a heap"""
+        fingerprint = hashlib.sha1(
+            repr(
+                (
+                    "listing",
+                    self.collection_name,
+                    self.filters,
+                    self.sort_by,
+                    self.descending,
+                )
+            ).encode()
+        ).hexdigest()[:16]
+        cursor = _decode_page_token(page_token, fingerprint) if page_token else None
+        read_fields = (
+            _normalize_fields(self.fields + [self.sort_by or ""] + check_fields)
+            if self.fields is not None
+            else None
+        )
+
+        def order_key(document: Dict[str, Any]) -> Tuple:
+            if self.sort_by is None:
+                return (document["id"],)
+            return (sort_key(document.get(self.sort_by)), document["id"])
+
+        cursor_key = None
+        if cursor is not None:
+            cursor_key = (
+                (cursor[1],)
+                if self.sort_by is None
+                else (sort_key(cursor[0]), cursor[1])
+            )
+
+        def candidates() -> Iterable[Dict[str, Any]]:
+            for document in firebase.iter_documents(
+                self.collection_name,
+                filters=plan.pushed_filters,
+                order_by=self.sort_by if plan.sort_pushed else None,
+                descending=self.descending if plan.sort_pushed else False,
+                fields=read_fields,
+            ):
+                if self.sort_by is not None and self.sort_by not in document:
+                    continue
+                if check is not None and not check(document):
+                    continue
+                if cursor_key is not None:
+                    key = order_key(document)
+                    if (key >= cursor_key) if self.descending else (key <= cursor_key):
+                        continue
+                yield document
+
+        total = 0
+        if self.limit is None:
+            documents = list(candidates())
+            total = len(documents)
+            if not plan.sort_pushed:
+                documents.sort(key=order_key, reverse=self.descending)
+            more = False
+        else:
+
+            def counted() -> Iterable[Dict[str, Any]]:
+                nonlocal total
+                for document in candidates():
+                    total += 1
+                    yield document
+
+            select = heapq.nlargest if self.descending else heapq.nsmallest
+            documents = select(self.limit + 1, counted(), key=order_key)
+            more = len(documents) > self.limit
+            documents = documents[: self.limit]
+
+        next_page_token = None
+        if more and documents:
+            last = documents[-1]
+            next_page_token = _encode_page_token(
+                fingerprint,
+                (last.get(self.sort_by) if self.sort_by else last["id"], last["id"]),
+            )
+
+        pagination: Dict[str, Any] = {
+            "page_size": self.limit if self.limit is not None else len(documents),
+            "has_next": next_page_token is not None,
+            "next_page_token": next_page_token,
+        }
+        # Later pages skip the matches before their cursor, so only the
+        # first page has seen them all
+        if include_total and cursor is None:
+            pagination["total_documents"] = total
+
+        if read_fields != self.fields:
+            documents = [_project(document, self.fields) for document in documents]
+        return {"documents": documents, "pagination": pagination}
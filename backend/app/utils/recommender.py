@@ -0,0 +1,476 @@
+"""
+Batch recommendation scoring for RetailGenie
+Rule-based product scores computed for many users at once as array
+operations over a columnar product matrix
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.search_index import CollectionSync
+
+logger = logging.getLogger(__name__)
+
+# Default model: the weights of the original per-product scoring loop
+DEFAULT_WEIGHTS = {
+    "category": 15,  # Product in a preferred category
+    "price_range": 10,  # Price within the preferred range
+    "brand": 12,  # Favorite brand
+    "not_purchased": 5,  # Not bought before
+    "rating_high": 8,  # rating >= 4.0
+    "rating_good": 5,  # rating >= 3.5
+    "reviews_high": 6,  # review_count > 100
+    "reviews_some": 3,  # review_count > 50
+}
+
+DEFAULT_LIMIT = 15
+
+# Precomputed lists written by precompute_recommendations()
+RECOMMENDATIONS_COLLECTION = "recommendations"
+
+# Memory a batch of users may take while being scored
+# (RECOMMENDATION_BATCH_BYTES); the batch size follows from the catalog size
+BATCH_BYTES = 64 * 1024 * 1024
+
+# Peak bytes per (user, product) cell while scoring: the float32 score plus
+# the boolean rule masks alive at the same time
+_BYTES_PER_CELL = 8
+
+_INITIAL_CAPACITY = 64
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0.0
+    return float(value)
+
+
+def _purchased_ids(purchase_history: Iterable[Any]) -> List[str]:
+    """Product IDs from a list of IDs or of {product_id: ...} entries"""
+    ids = []
+    for entry in purchase_history or []:
+        if isinstance(entry, dict):
+            entry = entry.get("product_id")
+        if entry:
+            ids.append(str(entry))
+    return ids
+
+
+def preferences_from_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recommendation preferences for a user document
+
+    Args:
+        user (Dict[str, Any]): User with optional preferences (categories,
+            brands, price_range) and purchase_history
+
+    Returns:
+        Dict[str, Any]: Preferences in the shape generate_recommendations takes
+    """
+    preferences = dict(user.get("preferences") or {})
+    preferences["purchase_history"] = _purchased_ids(
+        preferences.get("purchase_history") or user.get("purchase_history")
+    )
+    return preferences
+
+
+class RecommendationScorer:
+    """
+    Scores products for users with vectorized rules
+
+    Products are held as columns (price, rating, review count and
+    category/brand codes), and the user-independent part of the score
+    (rating and popularity) is computed once per product. Scoring a batch
+    of U users fills a U x P float32 matrix in place from boolean masks for
+    the category, brand, price-range and purchase rules, and each user's
+    top k comes from a partial sort (np.partition) rather than sorting
+    every product. Large batches are split so that matrix stays within
+    BATCH_BYTES.
+
+    Products can be added, updated and removed in place; removed rows are
+    zeroed before ranking and compacted away once they pile up.
+    """
+
+    def __init__(
+        self,
+        products: Iterable[Dict[str, Any]] = (),
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self._lock = threading.RLock()
+        self._categories: Dict[Any, int] = {}
+        self._brands: Dict[Any, int] = {}
+        self._reset(_INITIAL_CAPACITY)
+        for position, product in enumerate(products):
+            self.add(str(product.get("id", position)), product)
+
+    def _reset(self, capacity: int) -> None:
+        self._size = 0
+        self._rows: Dict[str, int] = {}
+        self.products: List[Optional[Dict[str, Any]]] = []
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._category = np.zeros(capacity, dtype=np.int64)
+        self._brand = np.zeros(capacity, dtype=np.int64)
+        self._price = np.zeros(capacity)
+        self._base = np.zeros(capacity, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, doc_id: str, product: Dict[str, Any]) -> None:
+        """Store a product, replacing any previous version"""
+        with self._lock:
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._append_row()
+                self._rows[doc_id] = row
+            stored = dict(product)
+            stored["id"] = doc_id
+            self.products[row] = stored
+
+            w = self.weights
+            rating = _number(stored.get("rating", 0))
+            reviews = _number(stored.get("review_count", 0))
+            # Rating and popularity don't depend on the user
+            base = (
+                w["rating_high"]
+                if rating >= 4.0
+                else w["rating_good"] if rating >= 3.5 else 0
+            )
+            base += (
+                w["reviews_high"]
+                if reviews > 100
+                else w["reviews_some"] if reviews > 50 else 0
+            )
+
+            self._alive[row] = True
+            self._category[row] = self._encode(self._categories, stored.get("category"))
+            self._brand[row] = self._encode(self._brands, stored.get("brand"))
+            self._price[row] = _number(stored.get("price", 0))
+            self._base[row] = base
+
+    def update(self, doc_id: str, changes: Dict[str, Any]) -> bool:
+        """
+        Apply a partial product update
+
+        Returns:
+            bool: False if the product isn't in the scorer
+        """
+        with self._lock:
+            row = self._rows.get(doc_id)
+            if row is None:
+                return False
+            self.add(doc_id, {**self.products[row], **changes})
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a product; returns False if it wasn't in the scorer"""
+        with self._lock:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                return False
+            self.products[row] = None
+            self._alive[row] = False
+            if self._size - len(self._rows) > max(self._size // 2, _INITIAL_CAPACITY):
+                self._compact()
+            return True
+
+    def _append_row(self) -> int:
+        capacity = len(self._alive)
+        if self._size == capacity:
+            self._resize(capacity * 2)
+        self.products.append(None)
+        self._size += 1
+        return self._size - 1
+
+    def _resize(self, capacity: int) -> None:
+        def grow(array: np.ndarray) -> np.ndarray:
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[: len(array)] = array[:capacity]
+            return grown
+
+        self._alive = grow(self._alive)
+        self._category = grow(self._category)
+        self._brand = grow(self._brand)
+        self._price = grow(self._price)
+        self._base = grow(self._base)
+
+    def _compact(self) -> None:
+        products = [product for product in self.products if product is not None]
+        self._reset(max(_INITIAL_CAPACITY, len(products) * 2))
+        for product in products:
+            self.add(product["id"], product)
+
+    def users_per_batch(self, memory_bytes: Optional[int] = None) -> int:
+        """How many users can be scored at once within a memory budget"""
+        if memory_bytes is None:
+            memory_bytes = int(os.getenv("RECOMMENDATION_BATCH_BYTES", BATCH_BYTES))
+        return max(1, memory_bytes // (max(self._size, 1) * _BYTES_PER_CELL))
+
+    @staticmethod
+    def _encode(codes: Dict[Any, int], value: Any) -> int:
+        """Dictionary-encode a field value (unhashable values share one code)"""
+        if isinstance(value, (list, dict, set)):
+            value = repr(value)
+        return codes.setdefault(value, len(codes))
+
+    @staticmethod
+    def _membership(
+        codes: Dict[Any, int], values_per_user: List[Iterable[Any]]
+    ) -> np.ndarray:
+        """U x len(codes) matrix of which codes each user prefers"""
+        matrix = np.zeros((len(values_per_user), len(codes)), dtype=bool)
+        for user, values in enumerate(values_per_user):
+            for value in values or []:
+                code = (
+                    codes.get(value)
+                    if not isinstance(value, (list, dict, set))
+                    else None
+                )
+                if code is not None:
+                    matrix[user, code] = True
+        return matrix
+
+    def score(self, preferences: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Score every product for every user
+
+        Args:
+            preferences (List[Dict[str, Any]]): Per user: categories,
+                brands, price_range {min, max} and purchase_history
+
+        Returns:
+            np.ndarray: U x P float32 score matrix, one column per row
+                (removed rows score 0)
+        """
+        with self._lock:
+            users, size = len(preferences), self._size
+            w = self.weights
+
+            scores = np.empty((users, size), dtype=np.float32)
+            scores[:] = self._base[:size]
+            categories = self._membership(
+                self._categories, [p.get("categories", []) for p in preferences]
+            )
+            np.add(
+                scores,
+                w["category"],
+                out=scores,
+                where=categories[:, self._category[:size]],
+            )
+            brands = self._membership(
+                self._brands, [p.get("brands", []) for p in preferences]
+            )
+            np.add(scores, w["brand"], out=scores, where=brands[:, self._brand[:size]])
+
+            ranges = [p.get("price_range") or {} for p in preferences]
+            min_price = np.array([_number(r.get("min", 0)) for r in ranges])[:, None]
+            max_price = np.array(
+                [_number(r["max"]) if "max" in r else np.inf for r in ranges]
+            )[:, None]
+            in_range = self._price[:size] >= min_price
+            in_range &= self._price[:size] <= max_price
+            np.add(scores, w["price_range"], out=scores, where=in_range)
+            del in_range
+
+            not_purchased = np.ones((users, size), dtype=bool)
+            for user, prefs in enumerate(preferences):
+                ids = _purchased_ids(prefs.get("purchase_history"))
+                not_purchased[user, [self._rows[i] for i in ids if i in self._rows]] = (
+                    False
+                )
+            np.add(scores, w["not_purchased"], out=scores, where=not_purchased)
+            del not_purchased
+
+            if size > len(self._rows):
+                # Removed products never rank (_top only keeps positive scores)
+                scores[:, ~self._alive[:size]] = 0
+            return scores
+
+    def _top(self, scores: np.ndarray, limit: int) -> np.ndarray:
+        """Rows of the top positive scores, highest first, ties in product order"""
+        candidates = int((scores > 0).sum())
+        k = min(limit, candidates)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        threshold = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[: k - len(above)]
+        rows = np.concatenate([above, tied])
+        return rows[np.lexsort((rows, -scores[rows]))]
+
+    def recommend_batch(
+        self, preferences: List[Dict[str, Any]], limit: int = DEFAULT_LIMIT
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Top recommendations for many users
+
+        Returns:
+            List[List[Dict[str, Any]]]: Per user, product copies with
+                recommendation_score, best first
+        """
+        if not preferences or not len(self):
+            return [[] for _ in preferences]
+
+        results = []
+        step = self.users_per_batch()
+        for start in range(0, len(preferences), step):
+            with self._lock:
+                for row_scores in self.score(preferences[start : start + step]):
+                    ranked = []
+                    for row in self._top(row_scores, limit):
+                        product = dict(self.products[row])
+                        # Rounded off float32 noise; integral scores stay
+                        # ints, as the per-product loop returned
+                        score = round(float(row_scores[row]), 4)
+                        product["recommendation_score"] = (
+                            int(score) if score.is_integer() else score
+                        )
+                        ranked.append(product)
+                    results.append(ranked)
+        return results
+
+    def recommend(
+        self, preferences: Dict[str, Any], limit: int = DEFAULT_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """Top recommendations for one user"""
+        return self.recommend_batch([preferences], limit)[0]
+
+
+class CollectionRecommendationScorer(CollectionSync, RecommendationScorer):
+    """RecommendationScorer kept in sync with a Firestore product collection"""
+
+    def __init__(
+        self, firebase, collection_name: str, refresh_seconds: Optional[float] = None
+    ):
+        super().__init__()
+        self._init_sync(firebase, collection_name, refresh_seconds)
+
+    def _empty_copy(self) -> RecommendationScorer:
+        return RecommendationScorer(weights=self.weights)
+
+    def _adopt(self, fresh: RecommendationScorer) -> None:
+        self.__dict__.update(
+            {key: value for key, value in fresh.__dict__.items() if key != "_lock"}
+        )
+
+    def recommend_batch(
+        self, preferences: List[Dict[str, Any]], limit: int = DEFAULT_LIMIT
+    ) -> List[List[Dict[str, Any]]]:
+        self.ensure_loaded()
+        return super().recommend_batch(preferences, limit)
+
+
+_scorers: Dict[Tuple[int, str], CollectionRecommendationScorer] = {}
+_scorers_lock = threading.Lock()
+
+
+def get_recommendation_scorer(
+    collection_name: str = "products", firebase=None
+) -> CollectionRecommendationScorer:
+    """
+    Get the process-wide recommendation scorer for a product collection
+
+    Args:
+        collection_name (str): Product collection
+        firebase (FirebaseUtils, optional): Data source; defaults to
+            get_firebase(). Each instance gets its own scorer.
+
+    Returns:
+        CollectionRecommendationScorer: Shared scorer, loaded lazily on
+            first use
+    """
+    if firebase is None:
+        from app.utils.firebase_utils import get_firebase
+
+        firebase = get_firebase()
+
+    key = (id(firebase), collection_name)
+    with _scorers_lock:
+        scorer = _scorers.get(key)
+        if scorer is None or scorer.firebase is not firebase:
+            scorer = CollectionRecommendationScorer(firebase, collection_name)
+            _scorers[key] = scorer
+        return scorer
+
+
+def precompute_recommendations(
+    firebase,
+    limit: int = DEFAULT_LIMIT,
+    batch_size: Optional[int] = None,
+    weights: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Score all active users and store their recommendation lists
+
+    Users are streamed and scored batch_size at a time. Each user's list
+    is written to the recommendations collection under their user ID as
+    product IDs and scores.
+
+    Args:
+        firebase (FirebaseUtils): Data source
+        limit (int): Recommendations per user
+        batch_size (int, optional): Users scored and written per batch
+            (defaults to as many as fit in RECOMMENDATION_BATCH_BYTES)
+        weights (Dict[str, float], optional): Overrides of DEFAULT_WEIGHTS
+
+    Returns:
+        Dict with users processed, products scored, write failures and duration
+    """
+    started = time.perf_counter()
+    scorer = RecommendationScorer(list(firebase.iter_documents("products")), weights)
+    batch_size = batch_size or scorer.users_per_batch()
+    generated_at = datetime.now(timezone.utc).isoformat()
+    users_processed = 0
+    failed = 0
+
+    def flush(batch: List[Dict[str, Any]]) -> int:
+        recommendations = scorer.recommend_batch(
+            [preferences_from_user(user) for user in batch], limit
+        )
+        operations = [
+            {
+                "type": "set",
+                "collection": RECOMMENDATIONS_COLLECTION,
+                "document_id": user["id"],
+                "data": {
+                    "user_id": user["id"],
+                    "products": [
+                        {"id": p.get("id"), "score": p["recommendation_score"]}
+                        for p in products
+                    ],
+                    "weights": scorer.weights,
+                    "generated_at": generated_at,
+                },
+            }
+            for user, products in zip(batch, recommendations)
+        ]
+        return firebase.bulk_write(operations).get("failed", 0)
+
+    batch: List[Dict[str, Any]] = []
+    for user in firebase.iter_documents("users"):
+        if not user.get("is_active", True):
+            continue
+        batch.append(user)
+        if len(batch) == batch_size:
+            failed += flush(batch)
+            users_processed += len(batch)
+            batch = []
+    if batch:
+        failed += flush(batch)
+        users_processed += len(batch)
+
+    summary = {
+        "users": users_processed,
+        "products": len(scorer),
+        "failed": failed,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(f"Precomputed recommendations: {summary}")
+    return summary
@@ -0,0 +1,215 @@
+"""
+Stale-while-revalidate result cache for RetailGenie
+Serves the last computed payload of expensive endpoints immediately,
+refreshes stale payloads in the background, and coalesces concurrent
+misses so each payload is computed once
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, value: Any, ttl: float, max_stale: float):
+        self.value = value
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.computed_at = time.monotonic()
+        self.computed_at_wall = datetime.now().isoformat()
+
+
+class ResultCache:
+    """
+    Stale-while-revalidate cache of computed results
+
+    A result younger than ttl is served as is. One older than ttl but
+    younger than max_stale is still served at once, and a single
+    background recomputation replaces it. Anything older, or missing, is
+    computed by the request; concurrent requests for the same key wait for
+    that one computation instead of starting their own. Failed
+    computations aren't cached (a failed background refresh keeps the
+    stale result). Entries are evicted least-recently-used past
+    max_entries.
+
+    ttl_for can shorten the life of particular results (e.g. partial
+    ones): it returns a TTL for a result, or None for the default. A
+    result with its own TTL isn't served stale past it.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        max_stale: float = 600.0,
+        max_entries: int = 256,
+        max_workers: int = 2,
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None,
+    ):
+        self.ttl = ttl
+        self.ttl_for = ttl_for
+        self.max_stale = max(max_stale, ttl)
+        self.max_entries = max(1, max_entries)
+        self.max_workers = max(1, max_workers)
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @classmethod
+    def from_env(
+        cls,
+        prefix: str = "ANALYTICS_CACHE",
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None,
+    ) -> "ResultCache":
+        """Build a cache from <prefix>_TTL/_MAX_STALE/_MAX_ENTRIES/_WORKERS"""
+        return cls(
+            ttl=float(os.getenv(f"{prefix}_TTL", "30")),
+            max_stale=float(os.getenv(f"{prefix}_MAX_STALE", "600")),
+            max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", "256")),
+            max_workers=int(os.getenv(f"{prefix}_WORKERS", "2")),
+            ttl_for=ttl_for,
+        )
+
+    def get(
+        self, key: Hashable, compute: Callable[[], Any], force: bool = False
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Get a result, computing or refreshing it as needed
+
+        Args:
+            key (Hashable): Cache key; must cover every input of compute
+            compute (Callable[[], Any]): Computes the result (runs outside
+                the request context when refreshing in the background)
+            force (bool): Skip cached results and compute now (still
+                coalesced with other computations of the key)
+
+        Returns:
+            Tuple of the result and its freshness: cache status ("hit",
+            "stale", "miss" or "coalesced"), computed_at, age_seconds,
+            ttl_seconds and revalidating
+
+        Raises:
+            Exception: Whatever compute raised, if the result had to be
+                computed for this request
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not force:
+                age = time.monotonic() - entry.computed_at
+                if age < entry.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value, self._freshness("hit", entry)
+                if age < entry.max_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    self._revalidate(key, compute)
+                    return entry.value, self._freshness("stale", entry)
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if owner:
+            self._compute(key, compute, future)
+        entry = future.result()
+        return entry.value, self._freshness("miss" if owner else "coalesced", entry)
+
+    def _revalidate(self, key: Hashable, compute: Callable[[], Any]) -> None:
+        """Start a background recomputation unless one is running (lock held)"""
+        if key in self._inflight:
+            return
+        future = self._inflight[key] = Future()
+        self.refreshes += 1
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="result-cache"
+            )
+        self._executor.submit(self._compute, key, compute, future)
+
+    def _compute(
+        self, key: Hashable, compute: Callable[[], Any], future: Future
+    ) -> None:
+        try:
+            entry = self._entry(compute())
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if key in self._entries:
+                    self.refresh_failures += 1
+            logger.warning(f"Computing cached result {key!r} failed: {e}")
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(entry)
+
+    def _entry(self, value: Any) -> _Entry:
+        ttl = self.ttl_for(value) if self.ttl_for is not None else None
+        if ttl is None:
+            return _Entry(value, self.ttl, self.max_stale)
+        return _Entry(value, ttl, ttl)
+
+    def _freshness(self, status: str, entry: _Entry) -> Dict[str, Any]:
+        age = time.monotonic() - entry.computed_at
+        return {
+            "status": status,
+            "computed_at": entry.computed_at_wall,
+            "age_seconds": round(age, 3),
+            "ttl_seconds": entry.ttl,
+            "revalidating": status == "stale",
+        }
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one cached result, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "max_stale_seconds": self.max_stale,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (
+                    round((self.hits + self.stale_hits) / lookups, 4)
+                    if lookups
+                    else 0.0
+                ),
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "inflight": len(self._inflight),
+            }
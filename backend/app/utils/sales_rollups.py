@@ -0,0 +1,279 @@
+"""
+Daily sales rollups for RetailGenie
+Per-day units, revenue and order counts per product, per store and for
+the whole business, kept up to date as orders are created so forecasts
+and analytics read a fixed number of small documents instead of every sale
+"""
+
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One document per (scope, key, day)
+ROLLUPS_COLLECTION = "sales_daily"
+
+SCOPE_PRODUCT = "product"
+SCOPE_STORE = "store"
+SCOPE_ALL = "all"
+ALL_KEY = "all"
+
+METRICS = ("units", "revenue", "orders")
+
+
+def rollup_id(scope: str, key: str, day: str) -> str:
+    """Document ID of a rollup, e.g. product__p1__2026-01-02"""
+    return f"{scope}__{key}__{day}"
+
+
+def order_day(order: Dict[str, Any]) -> Optional[str]:
+    """YYYY-MM-DD of an order's created_at, or None if it has none"""
+    created_at = order.get("created_at")
+    if isinstance(created_at, datetime):
+        return created_at.date().isoformat()
+    if not isinstance(created_at, str) or not created_at:
+        return None
+    try:
+        return (
+            datetime.fromisoformat(created_at.replace("Z", "+00:00")).date().isoformat()
+        )
+    except ValueError:
+        return None
+
+
+def _number(value: Any, default: float = 0) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return default
+    return value
+
+
+def order_rollups(
+    order: Dict[str, Any]
+) -> Dict[Tuple[str, str, str], Dict[str, float]]:
+    """
+    Rollup increments for one order
+
+    Args:
+        order (Dict[str, Any]): Order with items, created_at and optionally
+            store_id
+
+    Returns:
+        Dict mapping (scope, key, day) to {metric: amount}; empty for orders
+        without a usable created_at
+    """
+    day = order_day(order)
+    if day is None:
+        return {}
+
+    units = 0
+    revenue = 0
+    products: Dict[str, Dict[str, float]] = {}
+    for item in order.get("items") or []:
+        if not isinstance(item, dict):
+            continue
+        quantity = _number(item.get("quantity"), 1)
+        amount = _number(item.get("price")) * quantity
+        units += quantity
+        revenue += amount
+        product_id = item.get("product_id")
+        if product_id:
+            totals = products.setdefault(
+                str(product_id), {"units": 0, "revenue": 0, "orders": 1}
+            )
+            totals["units"] += quantity
+            totals["revenue"] += amount
+
+    revenue = _number(order.get("total"), revenue)
+    rollups = {
+        (SCOPE_ALL, ALL_KEY, day): {"units": units, "revenue": revenue, "orders": 1}
+    }
+    if order.get("store_id"):
+        rollups[(SCOPE_STORE, str(order["store_id"]), day)] = {
+            "units": units,
+            "revenue": revenue,
+            "orders": 1,
+        }
+    for product_id, totals in products.items():
+        rollups[(SCOPE_PRODUCT, product_id, day)] = totals
+    return rollups
+
+
+def _documents(
+    rollups: Dict[Tuple[str, str, str], Dict[str, float]]
+) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, Any]]]:
+    """Split rollups into per-document increments and identifying fields"""
+    increments, fields = {}, {}
+    for (scope, key, day), metrics in rollups.items():
+        doc_id = rollup_id(scope, key, day)
+        increments[doc_id] = metrics
+        fields[doc_id] = {"scope": scope, "key": key, "date": day}
+    return increments, fields
+
+
+def record_order(firebase, order: Dict[str, Any]) -> bool:
+    """
+    Add a new order to the daily rollups
+
+    Called once per created order; the increments are atomic, so
+    concurrent orders for the same day never lose updates.
+
+    Returns:
+        bool: Whether the rollups were updated
+    """
+    rollups = order_rollups(order)
+    if not rollups:
+        return False
+    increments, fields = _documents(rollups)
+    return firebase.increment_documents(ROLLUPS_COLLECTION, increments, fields)
+
+
+def backfill_sales_rollups(
+    firebase, orders: Optional[Iterable[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Recompute the daily rollups from order history
+
+    Every rollup touched by an order is overwritten with totals summed over
+    all orders, so the job is safe to re-run. Orders created while it runs
+    may be missed; run it when order creation is quiet (or re-run it).
+
+    Args:
+        firebase (FirebaseUtils): Data source
+        orders (Iterable[Dict[str, Any]], optional): Orders to roll up
+            (defaults to streaming the orders collection)
+
+    Returns:
+        Dict with the orders read, rollups written, failures and duration
+    """
+    started = time.perf_counter()
+    if orders is None:
+        orders = firebase.iter_documents(
+            "orders", fields=["items", "total", "store_id", "created_at"]
+        )
+
+    totals: Dict[Tuple[str, str, str], Dict[str, float]] = defaultdict(
+        lambda: dict.fromkeys(METRICS, 0)
+    )
+    order_count = 0
+    for order in orders:
+        order_count += 1
+        for rollup, metrics in order_rollups(order).items():
+            for metric, amount in metrics.items():
+                totals[rollup][metric] += amount
+
+    increments, fields = _documents(totals)
+    failed = 0
+    if increments:
+        failed = firebase.bulk_write(
+            [
+                {
+                    "type": "set",
+                    "collection": ROLLUPS_COLLECTION,
+                    "document_id": doc_id,
+                    "data": {**fields[doc_id], **metrics},
+                }
+                for doc_id, metrics in increments.items()
+            ]
+        ).get("failed", 0)
+
+    summary = {
+        "orders": order_count,
+        "rollups_written": len(increments) - failed,
+        "failed": failed,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(f"Sales rollups backfilled: {summary}")
+    return summary
+
+
+def daily_series(
+    firebase,
+    scope: str,
+    key: str = ALL_KEY,
+    days: int = 30,
+    end: Optional[date] = None,
+    metric: str = "units",
+) -> List[float]:
+    """
+    A metric per day over a fixed window, oldest first
+
+    Reads exactly one rollup document per day (in batched reads), however
+    many orders those days had. Days without sales are 0.
+
+    Args:
+        firebase (FirebaseUtils): Data source
+        scope (str): SCOPE_PRODUCT, SCOPE_STORE or SCOPE_ALL
+        key (str): Product or store ID (ALL_KEY for SCOPE_ALL)
+        days (int): Length of the window
+        end (date, optional): Last day of the window (defaults to today)
+        metric (str): units, revenue or orders
+
+    Returns:
+        List[float]: days values
+    """
+    return daily_window(firebase, scope, key, days, end)[metric]
+
+
+def daily_window(
+    firebase,
+    scope: str,
+    key: str = ALL_KEY,
+    days: int = 30,
+    end: Optional[date] = None,
+) -> Dict[str, List]:
+    """
+    Every metric per day over a fixed window, oldest first
+
+    Returns:
+        Dict with "dates" and a list per metric, each days long
+    """
+    end = end or datetime.now().date()
+    dates = [
+        (end - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)
+    ]
+    found = firebase.get_documents_by_ids(
+        ROLLUPS_COLLECTION, [rollup_id(scope, key, day) for day in dates]
+    )
+    window: Dict[str, List] = {"dates": dates}
+    for metric in METRICS:
+        window[metric] = [
+            (found.get(rollup_id(scope, key, day)) or {}).get(metric, 0)
+            for day in dates
+        ]
+    return window
+
+
+def top_keys(
+    firebase,
+    scope: str,
+    start: date,
+    end: Optional[date] = None,
+    metric: str = "revenue",
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    """
+    Keys of a scope (e.g. products) with the highest totals over a range
+
+    Scans one rollup per key and day with sales in the range, not the
+    orders behind them.
+
+    Returns:
+        List of {"key", "units", "revenue", "orders"} dicts, best first
+    """
+    end = end or datetime.now().date()
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+    for rollup in firebase.iter_documents(
+        ROLLUPS_COLLECTION,
+        filters=[
+            ("scope", "==", scope),
+            ("date", ">=", start.isoformat()),
+            ("date", "<=", end.isoformat()),
+        ],
+    ):
+        for name in METRICS:
+            totals[rollup["key"]][name] += _number(rollup.get(name))
+    ranked = sorted(totals.items(), key=lambda item: (-item[1][metric], item[0]))
+    return [{"key": key, **metrics} for key, metrics in ranked[:limit]]
@@ -0,0 +1,487 @@
+"""
+Inverted-index product search for RetailGenie
+Per-field postings with BM25 scoring, top-k retrieval and incremental
+updates, so search cost tracks the number of matching products rather
+than the size of the catalog
+"""
+
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.fuzzy_index import TrigramIndex
+
+logger = logging.getLogger(__name__)
+
+# Relevance weight of a match in each field (same weights the old
+# substring search used)
+FIELD_WEIGHTS = {"name": 10.0, "description": 5.0, "category": 3.0, "tags": 2.0}
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercase alphanumeric tokens of a string, or of each string in a list"""
+    if text is None:
+        return []
+    if isinstance(text, (list, tuple, set)):
+        return [token for item in text for token in tokenize(item)]
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+class SearchIndex:
+    """
+    In-memory inverted index with BM25 field scoring
+
+    Each field keeps postings {term: {doc_id: term_frequency}} and per-
+    document field lengths. A query's score for a document is the sum over
+    query terms and fields of weight(field) * BM25(term, field), so only
+    documents appearing in a query term's postings are ever scored.
+
+    The vocabulary is also kept in a TrigramIndex, so correct_query() can
+    map misspelled query terms to the closest indexed terms.
+    """
+
+    def __init__(
+        self,
+        field_weights: Optional[Dict[str, float]] = None,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+    ):
+        self.field_weights = dict(field_weights or FIELD_WEIGHTS)
+        self.k1 = k1
+        self.b = b
+
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, Dict[str, int]]] = {
+            field: {} for field in self.field_weights
+        }
+        self._lengths: Dict[str, Dict[str, int]] = {
+            field: {} for field in self.field_weights
+        }
+        self._total_lengths: Dict[str, int] = {field: 0 for field in self.field_weights}
+        # term -> number of fields it occurs in, and the trigrams of those terms
+        self._term_fields: Dict[str, int] = {}
+        self._trigrams = TrigramIndex()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._documents
+
+    def add(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """Index a document, replacing any previous version with the same ID"""
+        with self._lock:
+            self.remove(doc_id)
+            stored = dict(document)
+            stored["id"] = doc_id
+            self._documents[doc_id] = stored
+
+            for field in self.field_weights:
+                tokens = tokenize(stored.get(field))
+                if not tokens:
+                    continue
+                self._lengths[field][doc_id] = len(tokens)
+                self._total_lengths[field] += len(tokens)
+                postings = self._postings[field]
+                for token in tokens:
+                    term_postings = postings.get(token)
+                    if term_postings is None:
+                        term_postings = postings[token] = {}
+                        self._add_term(token)
+                    term_postings[doc_id] = term_postings.get(doc_id, 0) + 1
+
+    def update(self, doc_id: str, changes: Dict[str, Any]) -> bool:
+        """
+        Apply a partial update to an indexed document
+
+        Returns:
+            bool: False if the document isn't indexed
+        """
+        with self._lock:
+            current = self._documents.get(doc_id)
+            if current is None:
+                return False
+            merged = dict(current)
+            merged.update(changes)
+            self.add(doc_id, merged)
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a document from the index; returns False if it wasn't indexed"""
+        with self._lock:
+            document = self._documents.pop(doc_id, None)
+            if document is None:
+                return False
+
+            for field in self.field_weights:
+                length = self._lengths[field].pop(doc_id, 0)
+                if not length:
+                    continue
+                self._total_lengths[field] -= length
+                postings = self._postings[field]
+                for token in set(tokenize(document.get(field))):
+                    term_postings = postings.get(token)
+                    if term_postings is None:
+                        continue
+                    term_postings.pop(doc_id, None)
+                    if not term_postings:
+                        del postings[token]
+                        self._drop_term(token)
+            return True
+
+    def _add_term(self, term: str) -> None:
+        count = self._term_fields.get(term, 0)
+        self._term_fields[term] = count + 1
+        if not count:
+            self._trigrams.add(term)
+
+    def _drop_term(self, term: str) -> None:
+        count = self._term_fields.pop(term, 0) - 1
+        if count > 0:
+            self._term_fields[term] = count
+        else:
+            self._trigrams.remove(term)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+            for field in self.field_weights:
+                self._postings[field].clear()
+                self._lengths[field].clear()
+                self._total_lengths[field] = 0
+            self._term_fields.clear()
+            self._trigrams.clear()
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Copy of an indexed document"""
+        with self._lock:
+            document = self._documents.get(doc_id)
+            return dict(document) if document is not None else None
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        """
+        Rank documents for a query
+
+        Args:
+            query (str): Free-text query
+            limit (int): Number of results (top-k)
+
+        Returns:
+            List[Tuple[str, float]]: (doc_id, score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        if not terms or limit <= 0:
+            return []
+
+        with self._lock:
+            doc_count = len(self._documents)
+            if not doc_count:
+                return []
+
+            scores: Dict[str, float] = {}
+            for field, weight in self.field_weights.items():
+                postings = self._postings[field]
+                lengths = self._lengths[field]
+                avg_length = self._total_lengths[field] / doc_count or 1.0
+
+                for term in terms:
+                    term_postings = postings.get(term)
+                    if not term_postings:
+                        continue
+                    df = len(term_postings)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                    for doc_id, tf in term_postings.items():
+                        norm = self.k1 * (
+                            1 - self.b + self.b * lengths[doc_id] / avg_length
+                        )
+                        scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf * (
+                            tf * (self.k1 + 1) / (tf + norm)
+                        )
+
+        # Ties are broken by doc ID so results are stable
+        return heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+
+    def correct_query(self, query: str) -> str:
+        """
+        Rewrite a query with misspelled terms replaced by indexed ones
+
+        Terms already in the index are kept. Others become the indexed term
+        with the smallest edit distance (ties go to the term in more
+        documents), or are dropped if none is close enough.
+
+        Args:
+            query (str): Free-text query
+
+        Returns:
+            str: Corrected query terms joined by spaces
+        """
+        corrected = []
+        with self._lock:
+            for term in tokenize(query):
+                if term in self._term_fields:
+                    corrected.append(term)
+                    continue
+                matches = self._trigrams.lookup(term)
+                if matches:
+                    best = min(
+                        matches,
+                        key=lambda match: (
+                            match[1],
+                            -self._document_frequency(match[0]),
+                            match[0],
+                        ),
+                    )
+                    corrected.append(best[0])
+        return " ".join(corrected)
+
+    def _document_frequency(self, term: str) -> int:
+        return sum(len(postings.get(term, ())) for postings in self._postings.values())
+
+    def matching_ids(self, query: str) -> Set[str]:
+        """IDs of every document a query matches (the union of its postings)"""
+        matches: Set[str] = set()
+        terms = set(tokenize(query))
+        with self._lock:
+            for postings in self._postings.values():
+                for term in terms:
+                    matches.update(postings.get(term, ()))
+        return matches
+
+    def search_documents(
+        self, query: str, limit: int = 20, score_field: str = "relevance_score"
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank documents for a query and return copies with their score
+
+        Args:
+            query (str): Free-text query
+            limit (int): Number of results (top-k)
+            score_field (str): Key the score is stored under in each result
+
+        Returns:
+            List[Dict[str, Any]]: Matching documents, best first
+        """
+        results = []
+        for doc_id, score in self.search(query, limit):
+            document = self.get(doc_id)
+            if document is not None:  # Removed since it was ranked
+                document[score_field] = round(score, 4)
+                results.append(document)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "terms": {
+                    field: len(postings) for field, postings in self._postings.items()
+                },
+                "postings": {
+                    field: sum(len(docs) for docs in postings.values())
+                    for field, postings in self._postings.items()
+                },
+                "vocabulary": len(self._term_fields),
+            }
+
+    @classmethod
+    def build(cls, documents: Iterable[Dict[str, Any]], **kwargs: Any) -> "SearchIndex":
+        """Index documents that carry their ID in "id" """
+        index = cls(**kwargs)
+        for position, document in enumerate(documents):
+            index.add(str(document.get("id", position)), document)
+        return index
+
+
+class CollectionSync:
+    """
+    Mixin that keeps an in-memory index in sync with a Firestore collection
+
+    The collection is streamed into the index on first use, then kept
+    current from FirebaseUtils write notifications. Writes made by other
+    processes aren't seen, so the index is also rebuilt once it is older
+    than refresh_seconds (SEARCH_INDEX_REFRESH_SECONDS, 0 to disable).
+
+    Writes notified while a rebuild streams the collection are buffered
+    and replayed on the rebuilt index once it is swapped in, so they aren't
+    lost with the old index (replaying a write the stream already saw is
+    harmless: adds replace, updates merge and deletes are idempotent).
+
+    The index class provides add(), update(), remove(), a _lock, and
+    _empty_copy()/_adopt() to build a fresh index and swap its state in.
+    It may override _finish_copy() to complete the fresh index (e.g. sort
+    it) before the swap, outside the lock lookups wait on.
+    """
+
+    def _init_sync(
+        self, firebase, collection_name: str, refresh_seconds: Optional[float]
+    ) -> None:
+        self.firebase = firebase
+        self.collection_name = collection_name
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+        )
+        self._loaded_at: Optional[float] = None
+        self._load_lock = threading.Lock()
+        # Serializes applying writes with swapping in a rebuilt index;
+        # _pending buffers writes while a rebuild is running
+        self._write_lock = threading.RLock()
+        self._pending: Optional[List[Tuple[str, str, Optional[Dict[str, Any]]]]] = None
+        firebase.add_write_listener(collection_name, self._on_write)
+
+    def ensure_loaded(self) -> None:
+        """Build the index if it hasn't been built or has gone stale"""
+        loaded_at = self._loaded_at
+        if loaded_at is not None and (
+            self.refresh_seconds <= 0
+            or time.monotonic() - loaded_at < self.refresh_seconds
+        ):
+            return
+
+        with self._load_lock:
+            if self._loaded_at != loaded_at:
+                return  # Another thread rebuilt it meanwhile
+            self.reload()
+
+    def reload(self) -> None:
+        """Rebuild the index from the collection"""
+        started = time.perf_counter()
+        with self._write_lock:
+            self._pending = []
+        try:
+            fresh = self._empty_copy()
+            for document in self.firebase.iter_documents(self.collection_name):
+                fresh.add(document["id"], document)
+            self._finish_copy(fresh)
+        except Exception:
+            with self._write_lock:
+                pending, self._pending = self._pending or [], None
+                if self._loaded_at is not None:
+                    for write in pending:
+                        self._apply_write(*write)
+            raise
+
+        with self._write_lock:
+            with self._lock:
+                self._adopt(fresh)
+                self._loaded_at = time.monotonic()
+            pending, self._pending = self._pending, None
+            for write in pending:
+                self._apply_write(*write)
+
+        logger.info(
+            f"{type(self).__name__} for {self.collection_name}: {len(self)} "
+            f"documents in {(time.perf_counter() - started) * 1000:.0f} ms"
+            + (f", {len(pending)} writes replayed" if pending else "")
+        )
+
+    def _finish_copy(self, fresh: Any) -> None:
+        """Complete a freshly built index before it is swapped in"""
+
+    def _on_write(
+        self, op_type: str, document_id: str, data: Optional[Dict[str, Any]]
+    ) -> None:
+        with self._write_lock:
+            if self._pending is not None:
+                self._pending.append((op_type, document_id, data))
+            elif self._loaded_at is not None:
+                self._apply_write(op_type, document_id, data)
+            # Otherwise not built yet; the first lookup will load everything
+
+    def _apply_write(
+        self, op_type: str, document_id: str, data: Optional[Dict[str, Any]]
+    ) -> None:
+        if op_type == "delete":
+            self.remove(document_id)
+        elif op_type == "update":
+            if not self.update(document_id, data or {}):
+                document = self.firebase.get_document(self.collection_name, document_id)
+                if document:
+                    self.add(document_id, document)
+        else:
+            self.add(document_id, data or {})
+
+
+class CollectionSearchIndex(CollectionSync, SearchIndex):
+    """SearchIndex kept in sync with a Firestore collection"""
+
+    def __init__(
+        self,
+        firebase,
+        collection_name: str,
+        refresh_seconds: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self._init_sync(firebase, collection_name, refresh_seconds)
+
+    def _empty_copy(self) -> SearchIndex:
+        return SearchIndex(self.field_weights, self.k1, self.b)
+
+    def _adopt(self, fresh: SearchIndex) -> None:
+        self._documents = fresh._documents
+        self._postings = fresh._postings
+        self._lengths = fresh._lengths
+        self._total_lengths = fresh._total_lengths
+        self._term_fields = fresh._term_fields
+        self._trigrams = fresh._trigrams
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[str, float]]:
+        self.ensure_loaded()
+        return super().search(query, limit)
+
+    def matching_ids(self, query: str) -> Set[str]:
+        self.ensure_loaded()
+        return super().matching_ids(query)
+
+    def correct_query(self, query: str) -> str:
+        self.ensure_loaded()
+        return super().correct_query(query)
+
+
+_indexes: Dict[Tuple[int, str], CollectionSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_collection_search_index(
+    collection_name: str = "products", firebase=None
+) -> CollectionSearchIndex:
+    """
+    Get the process-wide search index for a collection
+
+    Args:
+        collection_name (str): Collection to index
+        firebase (FirebaseUtils, optional): Data source; defaults to
+            get_firebase(). Each instance gets its own index.
+
+    Returns:
+        CollectionSearchIndex: Shared index, built lazily on first search
+    """
+    if firebase is None:
+        # Imported here so SearchIndex itself has no Firebase dependency
+        from app.utils.firebase_utils import get_firebase
+
+        firebase = get_firebase()
+
+    key = (id(firebase), collection_name)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.firebase is not firebase:
+            index = CollectionSearchIndex(firebase, collection_name)
+            _indexes[key] = index
+        return index
@@ -0,0 +1,203 @@
+"""
+Concurrent section execution for RetailGenie dashboards
+Runs independent parts of a response on a bounded thread pool, each with
+a time budget, so a response takes as long as its slowest section rather
+than the sum of all of them, and a late section degrades instead of
+holding up the rest
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEGRADED_TIMEOUT = "timeout"
+DEGRADED_ERROR = "error"
+DEGRADED_DEPENDENCY = "dependency"
+DEGRADED_BUSY = "busy"
+
+
+class Section:
+    """
+    One part of a response
+
+    compute receives the values of the sections it depends on, in
+    depends_on order. budget is seconds from the start of the run (the
+    runner's default when None).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        compute: Callable[..., Any],
+        depends_on: Iterable[str] = (),
+        budget: Optional[float] = None,
+        default: Any = None,
+    ):
+        self.name = name
+        self.compute = compute
+        self.depends_on = tuple(depends_on)
+        self.budget = budget
+        self.default = default
+
+
+class SectionResults:
+    """Values of a run, with the sections that missed out and why"""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.degraded: Dict[str, str] = {}
+        self.timings_ms: Dict[str, float] = {}
+
+    @property
+    def degraded_sections(self) -> List[str]:
+        return sorted(self.degraded)
+
+
+class SectionRunner:
+    """
+    Runs sections concurrently on a shared, bounded thread pool
+
+    A section starts as soon as the sections it depends on have finished.
+    One that fails, or hasn't finished by its budget, is marked degraded
+    and its default is used; sections depending on it are degraded too.
+    Threads can't be interrupted, so a late section keeps its worker until
+    it returns, and its result is discarded. So that stragglers can't fill
+    the pool and make every later run queue past its budget, a section
+    isn't started again while its previous late run is still going, and
+    nothing is started while stragglers hold every worker; such sections
+    are degraded as busy straight away.
+    """
+
+    def __init__(self, max_workers: int = 4, default_budget: float = 5.0):
+        self.max_workers = max(1, max_workers)
+        self.default_budget = default_budget
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Late sections still holding a worker -> section name
+        self._stragglers: Dict[Future, str] = {}
+
+    @classmethod
+    def from_env(cls, prefix: str = "DASHBOARD_SECTION") -> "SectionRunner":
+        """Build a runner from <prefix>_WORKERS and <prefix>_BUDGET (seconds)"""
+        return cls(
+            max_workers=int(os.getenv(f"{prefix}_WORKERS", "4")),
+            default_budget=float(os.getenv(f"{prefix}_BUDGET", "5")),
+        )
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="section"
+                )
+            return self._executor
+
+    def _busy(self, section: Section) -> bool:
+        """Whether a section must not start because of stragglers"""
+        with self._lock:
+            return (
+                len(self._stragglers) >= self.max_workers
+                or section.name in self._stragglers.values()
+            )
+
+    def _straggle(self, future: Future, section: Section) -> None:
+        """Track a late section until its worker is free again"""
+        with self._lock:
+            self._stragglers[future] = section.name
+
+        def finished(done: Future) -> None:
+            with self._lock:
+                self._stragglers.pop(done, None)
+
+        future.add_done_callback(finished)
+
+    @property
+    def stragglers(self) -> List[str]:
+        """Names of late sections still running"""
+        with self._lock:
+            return sorted(self._stragglers.values())
+
+    @staticmethod
+    def _timed(compute: Callable[..., Any], args: List[Any]) -> Tuple[Any, float]:
+        started = time.perf_counter()
+        value = compute(*args)
+        return value, round((time.perf_counter() - started) * 1000, 1)
+
+    def run(self, sections: List[Section]) -> SectionResults:
+        """
+        Run sections and collect their values
+
+        Args:
+            sections (List[Section]): Sections with unique names
+
+        Returns:
+            SectionResults: values (defaults for degraded sections), the
+            degraded sections with their reason, and how long each section
+            that finished took
+        """
+        started = time.monotonic()
+        results = SectionResults()
+        pending = {section.name: section for section in sections}
+        running: Dict[Future, Section] = {}
+
+        def degrade(section: Section, reason: str) -> None:
+            results.degraded[section.name] = reason
+            results.values[section.name] = section.default
+
+        def deadline(section: Section) -> float:
+            budget = (
+                section.budget if section.budget is not None else self.default_budget
+            )
+            return started + budget
+
+        while pending or running:
+            for name, section in list(pending.items()):
+                if any(dep in results.degraded for dep in section.depends_on):
+                    del pending[name]
+                    degrade(section, DEGRADED_DEPENDENCY)
+                elif all(dep in results.values for dep in section.depends_on):
+                    del pending[name]
+                    if self._busy(section):
+                        degrade(section, DEGRADED_BUSY)
+                        continue
+                    args = [results.values[dep] for dep in section.depends_on]
+                    running[self._pool().submit(self._timed, section.compute, args)] = (
+                        section
+                    )
+
+            if not running:
+                # Whatever is left depends on sections that don't exist
+                for section in pending.values():
+                    degrade(section, DEGRADED_DEPENDENCY)
+                break
+
+            timeout = max(
+                0.0, min(deadline(s) for s in running.values()) - time.monotonic()
+            )
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                section = running.pop(future)
+                try:
+                    value, elapsed_ms = future.result()
+                except Exception as e:
+                    logger.warning(f"Section {section.name} failed: {e}")
+                    degrade(section, DEGRADED_ERROR)
+                    continue
+                results.values[section.name] = value
+                results.timings_ms[section.name] = elapsed_ms
+
+            now = time.monotonic()
+            for future, section in list(running.items()):
+                if now >= deadline(section):
+                    running.pop(future)
+                    if not future.cancel():
+                        self._straggle(future, section)
+                    logger.warning(f"Section {section.name} missed its deadline")
+                    degrade(section, DEGRADED_TIMEOUT)
+
+        return results
@@ -0,0 +1,531 @@
+"""
+Product substitute finder for RetailGenie
+Per-category sparse TF-IDF matrices with price, rating and brand features,
+scored for all candidates at once with vectorized operations
+"""
+
+import math
+import os
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+from app.utils.ann_index import LSHIndex
+from app.utils.search_index import CollectionSync
+
+# Similarity = weighted sum of these components (capped at 1.0), the same
+# weights the pairwise substitute scoring used
+SIMILARITY_WEIGHTS = {"price": 0.3, "brand": 0.2, "rating": 0.2, "text": 0.3}
+
+# Final score blend of similarity and user-preference score
+SIMILARITY_SHARE = 0.7
+PREFERENCE_SHARE = 0.3
+
+# Feature vector layout: hashed name/description terms, hashed brand,
+# and price and rating as angles (2 dims each)
+TEXT_DIM = 256
+BRAND_DIM = 16
+VECTOR_DIM = TEXT_DIM + BRAND_DIM + 4
+
+# Prices are compared on a log scale up to this value
+PRICE_SCALE = 10000.0
+
+# Fields substitute scoring reads; writes that change none of them leave
+# the category matrices alone
+SCORING_FIELDS = ("category", "name", "description", "price", "rating", "brand")
+
+# A category matrix is refitted (new vocabulary and IDF) once this share
+# of its rows has been replaced or removed since it was built
+REFIT_FRACTION = 0.2
+
+# Categories at least this large are searched through the LSH index
+# (SUBSTITUTE_ANN_MIN_CATEGORY), reranking this many candidates exactly.
+# 0 disables it: at 20k products per category the exact scan is faster
+# and the LSH candidates reach only ~0.83 recall@10 (see
+# tests/performance/test_ann_benchmark.py)
+ANN_MIN_CATEGORY_SIZE = 0
+ANN_CANDIDATES = 1000
+
+_text_vectorizer = HashingVectorizer(
+    n_features=TEXT_DIM, stop_words="english", norm="l2"
+)
+
+
+def _angle_block(fraction: np.ndarray) -> np.ndarray:
+    """Unit 2-vectors whose dot product falls off with the fraction gap"""
+    angle = np.clip(fraction, 0, 1) * (math.pi / 2)
+    return np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+
+def product_vectors(products: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Feature vectors whose cosine approximates substitute similarity
+
+    Each block (text, brand, price, rating) is unit length and scaled by
+    the square root of its SIMILARITY_WEIGHTS weight, so the dot product
+    of two vectors is the weighted sum of the per-block similarities.
+    Missing prices and ratings leave their block at zero.
+
+    Args:
+        products (List[Dict[str, Any]]): Products with name, description,
+            brand, price and rating
+
+    Returns:
+        np.ndarray: (len(products), VECTOR_DIM) float32 unit vectors
+    """
+    count = len(products)
+    vectors = np.zeros((count, VECTOR_DIM), dtype=np.float32)
+    if not count:
+        return vectors
+
+    text = _text_vectorizer.transform(
+        [f"{p.get('name', '')} {p.get('description', '')}" for p in products]
+    )
+    vectors[:, :TEXT_DIM] = text.toarray() * math.sqrt(SIMILARITY_WEIGHTS["text"])
+
+    for row, product in enumerate(products):
+        brand = product.get("brand")
+        if isinstance(brand, str) and brand:
+            bucket = zlib.crc32(brand.lower().encode()) % BRAND_DIM
+            vectors[row, TEXT_DIM + bucket] = math.sqrt(SIMILARITY_WEIGHTS["brand"])
+
+    price = np.array([_number(p.get("price")) for p in products])
+    price_block = _angle_block(np.log1p(np.maximum(price, 0)) / math.log1p(PRICE_SCALE))
+    vectors[:, -4:-2] = (
+        price_block * (price > 0)[:, None] * math.sqrt(SIMILARITY_WEIGHTS["price"])
+    )
+
+    rating = np.array([_number(p.get("rating")) for p in products])
+    vectors[:, -2:] = (
+        _angle_block(rating / 5.0)
+        * (rating > 0)[:, None]
+        * math.sqrt(SIMILARITY_WEIGHTS["rating"])
+    )
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool):
+        return 0.0
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _text(product: Dict[str, Any]) -> str:
+    return f"{product.get('name', '')} {product.get('description', '')}"
+
+
+class _CategoryMatrix:
+    """
+    Feature matrices for the products of one category
+
+    Writes patch the matrix instead of rebuilding it: a changed or removed
+    product's row is tombstoned and a changed or new product is appended,
+    its text vectorized with the vocabulary and IDF fitted at build time.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.ids = [doc["id"] for doc in documents]
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.alive = np.ones(len(documents), dtype=bool)
+        self.changes = 0
+        self.prices = np.array([_number(doc.get("price")) for doc in documents])
+        self.ratings = np.array([_number(doc.get("rating")) for doc in documents])
+        self.brands = np.array(
+            [str(doc.get("brand")) for doc in documents], dtype=object
+        )
+
+        self.vectorizer = TfidfVectorizer(stop_words="english")
+        try:
+            # Rows are L2-normalized, so a dot product is a cosine similarity
+            self.text = self.vectorizer.fit_transform(
+                [_text(doc) for doc in documents]
+            ).tocsr()
+        except ValueError:  # Only stop words / empty text in the category
+            self.vectorizer = None
+            self.text = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def append(self, document: Dict[str, Any]) -> None:
+        """Add a product as a new row (replacing its current row, if any)"""
+        self.drop(document["id"])
+        self.rows[document["id"]] = len(self.ids)
+        self.ids.append(document["id"])
+        self.alive = np.append(self.alive, True)
+        self.prices = np.append(self.prices, _number(document.get("price")))
+        self.ratings = np.append(self.ratings, _number(document.get("rating")))
+        self.brands = np.append(
+            self.brands, np.array([str(document.get("brand"))], dtype=object)
+        )
+        if self.text is not None:
+            self.text = sp.vstack(
+                [self.text, self.vectorizer.transform([_text(document)])], format="csr"
+            )
+
+    def drop(self, doc_id: str) -> None:
+        row = self.rows.pop(doc_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.changes += 1
+
+    @property
+    def stale(self) -> bool:
+        """Whether enough rows changed that the vocabulary and IDF should be refitted"""
+        return self.changes > REFIT_FRACTION * max(len(self), 1)
+
+    def text_vector(self, product: Dict[str, Any]):
+        row = self.rows.get(product.get("id"))
+        if row is not None:
+            return self.text[row]
+        return self.vectorizer.transform([_text(product)])
+
+    def similarity(
+        self, product: Dict[str, Any], rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Similarity of every row (or of the given rows) to the given product"""
+        prices, ratings, brands = self.prices, self.ratings, self.brands
+        if rows is not None:
+            prices, ratings, brands = prices[rows], ratings[rows], brands[rows]
+        scores = np.zeros(len(prices))
+
+        price = _number(product.get("price"))
+        if price > 0:
+            both = prices > 0
+            price_diff = np.abs(prices - price) / np.maximum(prices, price)
+            scores += np.where(
+                both, (1 - np.minimum(price_diff, 1)) * SIMILARITY_WEIGHTS["price"], 0
+            )
+
+        scores += (brands == str(product.get("brand"))) * SIMILARITY_WEIGHTS["brand"]
+
+        rating = _number(product.get("rating"))
+        if rating > 0:
+            rating_similarity = 1 - np.abs(ratings - rating) / 5.0
+            scores += np.where(
+                ratings > 0, rating_similarity * SIMILARITY_WEIGHTS["rating"], 0
+            )
+
+        if self.text is not None:
+            # One sparse matrix-vector product scores the whole category
+            text = self.text if rows is None else self.text[rows]
+            cosine = text @ self.text_vector(product).T
+            scores += cosine.toarray().ravel() * SIMILARITY_WEIGHTS["text"]
+
+        return np.minimum(scores, 1.0)
+
+    def preference(
+        self, preferences: Dict[str, Any], rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Vectorized user-preference score (0.5 base, clipped to [0, 1])"""
+        prices, ratings, brands = self.prices, self.ratings, self.brands
+        if rows is not None:
+            prices, ratings, brands = prices[rows], ratings[rows], brands[rows]
+        scores = np.full(len(prices), 0.5)
+        if "max_price" in preferences:
+            scores += np.where(prices <= _number(preferences["max_price"]), 0.2, -0.1)
+        preferred_brands = {str(b) for b in preferences.get("preferred_brands", [])}
+        if preferred_brands:
+            scores += np.isin(brands, list(preferred_brands)) * 0.2
+        scores += (ratings >= _number(preferences.get("min_rating", 0))) * 0.1
+        return np.clip(scores, 0, 1)
+
+
+class SubstituteIndex:
+    """
+    Finds substitutes for a product among products of the same category
+
+    Each category keeps a sparse TF-IDF matrix over name and description
+    plus price, rating and brand arrays. A lookup scores every candidate
+    with one sparse matrix-vector product and a few array operations, then
+    picks the top k with argpartition. Writes that touch none of
+    SCORING_FIELDS leave the matrices alone; others patch their category's
+    matrix in place, which is refitted lazily once REFIT_FRACTION of its
+    rows have changed.
+
+    With ann_min_category_size set (off by default), categories of that
+    many products or more skip the full scan: an LSH index over
+    product_vectors() (partitioned by category) proposes ann_candidates
+    products, which are scored with the category's matrix like the full
+    scan. The LSH index is built on the first such lookup and then kept
+    current by add() and remove().
+    """
+
+    def __init__(
+        self,
+        ann_min_category_size: Optional[int] = None,
+        ann_candidates: int = ANN_CANDIDATES,
+    ):
+        self.ann_min_category_size = (
+            ann_min_category_size
+            if ann_min_category_size is not None
+            else int(os.getenv("SUBSTITUTE_ANN_MIN_CATEGORY", ANN_MIN_CATEGORY_SIZE))
+        )
+        self.ann_candidates = ann_candidates
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._by_category: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._matrices: Dict[str, _CategoryMatrix] = {}
+        self._ann: Optional[LSHIndex] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, document: Dict[str, Any]) -> None:
+        """Index a product, replacing any previous version"""
+        with self._lock:
+            stored = dict(document)
+            stored["id"] = doc_id
+            category = stored.get("category")
+            current = self._documents.get(doc_id)
+            if current is not None and all(
+                current.get(field) == stored.get(field) for field in SCORING_FIELDS
+            ):
+                # Nothing substitutes are scored on changed (e.g. stock)
+                self._documents[doc_id] = stored
+                self._by_category[category][doc_id] = stored
+                return
+
+            self.remove(doc_id)
+            self._documents[doc_id] = stored
+            self._by_category.setdefault(category, {})[doc_id] = stored
+            matrix = self._matrices.get(category)
+            if matrix is not None:
+                matrix.append(stored)
+            if self._ann is not None:
+                self._ann.add(doc_id, product_vectors([stored])[0], partition=category)
+
+    def update(self, doc_id: str, changes: Dict[str, Any]) -> bool:
+        """
+        Apply a partial product update
+
+        Returns:
+            bool: False if the product isn't indexed
+        """
+        with self._lock:
+            current = self._documents.get(doc_id)
+            if current is None:
+                return False
+            merged = dict(current)
+            merged.update(changes)
+            self.add(doc_id, merged)
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a product; returns False if it wasn't indexed"""
+        with self._lock:
+            document = self._documents.pop(doc_id, None)
+            if document is None:
+                return False
+            category = document.get("category")
+            members = self._by_category.get(category, {})
+            members.pop(doc_id, None)
+            if not members:
+                self._by_category.pop(category, None)
+                self._matrices.pop(category, None)
+            elif category in self._matrices:
+                self._matrices[category].drop(doc_id)
+            if self._ann is not None:
+                self._ann.remove(doc_id)
+            return True
+
+    def _matrix(self, category: Any) -> Optional[_CategoryMatrix]:
+        matrix = self._matrices.get(category)
+        if matrix is None or matrix.stale:
+            members = self._by_category.get(category)
+            if not members:
+                return None
+            matrix = _CategoryMatrix(list(members.values()))
+            self._matrices[category] = matrix
+        return matrix
+
+    def find_substitutes(
+        self,
+        product: Dict[str, Any],
+        limit: int = 10,
+        preferences: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank same-category products as substitutes for a product
+
+        Args:
+            product (Dict[str, Any]): Original product (needs at least category)
+            limit (int): Number of substitutes (top-k)
+            preferences (Dict[str, Any], optional): max_price,
+                preferred_brands and min_rating
+
+        Returns:
+            List[Dict[str, Any]]: Product copies with similarity_score,
+                preference_score and final_score, best first
+        """
+        with self._lock:
+            category = product.get("category")
+            size = len(self._by_category.get(category, ()))
+            if self.ann_min_category_size and size >= self.ann_min_category_size:
+                return self._find_approximate(product, limit, preferences)
+            return self._rank(self._matrix(category), product, limit, preferences)
+
+    def _ann_index(self) -> LSHIndex:
+        if self._ann is None:
+            ids = list(self._documents)
+            documents = [self._documents[doc_id] for doc_id in ids]
+            self._ann = LSHIndex(VECTOR_DIM)
+            self._ann.add_batch(
+                ids,
+                product_vectors(documents),
+                [doc.get("category") for doc in documents],
+            )
+        return self._ann
+
+    def _find_approximate(
+        self,
+        product: Dict[str, Any],
+        limit: int,
+        preferences: Optional[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Score only the LSH candidates of a large category"""
+        category = product.get("category")
+        matrix = self._matrix(category)
+        neighbours = self._ann_index().query(
+            product_vectors([product])[0],
+            k=max(self.ann_candidates, limit),
+            partition=category,
+            exclude=[product.get("id")],
+        )
+        rows = np.array(
+            [matrix.rows[doc_id] for doc_id, _ in neighbours if doc_id in matrix.rows],
+            dtype=np.int64,
+        )
+        if len(rows) < limit:
+            # Too few products share a bucket with it; score the whole category
+            return self._rank(matrix, product, limit, preferences)
+        # Rerank with the category's own TF-IDF, so scores match the exact path
+        return self._rank(matrix, product, limit, preferences, rows)
+
+    def _rank(
+        self,
+        matrix: Optional[_CategoryMatrix],
+        product: Dict[str, Any],
+        limit: int,
+        preferences: Optional[Dict[str, Any]],
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top substitutes among a matrix's rows (all of them, or the given ones)"""
+        if matrix is None or limit <= 0:
+            return []
+
+        similarity = matrix.similarity(product, rows)
+        preference = matrix.preference(preferences or {}, rows)
+        final = similarity * SIMILARITY_SHARE + preference * PREFERENCE_SHARE
+        if rows is None:
+            rows = np.arange(len(matrix.ids))
+
+        own_row = matrix.rows.get(product.get("id"))
+        excluded = ~matrix.alive[rows] | (rows == own_row)
+        final[excluded] = -np.inf
+
+        k = min(limit, len(rows) - int(excluded.sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-final, k - 1)[:k]
+        top = top[np.argsort(-final[top], kind="stable")]
+
+        results = []
+        for position in top:
+            substitute = dict(self._documents[matrix.ids[rows[position]]])
+            substitute["similarity_score"] = float(similarity[position])
+            substitute["preference_score"] = float(preference[position])
+            substitute["final_score"] = float(final[position])
+            results.append(substitute)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "categories": len(self._by_category),
+                "built_categories": len(self._matrices),
+                "vocabulary": sum(
+                    len(m.vectorizer.vocabulary_)
+                    for m in self._matrices.values()
+                    if m.vectorizer is not None
+                ),
+                "ann": self._ann.stats() if self._ann is not None else None,
+            }
+
+    @classmethod
+    def build(cls, documents: List[Dict[str, Any]]) -> "SubstituteIndex":
+        """Index products that carry their ID in "id" """
+        index = cls()
+        for position, document in enumerate(documents):
+            index.add(str(document.get("id", position)), document)
+        return index
+
+
+class CollectionSubstituteIndex(CollectionSync, SubstituteIndex):
+    """SubstituteIndex kept in sync with a Firestore collection"""
+
+    def __init__(
+        self, firebase, collection_name: str, refresh_seconds: Optional[float] = None
+    ):
+        super().__init__()
+        self._init_sync(firebase, collection_name, refresh_seconds)
+
+    def _empty_copy(self) -> SubstituteIndex:
+        return SubstituteIndex(self.ann_min_category_size, self.ann_candidates)
+
+    def _adopt(self, fresh: SubstituteIndex) -> None:
+        self._documents = fresh._documents
+        self._by_category = fresh._by_category
+        self._matrices = {}
+        self._ann = None
+
+    def find_substitutes(
+        self,
+        product: Dict[str, Any],
+        limit: int = 10,
+        preferences: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        self.ensure_loaded()
+        return super().find_substitutes(product, limit, preferences)
+
+
+_indexes: Dict[Tuple[int, str], CollectionSubstituteIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_substitute_index(
+    collection_name: str = "products", firebase=None
+) -> CollectionSubstituteIndex:
+    """
+    Get the process-wide substitute index for a collection
+
+    Args:
+        collection_name (str): Product collection
+        firebase (FirebaseUtils, optional): Data source; defaults to
+            get_firebase(). Each instance gets its own index.
+
+    Returns:
+        CollectionSubstituteIndex: Shared index, built lazily on first lookup
+    """
+    if firebase is None:
+        from app.utils.firebase_utils import get_firebase
+
+        firebase = get_firebase()
+
+    key = (id(firebase), collection_name)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.firebase is not firebase:
+            index = CollectionSubstituteIndex(firebase, collection_name)
+            _indexes[key] = index
+        return index
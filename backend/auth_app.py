@@ -16,7 +16,7 @@ os.environ["FIREBASE_CREDENTIALS_PATH"] = (
     "/workspaces/RetailGenie/backend/retailgenie-production-firebase-adminsdk-fbsvc-f1c87b490f.json"
 )
 
-from app.utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import get_firebase
 
 
 def create_minimal_app():
@@ -37,7 +37,7 @@ def create_minimal_app():
     )
 
     # Initialize Firebase
-    firebase = FirebaseUtils()
+    firebase = get_firebase()
 
     def generate_jwt_token(user_data):
         """Generate JWT token for user"""
@@ -30,6 +30,9 @@ def make_celery(app=None):
             "celery_app.generate_report_async": {"queue": "reports"},
             "celery_app.sync_inventory_async": {"queue": "inventory"},
             "celery_app.cleanup_logs_async": {"queue": "maintenance"},
+            "celery_app.precompute_recommendations_async": {"queue": "reports"},
+            "celery_app.refresh_copurchase_model_async": {"queue": "reports"},
+            "celery_app.backfill_sales_rollups_async": {"queue": "reports"},
         },
         # Beat schedule for periodic tasks
         "beat_schedule": {
@@ -43,6 +46,16 @@ def make_celery(app=None):
                 "schedule": timedelta(hours=6),
                 "args": (),
             },
+            "copurchase-model-refresh": {
+                "task": "celery_app.refresh_copurchase_model_async",
+                "schedule": timedelta(hours=1),
+                "args": (),
+            },
+            "nightly-recommendations": {
+                "task": "celery_app.precompute_recommendations_async",
+                "schedule": timedelta(hours=24),
+                "args": (),
+            },
         },
         # Task time limits
         "task_soft_time_limit": 300,  # 5 minutes
@@ -335,6 +348,104 @@ def generate_daily_report():
         raise
 
 
+@celery.task(name="celery_app.precompute_recommendations_async")
+def precompute_recommendations_async(limit=15, batch_size=None):
+    """
+    Precompute recommendation lists for all active users - periodic task
+
+    Args:
+        limit (int): Recommendations per user
+        batch_size (int, optional): Users scored per batch (sized from
+            RECOMMENDATION_BATCH_BYTES by default)
+    """
+    try:
+        from app.utils.firebase_utils import get_firebase
+        from app.utils.recommender import precompute_recommendations
+
+        print("🎯 Precomputing recommendations...")
+
+        summary = precompute_recommendations(
+            get_firebase(), limit=limit, batch_size=batch_size
+        )
+
+        print(
+            f"✅ Recommendations precomputed for {summary['users']} users "
+            f"in {summary['duration_ms']} ms"
+        )
+
+        return {
+            "status": "SUCCESS",
+            "message": f"Recommendations precomputed for {summary['users']} users",
+            "summary": summary,
+        }
+
+    except Exception as e:
+        print(f"❌ Recommendation precompute failed: {str(e)}")
+        raise
+
+
+@celery.task(name="celery_app.refresh_copurchase_model_async")
+def refresh_copurchase_model_async(full=False):
+    """
+    Fold new orders into the co-purchase model - periodic task
+
+    Args:
+        full (bool): Rebuild the model from all orders
+    """
+    try:
+        from app.utils.copurchase import refresh_copurchase_model
+        from app.utils.firebase_utils import get_firebase
+
+        print("🛒 Refreshing co-purchase model...")
+
+        summary = refresh_copurchase_model(get_firebase(), full=full)
+
+        print(
+            f"✅ Co-purchase model refreshed ({summary['mode']}): "
+            f"{summary['orders']} orders, {summary['lists_written']} lists updated"
+        )
+
+        return {
+            "status": "SUCCESS",
+            "message": f"Co-purchase model refreshed from {summary['orders']} orders",
+            "summary": summary,
+        }
+
+    except Exception as e:
+        print(f"❌ Co-purchase model refresh failed: {str(e)}")
+        raise
+
+
+@celery.task(name="celery_app.backfill_sales_rollups_async")
+def backfill_sales_rollups_async():
+    """
+    Recompute the daily sales rollups from all orders - run once after
+    deploying rollups, or to repair them
+    """
+    try:
+        from app.utils.firebase_utils import get_firebase
+        from app.utils.sales_rollups import backfill_sales_rollups
+
+        print("📅 Backfilling daily sales rollups...")
+
+        summary = backfill_sales_rollups(get_firebase())
+
+        print(
+            f"✅ Sales rollups backfilled: {summary['orders']} orders, "
+            f"{summary['rollups_written']} rollups written"
+        )
+
+        return {
+            "status": "SUCCESS",
+            "message": f"Sales rollups backfilled from {summary['orders']} orders",
+            "summary": summary,
+        }
+
+    except Exception as e:
+        print(f"❌ Sales rollup backfill failed: {str(e)}")
+        raise
+
+
 # Utility functions for task management
 def get_task_status(task_id):
     """Get status of a background task"""
@@ -41,8 +41,10 @@ def check_database_status():
                 for collection in collections:
                     try:
                         # Count documents in each collection
-                        docs = list(collection.limit(10).stream())
-                        print(f"   📂 {collection.id}: {len(docs)} documents")
+                        total_docs = firebase.count_documents(collection.id)
+                        print(f"   📂 {collection.id}: {total_docs} documents")
+
+                        docs = list(collection.limit(1).stream())
 
                         # Show sample data from first document
                         if docs:
@@ -69,10 +71,8 @@ def check_database_status():
 
             for col_name in expected_collections:
                 try:
-                    collection_ref = db.collection(col_name)
-                    docs = list(collection_ref.limit(1).stream())
-                    if docs:
-                        total_docs = len(list(collection_ref.stream()))
+                    total_docs = firebase.count_documents(col_name)
+                    if total_docs:
                         print(f"   📂 {col_name}: {total_docs} documents")
                     else:
                         print(f"   📁 {col_name}: Empty")
@@ -10,7 +10,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import FirebaseUtils
 
 logger = logging.getLogger(__name__)
 
@@ -44,18 +44,13 @@ class DatabaseBackup:
         try:
             logger.info(f"Starting backup of collection: {collection_name}")
 
-            # Get all documents from the collection
-            documents = self.firebase.get_documents(collection_name)
-
-            backup_data = {
+            header = {
                 "collection": collection_name,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
-                "document_count": len(documents),
-                "documents": documents,
             }
 
             if include_metadata:
-                backup_data["metadata"] = {
+                header["metadata"] = {
                     "backup_version": "1.0",
                     "firebase_project": os.getenv("FIREBASE_PROJECT_ID", "unknown"),
                     "backup_type": "full_collection",
@@ -67,12 +62,34 @@ class DatabaseBackup:
             filename = f"backup_{collection_name}_{timestamp}.json"
             filepath = self.backup_dir / filename
 
-            # Write backup file
+            # Stream documents into the backup file page by page, so the
+            # collection is never held in memory; the file has the same
+            # layout as a json.dump of the whole backup
+            document_count = 0
             with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(backup_data, f, indent=2, ensure_ascii=False)
+                f.write("{\n")
+                for key, value in header.items():
+                    f.write(f"  {json.dumps(key)}: ")
+                    f.write(
+                        self._indent(json.dumps(value, indent=2, ensure_ascii=False))
+                    )
+                    f.write(",\n")
+
+                f.write('  "documents": [')
+                for document in self.firebase.iter_documents(collection_name):
+                    f.write(",\n    " if document_count else "\n    ")
+                    f.write(
+                        self._indent(
+                            json.dumps(document, indent=2, ensure_ascii=False), 4
+                        )
+                    )
+                    document_count += 1
+                f.write("\n  ],\n" if document_count else "],\n")
+
+                f.write(f'  "document_count": {document_count}\n}}')
 
             logger.info(f"✅ Backup created: {filepath}")
-            logger.info(f"📊 Backed up {len(documents)} documents")
+            logger.info(f"📊 Backed up {document_count} documents")
 
             return str(filepath)
 
@@ -80,6 +97,11 @@ class DatabaseBackup:
             logger.error(f"❌ Error backing up collection {collection_name}: {str(e)}")
             raise
 
+    @staticmethod
+    def _indent(text: str, spaces: int = 2) -> str:
+        """Indent continuation lines of a JSON fragment nested in the file"""
+        return text.replace("\n", "\n" + " " * spaces)
+
     def backup_all_collections(
         self, exclude_collections: Optional[List[str]] = None
     ) -> Dict[str, str]:
@@ -161,24 +183,30 @@ class DatabaseBackup:
                 f"Restoring {len(documents)} documents to collection: {collection_name}"
             )
 
-            # Restore documents
-            success_count = 0
-            failure_count = 0
-
+            # Restore documents in chunked, parallel batches. Original IDs are
+            # kept so re-running a restore overwrites instead of duplicating.
+            operations = []
             for doc in documents:
-                try:
-                    # Remove the 'id' field if present (Firestore will auto-generate)
-                    doc_data = {k: v for k, v in doc.items() if k != "id"}
-
-                    doc_id = self.firebase.create_document(collection_name, doc_data)
-                    if doc_id:
-                        success_count += 1
-                    else:
-                        failure_count += 1
-
-                except Exception as e:
-                    logger.error(f"Failed to restore document: {str(e)}")
-                    failure_count += 1
+                doc_data = {k: v for k, v in doc.items() if k != "id"}
+                operation = {
+                    "type": "set" if doc.get("id") else "create",
+                    "collection": collection_name,
+                    "data": doc_data,
+                }
+                if doc.get("id"):
+                    operation["document_id"] = doc["id"]
+                operations.append(operation)
+
+            result = self.firebase.bulk_write(operations)
+            success_count = result["succeeded"]
+            failure_count = result["failed"]
+
+            for op_result in result["results"]:
+                if not op_result["success"]:
+                    logger.error(
+                        f"Failed to restore document {op_result['document_id']}: "
+                        f"{op_result['error']}"
+                    )
 
             logger.info(
                 f"""
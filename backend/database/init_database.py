@@ -6,10 +6,30 @@ import os
 import sys
 from datetime import datetime
 
-# Add the current directory to Python path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import FirebaseUtils
+
+
+def _bulk_create(firebase, collection_name, documents):
+    """Create documents in chunked batches; returns the created ones with IDs"""
+    result = firebase.bulk_write(
+        [
+            {"type": "create", "collection": collection_name, "data": doc}
+            for doc in documents
+        ]
+    )
+    created = []
+    for op_result in result["results"]:
+        document = documents[op_result["index"]]
+        if op_result["success"]:
+            document["id"] = op_result["document_id"]
+            created.append(document)
+        else:
+            error = op_result["error"]
+            print(f"   ❌ Failed to create {collection_name} document: {error}")
+    return created
 
 
 def initialize_database():
@@ -83,20 +103,23 @@ def initialize_database():
 
         # Clear existing products (if any)
         print("🧹 Clearing existing products...")
-        existing_products = firebase.get_all_documents("products")
-        for product in existing_products:
-            if "id" in product:
-                firebase.delete_document("products", product["id"])
+        firebase.bulk_write(
+            [
+                {
+                    "type": "delete",
+                    "collection": "products",
+                    "document_id": product["id"],
+                }
+                for product in firebase.iter_documents("products")
+                if "id" in product
+            ]
+        )
 
         # Create sample products
         print("📦 Creating sample products...")
-        created_products = []
-
-        for i, product in enumerate(sample_products, 1):
-            product_id = firebase.create_document("products", product)
-            product["id"] = product_id
-            created_products.append(product)
-            print(f"   ✅ Created: {product['name']} (ID: {product_id})")
+        created_products = _bulk_create(firebase, "products", sample_products)
+        for product in created_products:
+            print(f"   ✅ Created: {product['name']} (ID: {product['id']})")
 
         # Sample users
         sample_users = [
@@ -118,16 +141,13 @@ def initialize_database():
 
         # Create sample users
         print("👥 Creating sample users...")
-        created_users = []
-
-        for user in sample_users:
-            user_id = firebase.create_document("users", user)
-            user["id"] = user_id
-            created_users.append(user)
+        created_users = _bulk_create(firebase, "users", sample_users)
+        for user in created_users:
             print(f"   ✅ Created: {user['name']} ({user['email']})")
 
         # Sample feedback
-        if created_products:
+        sample_feedback = []
+        if len(created_products) >= 2:
             print("💬 Creating sample feedback...")
             sample_feedback = [
                 {
@@ -153,8 +173,7 @@ def initialize_database():
                 },
             ]
 
-            for feedback in sample_feedback:
-                feedback_id = firebase.create_document("feedback", feedback)
+            for feedback in _bulk_create(firebase, "feedback", sample_feedback):
                 print(f"   ✅ Created feedback: {feedback['comment'][:30]}...")
 
         print("\n🎉 Database initialization completed successfully!")
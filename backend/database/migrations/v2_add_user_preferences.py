@@ -7,7 +7,7 @@ Created: 2025-06-29T16:30:00Z
 import logging
 from datetime import datetime, timezone
 
-from utils.firebase_utils import FirebaseUtils
+from app.utils.firebase_utils import FirebaseUtils
 
 logger = logging.getLogger(__name__)
 
@@ -53,11 +53,11 @@ def migrate():
         else:
             raise Exception("Failed to create user_preferences collection")
 
-        # Update users collection to include preferences reference
-        users_docs = firebase.get_documents("users")
+        # Update users collection to include preferences reference,
+        # streaming users page by page rather than loading them all
         updated_count = 0
 
-        for user_doc in users_docs:
+        for user_doc in firebase.iter_documents("users"):
             if "preferences_id" not in user_doc:
                 # Add preferences reference to existing users
                 update_data = {
@@ -140,10 +140,9 @@ def rollback():
 
     try:
         # Remove preferences-related fields from users
-        users_docs = firebase.get_documents("users")
         rollback_count = 0
 
-        for user_doc in users_docs:
+        for user_doc in firebase.iter_documents("users"):
             if "preferences_id" in user_doc or "preferences_created" in user_doc:
                 # Remove the added fields
                 # Note: Firestore doesn't support field deletion via update
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Compares building every controller with its own FirebaseUtils (the old
+behaviour) against sharing the process-wide instance from get_firebase()
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.controllers.ai_assistant_controller import AIAssistantController  # noqa: E402
+from app.controllers.analytics_controller import AnalyticsController  # noqa: E402
+from app.controllers.auth_controller import AuthController  # noqa: E402
+from app.controllers.cart_controller import CartController  # noqa: E402
+from app.controllers.feedback_controller import FeedbackController  # noqa: E402
+from app.controllers.inventory_controller import InventoryController  # noqa: E402
+from app.controllers.pricing_controller import PricingController  # noqa: E402
+from app.controllers.product_controller import ProductController  # noqa: E402
+from app.controllers.wishlist_controller import WishlistController  # noqa: E402
+from app.middleware.auth_middleware import AuthMiddleware  # noqa: E402
+from app.utils import firebase_utils  # noqa: E402
+from app.utils.firebase_utils import FirebaseUtils, get_firebase  # noqa: E402
+
+COMPONENTS = [
+    AIAssistantController,
+    AnalyticsController,
+    AuthController,
+    CartController,
+    FeedbackController,
+    InventoryController,
+    PricingController,
+    ProductController,
+    WishlistController,
+    AuthMiddleware,
+]
+
+
+def build_per_component() -> List[Any]:
+    """Old wiring: every component initializes its own FirebaseUtils"""
+    return [component(firebase=FirebaseUtils()) for component in COMPONENTS]
+
+
+def build_shared() -> List[Any]:
+    """New wiring: every component receives the shared instance"""
+    firebase_utils._reset_shared_instance()
+    shared = get_firebase()
+    return [component(firebase=shared) for component in COMPONENTS]
+
+
+def measure(build: Callable[[], List[Any]], runs: int) -> Dict[str, Any]:
+    durations = []
+    components: List[Any] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        components = build()
+        durations.append(time.perf_counter() - start)
+
+    instances = {id(component.firebase) for component in components}
+    clients = set()
+    for component in components:
+        clients.update(id(client) for client in component.firebase._clients)
+
+    return {
+        "mean_ms": statistics.mean(durations) * 1000,
+        "p95_ms": sorted(durations)[int(0.95 * (len(durations) - 1))] * 1000,
+        "firebase_instances": len(instances),
+        "firestore_clients": len(clients),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data-access startup")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print("🚀 RetailGenie startup benchmark")
+    print(f"   Components: {len(COMPONENTS)}, runs: {args.runs}")
+    pool_size = os.getenv("FIRESTORE_CHANNEL_POOL_SIZE", "1")
+    print(f"   FIRESTORE_CHANNEL_POOL_SIZE={pool_size}")
+
+    results = {
+        "per-component FirebaseUtils": measure(build_per_component, args.runs),
+        "shared get_firebase()": measure(build_shared, args.runs),
+    }
+
+    print(
+        f"\n{'wiring':<30} {'mean ms':>10} {'p95 ms':>10} "
+        f"{'instances':>10} {'clients':>8}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<30} {result['mean_ms']:>10.2f} {result['p95_ms']:>10.2f} "
+            f"{result['firebase_instances']:>10} {result['firestore_clients']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Recall and latency of the LSH substitute path against the exact scan
+
+Both paths run SubstituteIndex.find_substitutes on one large category:
+the exact one scores every product, the approximate one only the LSH
+candidates. Recall@k is the share of the exact top k the approximate
+path also returns.
+
+Run directly for a report:
+    python -m tests.performance.test_ann_benchmark
+"""
+
+import random
+import time
+
+import numpy as np
+import pytest
+
+from app.utils.substitute_index import (
+    ANN_CANDIDATES,
+    ANN_MIN_CATEGORY_SIZE,
+    SubstituteIndex,
+)
+
+
+def synthetic_products(count, seed=0, vocabulary=3000):
+    """One large category with Zipf-distributed name and description terms"""
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    brands = [f"Brand{i}" for i in range(200)]
+    return [
+        {
+            "id": f"p{i}",
+            "category": "Beverages",
+            "name": " ".join(rng.choices(words, weights, k=3)),
+            "description": " ".join(rng.choices(words, weights, k=12)),
+            "brand": rng.choice(brands),
+            "price": round(rng.uniform(1, 200), 2),
+            "rating": round(rng.uniform(1, 5), 1),
+        }
+        for i in range(count)
+    ]
+
+
+def run_benchmark(count=20000, queries=100, k=10, candidates=ANN_CANDIDATES):
+    products = synthetic_products(count)
+    exact = SubstituteIndex(ann_min_category_size=0)
+    approximate = SubstituteIndex(ann_min_category_size=1, ann_candidates=candidates)
+
+    started = time.perf_counter()
+    for product in products:
+        exact.add(product["id"], product)
+        approximate.add(product["id"], product)
+    # First lookups build the category matrix and the LSH index
+    exact.find_substitutes(products[0], k)
+    approximate.find_substitutes(products[0], k)
+    build_seconds = time.perf_counter() - started
+
+    recall, ann_seconds, exact_seconds = [], 0.0, 0.0
+    score_gaps = []
+    for product in products[1 : queries + 1]:
+        started = time.perf_counter()
+        found = approximate.find_substitutes(product, k)
+        ann_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        expected = exact.find_substitutes(product, k)
+        exact_seconds += time.perf_counter() - started
+
+        recall.append(len({p["id"] for p in found} & {p["id"] for p in expected}) / k)
+        # Candidates are scored exactly, so no rank can beat the exact one
+        score_gaps.extend(
+            a["final_score"] - e["final_score"] for a, e in zip(found, expected)
+        )
+
+    return {
+        "products": count,
+        "candidates": candidates,
+        "build_ms": round(build_seconds * 1000, 1),
+        f"recall@{k}": round(float(np.mean(recall)), 3),
+        "ann_ms_per_query": round(ann_seconds / queries * 1000, 3),
+        "exact_ms_per_query": round(exact_seconds / queries * 1000, 3),
+        "max_score_gap": float(max(score_gaps)),
+    }
+
+
+class TestANNBenchmark:
+    """Benchmark the LSH substitute path against the exact scan."""
+
+    @pytest.mark.slow
+    def test_recall_against_exact_path(self):
+        report = run_benchmark(count=20000, queries=50)
+
+        assert report["max_score_gap"] <= 1e-9
+        assert report["recall@10"] >= 0.75
+        # Not faster than the exact scan at this size, so it's off by default
+        assert ANN_MIN_CATEGORY_SIZE == 0
+
+
+if __name__ == "__main__":
+    for size in (5000, 20000, 50000):
+        for candidates in (200, ANN_CANDIDATES):
+            print(run_benchmark(count=size, candidates=candidates))
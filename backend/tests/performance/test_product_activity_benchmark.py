@@ -0,0 +1,104 @@
+"""
+Per-product scans vs the single-pass ProductActivity index
+
+The old ML analysis scanned every order and every feedback entry for each
+product, O(products x (orders + feedback)). ProductActivity reads each
+order and feedback entry once, O(products + orders + feedback).
+
+Run directly for a report:
+    python -m tests.performance.test_product_activity_benchmark
+"""
+
+import random
+import time
+
+import pytest
+
+from app.utils.product_activity import ProductActivity
+
+
+def synthetic_data(products, orders, feedback, seed=0):
+    rng = random.Random(seed)
+    ids = [f"p{i}" for i in range(products)]
+    order_docs = [
+        {
+            "items": [
+                {"product_id": rng.choice(ids), "quantity": rng.randint(1, 3)}
+                for _ in range(rng.randint(1, 4))
+            ],
+            "created_at": f"2026-01-{rng.randint(1, 28):02d}",
+        }
+        for _ in range(orders)
+    ]
+    feedback_docs = [
+        {"product_id": rng.choice(ids), "comment": rng.choice(["great", "bad", "ok"])}
+        for _ in range(feedback)
+    ]
+    return ids, order_docs, feedback_docs
+
+
+def per_product_scan(ids, orders, feedback):
+    """The previous approach: rescan orders and feedback for every product"""
+    baskets = [{item.get("product_id") for item in order["items"]} for order in orders]
+    results = {}
+    for product_id in ids:
+        demand = len([basket for basket in baskets if product_id in basket])
+        comments = [fb for fb in feedback if fb.get("product_id") == product_id]
+        results[product_id] = (demand, len(comments))
+    return results
+
+
+def indexed(ids, orders, feedback):
+    activity = ProductActivity.build(orders, feedback)
+    return {
+        product_id: (
+            activity.order_count(product_id),
+            len(activity.feedback_comments(product_id)),
+        )
+        for product_id in ids
+    }
+
+
+def best_of(repeat, fn, *args):
+    """Fastest of repeat runs (less sensitive to a busy machine) and the result"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_benchmark(products, orders, feedback, repeat=3):
+    data = synthetic_data(products, orders, feedback)
+
+    scan_seconds, scanned = best_of(repeat, per_product_scan, *data)
+    index_seconds, grouped = best_of(repeat, indexed, *data)
+
+    assert scanned == grouped
+    return {
+        "products": products,
+        "orders": orders,
+        "feedback": feedback,
+        "scan_ms": round(scan_seconds * 1000, 1),
+        "index_ms": round(index_seconds * 1000, 1),
+        "speedup": round(scan_seconds / max(index_seconds, 1e-9), 1),
+    }
+
+
+class TestProductActivityBenchmark:
+    """Benchmark per-product scans against the activity index."""
+
+    @pytest.mark.slow
+    def test_index_scales_linearly(self):
+        small = run_benchmark(200, 2000, 500)
+        large = run_benchmark(800, 8000, 2000)
+
+        # 4x the data: the scan does ~16x the work, the index ~4x
+        assert large["index_ms"] < large["scan_ms"]
+        assert large["speedup"] > small["speedup"]
+
+
+if __name__ == "__main__":
+    for size in (250, 500, 1000, 2000):
+        print(run_benchmark(size, size * 10, size * 2))
@@ -0,0 +1,133 @@
+import numpy as np
+
+from app.utils.ann_index import LSHIndex
+from app.utils.substitute_index import VECTOR_DIM, SubstituteIndex, product_vectors
+
+
+def _clustered_vectors(count, dim=32, clusters=20, seed=1):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim))
+    labels = rng.integers(0, clusters, count)
+    return centres[labels] + rng.standard_normal((count, dim)) * 0.3
+
+
+class TestLSHIndex:
+    """Test the LSH approximate nearest-neighbour index."""
+
+    def test_insert_replace_delete(self):
+        index = LSHIndex(dim=4, n_tables=4, n_bits=4)
+        index.add("a", np.array([1.0, 0, 0, 0]))
+        index.add("b", np.array([0.9, 0.1, 0, 0]))
+        index.add("c", np.array([0, 0, 1.0, 0]))
+
+        assert index.query(np.array([1.0, 0, 0, 0]), k=1)[0][0] == "a"
+
+        index.add("a", np.array([0, 0, 0, 1.0]))
+        index.remove("b")
+
+        assert len(index) == 2 and "b" not in index
+        assert [i for i, _ in index.exact_query(np.array([0, 0, 0, 1.0]), k=3)] == [
+            "a",
+            "c",
+        ]
+        assert index.remove("b") is False
+
+    def test_partitions_and_exclude(self):
+        index = LSHIndex(dim=3, n_tables=4, n_bits=2)
+        index.add_batch(
+            ["x1", "x2", "y1"],
+            np.array([[1.0, 0, 0], [1.0, 0.1, 0], [1.0, 0, 0]]),
+            ["x", "x", "y"],
+        )
+
+        results = index.query(np.array([1.0, 0, 0]), k=5, partition="x", exclude=["x1"])
+
+        assert [i for i, _ in results] == ["x2"]
+        assert index.query(np.array([1.0, 0, 0]), k=5, partition="z") == []
+
+    def test_recall_against_exact_search(self):
+        vectors = _clustered_vectors(3000)
+        index = LSHIndex(dim=vectors.shape[1])
+        index.add_batch([f"v{i}" for i in range(len(vectors))], vectors)
+
+        recall = []
+        for i in range(50):
+            approximate = {item for item, _ in index.query(vectors[i], k=10)}
+            exact = {item for item, _ in index.exact_query(vectors[i], k=10)}
+            recall.append(len(approximate & exact) / 10)
+
+        assert np.mean(recall) >= 0.9
+
+    def test_save_and_load(self, tmp_path):
+        vectors = _clustered_vectors(200)
+        index = LSHIndex(dim=vectors.shape[1], seed=7)
+        index.add_batch([f"v{i}" for i in range(200)], vectors, ["a", "b"] * 100)
+        index.remove("v0")
+        path = tmp_path / "ann.pkl"
+
+        index.save(str(path))
+        loaded = LSHIndex.load(str(path))
+
+        assert len(loaded) == 199 and "v0" not in loaded
+        assert [i for i, _ in loaded.query(vectors[1], k=5, partition="b")] == [
+            i for i, _ in index.query(vectors[1], k=5, partition="b")
+        ]
+
+    def test_substitute_index_uses_ann_for_large_categories(self):
+        products = [
+            {
+                "id": "p1",
+                "category": "Beverages",
+                "name": "Dark roast coffee",
+                "brand": "Roastery",
+                "price": 12,
+                "rating": 4.5,
+            },
+            {
+                "id": "p2",
+                "category": "Beverages",
+                "name": "Dark roast coffee beans",
+                "brand": "Roastery",
+                "price": 13,
+                "rating": 4.4,
+            },
+            {
+                "id": "p3",
+                "category": "Beverages",
+                "name": "Green tea",
+                "brand": "Leafy",
+                "price": 4,
+                "rating": 3.0,
+            },
+            {
+                "id": "p4",
+                "category": "Snacks",
+                "name": "Dark roast coffee",
+                "brand": "Roastery",
+                "price": 12,
+                "rating": 4.5,
+            },
+        ]
+        exact = SubstituteIndex.build(products)
+        approximate = SubstituteIndex(ann_min_category_size=2)
+        for product in products:
+            approximate.add(product["id"], product)
+
+        nearest = approximate.find_substitutes(products[0], limit=1)
+        results = approximate.find_substitutes(products[0], limit=2)
+        approximate.remove("p2")
+
+        assert [p["id"] for p in nearest] == ["p2"]
+        assert [p["id"] for p in results] == ["p2", "p3"]
+        assert approximate.stats()["ann"]["items"] == 3
+        assert [p["id"] for p in approximate.find_substitutes(products[0])] == ["p3"]
+        assert [p["id"] for p in exact.find_substitutes(products[0], limit=2)] == [
+            "p2",
+            "p3",
+        ]
+        # Candidates are scored with the category matrix, like the exact path
+        assert [p["final_score"] for p in results] == [
+            p["final_score"] for p in exact.find_substitutes(products[0], limit=2)
+        ]
+        assert exact.stats()["ann"] is None
+        assert product_vectors(products).shape == (4, VECTOR_DIM)
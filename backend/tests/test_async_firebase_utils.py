@@ -0,0 +1,90 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.async_firebase_utils import AsyncFirebaseUtils, gather_sync, run_sync
+from app.utils.firebase_utils import FirebaseUtils
+
+
+@pytest.fixture
+def async_firebase():
+    """AsyncFirebaseUtils over a FirebaseUtils forced into mock mode."""
+    with patch("firebase_admin._apps", {}), patch(
+        "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+    ):
+        firebase = FirebaseUtils()
+    assert firebase.db is None
+    return AsyncFirebaseUtils(firebase)
+
+
+class TestAsyncFirebaseUtils:
+    """Test the async data-access layer in mock mode."""
+
+    def test_crud_round_trip(self, async_firebase):
+        async def scenario():
+            doc_id = await async_firebase.create_document("products", {"name": "Tea"})
+            await async_firebase.update_document("products", doc_id, {"price": 4})
+            doc = await async_firebase.get_document("products", doc_id)
+            deleted = await async_firebase.delete_document("products", doc_id)
+            return doc, deleted, await async_firebase.get_document("products", doc_id)
+
+        doc, deleted, missing = asyncio.run(scenario())
+
+        assert doc["name"] == "Tea" and doc["price"] == 4
+        assert deleted
+        assert missing is None
+
+    def test_gather_sync_fans_out_reads(self, async_firebase):
+        firebase = async_firebase.firebase
+        for price in (5, 10, 15):
+            firebase.create_document("orders", {"total": price, "status": "paid"})
+        firebase.create_document("customers", {"name": "Ann"})
+
+        totals, customers, paid = gather_sync(
+            async_firebase.aggregate("orders", sum_fields=["total"]),
+            async_firebase.count_documents("customers"),
+            async_firebase.get_documents("orders", {"status": "paid"}),
+        )
+
+        assert totals["count"] == 3
+        assert totals["sum"]["total"] == 30
+        assert customers == 1
+        assert len(paid) == 3
+
+    def test_iter_documents(self, async_firebase):
+        for i in range(5):
+            async_firebase.firebase.create_document("items", {"n": i}, f"item-{i}")
+
+        async def collect():
+            return [
+                doc["id"]
+                async for doc in async_firebase.iter_documents("items", page_size=2)
+            ]
+
+        assert run_sync(collect()) == [f"item-{i}" for i in range(5)]
+
+    def test_run_sync_rejects_running_loop(self, async_firebase):
+        async def nested():
+            run_sync(async_firebase.count_documents("products"))
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(nested())
+
+    def test_field_projection(self, async_firebase):
+        async_firebase.firebase.create_document(
+            "products",
+            {
+                "name": "Tea",
+                "price": 4,
+                "description": "Long text",
+                "meta": {"a": 1, "b": 2},
+            },
+            "tea",
+        )
+
+        (docs,) = gather_sync(
+            async_firebase.get_documents("products", fields=["name", "meta.a"])
+        )
+
+        assert docs == [{"id": "tea", "name": "Tea", "meta": {"a": 1}}]
@@ -0,0 +1,135 @@
+import random
+
+from app.utils.autocomplete import AutocompleteIndex, normalize
+
+
+def build_index():
+    index = AutocompleteIndex()
+    index.add(
+        "p1",
+        {
+            "name": "Organic Coffee Beans",
+            "brand": "Café Verde",
+            "category": "Beverages",
+            "views": 40,
+        },
+    )
+    index.add(
+        "p2",
+        {
+            "name": "Coffee Grinder",
+            "brand": "Brewmaster",
+            "category": "Kitchen",
+            "views": 5,
+        },
+    )
+    index.add(
+        "p3",
+        {
+            "name": "Cold Brew Kit",
+            "brand": "Brewmaster",
+            "category": "Kitchen",
+            "views": 1,
+        },
+    )
+    return index
+
+
+class TestAutocompleteIndex:
+    """Test the prefix autocomplete index."""
+
+    def test_normalize(self):
+        assert normalize("  Café-Verde ") == "cafe verde"
+
+    def test_prefix_is_case_and_accent_insensitive(self):
+        index = build_index()
+
+        assert [s["text"] for s in index.suggest("CAF")] == ["Café Verde"]
+        assert index.suggest("caf")[0]["type"] == "brand"
+
+    def test_matches_word_starts_by_popularity(self):
+        index = build_index()
+
+        results = index.suggest("co", kind="product")
+
+        assert [s["text"] for s in results] == [
+            "Organic Coffee Beans",
+            "Coffee Grinder",
+            "Cold Brew Kit",
+        ]
+        assert results[0]["product_id"] == "p1"
+
+    def test_brand_weight_sums_products(self):
+        index = build_index()
+
+        (brand,) = index.suggest("brewm")
+
+        assert brand["text"] == "Brewmaster"
+        assert brand["score"] == 8  # (1 + 5) + (1 + 1)
+
+    def test_incremental_updates(self):
+        index = build_index()
+        assert index.suggest("co", limit=1)[0]["text"] == "Organic Coffee Beans"
+
+        index.update("p3", {"views": 500})
+        assert index.suggest("co", limit=1)[0]["text"] == "Cold Brew Kit"
+
+        index.update("p2", {"name": "Espresso Grinder"})
+        assert index.suggest("espr")[0]["product_id"] == "p2"
+        assert "Coffee Grinder" not in [s["text"] for s in index.suggest("coffee")]
+
+        index.remove("p1")
+        assert index.suggest("organic") == []
+        assert index.suggest("caf") == []
+        assert index.stats()["documents"] == 2
+        assert index.stats()["memory_bytes"] > 0
+        assert index.stats()["suggestions_by_type"] == {
+            "product": 2,
+            "brand": 1,
+            "category": 1,
+        }
+
+    def test_bulk_load_sorts_once(self):
+        index = AutocompleteIndex()
+        for i in range(200):
+            index.add(f"p{i}", {"name": f"Item {i:03d} Tea", "views": i})
+        index.remove("p199")  # Before the buffered entries are merged
+
+        results = index.suggest("tea", limit=2)
+
+        assert [s["text"] for s in results] == ["Item 198 Tea", "Item 197 Tea"]
+        assert index.suggest("item 05")[0]["text"] == "Item 059 Tea"
+        assert index.stats()["prefix_entries"] == 199 * 3
+
+    def test_short_prefix_rankings_follow_writes(self):
+        rng = random.Random(7)
+        index = AutocompleteIndex()
+        for i in range(150):
+            index.add(
+                f"p{i}",
+                {"name": f"{rng.choice('abc')}{i} item", "views": rng.randint(0, 50)},
+            )
+        prefixes = [("a", None), ("b", "product"), ("i", None), ("it", "product")]
+
+        for step in range(300):
+            for prefix, kind in prefixes:
+                index.suggest(prefix, limit=50, kind=kind)  # Memoize the rankings
+            doc_id = f"p{rng.randrange(170)}"
+            if step % 5 == 0:
+                index.remove(doc_id)
+            else:
+                index.add(
+                    doc_id,
+                    {
+                        "name": f"{rng.choice('abc')}{doc_id} item",
+                        "views": rng.randint(0, 50),
+                    },
+                )
+
+            rebuilt = AutocompleteIndex()
+            for other_id, fields in index._documents.items():
+                rebuilt.add(other_id, fields)
+            for prefix, kind in prefixes:
+                assert index.suggest(prefix, 50, kind) == rebuilt.suggest(
+                    prefix, 50, kind
+                )
@@ -0,0 +1,107 @@
+from app.utils.bulk_writer import BulkWriter
+
+
+class FakeRef:
+    def __init__(self, doc_id):
+        self.id = doc_id
+
+
+class FakeCollection:
+    def __init__(self, db):
+        self.db = db
+
+    def document(self, doc_id=None):
+        if doc_id is None:
+            self.db.auto_ids += 1
+            doc_id = f"auto-{self.db.auto_ids}"
+        return FakeRef(doc_id)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.ids = []
+
+    def set(self, ref, data):
+        self.ids.append(ref.id)
+
+    def update(self, ref, data):
+        self.ids.append(ref.id)
+
+    def delete(self, ref):
+        self.ids.append(ref.id)
+
+    def commit(self):
+        self.db.commits.append(len(self.ids))
+        if self.db.transient_failures:
+            self.db.transient_failures -= 1
+            raise ConnectionError("connection reset")
+        if "missing" in self.ids:
+            raise ValueError("No document to update")
+
+
+class FakeDB:
+    def __init__(self, transient_failures=0):
+        self.transient_failures = transient_failures
+        self.commits = []
+        self.auto_ids = 0
+
+    def collection(self, name):
+        return FakeCollection(self)
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+class TestBulkWriter:
+    """Test chunked, parallel batch writes."""
+
+    def test_chunks_under_batch_limit(self):
+        db = FakeDB()
+        operations = [
+            {"type": "set", "collection": "products", "document_id": str(i), "data": {}}
+            for i in range(1201)
+        ]
+
+        results = BulkWriter(db, max_workers=3).write(operations)
+
+        assert sorted(db.commits) == [201, 500, 500]
+        assert [r["index"] for r in results] == list(range(1201))
+        assert all(r["success"] for r in results)
+
+    def test_create_without_id_gets_generated_id(self):
+        results = BulkWriter(FakeDB()).write(
+            [{"type": "create", "collection": "products", "data": {"name": "A"}}]
+        )
+        assert results[0]["document_id"] == "auto-1"
+
+    def test_transient_errors_are_retried(self):
+        db = FakeDB(transient_failures=2)
+        results = BulkWriter(db, backoff_seconds=0).write(
+            [{"type": "delete", "collection": "products", "document_id": "p1"}]
+        )
+        assert results[0]["success"]
+        assert len(db.commits) == 3
+
+    def test_failed_batch_reports_per_operation(self):
+        operations = [
+            {
+                "type": "update",
+                "collection": "products",
+                "document_id": "p1",
+                "data": {},
+            },
+            {
+                "type": "update",
+                "collection": "products",
+                "document_id": "missing",
+                "data": {},
+            },
+            {"type": "merge", "collection": "products", "document_id": "p2"},
+        ]
+
+        results = BulkWriter(FakeDB()).write(operations)
+
+        assert [r["success"] for r in results] == [True, False, False]
+        assert "No document" in results[1]["error"]
+        assert "Unsupported" in results[2]["error"]
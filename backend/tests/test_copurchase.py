@@ -0,0 +1,86 @@
+import os
+from unittest.mock import patch
+
+from app.utils import copurchase
+from app.utils.copurchase import (
+    DEFAULT_MODEL_PATH,
+    NEIGHBOURS_COLLECTION,
+    CoPurchaseModel,
+    refresh_copurchase_model,
+)
+from app.utils.firebase_utils import FirebaseUtils
+
+ORDERS = [
+    {"items": [{"product_id": "coffee"}, {"product_id": "filter"}]},
+    {
+        "items": [
+            {"product_id": "coffee"},
+            {"product_id": "filter"},
+            {"product_id": "mug"},
+        ]
+    },
+    {"items": [{"product_id": "coffee"}, {"product_id": "mug"}]},
+    {"items": [{"product_id": "tea"}, {"product_id": "mug"}]},
+    {"items": [{"product_id": "headphones"}]},
+]
+
+
+class TestCoPurchaseModel:
+    """Test the item-item co-purchase model."""
+
+    def test_cosine_neighbours(self):
+        model = CoPurchaseModel(top_n=2).fit(ORDERS)
+
+        # coffee/filter: 2 / sqrt(3 * 2), coffee/mug: 2 / sqrt(3 * 3)
+        assert model.similar("filter") == [("coffee", 0.8165), ("mug", 0.4082)]
+        assert [p for p, _ in model.similar("coffee")] == ["filter", "mug"]
+        assert model.similar("headphones") == []
+        assert model.similar("unknown") == []
+
+    def test_partial_fit_matches_full_fit(self):
+        model = CoPurchaseModel(top_n=3).fit(ORDERS[:2])
+
+        changed = model.partial_fit(ORDERS[2:])
+        full = CoPurchaseModel(top_n=3).fit(ORDERS)
+
+        assert set(changed) == {"coffee", "filter", "mug", "tea", "headphones"}
+        for product_id in ("coffee", "filter", "mug", "tea"):
+            assert model.similar(product_id, 3) == full.similar(product_id, 3)
+
+    def test_refresh_is_incremental(self, tmp_path):
+        with patch("firebase_admin._apps", {}), patch(
+            "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+        ):
+            firebase = FirebaseUtils()
+        for day, order in enumerate(ORDERS[:3], start=1):
+            firebase.create_document(
+                "orders", {**order, "created_at": f"2025-01-0{day}"}
+            )
+        path = str(tmp_path / "model.pkl")
+
+        first = refresh_copurchase_model(firebase, model_path=path)
+        firebase.create_document("orders", {**ORDERS[3], "created_at": "2025-01-03"})
+        second = refresh_copurchase_model(firebase, model_path=path)
+        third = refresh_copurchase_model(firebase, model_path=path)
+
+        assert (first["mode"], first["orders"]) == ("full", 3)
+        assert (second["mode"], second["orders"]) == ("incremental", 1)
+        assert third["orders"] == 0 and third["lists_written"] == 0
+        stored = firebase.get_document(NEIGHBOURS_COLLECTION, "tea")
+        assert stored["neighbours"] == [{"id": "mug", "score": 0.5774}]
+
+    def test_model_path_from_environment(self, tmp_path):
+        with patch("firebase_admin._apps", {}), patch(
+            "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+        ):
+            firebase = FirebaseUtils()
+        firebase.create_document("orders", {**ORDERS[0], "created_at": "2025-01-01"})
+        path = tmp_path / "state" / "copurchase.pkl"
+
+        with patch.dict("os.environ", {"COPURCHASE_MODEL_PATH": str(path)}):
+            refresh_copurchase_model(firebase)
+
+        # The directory is created on save; nothing lands in the package
+        assert path.exists()
+        package = os.path.dirname(os.path.dirname(copurchase.__file__))
+        assert not os.path.abspath(DEFAULT_MODEL_PATH).startswith(package + os.sep)
@@ -0,0 +1,51 @@
+import time
+
+from app.utils.document_cache import DocumentCache
+
+
+class TestDocumentCache:
+    """Test the read-through document cache."""
+
+    def test_hit_miss_and_copies(self):
+        cache = DocumentCache()
+        assert cache.get("products", "all") is DocumentCache.MISS
+
+        cache.set("products", "all", [{"id": "p1", "price": 3}])
+        docs = cache.get("products", "all")
+        docs[0]["price"] = 100
+
+        assert cache.get("products", "all") == [{"id": "p1", "price": 3}]
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = DocumentCache(max_entries=2)
+        cache.set("products", "a", 1)
+        cache.set("products", "b", 2)
+        cache.get("products", "a")
+        cache.set("products", "c", 3)
+
+        assert cache.get("products", "b") is DocumentCache.MISS
+        assert cache.get("products", "a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_per_collection_ttl(self):
+        cache = DocumentCache(default_ttl=60, collection_ttls={"orders": 0.01})
+        cache.set("orders", "all", [])
+        cache.set("products", "all", [])
+        time.sleep(0.02)
+
+        assert cache.get("orders", "all") is DocumentCache.MISS
+        assert cache.get("products", "all") == []
+
+    def test_invalidation_rejects_stale_reads(self):
+        cache = DocumentCache()
+        cache.set("products", "all", [{"id": "p1"}])
+        cache.set("orders", "all", [{"id": "o1"}])
+
+        generation = cache.generation("products")
+        cache.invalidate("products")
+        cache.set("products", "all", [{"id": "stale"}], generation)
+
+        assert cache.get("products", "all") is DocumentCache.MISS
+        assert cache.get("orders", "all") == [{"id": "o1"}]
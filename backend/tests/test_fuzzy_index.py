@@ -0,0 +1,40 @@
+from app.utils.fuzzy_index import TrigramIndex, edit_distance, max_edits
+
+
+class TestTrigramIndex:
+    """Test trigram candidate generation and edit-distance re-ranking."""
+
+    def test_edit_distance(self):
+        assert edit_distance("coffee", "coffee") == 0
+        assert edit_distance("cofee", "coffee") == 1
+        assert edit_distance("cofefe", "coffee") == 1  # transposition
+        assert edit_distance("tea", "coffee") == 5
+        assert edit_distance("tea", "coffee", limit=2) == 3
+
+    def test_lookup_ranks_by_distance(self):
+        index = TrigramIndex()
+        for term in ["coffee", "toffee", "coffees", "cocoa", "tea"]:
+            index.add(term)
+
+        assert index.lookup("cofee") == [("coffee", 1)]
+        assert index.lookup("cofffee", max_distance=2) == [
+            ("coffee", 1),
+            ("coffees", 2),
+            ("toffee", 2),
+        ]
+        assert index.lookup("tea") == [("tea", 0)]
+        assert index.lookup("tae") == []  # too short to correct
+        assert max_edits("headphones") == 2
+
+    def test_remove_and_bounded_candidates(self):
+        index = TrigramIndex(max_candidates=5)
+        for i in range(500):
+            index.add(f"coffee{i}")
+        index.add("coffee")
+        index.remove("coffee")
+
+        matches = index.lookup("cofee1")
+
+        assert "coffee" not in index and len(index) == 500
+        assert len(matches) <= 5
+        assert ("coffee1", 1) in matches
@@ -0,0 +1,102 @@
+import pytest
+
+from app.utils.mock_store import InMemoryDocumentStore
+
+
+@pytest.fixture
+def store():
+    store = InMemoryDocumentStore()
+    products = [
+        ("p1", {"name": "Apple", "category": "fruit", "price": 3, "tags": ["red"]}),
+        ("p2", {"name": "Banana", "category": "fruit", "price": 1.5, "tags": []}),
+        ("p3", {"name": "Bread", "category": "bakery", "price": 4, "tags": ["fresh"]}),
+        ("p4", {"name": "Apricot", "category": "fruit", "price": 6, "tags": ["fresh"]}),
+    ]
+    for doc_id, data in products:
+        store.set("products", doc_id, data)
+    return store
+
+
+class TestInMemoryDocumentStore:
+    """Test the indexed mock document store."""
+
+    def test_equality_filter(self, store):
+        docs = store.query("products", [("category", "==", "fruit")])
+        assert [d["id"] for d in docs] == ["p1", "p2", "p4"]
+
+    def test_equality_tells_types_apart(self, store):
+        store.set("flags", "a", {"active": True, "codes": [True]})
+        store.set("flags", "b", {"active": 1, "codes": [1]})
+        store.set("flags", "c", {"active": 1.0, "parent": None})
+        store.set("flags", "d", {})
+
+        def ids(filters):
+            return [d["id"] for d in store.query("flags", filters)]
+
+        assert ids([("active", "==", True)]) == ["a"]
+        assert ids([("active", "==", 1)]) == ["b", "c"]
+        assert ids([("codes", "array-contains", 1)]) == ["b"]
+        # Documents without the field don't match == None
+        assert ids([("parent", "==", None)]) == ["c"]
+        store.update("flags", "a", {"active": 1})
+        assert ids([("active", "==", True)]) == []
+        assert ids([("active", "in", [1])]) == ["a", "b", "c"]
+
+    def test_range_filter_with_order(self, store):
+        docs = store.query(
+            "products", [("price", ">=", 3)], order_by="price", descending=True
+        )
+        assert [d["id"] for d in docs] == ["p4", "p3", "p1"]
+
+    def test_prefix_search(self, store):
+        docs = store.query(
+            "products",
+            [("name", ">=", "Ap"), ("name", "<=", "Ap\uf8ff")],
+            order_by="name",
+        )
+        assert [d["name"] for d in docs] == ["Apple", "Apricot"]
+
+    def test_array_contains_and_not_in(self, store):
+        docs = store.query(
+            "products",
+            [("tags", "array-contains", "fresh"), ("category", "not-in", ["bakery"])],
+        )
+        assert [d["id"] for d in docs] == ["p4"]
+
+    def test_indexes_follow_updates_and_deletes(self, store):
+        assert store.count("products", [("category", "==", "fruit")]) == 3
+        assert store.query("products", [("price", "<", 2)])[0]["id"] == "p2"
+
+        store.update("products", "p2", {"category": "snacks", "price": 9})
+        store.delete("products", "p1")
+
+        assert store.count("products", [("category", "==", "fruit")]) == 1
+        assert store.query("products", [("price", "<", 2)]) == []
+        assert store.query("products", order_by="price")[-1]["id"] == "p2"
+
+    def test_offset_limit_and_copies(self, store):
+        docs = store.query("products", order_by="price", offset=1, limit=2)
+        assert [d["id"] for d in docs] == ["p1", "p3"]
+
+        docs[0]["price"] = 100
+        assert store.get("products", "p1")["price"] == 3
+
+    def test_unsupported_operator(self, store):
+        with pytest.raises(ValueError):
+            store.query("products", [("price", "~", 1)])
+
+    def test_get_many(self, store):
+        docs = store.get_many("products", ["p3", "missing", "p1"])
+        assert list(docs) == ["p3", "p1"]
+        assert store.get_many("unknown", ["p1"]) == {}
+
+    def test_aggregate(self, store):
+        result = store.aggregate(
+            "products",
+            [("category", "==", "fruit")],
+            sum_fields=["price"],
+            avg_fields=["price", "name"],
+        )
+        assert result["count"] == 3
+        assert result["sum"] == {"price": 10.5}
+        assert result["avg"] == {"price": 3.5, "name": None}
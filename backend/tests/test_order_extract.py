@@ -0,0 +1,131 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.order_extract import (
+    OrderExtract,
+    bucket_range,
+    bucket_starts,
+    resolve_period,
+)
+
+ORDERS = [
+    {
+        "id": "o1",
+        "customer_id": "c1",
+        "store_id": "s1",
+        "status": "paid",
+        "total": 30,
+        "items": [
+            {"product_id": "p1", "price": 10, "quantity": 2},
+            {"product_id": "p2", "price": 10},
+        ],
+        "created_at": "2026-03-02T10:00:00",
+    },
+    {
+        "id": "o2",
+        "customer_id": "c2",
+        "store_id": "s2",
+        "status": "paid",
+        "items": [{"product_id": "p2", "price": 5, "quantity": 3}],
+        "created_at": "2026-03-05T10:00:00",
+    },
+    # Arrives out of time order
+    {
+        "id": "o3",
+        "customer_id": "c2",
+        "store_id": "s1",
+        "status": "paid",
+        "total": 8,
+        "items": [{"product_id": "p1", "price": 8}],
+        "created_at": "2026-03-01T09:00:00Z",
+    },
+    {
+        "id": "o4",
+        "customer_id": "c1",
+        "status": "cancelled",
+        "total": 99,
+        "items": [{"product_id": "p3", "price": 99}],
+        "created_at": "2026-03-04T10:00:00",
+    },
+    {"id": "o5", "customer_id": "c3", "total": 1, "items": []},
+]
+
+
+class TestOrderExtract:
+    """Test the columnar order extract."""
+
+    def test_window(self):
+        extract = OrderExtract.build(ORDERS)
+
+        orders, lines = extract.window(datetime(2026, 3, 1), datetime(2026, 3, 4, 23))
+        # Sorted by created_at; cancelled and undated orders left out
+        assert list(orders["id"]) == ["o3", "o1"]
+        assert list(orders["total"]) == [8, 30]
+        assert list(lines["order_id"]) == ["o3", "o1", "o1"]
+        assert list(lines["product_id"]) == ["p1", "p1", "p2"]
+        assert list(lines["revenue"]) == [8, 20, 10]
+
+        orders, lines = extract.window(store_id="s2", include_cancelled=True)
+        assert list(orders["id"]) == ["o2"] and list(orders["total"]) == [15]
+        assert len(extract.window(include_cancelled=True)[0]) == 4
+
+    def test_writes(self):
+        extract = OrderExtract.build(ORDERS)
+
+        assert extract.update("o1", {"status": "cancelled"})
+        assert extract.update(
+            "o2",
+            {"items": [{"product_id": "p9", "price": 1, "quantity": 1}], "total": 1},
+        )
+        assert not extract.update("missing", {"status": "paid"})
+        orders, lines = extract.window()
+        assert list(orders["id"]) == ["o3", "o2"]
+        assert list(lines["product_id"]) == ["p1", "p9"]
+
+        firsts = extract.first_order_times(["c1", "c2", "c9"])
+        assert firsts[1] == np.datetime64("2026-03-01T09:00:00")
+        assert np.isnat(firsts[2])
+        assert extract.remove("o3") and not extract.remove("o3")
+        assert extract.first_order_times(["c2"])[0] == np.datetime64(
+            "2026-03-05T10:00:00"
+        )
+        assert len(extract) == 4
+
+    def test_compaction(self):
+        extract = OrderExtract()
+        for i in range(3000):
+            extract.add(
+                f"o{i}",
+                {
+                    "total": i,
+                    "items": [{"product_id": "p"}],
+                    "created_at": f"2026-01-01T00:00:{i % 60:02d}",
+                },
+            )
+        for i in range(2500):
+            extract.remove(f"o{i}")
+
+        orders, lines = extract.window()
+        assert sorted(orders["total"]) == list(range(2500, 3000))
+        assert len(lines) == 500
+        assert extract.stats()["rows"] < 3000
+
+    def test_periods(self):
+        assert resolve_period("week").days == 7
+        assert resolve_period("month").series_days == 360
+        assert resolve_period("200d").bucket == "week"
+        with pytest.raises(ValueError):
+            resolve_period("fortnight")
+
+        times = pd.Series(pd.to_datetime(["2026-03-03", "2026-03-08", "2026-03-09"]))
+        assert list(bucket_starts(times, "week").dt.strftime("%m-%d")) == [
+            "03-02",
+            "03-02",
+            "03-09",
+        ]
+        assert (
+            len(bucket_range(datetime(2026, 1, 15), datetime(2026, 3, 1), "month")) == 3
+        )
@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.controllers.analytics_controller import AnalyticsController
+from app.utils.firebase_utils import FirebaseUtils
+from app.utils.product_activity import ProductActivity
+
+ORDERS = [
+    {
+        "items": [{"product_id": "p1", "quantity": 2}, {"product_id": "p2"}],
+        "created_at": "2026-01-02",
+    },
+    {
+        "items": [
+            {"product_id": "p1", "quantity": 1},
+            {"product_id": "p1", "quantity": 3},
+        ],
+        "created_at": "2026-01-05",
+    },
+    {"items": [{"product_id": "p3", "quantity": 4}], "created_at": "2026-01-01"},
+    {"items": ["legacy", {"name": "no id"}]},
+]
+
+FEEDBACK = [
+    {"product_id": "p2", "comment": "Great"},
+    {"product_id": "p1", "comment": "Love it"},
+    {"product_id": "p2", "comment": "Bad batch"},
+    {"product_id": "p3", "comment": ""},
+    {"comment": "No product"},
+]
+
+
+class TestProductActivity:
+    """Test grouping orders and feedback by product."""
+
+    def test_order_stats(self):
+        activity = ProductActivity.build(ORDERS, FEEDBACK)
+
+        # An order counts once per product, however many lines it has
+        assert activity.order_count("p1") == 2
+        assert activity.quantity("p1") == 6
+        assert activity.last_ordered("p1") == "2026-01-05"
+        assert activity.order_count("p2") == 1 and activity.quantity("p2") == 1
+        assert activity.order_count("missing") == 0
+        assert activity.last_ordered("missing") is None
+
+    def test_feedback_slices(self):
+        activity = ProductActivity.build(ORDERS, FEEDBACK)
+
+        assert activity.feedback_comments("p2") == ["Great", "Bad batch"]
+        assert activity.feedback_comments("p1") == ["Love it"]
+        assert activity.feedback_comments("p3") == []
+        assert activity.stats() == {
+            "products": 3,
+            "orders": 4,
+            "feedback": 5,
+            "comments": 3,
+        }
+
+    def test_matches_per_product_scan(self):
+        activity = ProductActivity.build(ORDERS, FEEDBACK)
+
+        for product_id in ["p1", "p2", "p3"]:
+            scanned = [
+                order
+                for order in ORDERS
+                if product_id
+                in {i.get("product_id") for i in order["items"] if isinstance(i, dict)}
+            ]
+            assert activity.order_count(product_id) == len(scanned)
+
+
+class TestMLAnalysisActivity:
+    """Test how the ML analysis treats a failed order/feedback stream."""
+
+    def test_stream_failure_degrades_dashboard_section(self):
+        with patch("firebase_admin._apps", {}), patch(
+            "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+        ):
+            controller = AnalyticsController(FirebaseUtils())
+        controller.firebase.create_document("products", {"name": "Tea"}, "p1")
+
+        async def broken_stream(collection_name, *args, **kwargs):
+            raise ConnectionError("stream reset")
+            yield
+
+        with patch.object(controller.async_firebase, "iter_documents", broken_stream):
+            with pytest.raises(ConnectionError):
+                controller.get_ml_product_analysis()
+            dashboard = controller.get_dashboard_analytics()
+
+        assert "ml_analysis" in dashboard["degraded_sections"]
+        assert dashboard["ml_insights"] == {}
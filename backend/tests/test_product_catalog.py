@@ -0,0 +1,158 @@
+import random
+
+from app.utils.product_catalog import ProductCatalog
+
+PRODUCTS = [
+    {
+        "id": "p1",
+        "name": "Coffee",
+        "category": "Beverages",
+        "brand": "Roastery",
+        "price": 12.0,
+        "rating": 4.5,
+    },
+    {
+        "id": "p2",
+        "name": "Tea",
+        "category": "beverages",
+        "brand": "Leafy",
+        "price": 6.0,
+        "in_stock": False,
+    },
+    {
+        "id": "p3",
+        "name": "Cocoa",
+        "category": "Beverages",
+        "brand": "Leafy",
+        "price": 8.0,
+        "rating": 4.1,
+    },
+    {"id": "p4", "name": "Headphones", "category": "Electronics", "price": 99.0},
+    {"id": "p5", "name": "Gift Card", "category": "Beverages"},
+]
+
+
+class TestProductCatalog:
+    """Test the columnar product catalog."""
+
+    def test_filters(self):
+        catalog = ProductCatalog.build(PRODUCTS)
+
+        def ids(**kwargs):
+            return [doc["id"] for doc in catalog.query(**kwargs)["documents"]]
+
+        assert ids(category="BEVERAGES") == ["p1", "p2", "p3", "p5"]
+        assert ids(category="beverages", max_price=10) == ["p2", "p3", "p5"]
+        assert ids(category="beverages", in_stock_only=True, min_price=1) == [
+            "p1",
+            "p3",
+        ]
+        assert ids(brand="leafy") == ["p2", "p3"]
+        assert ids(category="Toys") == []
+
+    def test_sorting_skips_missing_fields(self):
+        catalog = ProductCatalog.build(PRODUCTS)
+
+        by_price = catalog.query(sort_by="price", include_total=True)
+        by_rating = catalog.query(sort_by="rating")
+
+        assert [doc["id"] for doc in by_price["documents"]] == ["p2", "p3", "p1", "p4"]
+        assert by_price["pagination"]["total_documents"] == 4
+        assert [doc["id"] for doc in by_rating["documents"]] == ["p3", "p1"]
+        assert catalog.query(sort_by="name", limit=1, fields=["name"])["documents"] == [
+            {"id": "p3", "name": "Cocoa"}
+        ]
+
+    def test_cursor_pagination(self):
+        catalog = ProductCatalog.build(PRODUCTS)
+
+        seen, token = [], None
+        while True:
+            page = catalog.query(sort_by="name", limit=2, page_token=token)
+            seen += [doc["name"] for doc in page["documents"]]
+            token = page["pagination"]["next_page_token"]
+            if not token:
+                break
+
+        assert seen == ["Cocoa", "Coffee", "Gift Card", "Headphones", "Tea"]
+
+    def test_incremental_updates(self):
+        catalog = ProductCatalog.build(PRODUCTS)
+
+        catalog.update("p4", {"price": 1.0})
+        catalog.remove("p1")
+        for i in range(200):
+            catalog.add(f"n{i:03d}", {"name": "Mug", "price": 5.0 + i})
+        for i in range(150):
+            catalog.remove(f"n{i:03d}")
+
+        cheapest = catalog.query(sort_by="price", limit=3)["documents"]
+        assert [doc["id"] for doc in cheapest] == ["p4", "p2", "p3"]
+        assert len(catalog) == 54
+        assert catalog.stats()["rows"] < 200
+
+    def test_facets(self):
+        catalog = ProductCatalog.build(PRODUCTS)
+
+        facets = catalog.facets()
+        # Each facet ignores its own filter, but applies the others
+        filtered = catalog.facets(category="beverages", brand="leafy")
+
+        assert facets["category"] == {"Beverages": 4, "Electronics": 1}
+        assert facets["brand"] == {"Leafy": 2, "Roastery": 1}
+        assert facets["price"] == {"0-10": 2, "10-25": 1, "50-100": 1}
+        assert facets["rating"] == {"4-5": 2}
+        assert facets["in_stock"] == {"true": 4, "false": 1}
+        assert filtered["category"] == {"Beverages": 2}
+        assert filtered["brand"] == {"Leafy": 2, "Roastery": 1}
+        assert filtered["in_stock"] == {"true": 1, "false": 1}
+        assert catalog.facets(ids=["p1", "p4", "missing"])["category"] == {
+            "Beverages": 1,
+            "Electronics": 1,
+        }
+
+    def test_facets_follow_writes(self):
+        catalog = ProductCatalog.build(PRODUCTS)
+
+        catalog.update("p2", {"category": "Tea", "in_stock": True})
+        catalog.remove("p4")
+        for i in range(100):
+            catalog.add(f"n{i}", {"category": "Mugs", "price": 600})
+
+        facets = catalog.facets(min_price=500)
+
+        assert facets["category"] == {"Mugs": 100}
+        assert catalog.facets()["category"] == {"Mugs": 100, "Beverages": 3, "Tea": 1}
+        assert facets["price"] == {"0-10": 2, "10-25": 1, "500+": 100}
+        assert catalog.facets()["in_stock"] == {"true": 104, "false": 0}
+
+    def test_sort_ranks_follow_writes(self):
+        rng = random.Random(3)
+
+        def product(i):
+            return {
+                "name": rng.choice(["Apple", "Bread", "Cheese"]),
+                "price": rng.choice([1.0, 2.5, 4.0]),
+            }
+
+        catalog = ProductCatalog()
+        for i in range(60):
+            catalog.add(f"p{i:02d}", product(i))
+        sorts = ("name", "price", None)
+
+        for step in range(150):
+            for sort_by in sorts:
+                catalog.query(sort_by=sort_by)  # Cache the ranks
+            doc_id = f"p{rng.randrange(80):02d}"
+            if step % 4 == 0:
+                catalog.remove(doc_id)
+            elif step % 4 == 1:
+                catalog.update(doc_id, {"price": rng.choice([1.0, 2.5, 4.0])})
+            else:
+                catalog.add(doc_id, product(step))
+
+            rebuilt = ProductCatalog.build(catalog.query(limit=1000)["documents"])
+            for sort_by in sorts:
+                assert catalog.query(sort_by=sort_by, limit=1000) == rebuilt.query(
+                    sort_by=sort_by, limit=1000
+                )
@@ -0,0 +1,157 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.firebase_utils import FirebaseUtils
+from app.utils.query_planner import (
+    STRATEGY_HEAP,
+    STRATEGY_QUERY,
+    STRATEGY_STREAM_FILTER,
+    ListingQuery,
+    matches_filter,
+)
+
+ORDERS = [
+    {
+        "id": f"o{i}",
+        "status": "paid" if i % 2 else "pending",
+        "total": float(i * 10),
+        "created_at": f"2026-01-{i + 1:02d}",
+    }
+    for i in range(10)
+]
+
+FIRESTORE = SimpleNamespace(db=object())
+
+
+@pytest.fixture
+def firebase():
+    with patch("firebase_admin._apps", {}), patch(
+        "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+    ):
+        firebase = FirebaseUtils()
+    for order in ORDERS:
+        firebase.create_document("orders", order, order["id"])
+    return firebase
+
+
+class TestListingQuery:
+    """Test listing query planning and execution."""
+
+    def test_firestore_plan(self):
+        query = ListingQuery(
+            "orders",
+            filters=[
+                ("status", "==", "paid"),
+                ("total", ">=", 30),
+                ("created_at", "<", "2026-02"),
+            ],
+            sort_by="created_at",
+            descending=True,
+            limit=3,
+        )
+
+        plan = query.explain(FIRESTORE)
+
+        # Only the sort field's inequality can be pushed with the sort
+        assert plan["strategy"] == STRATEGY_STREAM_FILTER
+        assert plan["pushed_down"]["filters"] == [
+            ["status", "==", "paid"],
+            ["created_at", "<", "2026-02"],
+        ]
+        assert plan["in_process"]["filters"] == [["total", ">=", 30]]
+        assert plan["pushed_down"]["sort"] == {
+            "field": "created_at",
+            "descending": True,
+        }
+
+    def test_firestore_plan_without_sortable_range(self):
+        heap = ListingQuery(
+            "orders", filters=[("total", ">=", 30)], sort_by="created_at", limit=3
+        )
+        simple = ListingQuery(
+            "orders", filters={"status": "paid"}, sort_by="created_at", limit=3
+        )
+
+        assert heap.explain(FIRESTORE)["strategy"] == STRATEGY_HEAP
+        assert heap.explain(FIRESTORE)["in_process"]["sort"] == {
+            "field": "created_at",
+            "descending": False,
+        }
+        assert simple.explain(FIRESTORE)["strategy"] == STRATEGY_QUERY
+        assert simple.explain(FIRESTORE)["pushed_down"]["limit"] == 3
+
+    def test_mock_pushes_everything(self, firebase):
+        query = ListingQuery(
+            "orders",
+            filters=[("status", "==", "paid"), ("total", ">=", 30)],
+            sort_by="created_at",
+            descending=True,
+            limit=2,
+        )
+
+        page = query.execute(firebase, include_total=True)
+        second = query.execute(
+            firebase, page_token=page["pagination"]["next_page_token"]
+        )
+
+        assert query.explain(firebase)["strategy"] == STRATEGY_QUERY
+        assert [o["id"] for o in page["documents"]] == ["o9", "o7"]
+        assert page["pagination"]["total_documents"] == 4
+        assert [o["id"] for o in second["documents"]] == ["o5", "o3"]
+
+    def test_heap_top_k_pages(self, firebase):
+        query = ListingQuery(
+            "orders",
+            filters=[("total", ">=", 30)],
+            sort_by="created_at",
+            descending=True,
+            limit=3,
+        )
+
+        with patch.object(FirebaseUtils, "db", new=FIRESTORE.db), patch.object(
+            FirebaseUtils,
+            "iter_documents",
+            lambda self, *args, **kwargs: iter(
+                [dict(o) for o in ORDERS if o["total"] >= 30]
+            ),
+        ):
+            page = query.execute(firebase, include_total=True)
+            second = query.execute(
+                firebase, page_token=page["pagination"]["next_page_token"]
+            )
+            third = query.execute(
+                firebase, page_token=second["pagination"]["next_page_token"]
+            )
+
+        assert [o["id"] for o in page["documents"]] == ["o9", "o8", "o7"]
+        assert page["pagination"]["total_documents"] == 7
+        assert [o["id"] for o in second["documents"]] == ["o6", "o5", "o4"]
+        assert [o["id"] for o in third["documents"]] == ["o3"]
+        assert third["pagination"]["has_next"] is False
+
+    def test_predicate_without_limit(self, firebase):
+        query = ListingQuery(
+            "orders",
+            limit=None,
+            predicate=lambda order: order["total"] % 30 == 0,
+            predicate_description="total divisible by 30",
+        )
+
+        page = query.execute(firebase)
+
+        assert [o["id"] for o in page["documents"]] == ["o0", "o3", "o6", "o9"]
+        assert (
+            query.explain(firebase)["in_process"]["predicate"]
+            == "total divisible by 30"
+        )
+
+    def test_matches_filter(self):
+        doc = {"rating": 4, "tags": ["a", "b"], "name": "x"}
+
+        assert matches_filter(doc, ("rating", "==", 4.0))
+        assert not matches_filter(doc, ("rating", ">", "3"))  # different type
+        assert matches_filter(doc, ("tags", "array-contains-any", ["c", "b"]))
+        assert matches_filter(doc, ("name", "not-in", ["y"]))
+        assert not matches_filter(doc, ("missing", "!=", 1))
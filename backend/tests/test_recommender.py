@@ -0,0 +1,166 @@
+import random
+from unittest.mock import patch
+
+import numpy as np
+
+from app.utils.firebase_utils import FirebaseUtils
+from app.utils.recommender import (
+    RECOMMENDATIONS_COLLECTION,
+    RecommendationScorer,
+    get_recommendation_scorer,
+    precompute_recommendations,
+)
+
+PRODUCTS = [
+    {
+        "id": "p1",
+        "category": "Beverages",
+        "brand": "Roastery",
+        "price": 12,
+        "rating": 4.5,
+        "review_count": 120,
+    },
+    {"id": "p2", "category": "Beverages", "brand": "Leafy", "price": 6, "rating": 3.6},
+    {
+        "id": "p3",
+        "category": "Electronics",
+        "brand": "Sonic",
+        "price": 99,
+        "review_count": 60,
+    },
+    {"id": "p4", "category": "Snacks", "brand": "Leafy", "price": 3},
+]
+
+
+class TestRecommendationScorer:
+    """Test the vectorized recommendation scoring."""
+
+    def test_default_weights(self):
+        scorer = RecommendationScorer(PRODUCTS)
+
+        results = scorer.recommend(
+            {
+                "categories": ["Beverages"],
+                "brands": ["Leafy"],
+                "price_range": {"min": 5, "max": 20},
+                "purchase_history": ["p1"],
+            }
+        )
+
+        # p2: 15 + 10 + 12 + 5 + 5, p1: 15 + 10 + 8 + 6, p4: 12 + 5, p3: 5 + 3
+        assert [(p["id"], p["recommendation_score"]) for p in results] == [
+            ("p2", 47),
+            ("p1", 39),
+            ("p4", 17),
+            ("p3", 8),
+        ]
+
+    def test_batch_matches_single_user_scoring(self):
+        scorer = RecommendationScorer(PRODUCTS)
+        users = [
+            {"categories": ["Snacks"]},
+            {"brands": ["Sonic"], "purchase_history": [{"product_id": "p3"}]},
+            {},
+        ]
+
+        batch = scorer.recommend_batch(users, limit=2)
+
+        assert batch == [scorer.recommend(user, limit=2) for user in users]
+        assert [p["id"] for p in batch[0]] == ["p4", "p1"]
+        # Ties keep catalog order
+        assert [p["id"] for p in batch[2]] == ["p1", "p2"]
+
+    def test_batches_sized_from_memory_budget(self):
+        scorer = RecommendationScorer(PRODUCTS)
+        users = [{"categories": ["Snacks"]}, {"brands": ["Sonic"]}, {}]
+
+        # 4 products x 8 bytes per cell: 64 bytes leaves room for 2 users
+        assert scorer.users_per_batch(64) == 2
+        assert scorer.users_per_batch(1) == 1
+        assert scorer.score(users).dtype == np.float32
+        with patch.dict("os.environ", {"RECOMMENDATION_BATCH_BYTES": "64"}):
+            chunked = scorer.recommend_batch(users)
+        assert chunked == scorer.recommend_batch(users)
+
+    def test_custom_weights(self):
+        scorer = RecommendationScorer(
+            PRODUCTS, weights={"not_purchased": 0, "price_range": 0}
+        )
+
+        results = scorer.recommend({"categories": ["Electronics"]})
+
+        assert [p["id"] for p in results] == ["p3", "p1", "p2"]
+
+    def test_writes_match_a_fresh_build(self):
+        rng = random.Random(7)
+        scorer = RecommendationScorer(PRODUCTS)
+        products = {p["id"]: dict(p) for p in PRODUCTS}
+        for _ in range(300):
+            doc_id = f"p{rng.randrange(120)}"
+            if rng.random() < 0.3:
+                scorer.remove(doc_id)
+                products.pop(doc_id, None)
+            else:
+                product = {
+                    "id": doc_id,
+                    "category": rng.choice(["Beverages", "Snacks", "Electronics"]),
+                    "brand": rng.choice(["Leafy", "Sonic", "Roastery"]),
+                    "price": rng.randrange(1, 100),
+                    "rating": rng.choice([3, 3.7, 4.5]),
+                }
+                scorer.add(doc_id, product)
+                products[doc_id] = product
+        user = {
+            "categories": ["Snacks"],
+            "brands": ["Sonic"],
+            "purchase_history": ["p3"],
+        }
+
+        assert len(scorer) == len(products)
+        assert scorer.recommend(user, limit=30) == RecommendationScorer(
+            list(products.values())
+        ).recommend(user, limit=30)
+
+    def test_precompute_recommendations(self):
+        with patch("firebase_admin._apps", {}), patch(
+            "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+        ):
+            firebase = FirebaseUtils()
+        for product in PRODUCTS:
+            firebase.create_document("products", product, product["id"])
+        firebase.create_document(
+            "users", {"preferences": {"categories": ["Snacks"]}}, "u1"
+        )
+        firebase.create_document("users", {"is_active": False}, "u2")
+
+        summary = precompute_recommendations(firebase, limit=2, batch_size=1)
+        stored = firebase.get_document(RECOMMENDATIONS_COLLECTION, "u1")
+
+        assert summary["users"] == 1 and summary["failed"] == 0
+        assert [p["id"] for p in stored["products"]] == ["p4", "p1"]
+        assert firebase.get_document(RECOMMENDATIONS_COLLECTION, "u2") is None
+
+
+class TestCollectionRecommendationScorer:
+    """Test the shared scorer kept in sync with the products collection."""
+
+    def test_follows_product_writes(self):
+        with patch("firebase_admin._apps", {}), patch(
+            "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+        ):
+            firebase = FirebaseUtils()
+        for product in PRODUCTS:
+            firebase.create_document("products", product, product["id"])
+        scorer = get_recommendation_scorer("products", firebase)
+        assert get_recommendation_scorer("products", firebase) is scorer
+
+        assert [
+            p["id"] for p in scorer.recommend({"categories": ["Snacks"]}, limit=1)
+        ] == ["p4"]
+        firebase.create_document("products", {"category": "Snacks", "rating": 5}, "p5")
+        firebase.update_document("products", "p4", {"category": "Beverages"})
+
+        results = scorer.recommend({"categories": ["Snacks"]}, limit=1)
+        assert [(p["id"], p["recommendation_score"]) for p in results] == [("p5", 38)]
+        firebase.delete_document("products", "p5")
+        assert scorer.recommend({"categories": ["Snacks"]}, limit=1)[0]["id"] != "p5"
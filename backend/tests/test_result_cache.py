@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.result_cache import ResultCache
+
+
+class Counter:
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return {"version": calls}
+
+
+class TestResultCache:
+    """Test the stale-while-revalidate result cache."""
+
+    def test_fresh_then_stale(self):
+        cache = ResultCache(ttl=0.2, max_stale=10)
+        compute = Counter(delay=0.05)
+
+        value, freshness = cache.get("k", compute)
+        assert value == {"version": 1} and freshness["status"] == "miss"
+        assert cache.get("k", compute)[1]["status"] == "hit"
+
+        time.sleep(0.25)
+        # Stale: the old payload comes back at once, one refresh starts
+        started = time.perf_counter()
+        value, freshness = cache.get("k", compute)
+        assert value == {"version": 1}
+        assert freshness["status"] == "stale" and freshness["revalidating"]
+        assert time.perf_counter() - started < 0.04
+        cache.get("k", compute)
+
+        time.sleep(0.1)
+        value, freshness = cache.get("k", compute)
+        assert value == {"version": 2} and freshness["status"] == "hit"
+        assert compute.calls == 2
+        assert cache.stats()["refreshes"] == 1
+
+    def test_concurrent_misses_coalesce(self):
+        cache = ResultCache(ttl=60)
+        compute = Counter(delay=0.1)
+        results = []
+
+        def request():
+            results.append(cache.get(("dashboard", "store-1", "7d"), compute))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert compute.calls == 1
+        assert all(value == {"version": 1} for value, _ in results)
+        statuses = sorted(freshness["status"] for _, freshness in results)
+        assert statuses == ["coalesced"] * 7 + ["miss"]
+
+    def test_failures_not_cached(self):
+        cache = ResultCache(ttl=0.01, max_stale=10)
+        with pytest.raises(RuntimeError):
+            cache.get("k", Counter(fail=True))
+        assert cache.stats()["entries"] == 0
+
+        cache.get("k", Counter())
+        time.sleep(0.02)
+        # A failed background refresh keeps serving the stale result
+        failing = Counter(fail=True)
+        assert cache.get("k", failing)[0] == {"version": 1}
+        time.sleep(0.05)
+        assert cache.get("k", failing)[1]["status"] == "stale"
+        assert cache.stats()["refresh_failures"] >= 1
+
+    def test_expiry_and_eviction(self):
+        cache = ResultCache(ttl=0.01, max_stale=0.02, max_entries=2)
+        compute = Counter()
+        cache.get("a", compute)
+        time.sleep(0.03)
+        # Past max_stale the request recomputes
+        value, freshness = cache.get("a", compute)
+        assert value == {"version": 2} and freshness["status"] == "miss"
+
+        cache.get("b", compute)
+        cache.get("c", compute)
+        assert cache.stats()["entries"] == 2
+        assert cache.get("a", compute, force=True)[1]["status"] == "miss"
+
+    def test_ttl_for_shortens_partial_results(self):
+        cache = ResultCache(
+            ttl=60,
+            max_stale=600,
+            ttl_for=lambda value: 0.05 if value["version"] == 1 else None,
+        )
+        compute = Counter()
+        value, freshness = cache.get("k", compute)
+        assert value == {"version": 1} and freshness["ttl_seconds"] == 0.05
+
+        time.sleep(0.06)
+        # Not served stale past its own TTL: the request recomputes
+        value, freshness = cache.get("k", compute)
+        assert value == {"version": 2} and freshness["status"] == "miss"
+        freshness = cache.get("k", compute)[1]
+        assert freshness["status"] == "hit" and freshness["ttl_seconds"] == 60
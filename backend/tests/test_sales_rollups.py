@@ -0,0 +1,116 @@
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.firebase_utils import FirebaseUtils
+from app.utils.sales_rollups import (
+    ROLLUPS_COLLECTION,
+    SCOPE_ALL,
+    SCOPE_PRODUCT,
+    SCOPE_STORE,
+    backfill_sales_rollups,
+    daily_series,
+    daily_window,
+    record_order,
+    top_keys,
+)
+
+ORDERS = [
+    {
+        "store_id": "s1",
+        "items": [
+            {"product_id": "p1", "price": 2.5, "quantity": 2},
+            {"product_id": "p2", "price": 10},
+        ],
+        "total": 15,
+        "created_at": "2026-03-01T09:30:00",
+    },
+    {
+        "store_id": "s2",
+        "items": [
+            {"product_id": "p1", "price": 2.5, "quantity": 1},
+            {"product_id": "p1", "price": 2.5, "quantity": 3},
+        ],
+        "total": 10,
+        "created_at": "2026-03-01T18:00:00",
+    },
+    {
+        "items": [{"product_id": "p2", "price": 10, "quantity": 4}],
+        "total": 40,
+        "created_at": "2026-03-03T12:00:00",
+    },
+    {"items": [{"product_id": "p3", "price": 1}]},
+]
+
+
+def make_firebase():
+    with patch("firebase_admin._apps", {}), patch(
+        "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+    ):
+        return FirebaseUtils()
+
+
+@pytest.fixture
+def firebase():
+    return make_firebase()
+
+
+class TestSalesRollups:
+    """Test daily sales rollups."""
+
+    def test_record_order_increments(self, firebase):
+        recorded = [record_order(firebase, order) for order in ORDERS]
+
+        # Orders without created_at can't be placed on a day
+        assert recorded == [True, True, True, False]
+        end = date(2026, 3, 3)
+        assert daily_series(firebase, SCOPE_PRODUCT, "p1", days=3, end=end) == [6, 0, 0]
+        assert daily_series(
+            firebase, SCOPE_PRODUCT, "p2", days=3, end=end, metric="revenue"
+        ) == [10, 0, 40]
+        assert daily_series(
+            firebase, SCOPE_STORE, "s1", days=3, end=end, metric="orders"
+        ) == [1, 0, 0]
+
+        window = daily_window(firebase, SCOPE_ALL, days=3, end=end)
+        assert window["dates"] == ["2026-03-01", "2026-03-02", "2026-03-03"]
+        assert window["orders"] == [2, 0, 1]
+        assert window["revenue"] == [25, 0, 40]
+
+    def test_backfill_matches_incremental(self, firebase):
+        for order in ORDERS:
+            record_order(firebase, order)
+
+        rebuilt = make_firebase()
+        for index, order in enumerate(ORDERS):
+            rebuilt.create_document("orders", order, f"o{index}")
+        summary = backfill_sales_rollups(rebuilt)
+        # Re-running overwrites rather than double counting
+        backfill_sales_rollups(rebuilt)
+
+        assert summary["orders"] == 4 and summary["failed"] == 0
+        expected = {
+            doc["id"]: doc for doc in firebase.iter_documents(ROLLUPS_COLLECTION)
+        }
+        actual = {doc["id"]: doc for doc in rebuilt.iter_documents(ROLLUPS_COLLECTION)}
+        assert actual == expected
+
+    def test_top_keys(self, firebase):
+        for order in ORDERS:
+            record_order(firebase, order)
+
+        top = top_keys(
+            firebase, SCOPE_PRODUCT, start=date(2026, 3, 1), end=date(2026, 3, 3)
+        )
+        assert [entry["key"] for entry in top] == ["p2", "p1"]
+        assert top[0]["units"] == 5 and top[0]["orders"] == 2
+
+        first_day = top_keys(
+            firebase,
+            SCOPE_PRODUCT,
+            start=date(2026, 3, 1),
+            end=date(2026, 3, 1),
+            metric="units",
+        )
+        assert [entry["key"] for entry in first_day] == ["p1", "p2"]
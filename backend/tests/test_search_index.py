@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from app.utils.document_cache import DocumentCache
+from app.utils.firebase_utils import FirebaseUtils
+from app.utils.search_index import CollectionSearchIndex, SearchIndex, tokenize
+
+PRODUCTS = [
+    {
+        "id": "p1",
+        "name": "Organic Coffee Beans",
+        "description": "Medium roast arabica beans",
+        "category": "Beverages",
+        "tags": ["coffee", "organic"],
+    },
+    {
+        "id": "p2",
+        "name": "Green Tea",
+        "description": "Loose leaf tea, pairs well with coffee cake",
+        "category": "Beverages",
+        "tags": ["tea"],
+    },
+    {
+        "id": "p3",
+        "name": "Wireless Headphones",
+        "description": "Noise cancelling",
+        "category": "Electronics",
+        "tags": [],
+    },
+]
+
+
+class TestSearchIndex:
+    """Test the BM25 inverted index."""
+
+    def test_tokenize(self):
+        assert tokenize("Eco-Friendly Bottle, 500ml") == [
+            "eco",
+            "friendly",
+            "bottle",
+            "500ml",
+        ]
+        assert tokenize(["Coffee", "Fair Trade"]) == ["coffee", "fair", "trade"]
+
+    def test_name_match_outranks_description_match(self):
+        index = SearchIndex.build(PRODUCTS)
+
+        results = index.search_documents("coffee")
+
+        assert [r["id"] for r in results] == ["p1", "p2"]
+        assert results[0]["relevance_score"] > results[1]["relevance_score"]
+
+    def test_category_and_top_k(self):
+        index = SearchIndex.build(PRODUCTS)
+
+        assert [doc_id for doc_id, _ in index.search("beverages", limit=1)] == ["p1"]
+        assert index.search("nonexistent") == []
+
+    def test_incremental_updates(self):
+        index = SearchIndex.build(PRODUCTS)
+
+        index.update("p3", {"name": "Coffee Grinder"})
+        assert "p3" in [doc_id for doc_id, _ in index.search("grinder")]
+        assert index.search("headphones") == []
+
+        index.remove("p1")
+        assert [doc_id for doc_id, _ in index.search("organic")] == []
+        assert index.stats()["documents"] == 2
+
+        index.add("p4", {"name": "Cold Brew Coffee"})
+        assert index.search("brew")[0][0] == "p4"
+
+    def test_correct_query(self):
+        index = SearchIndex.build(PRODUCTS)
+
+        assert index.correct_query("Orgnaic cofee") == "organic coffee"
+        assert index.correct_query("wireles headphnes xyz") == "wireless headphones"
+
+        index.remove("p3")
+        assert index.correct_query("headphnes") == ""
+        assert index.stats()["vocabulary"] > 0
+
+    def test_writes_during_reload_are_replayed(self):
+        with patch("firebase_admin._apps", {}), patch(
+            "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+        ):
+            firebase = FirebaseUtils()
+        for product in PRODUCTS:
+            firebase.create_document("products", dict(product), product["id"])
+        index = CollectionSearchIndex(firebase, "products", refresh_seconds=0)
+
+        stream = firebase.iter_documents
+
+        def iter_with_writes(collection_name, *args, **kwargs):
+            documents = list(stream(collection_name, *args, **kwargs))
+            yield documents[0]
+            # Land while the index is being built
+            firebase.create_document("products", {"name": "Cold Brew Coffee"}, "p4")
+            firebase.update_document("products", "p2", {"name": "Matcha Tea"})
+            firebase.delete_document("products", "p3")
+            yield from documents[1:]
+
+        with patch.object(firebase, "iter_documents", iter_with_writes):
+            assert index.search("brew")[0][0] == "p4"
+
+        assert [doc_id for doc_id, _ in index.search("matcha")] == ["p2"]
+        assert index.search("headphones") == []
+        assert len(index) == 3
+
+    def test_update_fallback_reads_past_the_cache(self):
+        with patch("firebase_admin._apps", {}), patch(
+            "firebase_admin.initialize_app", side_effect=ValueError("no credentials")
+        ):
+            firebase = FirebaseUtils(cache=DocumentCache())
+        index = CollectionSearchIndex(firebase, "products", refresh_seconds=0)
+        assert index.search("tea") == []
+
+        # Written behind the index's back (e.g. by another process), then
+        # read through the cache
+        firebase._mock_store.set("products", "p9", {"name": "Green Tea"})
+        assert firebase.get_document("products", "p9")["name"] == "Green Tea"
+        firebase.update_document("products", "p9", {"name": "Matcha Tea"})
+
+        assert [doc_id for doc_id, _ in index.search("matcha")] == ["p9"]
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from app.utils.section_runner import Section, SectionRunner
+
+
+def sleeper(seconds, value):
+    def compute(*args):
+        time.sleep(seconds)
+        return value
+
+    return compute
+
+
+class TestSectionRunner:
+    """Test concurrent dashboard sections with time budgets."""
+
+    def test_sections_run_concurrently(self):
+        runner = SectionRunner(max_workers=4, default_budget=2)
+        started = time.perf_counter()
+        results = runner.run(
+            [Section(name, sleeper(0.2, name)) for name in ("stats", "ml", "sentiment")]
+        )
+        elapsed = time.perf_counter() - started
+
+        assert results.values == {
+            "stats": "stats",
+            "ml": "ml",
+            "sentiment": "sentiment",
+        }
+        assert results.degraded_sections == []
+        assert set(results.timings_ms) == {"stats", "ml", "sentiment"}
+        assert elapsed < 0.5
+
+    def test_late_section_is_degraded(self):
+        runner = SectionRunner(max_workers=2, default_budget=2)
+        release = threading.Event()
+        started = time.perf_counter()
+        results = runner.run(
+            [
+                Section("stats", sleeper(0.01, {"orders": 3})),
+                Section("ml", lambda: release.wait(5), budget=0.2, default={}),
+                Section(
+                    "insights",
+                    lambda ml: ml,
+                    depends_on=["ml"],
+                    default={"empty": True},
+                ),
+            ]
+        )
+        elapsed = time.perf_counter() - started
+        release.set()
+
+        assert elapsed < 1
+        assert results.values == {
+            "stats": {"orders": 3},
+            "ml": {},
+            "insights": {"empty": True},
+        }
+        assert results.degraded == {"ml": "timeout", "insights": "dependency"}
+        assert results.degraded_sections == ["insights", "ml"]
+
+    def test_failures_and_dependencies(self):
+        def broken():
+            raise RuntimeError("feedback unavailable")
+
+        runner = SectionRunner(max_workers=2, default_budget=2)
+        results = runner.run(
+            [
+                Section("sentiment", broken, default=[]),
+                Section("ml", sleeper(0.01, {"alerts": [1, 2, 3, 4]})),
+                Section("alerts", lambda ml: ml["alerts"][:3], depends_on=["ml"]),
+                Section("orphan", lambda x: x, depends_on=["missing"]),
+            ]
+        )
+
+        assert results.values["sentiment"] == []
+        assert results.values["alerts"] == [1, 2, 3]
+        assert results.degraded == {"sentiment": "error", "orphan": "dependency"}
+
+    def test_stragglers_do_not_fill_the_pool(self):
+        runner = SectionRunner(max_workers=2, default_budget=2)
+        release = threading.Event()
+
+        def slow_ml():
+            release.wait(5)
+            return {"late": True}
+
+        first = runner.run([Section("ml", slow_ml, budget=0.1, default={})])
+        assert first.degraded == {"ml": "timeout"}
+        assert runner.stragglers == ["ml"]
+
+        # The late ML run still holds a worker: ML isn't started again,
+        # the other sections run as usual
+        started = time.perf_counter()
+        second = runner.run(
+            [
+                Section("stats", sleeper(0.01, {"orders": 3})),
+                Section("ml", slow_ml, budget=0.1, default={}),
+                Section("insights", lambda ml: ml, depends_on=["ml"], default={}),
+            ]
+        )
+        assert time.perf_counter() - started < 0.1
+        assert second.values["stats"] == {"orders": 3}
+        assert second.degraded == {"ml": "busy", "insights": "dependency"}
+
+        release.set()
+        deadline = time.monotonic() + 2
+        while runner.stragglers and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert runner.run([Section("ml", slow_ml)]).values == {"ml": {"late": True}}
+
+    def test_busy_when_stragglers_hold_every_worker(self):
+        runner = SectionRunner(max_workers=1, default_budget=0.1)
+        release = threading.Event()
+        runner.run([Section("ml", lambda: release.wait(5))])
+
+        results = runner.run([Section("stats", sleeper(0.01, 1), default=0)])
+        release.set()
+
+        assert results.degraded == {"stats": "busy"}
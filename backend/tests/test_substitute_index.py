@@ -0,0 +1,112 @@
+from app.utils.substitute_index import SubstituteIndex
+
+PRODUCTS = [
+    {
+        "id": "p1",
+        "name": "Organic Coffee Beans",
+        "description": "Medium roast arabica beans",
+        "category": "Beverages",
+        "brand": "Roastery",
+        "price": 12.0,
+        "rating": 4.5,
+    },
+    {
+        "id": "p2",
+        "name": "Dark Roast Coffee Beans",
+        "description": "Bold arabica beans",
+        "category": "Beverages",
+        "brand": "Roastery",
+        "price": 13.0,
+        "rating": 4.4,
+    },
+    {
+        "id": "p3",
+        "name": "Green Tea",
+        "description": "Loose leaf tea",
+        "category": "Beverages",
+        "brand": "Leafy",
+        "price": 6.0,
+        "rating": 3.9,
+    },
+    {
+        "id": "p4",
+        "name": "Wireless Headphones",
+        "description": "Noise cancelling",
+        "category": "Electronics",
+        "brand": "Roastery",
+        "price": 12.0,
+        "rating": 4.5,
+    },
+]
+
+
+class TestSubstituteIndex:
+    """Test the vectorized substitute finder."""
+
+    def test_ranks_same_category_only(self):
+        index = SubstituteIndex.build(PRODUCTS)
+
+        results = index.find_substitutes(PRODUCTS[0])
+
+        assert [r["id"] for r in results] == ["p2", "p3"]
+        assert results[0]["final_score"] > results[1]["final_score"]
+        assert 0 < results[0]["similarity_score"] <= 1
+
+    def test_preferences_and_top_k(self):
+        index = SubstituteIndex.build(PRODUCTS)
+
+        results = index.find_substitutes(
+            PRODUCTS[0], preferences={"max_price": 10, "preferred_brands": ["Leafy"]}
+        )
+        scores = {r["id"]: r["preference_score"] for r in results}
+
+        assert scores["p2"] == 0.5  # Over budget
+        assert round(scores["p3"], 6) == 1.0  # In budget, preferred brand
+        assert len(index.find_substitutes(PRODUCTS[0], limit=1)) == 1
+        assert index.find_substitutes({"category": "Toys"}) == []
+
+    def test_incremental_updates(self):
+        index = SubstituteIndex.build(PRODUCTS)
+        assert [r["id"] for r in index.find_substitutes(PRODUCTS[3])] == []
+
+        index.update("p3", {"category": "Electronics"})
+        index.add(
+            "p5", {"name": "Coffee Grinder", "category": "Beverages", "price": 30}
+        )
+        index.remove("p2")
+
+        assert [r["id"] for r in index.find_substitutes(PRODUCTS[3])] == ["p3"]
+        assert [r["id"] for r in index.find_substitutes(PRODUCTS[0])] == ["p5"]
+
+    def test_writes_patch_category_matrix(self):
+        fillers = [
+            {
+                "id": f"f{i}",
+                "name": f"Sparkling Water {i}",
+                "category": "Beverages",
+                "price": 2.0,
+            }
+            for i in range(20)
+        ]
+        index = SubstituteIndex.build(PRODUCTS + fillers)
+        index.find_substitutes(PRODUCTS[0])
+        matrix = index._matrices["Beverages"]
+
+        index.update("p2", {"stock_quantity": 0})
+        assert index._matrices["Beverages"] is matrix and matrix.changes == 0
+
+        index.update("p3", {"price": 12.0, "brand": "Roastery"})
+        index.add(
+            "p5", {"name": "Cold Brew Coffee", "category": "Beverages", "price": 12.0}
+        )
+        index.remove("p2")
+        results = {r["id"]: r for r in index.find_substitutes(PRODUCTS[0], limit=3)}
+        assert index._matrices["Beverages"] is matrix
+        assert {"p3", "p5"} <= set(results) and "p2" not in results
+        assert results["p3"]["similarity_score"] > 0.6  # Same price and brand now
+
+        for filler in fillers[:3]:
+            index.remove(filler["id"])
+        # 5 of 20 rows replaced or removed: refitted on the next lookup
+        assert len(index.find_substitutes(PRODUCTS[0], limit=50)) == 19
+        assert index._matrices["Beverages"] is not matrix